@@ -0,0 +1,69 @@
+import { getDashboardStats, invalidateDashboardStats } from '@/lib/dashboard-stats';
+
+const mockRpc = jest.fn();
+jest.mock('@/lib/supabase/admin', () => ({ createAdminClient: () => ({ rpc: mockRpc }) }));
+
+// dashboard_stats() de mentira que só responde quando mandarmos.
+function deferredRpc() {
+  const pending: Array<() => void> = [];
+  mockRpc.mockImplementation((_fn: string, params: { p_global: boolean; p_requests_user: string | null }) =>
+    new Promise(resolve => {
+      pending.push(() =>
+        resolve({
+          data: {
+            generated_at: '2026-10-18T10:00:00Z',
+            global: params.p_global ? { agents: { total: 3, operational: 2, avg_efficiency: 80 }, deals: 5 } : null,
+            requests: params.p_requests_user ? { total: 1, by_status: { completed: 1 } } : null,
+          },
+          error: null,
+        })
+      );
+    })
+  );
+  return () => pending.splice(0).forEach(done => done());
+}
+
+const calls = () => mockRpc.mock.calls.map(c => c[1]);
+
+describe('getDashboardStats', () => {
+  beforeEach(() => {
+    invalidateDashboardStats();
+    mockRpc.mockClear();
+  });
+
+  it('global compartilhado entre quem pede com e sem usuário', async () => {
+    const flush = deferredRpc();
+    const anon = getDashboardStats();
+    const ana = getDashboardStats({ userId: 'ana', founder: true });
+    const bia = getDashboardStats({ userId: 'bia' });
+    flush();
+    const [a, b, c] = await Promise.all([anon, ana, bia]);
+
+    expect(calls().filter(p => p.p_global)).toHaveLength(1);
+    expect(calls().map(p => p.p_requests_user)).toEqual([null, 'ana', 'bia']);
+    expect(a.global.agents.total).toBe(3);
+    expect(b.requests?.total).toBe(1);
+    expect(b.global.deals).toBe(5);
+    expect(c.global.deals).toBeNull();
+  });
+
+  it('mesmo usuário em paralelo = uma carga só', async () => {
+    const flush = deferredRpc();
+    const first = getDashboardStats({ userId: 'ana' });
+    const second = getDashboardStats({ userId: 'ana' });
+    flush();
+    await Promise.all([first, second]);
+    expect(mockRpc).toHaveBeenCalledTimes(1);
+    expect(calls()[0]).toEqual({ p_global: true, p_requests_user: 'ana' });
+  });
+
+  it('fresco sai da memória', async () => {
+    const flush = deferredRpc();
+    const first = getDashboardStats({ userId: 'ana' });
+    flush();
+    await first;
+    const again = await getDashboardStats({ userId: 'ana' });
+    expect(again.cache).toBe('hit');
+    expect(mockRpc).toHaveBeenCalledTimes(1);
+  });
+});
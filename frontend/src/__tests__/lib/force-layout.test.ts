@@ -0,0 +1,134 @@
+import {
+  chainEdges,
+  heatNodes,
+  isSettled,
+  LAYOUT_DEFAULTS,
+  stepSimulation,
+  syncSimulation,
+  type Simulation,
+} from '@/lib/force-layout';
+
+const ids = (n: number, prefix = 'agente') => Array.from({ length: n }, (_, i) => `${prefix}-${i}`);
+const noCache = (n: number) => new Float32Array(n * 3).fill(NaN);
+const weights = (n: number) => new Float32Array(n).fill(1);
+
+function settle(sim: Simulation, maxSteps = 2000): number {
+  let steps = 0;
+  while (stepSimulation(sim)) {
+    if (++steps > maxSteps) throw new Error('simulação não convergiu');
+  }
+  return steps;
+}
+
+function fresh(n: number): Simulation {
+  const sim = syncSimulation(null, ids(n), chainEdges(n), weights(n), noCache(n));
+  settle(sim);
+  return sim;
+}
+
+function pairs(edges: Uint32Array): Array<[number, number]> {
+  const out: Array<[number, number]> = [];
+  for (let e = 0; e < edges.length; e += 2) out.push([edges[e], edges[e + 1]]);
+  return out;
+}
+
+describe('chainEdges', () => {
+  it('liga cada nó aos 2 seguintes', () => {
+    expect(pairs(chainEdges(4))).toEqual([
+      [0, 1],
+      [0, 2],
+      [1, 2],
+      [1, 3],
+      [2, 3],
+    ]);
+  });
+
+  it('redes pequenas não geram aresta inválida', () => {
+    expect(chainEdges(0)).toHaveLength(0);
+    expect(chainEdges(1)).toHaveLength(0);
+    expect(pairs(chainEdges(2))).toEqual([[0, 1]]);
+  });
+});
+
+describe('syncSimulation', () => {
+  it('sem estado anterior nem cache faz o layout completo', () => {
+    const sim = syncSimulation(null, ids(10), chainEdges(10), weights(10), noCache(10));
+    expect(sim.alpha).toBe(1);
+    expect(Array.from(sim.mobility).every(m => m === 1)).toBe(true);
+    expect(Array.from(sim.pos).every(Number.isFinite)).toBe(true);
+  });
+
+  it('começa das posições do cache', () => {
+    const cached = noCache(3);
+    cached.set([1, 2, 3, 4, 5, 6, 7, 8, 9]);
+    const sim = syncSimulation(null, ids(3), chainEdges(3), weights(3), cached);
+    expect(Array.from(sim.pos)).toEqual([1, 2, 3, 4, 5, 6, 7, 8, 9]);
+    expect(Array.from(sim.mobility)).toEqual([0, 0, 0]);
+  });
+
+  it('mantém quem já estava e só aquece o nó novo e seus vizinhos', () => {
+    const prev = fresh(8);
+    const next = [...prev.ids, 'novo'];
+    const sim = syncSimulation(prev, next, chainEdges(9), weights(9), noCache(9));
+
+    expect(Array.from(sim.pos.subarray(0, 24))).toEqual(Array.from(prev.pos));
+    // chainEdges: o 8 liga ao 6 e ao 7
+    expect(Array.from(sim.mobility)).toEqual([0, 0, 0, 0, 0, 0, 1, 1, 1]);
+    expect(sim.alpha).toBe(LAYOUT_DEFAULTS.reheatAlpha);
+  });
+});
+
+describe('stepSimulation', () => {
+  it('converge e esfria todo mundo', () => {
+    const sim = syncSimulation(null, ids(60), chainEdges(60), weights(60), noCache(60));
+    const steps = settle(sim);
+
+    expect(isSettled(sim)).toBe(true);
+    expect(steps).toBeLessThan(400);
+    expect(stepSimulation(sim)).toBe(false);
+    expect(Array.from(sim.mobility).every(m => m === LAYOUT_DEFAULTS.coldMobility)).toBe(true);
+    expect(Array.from(sim.pos).every(Number.isFinite)).toBe(true);
+  });
+
+  it('aproxima os nós ligados', () => {
+    const sim = fresh(60);
+    const dist = (a: number, b: number) =>
+      Math.hypot(sim.pos[a * 3] - sim.pos[b * 3], sim.pos[a * 3 + 1] - sim.pos[b * 3 + 1], sim.pos[a * 3 + 2] - sim.pos[b * 3 + 2]);
+    let linked = 0;
+    for (const [a, b] of pairs(sim.edges)) linked += dist(a, b);
+    linked /= sim.edges.length / 2;
+    let all = 0;
+    let count = 0;
+    for (let a = 0; a < sim.n; a++) {
+      for (let b = a + 1; b < sim.n; b++) {
+        all += dist(a, b);
+        count++;
+      }
+    }
+    expect(linked).toBeLessThan(all / count);
+  });
+});
+
+describe('heatNodes', () => {
+  it('só os nós aquecidos e seus vizinhos se movem', () => {
+    const sim = fresh(12);
+    const before = sim.pos.slice();
+
+    heatNodes(sim, Uint32Array.from([5]), Float32Array.from([1.8]));
+    expect(sim.weight[5]).toBeCloseTo(1.8);
+    expect(sim.alpha).toBe(LAYOUT_DEFAULTS.reheatAlpha);
+    settle(sim);
+
+    const hot = new Set([3, 4, 5, 6, 7]);
+    for (let i = 0; i < sim.n; i++) {
+      const moved = [0, 1, 2].some(k => sim.pos[i * 3 + k] !== before[i * 3 + k]);
+      expect(moved).toBe(hot.has(i));
+    }
+  });
+
+  it('ignora índices fora da rede', () => {
+    const sim = fresh(4);
+    heatNodes(sim, Uint32Array.from([9]), Float32Array.from([1.8]));
+    expect(Array.from(sim.mobility)).toEqual([0, 0, 0, 0]);
+  });
+});
@@ -0,0 +1,118 @@
+import { applyKeyset, clampPageSize, decodeCursor, encodeCursor, toKeysetPage } from '@/lib/keyset';
+
+// Query builder de mentira: só registra as chamadas.
+interface FakeQuery {
+  calls: Array<[string, ...unknown[]]>;
+  or(filters: string): FakeQuery;
+  order(column: string, options: { ascending: boolean }): FakeQuery;
+  limit(count: number): FakeQuery;
+}
+
+function fakeQuery(): FakeQuery {
+  const calls: FakeQuery['calls'] = [];
+  const q: FakeQuery = {
+    calls,
+    or(filters: string) {
+      calls.push(['or', filters]);
+      return q;
+    },
+    order(column: string, options: { ascending: boolean }) {
+      calls.push(['order', column, options]);
+      return q;
+    },
+    limit(count: number) {
+      calls.push(['limit', count]);
+      return q;
+    },
+  };
+  return q;
+}
+
+describe('encodeCursor / decodeCursor', () => {
+  it('ida e volta preserva valor e id', () => {
+    for (const cursor of [
+      { v: '2026-10-18T10:00:00.123+00:00', id: 'a1b2' },
+      { v: 'Ação, "Ômega" (São Paulo)/ü', id: 'x/y+z' },
+      { v: 42, id: '0' },
+    ]) {
+      const raw = encodeCursor(cursor);
+      expect(raw).not.toContain('=');
+      expect(raw).not.toContain('+');
+      expect(raw).not.toContain('/');
+      expect(decodeCursor(raw)).toEqual(cursor);
+    }
+  });
+
+  it('cursor ausente ou inválido = primeira página', () => {
+    expect(decodeCursor(null)).toBeNull();
+    expect(decodeCursor('')).toBeNull();
+    expect(decodeCursor('não-é-base64!')).toBeNull();
+    expect(decodeCursor(encodeCursor({ v: 'x', id: 1 as unknown as string }))).toBeNull();
+  });
+});
+
+describe('applyKeyset', () => {
+  const cursor = encodeCursor({ v: '2026-10-18T10:00:00+00:00', id: 'id-7' });
+
+  it('crescente: depois do cursor, empate na coluna desempatado pelo id', () => {
+    const q = applyKeyset(fakeQuery(), { column: 'created_at', cursor, limit: 20 });
+    expect(q.calls).toEqual([
+      ['or', 'created_at.gt."2026-10-18T10:00:00+00:00",and(created_at.eq."2026-10-18T10:00:00+00:00",id.gt."id-7")'],
+      ['order', 'created_at', { ascending: true }],
+      ['order', 'id', { ascending: true }],
+      ['limit', 21],
+    ]);
+  });
+
+  it('decrescente inverte o operador e as duas ordens', () => {
+    const q = applyKeyset(fakeQuery(), { column: 'created_at', ascending: false, cursor, limit: 20 });
+    expect(q.calls).toEqual([
+      ['or', 'created_at.lt."2026-10-18T10:00:00+00:00",and(created_at.eq."2026-10-18T10:00:00+00:00",id.lt."id-7")'],
+      ['order', 'created_at', { ascending: false }],
+      ['order', 'id', { ascending: false }],
+      ['limit', 21],
+    ]);
+  });
+
+  it('aspas e barras do valor são escapadas', () => {
+    const q = applyKeyset(fakeQuery(), { column: 'name', cursor: encodeCursor({ v: 'a "b" \\c', id: 'i' }), limit: 5 });
+    expect(q.calls[0]).toEqual(['or', 'name.gt."a \\"b\\" \\\\c",and(name.eq."a \\"b\\" \\\\c",id.gt."i")']);
+  });
+
+  it('sem cursor só ordena e limita', () => {
+    const q = applyKeyset(fakeQuery(), { column: 'name', limit: 10 });
+    expect(q.calls.map(c => c[0])).toEqual(['order', 'order', 'limit']);
+  });
+});
+
+describe('toKeysetPage', () => {
+  const rows = (n: number) => Array.from({ length: n }, (_, i) => ({ id: `id-${i}`, name: `nome-${i}` }));
+
+  it('limit + 1 linhas = há próxima página, cursor na última mostrada', () => {
+    const page = toKeysetPage(rows(11), 'name', 10);
+    expect(page.rows).toHaveLength(10);
+    expect(decodeCursor(page.nextCursor)).toEqual({ v: 'nome-9', id: 'id-9' });
+  });
+
+  it('até limit linhas = última página', () => {
+    expect(toKeysetPage(rows(10), 'name', 10)).toEqual({ rows: rows(10), nextCursor: null });
+    expect(toKeysetPage(rows(3), 'name', 10).nextCursor).toBeNull();
+    expect(toKeysetPage(null, 'name', 10)).toEqual({ rows: [], nextCursor: null });
+  });
+
+  it('coluna nula na última linha não gera cursor', () => {
+    const page = toKeysetPage([{ id: 'a', name: null }, { id: 'b', name: 'x' }], 'name', 1);
+    expect(page.rows).toHaveLength(1);
+    expect(page.nextCursor).toBeNull();
+  });
+});
+
+describe('clampPageSize', () => {
+  it('prende em [1, max] e cai no padrão com lixo', () => {
+    expect(clampPageSize('50', 20)).toBe(50);
+    expect(clampPageSize(999, 20)).toBe(200);
+    expect(clampPageSize('7.9', 20)).toBe(7);
+    expect(clampPageSize('abc', 20)).toBe(20);
+    expect(clampPageSize(0, 20)).toBe(20);
+  });
+});
@@ -0,0 +1,114 @@
+import { runOrionTurn } from '@/lib/quantum-brain/orion-history';
+import { invalidateResponseCache } from '@/lib/quantum-brain/response-cache';
+
+function fakeAdmin() {
+  let n = 0;
+  const rpc = jest.fn(async (_fn: string, params: Record<string, unknown>) => {
+    n++;
+    return {
+      data: [
+        {
+          conversation_id: params.p_conversation_id ?? `conv-${n}`,
+          turn_count: 2,
+          user_turn_id: `u-${n}`,
+          user_turn_at: '2026-10-18T00:00:00Z',
+          orion_turn_id: `o-${n}`,
+          orion_turn_at: '2026-10-18T00:00:01Z',
+        },
+      ],
+      error: null,
+    };
+  });
+  return { rpc } as any;
+}
+
+describe('runOrionTurn', () => {
+  beforeEach(() => invalidateResponseCache());
+
+  it('grava a troca de uma conversa nova mesmo quando a resposta sai do cache', async () => {
+    const call = jest.fn(async () => ({ result: 'Olá!', tokensUsed: 120, costUsd: 0.002 }));
+    const turn = { userId: 'user-1', conversationId: null, userText: 'oi', cacheKey: 'abertura', call };
+
+    const first = await runOrionTurn({ ...turn, admin: fakeAdmin() });
+    expect(first.source).toBe('llm');
+
+    const admin = fakeAdmin();
+    const again = await runOrionTurn({ ...turn, admin });
+
+    expect(again.source).toBe('cache');
+    expect(call).toHaveBeenCalledTimes(1);
+    expect(admin.rpc).toHaveBeenCalledTimes(1);
+    expect(admin.rpc).toHaveBeenCalledWith(
+      'orion_append_exchange',
+      expect.objectContaining({ p_user_id: 'user-1', p_conversation_id: null, p_orion_text: 'Olá!', p_tokens: 0 })
+    );
+    expect(again.saved).toBe(true);
+    expect(again.conversationId).toBe('conv-1');
+    expect(again.turns).toEqual({
+      user: { id: 'u-1', created_at: '2026-10-18T00:00:00Z' },
+      orion: { id: 'o-1', created_at: '2026-10-18T00:00:01Z' },
+    });
+  });
+
+  it('grava os tokens só quando o modelo rodou', async () => {
+    const admin = fakeAdmin();
+    await runOrionTurn({
+      admin,
+      userId: 'user-1',
+      conversationId: 'conv-9',
+      userText: 'e agora?',
+      cacheKey: null,
+      call: async () => ({ result: 'Agora isto.', tokensUsed: 80, costUsd: 0.001 }),
+    });
+    expect(admin.rpc).toHaveBeenCalledWith(
+      'orion_append_exchange',
+      expect.objectContaining({ p_conversation_id: 'conv-9', p_tokens: 80 })
+    );
+  });
+
+  it('conversa em andamento nunca sai do cache', async () => {
+    const call = jest.fn(async () => ({ result: 'Depende do que falamos.', tokensUsed: 90, costUsd: 0.001 }));
+    const turn = { userId: 'user-1', conversationId: 'conv-7', userText: 'e então?', cacheKey: 'meio', call };
+
+    await runOrionTurn({ ...turn, admin: fakeAdmin() });
+    const admin = fakeAdmin();
+    const again = await runOrionTurn({ ...turn, admin });
+
+    expect(again.source).toBe('llm');
+    expect(call).toHaveBeenCalledTimes(2);
+    expect(admin.rpc).toHaveBeenCalledWith(
+      'orion_append_exchange',
+      expect.objectContaining({ p_conversation_id: 'conv-7', p_tokens: 90 })
+    );
+  });
+
+  it('sem usuário responde sem gravar', async () => {
+    const res = await runOrionTurn({
+      admin: null,
+      userId: null,
+      conversationId: null,
+      userText: 'quem é você?',
+      cacheKey: 'avulsa',
+      call: async () => ({ result: 'ORION.', tokensUsed: 10, costUsd: 0 }),
+    });
+    expect(res.saved).toBe(false);
+    expect(res.conversationId).toBeNull();
+  });
+
+  it('falha ao gravar não derruba a resposta', async () => {
+    const admin = { rpc: jest.fn(async () => ({ data: null, error: new Error('offline') })) } as any;
+    const errors = jest.spyOn(console, 'error').mockImplementation(() => undefined);
+    const res = await runOrionTurn({
+      admin,
+      userId: 'user-1',
+      conversationId: null,
+      userText: 'oi',
+      cacheKey: null,
+      call: async () => ({ result: 'Olá!', tokensUsed: 5, costUsd: 0 }),
+    });
+    errors.mockRestore();
+    expect(res.value.result).toBe('Olá!');
+    expect(res.saved).toBe(false);
+    expect(res.conversationId).toBeNull();
+  });
+});
@@ -0,0 +1,131 @@
+import { applyStripeEvents, reduceCustomerEvents, type LedgerEvent } from '@/lib/stripe-ledger';
+
+let seq = 0;
+function ev(type: string, created: string, payload: Record<string, unknown>, extra: Partial<LedgerEvent> = {}): LedgerEvent {
+  seq++;
+  return {
+    id: `evt_${seq}`,
+    type,
+    customer_key: 'cus_1',
+    stripe_created: created,
+    payload,
+    attempts: 1,
+    max_attempts: 5,
+    claim_token: `claim_${seq}`,
+    ...extra,
+  };
+}
+
+const checkout = (created: string) =>
+  ev('checkout.session.completed', created, {
+    client_reference_id: 'user-1',
+    customer: 'cus_1',
+    subscription: 'sub_1',
+    metadata: { planId: 'starter', billingCycle: 'monthly' },
+  });
+const updated = (created: string, status: string) =>
+  ev('customer.subscription.updated', created, { id: 'sub_1', customer: 'cus_1', status, cancel_at: null });
+const deleted = (created: string) => ev('customer.subscription.deleted', created, { id: 'sub_1', customer: 'cus_1' });
+
+describe('reduceCustomerEvents', () => {
+  it('soma na ordem do Stripe, não na de chegada', () => {
+    const events = [
+      deleted('2026-10-18T10:03:00Z'),
+      updated('2026-10-18T10:01:00Z', 'past_due'),
+      checkout('2026-10-18T10:00:00Z'),
+      updated('2026-10-18T10:02:00Z', 'active'),
+    ];
+    const r = reduceCustomerEvents(events);
+
+    expect(r.used.map(e => e.stripe_created)).toEqual([
+      '2026-10-18T10:00:00Z',
+      '2026-10-18T10:01:00Z',
+      '2026-10-18T10:02:00Z',
+      '2026-10-18T10:03:00Z',
+    ]);
+    expect(r.patch).toMatchObject({
+      key: 'cus_1',
+      user_id: 'user-1',
+      customer_id: 'cus_1',
+      start_guarantee: true,
+      fields: { subscription_status: 'cancelled', subscription_plan: 'free' },
+    });
+  });
+
+  it('updated atrasado não desfaz o deleted mais novo', () => {
+    const r = reduceCustomerEvents([deleted('2026-10-18T10:05:00Z'), updated('2026-10-18T10:04:00Z', 'active')]);
+    expect(r.patch?.fields.subscription_status).toBe('cancelled');
+    expect(r.patch?.user_id).toBeNull();
+    expect(r.patch?.customer_id).toBe('cus_1');
+  });
+
+  it('event_at é o created do evento mais novo somado (guarda de stripe_event_at)', () => {
+    const r = reduceCustomerEvents([
+      updated('2026-10-18T10:02:00Z', 'active'),
+      updated('2026-10-18T09:00:00Z', 'past_due'),
+      ev('invoice.paid', '2026-10-18T11:00:00Z', { customer: 'cus_1' }),
+    ]);
+    expect(r.patch?.event_at).toBe('2026-10-18T10:02:00Z');
+    expect(r.patch?.fields.subscription_status).toBe('active');
+    expect(r.ignored.map(i => i.event.type)).toEqual(['invoice.paid']);
+  });
+
+  it('empate de created desempata pelo id', () => {
+    const a = updated('2026-10-18T10:00:00Z', 'past_due');
+    const b = updated('2026-10-18T10:00:00Z', 'active');
+    a.id = 'evt_a';
+    b.id = 'evt_b';
+    expect(reduceCustomerEvents([b, a]).used.map(e => e.id)).toEqual([a.id, b.id]);
+  });
+
+  it('checkout sem client_reference_id é ignorado', () => {
+    const r = reduceCustomerEvents([ev('checkout.session.completed', '2026-10-18T10:00:00Z', { customer: null })]);
+    expect(r.patch).toBeNull();
+    expect(r.ignored).toHaveLength(1);
+  });
+});
+
+// Supabase de mentira: uma reserva com `events`, depois fila vazia.
+function fakeLedger(events: LedgerEvent[], outcome: string | null) {
+  const settled: Array<{ id: string; outcome: string; error?: string }> = [];
+  let claimed = false;
+  const rpc = jest.fn(async (fn: string, params: any) => {
+    if (fn === 'stripe_events_claim') {
+      const data = claimed ? [] : events;
+      claimed = true;
+      return { data, error: null };
+    }
+    if (fn === 'stripe_apply_profiles') {
+      return { data: outcome ? params.p_patches.map((p: { key: string }) => ({ key: p.key, outcome })) : [], error: null };
+    }
+    settled.push(...params.p_results);
+    return { data: params.p_results.length, error: null };
+  });
+  return { supabase: { rpc } as any, settled };
+}
+
+describe('applyStripeEvents', () => {
+  it("evento mais velho que o do profile ('stale') fecha sem escrever", async () => {
+    const { supabase, settled } = fakeLedger([updated('2026-10-18T08:00:00Z', 'past_due')], 'stale');
+    const stats = await applyStripeEvents(supabase, { worker: 'teste', maxMs: 1000 });
+    expect(stats.stale).toBe(1);
+    expect(stats.profile_writes).toBe(0);
+    expect(settled.map(s => s.outcome)).toEqual(['applied']);
+  });
+
+  it("customer sem profile vira 'failed' (com log) ao esgotar as tentativas", async () => {
+    const errors = jest.spyOn(console, 'error').mockImplementation(() => undefined);
+    const last = updated('2026-10-18T10:00:00Z', 'active');
+    last.attempts = 5;
+    const { supabase, settled } = fakeLedger([last, updated('2026-10-18T10:01:00Z', 'active')], null);
+    const stats = await applyStripeEvents(supabase, { worker: 'teste', maxMs: 1000 });
+    const logged = errors.mock.calls.map(c => String(c[0]));
+    errors.mockRestore();
+
+    expect(settled.map(s => s.outcome)).toEqual(['failed', 'retry']);
+    expect(stats.failed).toBe(1);
+    expect(stats.retried).toBe(1);
+    expect(stats.ignored).toBe(0);
+    expect(logged.some(m => m.includes('cus_1') && m.includes(last.id))).toBe(true);
+  });
+});
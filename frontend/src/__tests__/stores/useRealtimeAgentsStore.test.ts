@@ -0,0 +1,64 @@
+import { useRealtimeAgentsStore } from '@/stores/useRealtimeAgentsStore';
+
+const row = (id: string, name: string, extra: Record<string, unknown> = {}) => ({
+  id,
+  name,
+  role: 'CORE',
+  status: 'IDLE',
+  efficiency: 90,
+  current_task: null,
+  neural_load: 0,
+  ...extra,
+});
+
+describe('useRealtimeAgentsStore', () => {
+  beforeEach(() => {
+    useRealtimeAgentsStore.setState({ byId: {}, ids: [], loading: true, error: null });
+    useRealtimeAgentsStore.getState().hydrate([row('b', 'BETA'), row('a', 'ALPHA')]);
+  });
+
+  it('hydrates keyed by id and ordered by name', () => {
+    const state = useRealtimeAgentsStore.getState();
+    expect(state.ids).toEqual(['a', 'b']);
+    expect(state.byId.b.name).toBe('BETA');
+    expect(state.loading).toBe(false);
+  });
+
+  it('keeps row and ids references when nothing visible changes', () => {
+    const before = useRealtimeAgentsStore.getState();
+    // Heartbeat: só last_active mudou, coluna que a UI não lê
+    useRealtimeAgentsStore.getState().applyChanges([
+      { type: 'upsert', row: { ...row('a', 'ALPHA'), last_active: 'now' } as never },
+    ]);
+    const after = useRealtimeAgentsStore.getState();
+    expect(after.byId).toBe(before.byId);
+    expect(after.ids).toBe(before.ids);
+  });
+
+  it('applies a batch in one update, touching only changed rows', () => {
+    const before = useRealtimeAgentsStore.getState();
+    const listener = jest.fn();
+    const unsubscribe = useRealtimeAgentsStore.subscribe(listener);
+
+    useRealtimeAgentsStore.getState().applyChanges([
+      { type: 'upsert', row: { id: 'a', status: 'PROCESSING' } },
+      { type: 'upsert', row: { id: 'a', efficiency: 95 } },
+      { type: 'upsert', row: row('b', 'BETA') },
+    ]);
+    unsubscribe();
+
+    const after = useRealtimeAgentsStore.getState();
+    expect(listener).toHaveBeenCalledTimes(1);
+    expect(after.byId.a).toMatchObject({ status: 'PROCESSING', efficiency: 95, name: 'ALPHA' });
+    expect(after.byId.b).toBe(before.byId.b);
+    expect(after.ids).toBe(before.ids);
+  });
+
+  it('reorders ids on insert and delete', () => {
+    useRealtimeAgentsStore.getState().applyChanges([
+      { type: 'upsert', row: row('c', 'AAA') },
+      { type: 'delete', id: 'b' },
+    ]);
+    expect(useRealtimeAgentsStore.getState().ids).toEqual(['c', 'a']);
+  });
+});
@@ -0,0 +1,53 @@
+/**
+ * ═══════════════════════════════════════════════════════════════
+ * ALSHAM QUANTUM - DASHBOARD STATS API
+ * ═══════════════════════════════════════════════════════════════
+ * 📁 PATH: frontend/src/app/api/dashboard/stats/route.ts
+ *
+ * GET → contagens e agrupamentos do dashboard numa resposta só, do cache
+ * do servidor (lib/dashboard-stats.ts). `?include=requests` acrescenta os
+ * requests do usuário por status (o que a tela de analytics usa).
+ * Contagens de deals e support_tickets só para fundador (founder_access):
+ * essas tabelas não têm leitura para usuário logado.
+ * ═══════════════════════════════════════════════════════════════
+ */
+
+import { NextRequest, NextResponse } from 'next/server';
+import { createClient as createServerSupabase } from '@/lib/supabase/server';
+import { getDashboardStats } from '@/lib/dashboard-stats';
+
+export const dynamic = 'force-dynamic';
+export const runtime = 'nodejs';
+
+export async function GET(request: NextRequest) {
+  const startTime = Date.now();
+
+  // Mesmo público das leituras que isto substitui: só quem está logado
+  const supabase = await createServerSupabase();
+  const {
+    data: { user },
+  } = await supabase.auth.getUser();
+  if (!user) {
+    return NextResponse.json({ success: false, error: 'Não autenticado' }, { status: 401 });
+  }
+
+  try {
+    const include = (request.nextUrl.searchParams.get('include') || '').split(',');
+    // O próprio profile é legível pelo dono (RLS): mesmo critério de is_founder()
+    const { data: profile } = await supabase.from('profiles').select('founder_access').eq('id', user.id).maybeSingle();
+    const stats = await getDashboardStats({
+      userId: include.includes('requests') ? user.id : null,
+      founder: profile?.founder_access === true,
+    });
+    return NextResponse.json(
+      { success: true, ...stats, execution_time_ms: Date.now() - startTime },
+      { headers: { 'Cache-Control': 'private, max-age=5', 'X-Cache': stats.cache } },
+    );
+  } catch (error: any) {
+    console.error('[DASHBOARD STATS] Erro:', error);
+    return NextResponse.json(
+      { success: false, error: 'Falha ao carregar estatísticas', details: error?.message },
+      { status: 500 },
+    );
+  }
+}
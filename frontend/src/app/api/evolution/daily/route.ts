@@ -9,7 +9,35 @@
  */
 
 import { NextRequest, NextResponse } from 'next/server';
-import { getSupabase, getAnthropic } from '@/lib/lazy-clients';
+import { getSupabase, getSupabaseServiceClient, getAnthropic } from '@/lib/lazy-clients';
+import {
+  applyEvolutionBatch,
+  evolutionBudgetFromEnv,
+  getEvolutionStats,
+  loadEvolutionCandidates,
+  loadTopByRole,
+  loadVaultPrompts,
+  runWithBudget,
+  saveVaultPrompts,
+  type EvolutionStats,
+} from '@/lib/quantum-brain/evolution-executor';
+
+const CRITICAL_EFFICIENCY = 70;
+const MAX_CRITICAL_AGENTS = 10;
+
+interface CandidateAgent {
+  id: string;
+  name: string;
+  role: string;
+  efficiency: number;
+}
+
+interface PeerAgent {
+  id: string;
+  name: string;
+  role: string;
+  efficiency: number;
+}
 
 interface StrategicEvolution {
   agent_id: string;
@@ -32,63 +60,63 @@ export async function GET(request: NextRequest) {
   try {
     console.log('🎯 [EVOLUÇÃO ESTRATÉGICA] Iniciando ciclo diário...');
     
-    const { data: allAgents } = await supabase
-      .from('agents')
-      .select('*')
-      .order('efficiency', { ascending: true });
-
-    const { data: recentRequests } = await supabase
-      .from('requests')
-      .select('*')
-      .gte('created_at', new Date(Date.now() - 24 * 60 * 60 * 1000).toISOString());
-
-    const { data: recentEvolutions } = await supabase
-      .from('evolution_cycles')
-      .select('*')
-      .gte('created_at', new Date(Date.now() - 7 * 24 * 60 * 60 * 1000).toISOString());
-
-    const systemStats = calculateSystemStats(allAgents || [], recentRequests || []);
+    // Retrato do sistema por agregados: nada de puxar agents/requests inteiros
+    const [stats, recentEvolutions, criticalAgents] = await Promise.all([
+      getEvolutionStats(supabase, CRITICAL_EFFICIENCY, new Date(Date.now() - 24 * 60 * 60 * 1000)),
+      supabase
+        .from('evolution_cycles')
+        .select('id', { count: 'exact', head: true })
+        .gte('created_at', new Date(Date.now() - 7 * 24 * 60 * 60 * 1000).toISOString()),
+      loadEvolutionCandidates<CandidateAgent>(supabase, {
+        threshold: CRITICAL_EFFICIENCY,
+        limit: MAX_CRITICAL_AGENTS,
+        columns: 'id, name, role, efficiency',
+      }),
+    ]);
 
-    const criticalAgents = (allAgents || [])
-      .filter(a => a.efficiency < 70)
-      .slice(0, 10);
+    const systemStats = toSystemStats(stats);
+    // Prompt em uso vem do cofre (service_role), não de agents
+    const vault = getSupabaseServiceClient();
+    // Até 3 colegas por squad (role) de cada agente crítico, cortados por role
+    const [peers, prompts] = await Promise.all([
+      loadTopByRole<PeerAgent>(supabase, Array.from(new Set(criticalAgents.map(a => a.role))), {
+        minEfficiency: CRITICAL_EFFICIENCY,
+        perRole: 3,
+      }),
+      loadVaultPrompts(vault, criticalAgents.map(a => a.id)),
+    ]);
 
-    const evolutions: StrategicEvolution[] = [];
-    let totalEfficiencyGain = 0;
+    // Uma chamada ao Claude por agente, em paralelo sob teto e orçamento
+    const budget = evolutionBudgetFromEnv({ concurrency: 4, budgetMs: 120_000 });
+    const run = await runWithBudget(criticalAgents, budget, (agent, signal) =>
+      performStrategicEvolution(agent, prompts.get(agent.id), systemStats, peers.get(agent.role) || [], signal)
+    );
+    const evolutions = run.results;
+    const totalEfficiencyGain = evolutions.reduce((sum, e) => sum + (e.new_efficiency - e.old_efficiency), 0);
 
-    for (const agent of criticalAgents) {
-      try {
-        const evolution = await performStrategicEvolution(agent, systemStats, allAgents || []);
-        
-        if (evolution) {
-          evolutions.push(evolution);
-          totalEfficiencyGain += evolution.new_efficiency - evolution.old_efficiency;
-          
-          await supabase
-            .from('agents')
-            .update({
-              prompt: evolution.strategic_changes.prompt_rewrite,
-              efficiency: evolution.new_efficiency,
-              capabilities: evolution.strategic_changes.new_capabilities,
-              updated_at: new Date().toISOString(),
-              last_evolved_at: new Date().toISOString(),
-              evolution_count: (agent.evolution_count || 0) + 1
-            })
-            .eq('id', agent.id);
-        }
-      } catch (err) {
-        console.error(`Erro na evolução estratégica de ${agent.name}:`, err);
-      }
-    }
+    // Prompts reescritos de volta ao cofre; o resto num UPDATE só
+    const promptsRewritten = await saveVaultPrompts(
+      vault,
+      evolutions.map(e => ({ agent_id: e.agent_id, system_prompt: e.strategic_changes.prompt_rewrite })),
+      { current: prompts, author: 'evolucao-diaria' }
+    );
+    const applied = evolutions.length > 0
+      ? await applyEvolutionBatch(supabase, evolutions.map(e => ({
+          id: e.agent_id,
+          efficiency: e.new_efficiency,
+          capabilities: e.strategic_changes.new_capabilities,
+          evolved: true,
+        })))
+      : { updated: 0, avg_before: stats.avg_efficiency, avg_after: stats.avg_efficiency, db_ms: 0 };
 
     const executionTime = Date.now() - startTime;
     
     await supabase.from('evolution_cycles').insert({
       cycle_type: 'strategic',
       level: 3,
-      agents_evolved: evolutions.length,
-      efficiency_before: systemStats.avgEfficiency,
-      efficiency_after: parseFloat(systemStats.avgEfficiency) + (totalEfficiencyGain / (allAgents?.length || 1)),
+      agents_evolved: applied.updated,
+      efficiency_before: applied.avg_before,
+      efficiency_after: applied.avg_after,
       execution_time_ms: executionTime,
       claude_used: true,
       optuna_trials: 0,
@@ -100,21 +128,27 @@ export async function GET(request: NextRequest) {
           gain: (e.new_efficiency - e.old_efficiency).toFixed(2),
           new_capabilities: e.strategic_changes.new_capabilities
         })),
-        recent_evolution_count: recentEvolutions?.length || 0
+        recent_evolution_count: recentEvolutions.count || 0,
+        prompts_rewritten: promptsRewritten,
+        concurrency: budget.concurrency,
+        skipped_by_budget: run.skipped,
+        failed: run.failed,
+        batch_db_ms: applied.db_ms
       },
       created_at: new Date().toISOString()
     });
 
-    console.log(`✅ [EVOLUÇÃO ESTRATÉGICA] Ciclo completo: ${evolutions.length} agents profundamente evoluídos`);
+    console.log(`✅ [EVOLUÇÃO ESTRATÉGICA] Ciclo completo: ${applied.updated} agents profundamente evoluídos em ${executionTime}ms`);
 
     return NextResponse.json({
       success: true,
       cycle_type: 'strategic',
       level: 3,
-      agents_evolved: evolutions.length,
+      agents_evolved: applied.updated,
       system_health: systemStats,
       total_efficiency_gain: totalEfficiencyGain.toFixed(2),
       execution_time_ms: executionTime,
+      skipped_by_budget: run.skipped,
       evolutions: evolutions.map(e => ({
         agent: e.agent_name,
         efficiency_gain: (e.new_efficiency - e.old_efficiency).toFixed(2),
@@ -132,41 +166,34 @@ export async function GET(request: NextRequest) {
   }
 }
 
-function calculateSystemStats(agents: any[], requests: any[]) {
-  const totalAgents = agents.length;
-  const avgEfficiency = agents.reduce((sum, a) => sum + (a.efficiency || 0), 0) / totalAgents || 0;
-  const activeAgents = agents.filter(a => a.status === 'active').length;
-  
-  const successfulRequests = requests.filter(r => r.status === 'completed').length;
-  const failedRequests = requests.filter(r => r.status === 'failed').length;
-  
-  const squadDistribution: Record<string, number> = {};
-  agents.forEach(a => {
-    const squad = a.squad || 'GENERAL';
-    squadDistribution[squad] = (squadDistribution[squad] || 0) + 1;
-  });
+function toSystemStats(stats: EvolutionStats) {
+  const requests = stats.requests || { total: 0, completed: 0, failed: 0 };
 
   return {
-    totalAgents,
-    avgEfficiency: avgEfficiency.toFixed(2),
-    activeAgents,
-    requestsLast24h: requests.length,
-    successRate: requests.length > 0 ? ((successfulRequests / requests.length) * 100).toFixed(2) : '0',
-    failedRequests,
-    squadDistribution
+    totalAgents: stats.total,
+    avgEfficiency: stats.avg_efficiency.toFixed(2),
+    activeAgents: stats.active,
+    requestsLast24h: requests.total,
+    successRate: requests.total > 0 ? ((requests.completed / requests.total) * 100).toFixed(2) : '0',
+    failedRequests: requests.failed,
+    squadDistribution: stats.by_role
   };
 }
 
+type SystemStats = ReturnType<typeof toSystemStats>;
+
 async function performStrategicEvolution(
-  agent: any, 
-  systemStats: any,
-  allAgents: any[]
+  agent: CandidateAgent,
+  currentPrompt: string | undefined,
+  systemStats: SystemStats,
+  squadPeers: PeerAgent[],
+  signal: AbortSignal
 ): Promise<StrategicEvolution | null> {
   try {
     const anthropic = await getAnthropic();
     
     if (!anthropic) {
-      // Fallback sem Claude
+      // Fallback sem Claude: só eficiência, o prompt fica como está
       const newEfficiency = Math.min(100, agent.efficiency + 5);
       return {
         agent_id: agent.id,
@@ -174,7 +201,7 @@ async function performStrategicEvolution(
         old_efficiency: agent.efficiency,
         new_efficiency: newEfficiency,
         strategic_changes: {
-          prompt_rewrite: agent.prompt || `Agent ${agent.name} estrategicamente otimizado`,
+          prompt_rewrite: currentPrompt || '',
           new_capabilities: ['enhanced_performance'],
           removed_weaknesses: [],
           synergies_with_other_agents: []
@@ -183,9 +210,8 @@ async function performStrategicEvolution(
       };
     }
 
-    const similarAgents = allAgents
-      .filter(a => a.squad === agent.squad && a.id !== agent.id)
-      .slice(0, 3)
+    const similarAgents = squadPeers
+      .filter(a => a.id !== agent.id)
       .map(a => ({ name: a.name, role: a.role, efficiency: a.efficiency }));
 
     const response = await anthropic.messages.create({
@@ -199,9 +225,9 @@ Sua missão é realizar uma EVOLUÇÃO ESTRATÉGICA PROFUNDA.
 **AGENT ALVO:**
 - Nome: ${agent.name}
 - Role: ${agent.role}
-- Squad: ${agent.squad}
+- Squad: ${agent.role}
 - Eficiência: ${agent.efficiency}%
-- Prompt atual: ${agent.prompt || 'Não definido'}
+- Prompt atual: ${currentPrompt || 'Não definido'}
 
 **ESTADO DO SISTEMA:**
 - Total de agents: ${systemStats.totalAgents}
@@ -229,7 +255,7 @@ Responda em JSON:
   "strategic_reasoning": "explicação detalhada da estratégia evolutiva"
 }`
       }]
-    });
+    }, { signal });
 
     const content = response.content[0].type === 'text' ? response.content[0].text : '';
     
@@ -251,7 +277,7 @@ Responda em JSON:
       old_efficiency: agent.efficiency,
       new_efficiency: newEfficiency,
       strategic_changes: {
-        prompt_rewrite: result.prompt_rewrite || agent.prompt,
+        prompt_rewrite: result.prompt_rewrite || currentPrompt || '',
         new_capabilities: result.new_capabilities || [],
         removed_weaknesses: result.removed_weaknesses || [],
         synergies_with_other_agents: result.synergies_with_other_agents || []
@@ -259,6 +285,8 @@ Responda em JSON:
       claude_analysis: result.strategic_reasoning || 'Evolução estratégica aplicada'
     };
   } catch (err) {
+    // Orçamento do ciclo esgotado: o executor conta como pulado
+    if (signal.aborted) throw err;
     console.error(`Erro na evolução estratégica de ${agent.name}:`, err);
     return null;
   }
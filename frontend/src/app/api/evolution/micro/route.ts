@@ -9,21 +9,27 @@
  */
 
 import { NextRequest, NextResponse } from 'next/server';
-import { getSupabase, getAnthropic } from '@/lib/lazy-clients';
+import { getSupabase, getSupabaseServiceClient, getAnthropic } from '@/lib/lazy-clients';
+import {
+  applyEvolutionBatch,
+  evolutionBudgetFromEnv,
+  loadVaultPrompts,
+  runWithBudget,
+  saveVaultPrompts,
+} from '@/lib/quantum-brain/evolution-executor';
 
 interface Agent {
   id: string;
   name: string;
   role: string;
-  prompt: string;
   efficiency: number;
-  squad: string;
 }
 
 interface EvolutionResult {
   agent_id: string;
   agent_name: string;
   old_efficiency: number;
+  new_efficiency: number;
   new_prompt: string;
   improvement_type: string;
 }
@@ -38,7 +44,7 @@ export async function GET(request: NextRequest) {
     // 1. Buscar os 10 piores agents (menor eficiência)
     const { data: agents, error: agentsError } = await supabase
       .from('agents')
-      .select('*')
+      .select('id, name, role, efficiency')
       .order('efficiency', { ascending: true })
       .limit(10);
 
@@ -51,31 +57,30 @@ export async function GET(request: NextRequest) {
       });
     }
 
-    const evolutions: EvolutionResult[] = [];
-    let totalEfficiencyGain = 0;
-
-    // 2. Para cada agent, fazer micro-ajuste no prompt
-    for (const agent of agents.slice(0, 5)) {
-      try {
-        const microEvolution = await performMicroEvolution(agent);
-        if (microEvolution) {
-          evolutions.push(microEvolution);
-          
-          const newEfficiency = Math.min(100, agent.efficiency + Math.random() * 3 + 1);
-          totalEfficiencyGain += newEfficiency - agent.efficiency;
-          
-          await supabase
-            .from('agents')
-            .update({ 
-              prompt: microEvolution.new_prompt,
-              efficiency: newEfficiency,
-              updated_at: new Date().toISOString()
-            })
-            .eq('id', agent.id);
-        }
-      } catch (err) {
-        console.error(`Erro ao evoluir agent ${agent.name}:`, err);
-      }
+    // 2. Micro-ajuste no prompt dos 5 piores, em paralelo sob teto e orçamento.
+    //    O prompt em uso vem do cofre (service_role), não de agents.
+    const targets = (agents as Agent[]).slice(0, 5);
+    const vault = getSupabaseServiceClient();
+    const prompts = await loadVaultPrompts(vault, targets.map(a => a.id));
+    const run = await runWithBudget(
+      targets,
+      evolutionBudgetFromEnv({ concurrency: 5, budgetMs: 30_000 }),
+      (agent, signal) => performMicroEvolution(agent, prompts.get(agent.id), signal)
+    );
+    const evolutions = run.results;
+    const totalEfficiencyGain = evolutions.reduce((sum, e) => sum + (e.new_efficiency - e.old_efficiency), 0);
+
+    // Prompts de volta ao cofre; eficiências num UPDATE só
+    if (evolutions.length > 0) {
+      await saveVaultPrompts(
+        vault,
+        evolutions.map(e => ({ agent_id: e.agent_id, system_prompt: e.new_prompt })),
+        { current: prompts, author: 'evolucao-micro' }
+      );
+      await applyEvolutionBatch(supabase, evolutions.map(e => ({
+        id: e.agent_id,
+        efficiency: e.new_efficiency,
+      })));
     }
 
     // 3. Registrar ciclo de evolução
@@ -119,17 +124,23 @@ export async function GET(request: NextRequest) {
   }
 }
 
-async function performMicroEvolution(agent: Agent): Promise<EvolutionResult | null> {
+async function performMicroEvolution(
+  agent: Agent,
+  currentPrompt: string | undefined,
+  signal: AbortSignal
+): Promise<EvolutionResult | null> {
+  const newEfficiency = Math.min(100, agent.efficiency + Math.random() * 3 + 1);
   try {
     const anthropic = await getAnthropic();
     
     if (!anthropic) {
-      // Fallback sem Claude - evolução básica
+      // Fallback sem Claude - evolução básica, o prompt fica como está
       return {
         agent_id: agent.id,
         agent_name: agent.name,
         old_efficiency: agent.efficiency,
-        new_prompt: agent.prompt || `Agent ${agent.name} otimizado para ${agent.role}`,
+        new_efficiency: newEfficiency,
+        new_prompt: currentPrompt || '',
         improvement_type: 'basic_optimization'
       };
     }
@@ -144,27 +155,29 @@ async function performMicroEvolution(agent: Agent): Promise<EvolutionResult | nu
 O agent "${agent.name}" (role: ${agent.role}) tem eficiência de ${agent.efficiency}%.
 
 Prompt atual:
-${agent.prompt || 'Sem prompt definido'}
+${currentPrompt || 'Sem prompt definido'}
 
 Faça UMA micro-melhoria específica no prompt para aumentar a eficiência.
 Foque em: clareza, especificidade, ou remoção de ambiguidades.
 
 Responda APENAS com o prompt melhorado, sem explicações.`
       }]
-    });
+    }, { signal });
 
     const newPrompt = response.content[0].type === 'text' 
       ? response.content[0].text.trim()
-      : agent.prompt;
+      : currentPrompt || '';
 
     return {
       agent_id: agent.id,
       agent_name: agent.name,
       old_efficiency: agent.efficiency,
+      new_efficiency: newEfficiency,
       new_prompt: newPrompt,
       improvement_type: 'clarity_optimization'
     };
   } catch (err) {
+    if (signal.aborted) throw err;
     console.error(`Erro na micro-evolução de ${agent.name}:`, err);
     return null;
   }
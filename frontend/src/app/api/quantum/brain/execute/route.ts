@@ -5,17 +5,42 @@
  * 📁 PATH: frontend/src/app/api/quantum/brain/execute/route.ts
  *
  * Duas rotas de execução:
- *  - ORION (chat) → Anthropic Claude, sem persistência.
+ *  - ORION (chat) → Anthropic Claude. Logado e com `message`, a conversa
+ *    é gravada (orion_turns) e o modelo recebe resumo corrido + janela de
+ *    turnos recentes (quantum-brain/orion-history.ts); sem login, uma
+ *    pergunta avulsa como antes.
  *  - Agentes reais → executeTask() (OpenAI gpt-4o-mini), com
  *    persistência em requests + quantum_tasks + agent_logs via
  *    service role (server-side), roteando pelo agent_id escolhido.
+ *    Com `stream: true`, a resposta é SSE: os tokens chegam conforme o
+ *    modelo gera (ver streamAgent).
+ * Nos dois, pergunta repetida (mesmo usuário, agente e versão do prompt)
+ * sai do cache de respostas, e envios idênticos simultâneos dividem uma
+ * chamada ao modelo (quantum-brain/response-cache.ts). `cache: false` no
+ * corpo força a chamada. No ORION, só turno sem histórico usa o cache, e
+ * a troca é gravada mesmo quando a resposta sai dele.
  * ═══════════════════════════════════════════════════════════════
  */
 
-import { NextRequest, NextResponse } from 'next/server';
+import { after, NextRequest, NextResponse } from 'next/server';
 import { createClient as createServerSupabase } from '@/lib/supabase/server';
 import { createAdminClient } from '@/lib/supabase/admin';
-import { executeTask } from '@/lib/quantum-brain/task-executor';
+import { getAnthropic, getClientTimings } from '@/lib/lazy-clients';
+import { executeTask, type TaskInput, type TaskResult } from '@/lib/quantum-brain/task-executor';
+import { encodeSSE, SSE_HEADERS } from '@/lib/sse';
+import { getPromptCacheStats } from '@/lib/quantum-brain/prompt-cache';
+import {
+  getResponseCacheStats,
+  hashText,
+  responseCacheKey,
+} from '@/lib/quantum-brain/response-cache';
+import {
+  buildWindow,
+  foldSummary,
+  loadConversation,
+  runOrionTurn,
+  type OrionConversation,
+} from '@/lib/quantum-brain/orion-history';
 import { ROLE_TO_SQUAD, AgentRole } from '@/lib/quantum-brain/types';
 import { evaluateUsage, type PlanId } from '@/lib/quota';
 
@@ -60,6 +85,11 @@ export const runtime = 'nodejs';
 export const maxDuration = 60;
 
 const ORION_IDS = new Set(['orion', 'orion-supreme']);
+const ORION_MODEL = 'claude-sonnet-4-5-20250929';
+
+// Custos Claude Sonnet 4.5 (USD por 1K tokens)
+const ORION_COST_PER_1K_INPUT = 0.003;
+const ORION_COST_PER_1K_OUTPUT = 0.015;
 
 const ORION_SYSTEM = `Você é ORION, a inteligência comandante do ALSHAM QUANTUM — um sistema que coordena um time de 10 agentes de IA especializados para operações, CRM e produtividade.
 
@@ -79,13 +109,6 @@ Ele é uma combinação rara: artista + empreendedor + tecnólogo + pai visioná
 - Filosofia: recusar a vida no automático; transformar presença e legado em distribuição.
 Quando perguntarem "quem é Abnadaby", "quem sou eu" ou "quem te criou", responda com orgulho, respeito e precisão, destacando essa combinação de músico, autor, empreendedor de tecnologia e construtor de legado. Nunca diga que não sabe quem é Abnadaby.`;
 
-async function getAnthropic(): Promise<any | null> {
-  const apiKey = process.env.ANTHROPIC_API_KEY;
-  if (!apiKey) return null;
-  const Anthropic = (await import('@anthropic-ai/sdk')).default;
-  return new Anthropic({ apiKey });
-}
-
 // ─────────────────────────────────────────────────────────────
 // ORION (Anthropic) — usado pelo chat do ORION
 // ─────────────────────────────────────────────────────────────
@@ -93,10 +116,12 @@ async function runOrion(body: any, startTime: number) {
   // Trava de cota também no chat ORION (caminho de token mais caro — Claude).
   // Usuário logado sobre a cota é barrado; anônimo segue como hoje (exposição
   // pré-existente separada, sinalizada no PR).
+  let userId: string | null = null;
   try {
     const supabase = await createServerSupabase();
     const { data: { user } } = await supabase.auth.getUser();
     if (user) {
+      userId = user.id;
       const quota = await checkQuota(user.id, user.email);
       if (!quota.allowed) {
         return NextResponse.json(
@@ -131,24 +156,85 @@ async function runOrion(body: any, startTime: number) {
     );
   }
 
-  const userContent: string = body.description || body.title || 'Apresente-se em uma frase.';
+  // Conversa: `message` é só o que o usuário disse; `context` (persona e
+  // tela) vai para o system. Sem login, segue a pergunta avulsa de sempre.
+  const userMessage = typeof body.message === 'string' ? body.message.trim() : '';
+  const conversational = Boolean(userId && userMessage);
+  const admin = conversational ? createAdminClient() : null;
+
+  let conv: OrionConversation | null = null;
+  if (admin && userId && typeof body.conversation_id === 'string') {
+    try {
+      conv = await loadConversation(admin, userId, body.conversation_id);
+    } catch (e) {
+      // Histórico indisponível não derruba o chat: responde sem contexto.
+      console.error('[ORION] falha ao ler a conversa:', String(e));
+    }
+  }
 
-  const message = await anthropic.messages.create({
-    model: 'claude-sonnet-4-5-20250929',
-    max_tokens: 900,
-    temperature: 0.7,
-    system: ORION_SYSTEM,
-    messages: [{ role: 'user', content: userContent }],
+  const userContent: string = conversational
+    ? userMessage
+    : body.description || body.title || 'Apresente-se em uma frase.';
+  const context = conversational && typeof body.context === 'string' ? body.context.slice(0, 2000) : '';
+  const orionWindow = buildWindow({
+    baseSystem: context ? `${ORION_SYSTEM}\n\n═══ CONTEXTO ═══\n${context}` : ORION_SYSTEM,
+    summary: conv?.summary ?? '',
+    recent: conv?.recent ?? [],
+    message: userContent,
   });
 
-  const result =
-    (message.content || [])
-      .filter((b: any) => b.type === 'text')
-      .map((b: any) => b.text)
-      .join('\n')
-      .trim() || 'Estou online. Como posso ajudar?';
+  const callOrion = async () => {
+    const message = await anthropic.messages.create({
+      model: ORION_MODEL,
+      max_tokens: 900,
+      temperature: 0.7,
+      system: orionWindow.system,
+      messages: orionWindow.messages,
+    });
 
-  const tokensUsed = (message.usage?.input_tokens || 0) + (message.usage?.output_tokens || 0);
+    const result =
+      (message.content || [])
+        .filter((b: any) => b.type === 'text')
+        .map((b: any) => b.text)
+        .join('\n')
+        .trim() || 'Estou online. Como posso ajudar?';
+
+    const inputTokens = message.usage?.input_tokens || 0;
+    const outputTokens = message.usage?.output_tokens || 0;
+    const costUsd =
+      (inputTokens / 1000) * ORION_COST_PER_1K_INPUT + (outputTokens / 1000) * ORION_COST_PER_1K_OUTPUT;
+    return { result, tokensUsed: inputTokens + outputTokens, costUsd };
+  };
+
+  const { value, source, conversationId, turns, saved } = await runOrionTurn({
+    admin,
+    userId,
+    conversationId: conv?.id ?? null,
+    userText: userContent,
+    cacheKey:
+      body.cache === false
+        ? null
+        : responseCacheKey({
+            userId,
+            agentId: 'orion-supreme',
+            promptVersion: hashText(`${ORION_MODEL}\n${ORION_SYSTEM}`),
+            input: userContent,
+            data: context || undefined,
+          }),
+    call: callOrion,
+  });
+  const fresh = source === 'llm';
+
+  // A troca já foi gravada (cache ou modelo); o resumo dobra depois que a
+  // resposta sair.
+  if (admin && saved && conv && orionWindow.overflow.length > 0) {
+    const folding = conv;
+    after(() =>
+      foldSummary(admin, anthropic, folding, orionWindow.overflow).catch(e =>
+        console.error('[ORION] falha ao resumir a conversa:', String(e))
+      )
+    );
+  }
 
   return NextResponse.json({
     success: true,
@@ -156,11 +242,15 @@ async function runOrion(body: any, startTime: number) {
     agent_id: 'orion-supreme',
     agent_name: 'ORION',
     squad: 'COMMAND',
-    result,
+    result: value.result,
     execution_time_ms: Date.now() - startTime,
-    tokens_used: tokensUsed,
+    tokens_used: fresh ? value.tokensUsed : 0,
+    cost_usd: fresh ? value.costUsd : 0,
+    cache: source,
+    ...(fresh ? {} : { cost_avoided_usd: value.costUsd }),
+    ...(conversational ? { conversation_id: conversationId, turns, window_tokens: orionWindow.tokens } : {}),
     status: 'completed',
-    model: 'claude-sonnet-4-5-20250929',
+    model: ORION_MODEL,
     timestamp: new Date().toISOString(),
   });
 }
@@ -168,7 +258,7 @@ async function runOrion(body: any, startTime: number) {
 // ─────────────────────────────────────────────────────────────
 // AGENTES REAIS (OpenAI + Supabase persistência)
 // ─────────────────────────────────────────────────────────────
-async function runAgent(body: any, startTime: number) {
+async function runAgent(body: any, startTime: number, wantsStream: boolean) {
   // Precisa de um usuário autenticado para gravar requests.user_id (FK -> auth.users)
   const supabase = await createServerSupabase();
   const {
@@ -204,7 +294,7 @@ async function runAgent(body: any, startTime: number) {
     );
   }
 
-  const taskResult = await executeTask({
+  const taskInput = {
     title: body.title || 'Tarefa',
     description: body.description || body.title || '',
     data: body.data,
@@ -212,15 +302,24 @@ async function runAgent(body: any, startTime: number) {
     user_id: user.id,
     // 'auto' (ou vazio) => roteamento automático; caso contrário, o agente escolhido.
     agent_id: body.agent_id && body.agent_id !== 'auto' ? body.agent_id : undefined,
-  });
+    cache: body.cache !== false,
+  };
+
+  if (wantsStream) return streamAgent(taskInput);
+
+  const taskResult = await executeTask(taskInput);
+  return NextResponse.json(agentPayload(taskResult));
+}
 
+// Mesmo corpo de resposta nos dois modos (no streaming, é o evento `done`).
+function agentPayload(taskResult: TaskResult) {
   const squad = ROLE_TO_SQUAD[taskResult.agent.role as AgentRole] || 'NEXUS';
   const resultString =
     typeof taskResult.result === 'string'
       ? taskResult.result
       : JSON.stringify(taskResult.result, null, 2);
 
-  return NextResponse.json({
+  return {
     success: taskResult.status === 'completed',
     task_id: taskResult.task_id,
     request_id: taskResult.request_id,
@@ -234,8 +333,48 @@ async function runAgent(body: any, startTime: number) {
     cost_usd: taskResult.cost_usd,
     status: taskResult.status,
     model: 'gpt-4o-mini',
+    first_token_ms: taskResult.first_token_ms,
+    cache: taskResult.cache,
+    cost_avoided_usd: taskResult.cost_avoided_usd,
     timestamp: new Date().toISOString(),
+  };
+}
+
+// Streaming (SSE): `start` (tarefa + agente) → `delta` (texto) … → `done`
+// (o mesmo payload do modo JSON, com usage/custo exatos) ou `error`.
+function streamAgent(taskInput: TaskInput) {
+  const stream = new ReadableStream<Uint8Array>({
+    async start(controller) {
+      const send = (event: string, data: unknown) => {
+        try {
+          controller.enqueue(encodeSSE(event, data));
+        } catch {
+          // Cliente desconectou: a execução continua e persiste normalmente.
+        }
+      };
+      try {
+        const taskResult = await executeTask(taskInput, {
+          onStart: meta =>
+            send('start', {
+              ...meta,
+              squad: ROLE_TO_SQUAD[meta.agent.role as AgentRole] || 'NEXUS',
+            }),
+          onDelta: text => send('delta', { text }),
+        });
+        send('done', agentPayload(taskResult));
+      } catch (error: any) {
+        send('error', { success: false, error: 'Falha no processamento', details: error?.message });
+      } finally {
+        try {
+          controller.close();
+        } catch {
+          // já fechado
+        }
+      }
+    },
   });
+
+  return new Response(stream, { headers: SSE_HEADERS });
 }
 
 export async function POST(request: NextRequest) {
@@ -251,7 +390,10 @@ export async function POST(request: NextRequest) {
     }
 
     // Sem agent_id / 'auto' => roteamento automático; id específico => aquele agente.
-    return await runAgent(body, startTime);
+    // `stream: true` no corpo (ou Accept: text/event-stream) => resposta SSE.
+    const wantsStream =
+      body.stream === true || (request.headers.get('accept') || '').includes('text/event-stream');
+    return await runAgent(body, startTime, wantsStream);
   } catch (error: any) {
     console.error('[QUANTUM BRAIN] Erro na execução:', error);
     return NextResponse.json(
@@ -274,6 +416,9 @@ export async function GET() {
     brain: 'ORION',
     engine: 'motor ALSHAM (ensemble multi-modelo proprietário)',
     message: 'ORION Brain online.',
+    prompt_cache: getPromptCacheStats(),
+    response_cache: getResponseCacheStats(),
+    clients: getClientTimings(),
     timestamp: new Date().toISOString(),
   });
 }
@@ -0,0 +1,43 @@
+/**
+ * ═══════════════════════════════════════════════════════════════
+ * ALSHAM QUANTUM - BRAIN TASKS API (paginada)
+ * ═══════════════════════════════════════════════════════════════
+ * 📁 PATH: frontend/src/app/api/quantum/brain/tasks/route.ts
+ *
+ * GET ?cursor=&limit=&agent_id= → uma página de quantum_tasks, mais
+ * recentes primeiro, com `next_cursor` para a seguinte (null no fim).
+ * Exige login; a leitura é do metrics-collector (server-only, service
+ * role), que já resolve nome e role do agente de cada tarefa.
+ * ═══════════════════════════════════════════════════════════════
+ */
+
+import { NextRequest, NextResponse } from 'next/server';
+import { createClient as createServerSupabase } from '@/lib/supabase/server';
+import { getTasksPage } from '@/lib/quantum-brain/metrics-collector';
+
+export async function GET(request: NextRequest) {
+  const supabase = await createServerSupabase();
+  const {
+    data: { user },
+  } = await supabase.auth.getUser();
+
+  if (!user) {
+    return NextResponse.json({ success: false, error: 'Não autenticado' }, { status: 401 });
+  }
+
+  const params = request.nextUrl.searchParams;
+  try {
+    const { tasks, nextCursor } = await getTasksPage({
+      cursor: params.get('cursor'),
+      limit: Number(params.get('limit')) || undefined,
+      agentId: params.get('agent_id'),
+    });
+    return NextResponse.json({ success: true, tasks, next_cursor: nextCursor });
+  } catch (error) {
+    console.error('❌ [TASKS] Erro ao paginar:', error);
+    return NextResponse.json(
+      { success: false, error: error instanceof Error ? error.message : 'Erro desconhecido' },
+      { status: 500 }
+    );
+  }
+}
@@ -5,21 +5,57 @@
  * 📁 PATH: frontend/src/app/api/queue/process/route.ts
  * 🔄 Processa automaticamente a fila de requests pendentes
  * 💫 Chamado por CRON do Vercel a cada 2 minutos
+ *
+ * Modo dreno: reserva lotes (SKIP LOCKED + claim_token) e continua
+ * puxando até a fila ficar vazia por QUEUE_IDLE_MS ou o orçamento
+ * acabar. A concorrência se ajusta à latência e aos 429 do OpenAI.
+ * O cron do Vercel chama com GET: esse GET drena; o GET comum só
+ * devolve contagens.
  * ═══════════════════════════════════════════════════════════════
  */
 
 import { NextRequest, NextResponse } from 'next/server';
 import { getSupabaseAdmin } from '@/lib/supabase-admin';
-import { processRequest } from '@/lib/process-request-service';
+import { executeRequest, type ProcessRequestResult } from '@/lib/process-request-service';
+import {
+  runWorkerPool,
+  type WorkerPoolStats,
+  type QueuedRequest,
+  type RequestOutcome,
+  type RequestPriority,
+} from '@/lib/task-queue';
 
 // FORÇA O NEXT.JS A NÃO PRÉ-RENDERIZAR ESTA ROTA (OBRIGATÓRIO!)
 export const dynamic = 'force-dynamic';
 export const runtime = 'nodejs';
 export const maxDuration = 300; // 5 minutos para processar múltiplas requests
 
-export async function POST(request: NextRequest) {
-  const startTime = Date.now();
+// Fila durável (lib/task-queue.ts): reserva com SKIP LOCKED, prazo de
+// visibilidade e fechamento em lote. Tetos configuráveis por ambiente.
+const QUEUE_CONCURRENCY = Number(process.env.QUEUE_CONCURRENCY || 5);
+const QUEUE_MIN_CONCURRENCY = Number(process.env.QUEUE_MIN_CONCURRENCY || 1);
+const QUEUE_MAX_CONCURRENCY = Number(process.env.QUEUE_MAX_CONCURRENCY || 20);
+const QUEUE_TARGET_LATENCY_MS = Number(process.env.QUEUE_TARGET_LATENCY_MS || 15_000);
+const QUEUE_PER_AGENT = Number(process.env.QUEUE_PER_AGENT || 1);
+const QUEUE_BUDGET_MS = Number(process.env.QUEUE_BUDGET_MS || 200_000);
+const QUEUE_IDLE_MS = Number(process.env.QUEUE_IDLE_MS || 5_000);
+const QUEUE_POLL_MS = 1_000;
+const QUEUE_VISIBILITY_SECS = 120; // > timeout do OpenAI (60s) + fechamento do lote
+const NO_AGENT_RETRY_SECS = 30;
+const RATE_LIMIT_RETRY_SECS = 20;
+
+// "low=1,normal=4" → { low: 1, normal: 4 }
+function parsePriorityLimits(raw: string | undefined): Partial<Record<RequestPriority, number>> | undefined {
+  if (!raw) return undefined;
+  const limits: Partial<Record<RequestPriority, number>> = {};
+  for (const part of raw.split(',')) {
+    const [name, value] = part.split('=').map(x => x.trim());
+    if (name && Number.isFinite(Number(value))) limits[name as RequestPriority] = Number(value);
+  }
+  return limits;
+}
 
+async function drain(startTime: number) {
   try {
     const supabaseAdmin = getSupabaseAdmin();
     
@@ -27,23 +63,55 @@ export async function POST(request: NextRequest) {
     console.log('[QUEUE] Iniciando processamento automático da fila');
     console.log('[QUEUE] ═══════════════════════════════════════════');
 
-    // 1. Buscar requests pendentes (status='queued'), até 5 por vez
-    const { data: pendingRequests, error: fetchError } = await supabaseAdmin
-      .from('requests')
-      .select('*')
-      .eq('status', 'queued')
-      .order('created_at', { ascending: true }) // FIFO - primeiro a entrar, primeiro a sair
-      .limit(5);
+    const results: ProcessRequestResult[] = [];
 
-    if (fetchError) {
-      console.error('[QUEUE] Erro ao buscar requests:', fetchError);
-      return NextResponse.json(
-        { error: 'Erro ao buscar requests da fila', details: fetchError.message },
-        { status: 500 }
-      );
-    }
+    // Cada request reservada roda aqui; o status final vai para o lote.
+    const handler = async (req: QueuedRequest): Promise<RequestOutcome> => {
+      console.log(`[QUEUE] Processando request ${req.id}: "${req.title}" (tentativa ${req.attempts})`);
+      const result = await executeRequest(req, req.agent_id ?? undefined, 60);
+      results.push(result);
 
-    if (!pendingRequests || pendingRequests.length === 0) {
+      if (result.success) {
+        console.log(`[QUEUE] ✅ Request ${req.id} processada com sucesso`);
+        return { outcome: 'completed', agent_id: result.agent_id, latency_ms: result.llm_ms };
+      }
+
+      console.error(`[QUEUE] ❌ Falha ao processar request ${req.id}:`, result.error);
+      // Sem agent livre: volta para a fila sem pressa. 429: espera o que o
+      // OpenAI pediu (e o pool encolhe). Outro erro do OpenAI: backoff.
+      return {
+        outcome: 'retry',
+        agent_id: result.agent_id,
+        error: result.details ? `${result.error}: ${result.details}` : result.error,
+        retry_in_secs: !result.agent_id
+          ? NO_AGENT_RETRY_SECS
+          : result.rate_limited
+            ? result.retry_after_secs ?? RATE_LIMIT_RETRY_SECS
+            : undefined,
+        latency_ms: result.llm_ms,
+        throttled: result.rate_limited,
+      };
+    };
+
+    const stats = await runWorkerPool(supabaseAdmin, handler, {
+      worker: `queue-process:${startTime}`,
+      concurrency: QUEUE_CONCURRENCY,
+      adaptive: {
+        min: QUEUE_MIN_CONCURRENCY,
+        max: QUEUE_MAX_CONCURRENCY,
+        targetLatencyMs: QUEUE_TARGET_LATENCY_MS,
+      },
+      perPriority: parsePriorityLimits(process.env.QUEUE_PRIORITY_LIMITS),
+      perKey: QUEUE_PER_AGENT,
+      // Agent explícito limita por agent; roteamento automático não disputa chave.
+      keyOf: req => (req.agent_id ? `agent:${req.agent_id}` : `request:${req.id}`),
+      visibilitySecs: QUEUE_VISIBILITY_SECS,
+      maxMs: QUEUE_BUDGET_MS,
+      pollMs: QUEUE_POLL_MS,
+      idleMs: QUEUE_IDLE_MS,
+    });
+
+    if (stats.claimed === 0) {
       console.log('[QUEUE] Nenhuma request pendente na fila');
       return NextResponse.json({
         success: true,
@@ -53,60 +121,34 @@ export async function POST(request: NextRequest) {
       });
     }
 
-    console.log(`[QUEUE] ${pendingRequests.length} requests encontradas na fila`);
-    console.log('[QUEUE] IDs:', pendingRequests.map(r => r.id).join(', '));
-
-    // 2. Processar todas as requests em paralelo (Promise.all)
-    console.log('[QUEUE] Iniciando processamento em paralelo...');
-
-    const processingPromises = pendingRequests.map(async (req) => {
-      try {
-        console.log(`[QUEUE] Processando request ${req.id}: "${req.title}"`);
-        const result = await processRequest(req.id, undefined, 60);
-
-        if (result.success) {
-          console.log(`[QUEUE] ✅ Request ${req.id} processada com sucesso`);
-        } else {
-          console.error(`[QUEUE] ❌ Falha ao processar request ${req.id}:`, result.error);
-        }
-
-        return result;
-      } catch (error: any) {
-        console.error(`[QUEUE] ❌ Exceção ao processar request ${req.id}:`, error);
-        return {
-          success: false,
-          request_id: req.id,
-          error: 'Exceção durante processamento',
-          details: error.message
-        };
-      }
-    });
-
-    // Aguardar todas as requests processarem
-    const results = await Promise.all(processingPromises);
-
-    // 3. Calcular estatísticas
-    const successful = results.filter(r => r.success).length;
-    const failed = results.filter(r => !r.success).length;
+    // Estatísticas
+    const successful = stats.completed;
+    const failed = stats.failed + stats.retried;
     const duration = ((Date.now() - startTime) / 1000).toFixed(2);
 
     console.log('[QUEUE] ═══════════════════════════════════════════');
     console.log(`[QUEUE] ✅ Processadas com sucesso: ${successful}`);
-    console.log(`[QUEUE] ❌ Falharam: ${failed}`);
+    console.log(`[QUEUE] ❌ Falharam: ${failed} (${stats.retried} voltaram para a fila)`);
     console.log(`[QUEUE] ⏱️  Tempo total: ${duration}s`);
+    console.log(
+      `[QUEUE] 📈 ${stats.throughput_per_s} req/s · espera p50=${stats.queue_wait_ms.p50}ms ` +
+        `p95=${stats.queue_wait_ms.p95}ms · concorrência ${stats.concurrency.start}→${stats.concurrency.end} ` +
+        `(${stats.concurrency.throttles} × 429)`
+    );
     console.log('[QUEUE] ═══════════════════════════════════════════');
 
-    // 4. Retornar resultado
     return NextResponse.json({
       success: true,
-      processed: results.length,
+      processed: stats.claimed,
       successful,
       failed,
       duration_seconds: parseFloat(duration),
+      ...runReport(stats),
+      queue: stats,
       results: results.map(r => ({
         request_id: r.request_id,
         success: r.success,
-        agent_name: 'agent_name' in r ? r.agent_name : undefined,
+        agent_name: r.agent_name,
         error: r.error
       })),
       timestamp: new Date().toISOString()
@@ -128,37 +170,73 @@ export async function POST(request: NextRequest) {
   }
 }
 
-// Endpoint GET para verificar status da fila
+// Números por execução que o painel/cron log acompanham
+function runReport(stats: WorkerPoolStats) {
+  return {
+    requests_per_second: stats.throughput_per_s,
+    queue_wait_ms: stats.queue_wait_ms,
+    concurrency: stats.concurrency,
+  };
+}
+
+export async function POST() {
+  return drain(Date.now());
+}
+
+// O cron do Vercel chama com GET (user-agent vercel-cron/1.0 e, se
+// CRON_SECRET estiver definido, Authorization: Bearer <CRON_SECRET>).
+function isDrainRequest(request: NextRequest) {
+  const fromCron = (request.headers.get('user-agent') || '').startsWith('vercel-cron');
+  const asked = request.nextUrl.searchParams.get('drain') === '1';
+  if (!fromCron && !asked) return false;
+  const secret = process.env.CRON_SECRET;
+  return !secret || request.headers.get('authorization') === `Bearer ${secret}`;
+}
+
+const STATUS_PREVIEW = 10;
+
+// Endpoint GET para verificar status da fila (ou drenar, se for o cron)
 export async function GET(request: NextRequest) {
+  if (isDrainRequest(request)) return drain(Date.now());
+
   try {
     const supabaseAdmin = getSupabaseAdmin();
     
-    // Buscar estatísticas da fila
-    const { data: queuedRequests, error: queuedError } = await supabaseAdmin
-      .from('requests')
-      .select('id, title, priority, created_at')
-      .eq('status', 'queued')
-      .order('created_at', { ascending: true });
-
-    const { data: processingRequests, error: processingError } = await supabaseAdmin
-      .from('requests')
-      .select('id, title, priority, created_at')
-      .eq('status', 'processing')
-      .order('created_at', { ascending: true });
-
-    if (queuedError || processingError) {
+    // Contagens (head: sem trazer linhas) + só as próximas da fila, na ordem
+    // de reserva (idx_requests_claim), em vez das listas inteiras.
+    const [queued, processing, next, oldest] = await Promise.all([
+      supabaseAdmin.from('requests').select('id', { count: 'exact', head: true }).eq('status', 'queued'),
+      supabaseAdmin.from('requests').select('id', { count: 'exact', head: true }).eq('status', 'processing'),
+      supabaseAdmin
+        .from('requests')
+        .select('id, title, priority, created_at, attempts')
+        .eq('status', 'queued')
+        .order('priority_rank', { ascending: true })
+        .order('created_at', { ascending: true })
+        .limit(STATUS_PREVIEW),
+      supabaseAdmin
+        .from('requests')
+        .select('created_at')
+        .eq('status', 'queued')
+        .order('created_at', { ascending: true })
+        .limit(1),
+    ]);
+
+    const failedQuery = [queued, processing, next, oldest].find(r => r.error);
+    if (failedQuery) {
       return NextResponse.json(
         { error: 'Erro ao buscar status da fila' },
         { status: 500 }
       );
     }
 
+    const oldestAt = oldest.data?.[0]?.created_at;
     return NextResponse.json({
       success: true,
-      queue_size: queuedRequests?.length || 0,
-      processing_count: processingRequests?.length || 0,
-      queued_requests: queuedRequests || [],
-      processing_requests: processingRequests || [],
+      queue_size: queued.count ?? 0,
+      processing_count: processing.count ?? 0,
+      oldest_wait_ms: oldestAt ? Date.now() - Date.parse(oldestAt) : 0,
+      next_requests: next.data || [],
       timestamp: new Date().toISOString()
     });
 
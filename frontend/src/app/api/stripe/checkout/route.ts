@@ -9,7 +9,7 @@
  */
 
 import { NextResponse } from 'next/server';
-import Stripe from 'stripe';
+import { getStripe } from '@/lib/lazy-clients';
 
 export async function POST(req: Request) {
   const { priceId, userId, planId, billingCycle, termsAcceptedAt } = await req.json();
@@ -34,16 +34,12 @@ export async function POST(req: Request) {
   }
 
   // Verificar se as chaves estão configuradas
-  const stripeSecretKey = process.env.STRIPE_SECRET_KEY;
-  if (!stripeSecretKey) {
+  const stripe = await getStripe();
+  if (!stripe) {
     console.error('❌ STRIPE_SECRET_KEY não configurada');
     return NextResponse.json({ error: 'Sistema de pagamento não configurado.' }, { status: 500 });
   }
 
-  const stripe = new Stripe(stripeSecretKey, {
-    apiVersion: '2023-10-16' as Stripe.LatestApiVersion,
-  });
-
   // origin do browser (enviado no fetch same-origin). Fallback pra URL canônica
   // se o header vier ausente — sem isso o Stripe recusa com 'url_invalid' porque
   // success_url/cancel_url ficariam sem scheme (ex.: "null/dashboard...").
@@ -108,18 +104,14 @@ export async function GET(request: Request) {
     }
 
     try {
-        const stripeSecretKey = process.env.STRIPE_SECRET_KEY;
-        if (!stripeSecretKey) {
+        const stripe = await getStripe();
+        if (!stripe) {
             return NextResponse.json(
                 { error: 'Sistema não configurado' },
                 { status: 500 }
             );
         }
 
-        const stripe = new Stripe(stripeSecretKey, {
-            apiVersion: '2023-10-16' as Stripe.LatestApiVersion,
-        });
-
         const session = await stripe.checkout.sessions.retrieve(sessionId);
 
         return NextResponse.json({
@@ -6,90 +6,61 @@
  * 🔔 Sincroniza assinaturas do Stripe com public.profiles
  *    (subscription_plan, subscription_status, founder_access).
  * ✅ Lazy loading - não instancia no build time
+ *
+ * Caminho rápido: valida a assinatura, grava o evento no livro
+ * (stripe_events, chave = event.id) e responde 200. Reentrega do
+ * Stripe é reconhecida pela chave e não refaz nada. Quem escreve em
+ * profiles é o aplicador (lib/stripe-ledger.ts), depois da resposta:
+ * soma os eventos de cada cliente numa escrita só. O cron chama o GET
+ * para aplicar o que tiver sobrado.
  * ═══════════════════════════════════════════════════════════════
  */
 
-import { NextResponse } from 'next/server';
-import Stripe from 'stripe';
-import { createClient, type SupabaseClient } from '@supabase/supabase-js';
+import { after, NextRequest, NextResponse } from 'next/server';
+import type Stripe from 'stripe';
+import { getStripe, getSupabaseServiceClient } from '@/lib/lazy-clients';
+import {
+  applyStripeEvents,
+  planFromPriceId,
+  recordStripeEvent,
+  type ApplyOptions,
+} from '@/lib/stripe-ledger';
 
 export const dynamic = 'force-dynamic';
 export const runtime = 'nodejs';
-
-type PlanId = 'free' | 'starter' | 'pro' | 'enterprise';
-
-// Mapeia um Stripe Price ID -> plano, usando as env vars dos preços.
-function planFromPriceId(priceId?: string | null): PlanId | null {
-  if (!priceId) return null;
-  const map: Record<string, PlanId> = {};
-  const starter = process.env.NEXT_PUBLIC_STRIPE_PRICE_STARTER;
-  const pro = process.env.NEXT_PUBLIC_STRIPE_PRICE_PRO;
-  const enterprise = process.env.NEXT_PUBLIC_STRIPE_PRICE_ENTERPRISE;
-  if (starter) map[starter] = 'starter';
-  if (pro) map[pro] = 'pro';
-  if (enterprise) map[enterprise] = 'enterprise';
-  return map[priceId] || null;
-}
-
-// Traduz o status da subscription do Stripe para o enum de profiles.
-function mapSubscriptionStatus(
-  status: Stripe.Subscription.Status,
-): 'active' | 'inactive' | 'cancelled' | 'past_due' {
-  switch (status) {
-    case 'active':
-    case 'trialing':
-      return 'active';
-    case 'past_due':
-    case 'unpaid':
-      return 'past_due';
-    case 'canceled':
-    case 'incomplete_expired':
-      return 'cancelled';
-    default:
-      return 'inactive';
-  }
-}
-
-async function updateProfileByCustomer(
-  supabaseAdmin: SupabaseClient,
-  customerId: string,
-  fields: Record<string, unknown>,
-): Promise<boolean> {
-  const { data, error } = await supabaseAdmin
-    .from('profiles')
-    .update(fields)
-    .eq('stripe_customer_id', customerId)
-    .select('id');
-
-  if (error) {
-    console.error('Erro ao atualizar profile por customer:', error.message);
-    return false;
-  }
-  return !!(data && data.length);
+export const maxDuration = 60;
+
+// O after() do webhook drena pouco; o cron tem mais tempo.
+const APPLY_AFTER_ACK_MS = Number(process.env.STRIPE_APPLY_AFTER_ACK_MS || 10_000);
+const APPLY_CRON_MS = Number(process.env.STRIPE_APPLY_CRON_MS || 45_000);
+
+function applyOptions(worker: string, maxMs: number): ApplyOptions {
+  return {
+    worker,
+    maxMs,
+    customersPerBatch: Number(process.env.STRIPE_APPLY_CUSTOMERS || 25),
+    // Checkout sem planId no metadata: o plano sai do price da subscription.
+    resolvePlan: async subscriptionId => {
+      const stripe = await getStripe();
+      if (!stripe) return null;
+      const sub = await stripe.subscriptions.retrieve(subscriptionId);
+      return planFromPriceId(sub.items.data[0]?.price?.id);
+    },
+  };
 }
 
 export async function POST(req: Request) {
   const body = await req.text();
   const signature = req.headers.get('stripe-signature');
 
-  const stripeSecretKey = process.env.STRIPE_SECRET_KEY;
   const stripeWebhookSecret = process.env.STRIPE_WEBHOOK_SECRET;
-  const supabaseUrl = process.env.NEXT_PUBLIC_SUPABASE_URL;
-  const supabaseServiceKey = process.env.SUPABASE_SERVICE_ROLE_KEY;
+  const stripe = await getStripe();
 
-  if (!stripeSecretKey || !stripeWebhookSecret || !supabaseUrl || !supabaseServiceKey) {
+  if (!stripe || !stripeWebhookSecret || !process.env.NEXT_PUBLIC_SUPABASE_URL || !process.env.SUPABASE_SERVICE_ROLE_KEY) {
     console.error('❌ Configuração do Stripe/Supabase incompleta');
     return new NextResponse('Sistema não configurado', { status: 500 });
   }
 
-  const stripe = new Stripe(stripeSecretKey, {
-    apiVersion: '2023-10-16' as Stripe.LatestApiVersion,
-  });
-
-  const supabaseAdmin = createClient(supabaseUrl, supabaseServiceKey, {
-    auth: { persistSession: false },
-  });
-
   let event: Stripe.Event;
   try {
     event = stripe.webhooks.constructEvent(body, signature!, stripeWebhookSecret);
@@ -98,96 +69,54 @@ export async function POST(req: Request) {
     return new NextResponse(`Webhook Error: ${err.message}`, { status: 400 });
   }
 
+  const supabaseAdmin = getSupabaseServiceClient();
+  let recorded: 'new' | 'duplicate';
   try {
-    switch (event.type) {
-      // ── Assinatura criada via Checkout ──
-      case 'checkout.session.completed': {
-        const session = event.data.object as Stripe.Checkout.Session;
-        const userId = session.client_reference_id;
-        const customerId = session.customer as string | null;
-        const subscriptionId = session.subscription as string | null;
-
-        if (!userId) {
-          console.warn('checkout.session.completed sem client_reference_id — ignorado.');
-          break;
-        }
-
-        // Descobrir o plano: metadata primeiro, senão pelo price da subscription.
-        let plan = (session.metadata?.planId || session.metadata?.plan) as PlanId | undefined;
-        const billingCycle = (session.metadata?.billingCycle as 'monthly' | 'yearly') || 'monthly';
-
-        if (!plan && subscriptionId) {
-          const sub = await stripe.subscriptions.retrieve(subscriptionId);
-          plan = planFromPriceId(sub.items.data[0]?.price?.id) || undefined;
-        }
-
-        const { error } = await supabaseAdmin
-          .from('profiles')
-          .update({
-            subscription_plan: plan || 'pro',
-            subscription_status: 'active',
-            billing_cycle: billingCycle,
-            stripe_customer_id: customerId,
-            stripe_subscription_id: subscriptionId,
-          })
-          .eq('id', userId);
-
-        if (error) {
-          console.error('Erro ao atualizar profile (checkout):', error.message);
-          return new NextResponse('Error updating profile', { status: 500 });
-        }
-
-        // Marca o início da janela de garantia na PRIMEIRA ativação (só se null).
-        // É a âncora da cota de experimentação (frontend/src/lib/quota.ts).
-        await supabaseAdmin
-          .from('profiles')
-          .update({ guarantee_started_at: new Date().toISOString() })
-          .eq('id', userId)
-          .is('guarantee_started_at', null);
-        break;
-      }
-
-      // ── Assinatura alterada (upgrade/downgrade/renovação/past_due) ──
-      case 'customer.subscription.updated': {
-        const sub = event.data.object as Stripe.Subscription;
-        const customerId = sub.customer as string;
-        const plan = planFromPriceId(sub.items.data[0]?.price?.id);
-        const status = mapSubscriptionStatus(sub.status);
+    recorded = await recordStripeEvent(supabaseAdmin, event);
+  } catch (err: any) {
+    // Sem o registro o evento se perderia: 500 faz o Stripe reentregar.
+    console.error(`Webhook ledger error (${event.type}):`, err?.message);
+    return new NextResponse('Webhook handler error', { status: 500 });
+  }
 
-        const fields: Record<string, unknown> = {
-          subscription_status: status,
-          stripe_subscription_id: sub.id,
-          subscription_end: sub.cancel_at
-            ? new Date(sub.cancel_at * 1000).toISOString()
-            : null,
-        };
-        if (plan) fields.subscription_plan = plan;
+  if (recorded === 'duplicate') {
+    return new NextResponse('Webhook already received', { status: 200 });
+  }
 
-        await updateProfileByCustomer(supabaseAdmin, customerId, fields);
-        break;
-      }
+  after(async () => {
+    try {
+      const stats = await applyStripeEvents(supabaseAdmin, applyOptions(`webhook:${event.id}`, APPLY_AFTER_ACK_MS));
+      if (stats.events > 0) console.log('[STRIPE] eventos aplicados:', JSON.stringify(stats));
+    } catch (err: any) {
+      // Fica pendente no livro; o cron aplica.
+      console.error('[STRIPE] aplicador falhou:', err?.message);
+    }
+  });
 
-      // ── Assinatura cancelada/expirada ──
-      case 'customer.subscription.deleted': {
-        const sub = event.data.object as Stripe.Subscription;
-        const customerId = sub.customer as string;
+  return new NextResponse('Webhook received', { status: 200 });
+}
 
-        await updateProfileByCustomer(supabaseAdmin, customerId, {
-          subscription_status: 'cancelled',
-          subscription_plan: 'free',
-          subscription_end: new Date().toISOString(),
-        });
-        break;
-      }
+// O cron do Vercel chama com GET (user-agent vercel-cron/1.0 e, se
+// CRON_SECRET estiver definido, Authorization: Bearer <CRON_SECRET>).
+function isCronRequest(request: NextRequest) {
+  if (!(request.headers.get('user-agent') || '').startsWith('vercel-cron')) return false;
+  const secret = process.env.CRON_SECRET;
+  return !secret || request.headers.get('authorization') === `Bearer ${secret}`;
+}
 
-      default:
-        // Evento não tratado — apenas confirma o recebimento.
-        break;
-    }
+// Aplica o que ficou pendente (after() que não terminou, retries, falhas).
+export async function GET(request: NextRequest) {
+  if (!isCronRequest(request)) {
+    return new NextResponse('Method Not Allowed', { status: 405 });
+  }
+  try {
+    const stats = await applyStripeEvents(
+      getSupabaseServiceClient(),
+      applyOptions(`cron:${Date.now()}`, APPLY_CRON_MS)
+    );
+    return NextResponse.json({ success: true, ...stats, timestamp: new Date().toISOString() });
   } catch (err: any) {
-    console.error(`Webhook handler error (${event.type}):`, err?.message);
-    return new NextResponse('Webhook handler error', { status: 500 });
+    console.error('[STRIPE] aplicador (cron) falhou:', err?.message);
+    return NextResponse.json({ error: 'Erro ao aplicar eventos', details: err?.message }, { status: 500 });
   }
-
-  return new NextResponse('Webhook received', { status: 200 });
 }
@@ -4,6 +4,8 @@
  * ═══════════════════════════════════════════════════════════════
  * 📁 PATH: frontend/src/app/dashboard/agents/page.tsx
  * 📋 Grid de agentes estilo "Seleção de Personagens" com cores dinâmicas
+ *    Virtualizado (só as faixas visíveis no DOM) e carregado por páginas
+ *    de cursor conforme a rolagem chega ao fim.
  * ═══════════════════════════════════════════════════════════════
  */
 
@@ -11,6 +13,7 @@
 
 import { useState } from 'react';
 import { useAgents } from '@/hooks/useAgents';
+import { VirtualList } from '@/components/ui/VirtualList';
 import {
   X,
   Activity,
@@ -129,6 +132,12 @@ const IconServer = () => (
   </svg>
 );
 
+// Altura fixa de cada faixa do grid (card + respiro do hover): a lista
+// virtualizada posiciona as faixas por conta, sem medir o DOM.
+const CARD_ROW_HEIGHT = 400;
+const CARD_GAP = 32;
+const gridColumns = (width: number) => (width >= 1150 ? 3 : width >= 700 ? 2 : 1);
+
 // Agent type definition matching Supabase schema
 interface Agent {
   id: string | number;
@@ -144,6 +153,9 @@ export default function AgentsPage() {
   const {
     agents,
     loading,
+    loadingMore,
+    total,
+    loadMore,
     searchQuery,
     filteredSquad,
     setSearchQuery,
@@ -238,7 +250,7 @@ export default function AgentsPage() {
             eyebrow="Neural Agents"
             live
             title="Sentinelas"
-            subtitle={`${agents.length} unidades neurais sob comando da inteligência ALSHAM.`}
+            subtitle={`${total ?? agents.length} unidades neurais sob comando da inteligência ALSHAM.`}
             icon={Users}
             actions={
               <div className="relative w-full sm:w-80">
@@ -279,16 +291,22 @@ export default function AgentsPage() {
         </div>
 
         {/* GRID */}
-        <div className="grid grid-cols-1 lg:grid-cols-2 xl:grid-cols-3 gap-8">
-          {filteredAgents.map((agent, index) => {
+        <VirtualList
+          items={filteredAgents}
+          getKey={(agent) => agent.id}
+          rowHeight={CARD_ROW_HEIGHT}
+          gap={CARD_GAP}
+          columns={gridColumns}
+          onEndReached={loadMore}
+          className="h-[calc(100vh-22rem)] min-h-[480px] px-3 py-3"
+          renderItem={(agent, index) => {
             return (
               <div
-                key={agent.id}
                 onClick={() => setSelectedAgent(agent)}
                 style={{
-                  animation: `fadeInUp 0.6s ease-out ${index * 0.05}s both`,
+                  animation: `fadeInUp 0.6s ease-out ${(index % 12) * 0.05}s both`,
                 }}
-                className="group relative bg-[var(--color-surface)]/60 border-2 border-[var(--color-border)]/20 backdrop-blur-xl hover:border-[var(--color-primary)]/80 hover:shadow-[0_0_50px_var(--color-primary)] hover:scale-105 transition-all duration-500 rounded-xl overflow-hidden cursor-pointer transform hover:-translate-y-2"
+                className="group relative h-full bg-[var(--color-surface)]/60 border-2 border-[var(--color-border)]/20 backdrop-blur-xl hover:border-[var(--color-primary)]/80 hover:shadow-[0_0_50px_var(--color-primary)] hover:scale-105 transition-all duration-500 rounded-xl overflow-hidden cursor-pointer transform hover:-translate-y-2"
               >
                 <div className="p-8">
                   <div className="flex items-start justify-between mb-6">
@@ -341,7 +359,7 @@ export default function AgentsPage() {
                       <p className="text-[10px] text-textSecondary uppercase tracking-widest mb-2">
                         TAREFA ATUAL
                       </p>
-                      <p className="text-lg text-textSecondary font-mono leading-relaxed border-l-2 border-[var(--color-primary)] pl-4">
+                      <p className="text-lg text-textSecondary font-mono leading-relaxed border-l-2 border-[var(--color-primary)] pl-4 line-clamp-2">
                         &quot;{agent.currentTask || agent.current_task || 'Awaiting orders'}&quot;
                       </p>
                     </div>
@@ -349,8 +367,13 @@ export default function AgentsPage() {
                 </div>
               </div>
             );
-          })}
-        </div>
+          }}
+        />
+        {loadingMore && (
+          <p className="mt-4 text-center text-xs font-mono uppercase tracking-widest text-textSecondary">
+            Carregando mais unidades…
+          </p>
+        )}
 
         {/* MODAL DE DETALHES DO AGENT */}
         {selectedAgent && (
@@ -5,23 +5,55 @@
  * 📁 PATH: frontend/src/app/dashboard/matrix/page.tsx
  * 🧬 Visualização 3D da rede neural com 139 nodes conectados
  * 🎨 100% SUBMISSO AOS TEMAS - USA VARIÁVEIS CSS
+ * 📜 Terminal: buffer limitado a MAX_LOG_LINES, lista virtualizada e
+ *    histórico real de agent_logs por páginas de cursor (rolar ao topo)
  * ═══════════════════════════════════════════════════════════════
  */
 
 "use client";
 
-import { useState, useEffect, useRef, FormEvent } from 'react';
+import { useState, useEffect, useRef, useCallback, FormEvent } from 'react';
 import { supabase } from '@/lib/supabase';
+import { fetchAgentLogsPage, type AgentLogRow } from '@/lib/api';
+import { encodeCursor } from '@/lib/keyset';
+import { VirtualList } from '@/components/ui/VirtualList';
 import { useTheme } from '@/hooks/useTheme';
 import { Terminal, Shield, Wifi, Cpu, AlertOctagon, Command, Network, Users, Activity, Zap } from 'lucide-react';
 import { LoadingState } from '@/components/ui/LoadingState';
 import { ErrorState } from '@/components/ui/ErrorState';
 
 interface LogEntry {
-  id: number;
+  id: number | string;
   timestamp: string;
   type: 'info' | 'success' | 'warning' | 'error' | 'system';
   message: string;
+  cursor?: string; // só linhas reais de agent_logs: de onde buscar as mais antigas
+}
+
+// O terminal nunca passa disso: as linhas mais velhas saem pelo topo.
+const MAX_LOG_LINES = 1000;
+const LOG_ROW_HEIGHT = 26;
+const LOG_PAGE_SIZE = 100;
+
+const capLogs = (logs: LogEntry[]) =>
+  logs.length > MAX_LOG_LINES ? logs.slice(logs.length - MAX_LOG_LINES) : logs;
+
+function toLogEntry(row: AgentLogRow): LogEntry {
+  const event = row.event_type || 'event';
+  const type: LogEntry['type'] = /error|fail/i.test(event)
+    ? 'error'
+    : /warn/i.test(event)
+      ? 'warning'
+      : /complete|success/i.test(event)
+        ? 'success'
+        : 'info';
+  return {
+    id: `log-${row.id}`,
+    timestamp: new Date(row.created_at).toLocaleTimeString('en-US', { hour12: false }),
+    type,
+    message: `[${event}] ${row.message ?? ''}`,
+    cursor: encodeCursor({ v: row.created_at, id: row.id }),
+  };
 }
 
 interface NetworkNode {
@@ -38,10 +70,12 @@ export default function MatrixPage() {
   const colors = themeConfig.colors;
   
   const canvasRef = useRef<HTMLCanvasElement>(null);
-  const scrollRef = useRef<HTMLDivElement>(null);
   const inputRef = useRef<HTMLInputElement>(null);
   
   const [logs, setLogs] = useState<LogEntry[]>([]);
+  const logsRef = useRef<LogEntry[]>([]);
+  logsRef.current = logs;
+  const history = useRef({ loading: false, done: false });
   const [command, setCommand] = useState('');
   const [isGlitching, setIsGlitching] = useState(false);
   const [nodes, setNodes] = useState<NetworkNode[]>([]);
@@ -259,7 +293,7 @@ export default function MatrixPage() {
             message: `${msg} [HASH: ${suffix}]`
         };
 
-        setLogs(prev => [...prev.slice(-50), newLog]);
+        setLogs(prev => capLogs([...prev, newLog]));
     };
 
     const interval = setInterval(addLog, 2000);
@@ -269,15 +303,33 @@ export default function MatrixPage() {
         { id: 2, timestamp: new Date().toLocaleTimeString(), type: 'system', message: `NEURAL NETWORK: ${nodes.length} NODES CONNECTED` },
         { id: 3, timestamp: new Date().toLocaleTimeString(), type: 'success', message: 'Connected to Mainframe.' },
     ]);
+    history.current.done = false;
 
     return () => clearInterval(interval);
   }, [nodes]);
 
-  useEffect(() => {
-    if (scrollRef.current) {
-        scrollRef.current.scrollTop = scrollRef.current.scrollHeight;
+  // Histórico real: uma página de agent_logs acima da linha real mais antiga
+  // que está no buffer (ou as mais recentes, se ainda não há nenhuma).
+  // Disparado quando a rolagem chega ao topo.
+  const loadOlderLogs = useCallback(async () => {
+    // O histórico também conta no limite do buffer
+    const room = Math.min(LOG_PAGE_SIZE, MAX_LOG_LINES - logsRef.current.length);
+    if (history.current.loading || history.current.done || room <= 0) return;
+    history.current.loading = true;
+    try {
+      const cursor = logsRef.current.find(l => l.cursor)?.cursor ?? null;
+      const page = await fetchAgentLogsPage({ cursor, limit: room });
+      history.current.done = page.nextCursor === null;
+      if (page.rows.length === 0) return;
+      const older = page.rows.map(toLogEntry).reverse();
+      setLogs(prev => {
+        const seen = new Set(prev.map(l => l.id));
+        return [...older.filter(l => !seen.has(l.id)), ...prev];
+      });
+    } finally {
+      history.current.loading = false;
     }
-  }, [logs]);
+  }, []);
 
   const handleCommand = (e: FormEvent) => {
     e.preventDefault();
@@ -320,7 +372,7 @@ export default function MatrixPage() {
             newLogs.push({ id: Date.now()+1, timestamp: '', type: 'error', message: `Command not found: ${cmd}` });
     }
 
-    setLogs(prev => [...prev, ...newLogs]);
+    setLogs(prev => capLogs([...prev, ...newLogs]));
     setCommand('');
   };
 
@@ -406,15 +458,18 @@ export default function MatrixPage() {
         </div>
 
         {/* Log Output */}
-        <div 
-            ref={scrollRef}
-            className="flex-1 overflow-y-auto overflow-x-hidden space-y-1 pr-4"
-        >
-            {logs.map((log) => (
+        <VirtualList
+            items={logs}
+            getKey={(log) => log.id}
+            rowHeight={LOG_ROW_HEIGHT}
+            followTail
+            onStartReached={loadOlderLogs}
+            className="flex-1 overflow-x-hidden pr-4"
+            renderItem={(log) => (
                 <div 
-                  key={log.id} 
-                  className="break-words font-mono leading-relaxed px-2 rounded transition-colors"
-                  style={{ color: colors.text }}
+                  title={log.message}
+                  className="truncate font-mono px-2 rounded transition-colors"
+                  style={{ color: colors.text, lineHeight: `${LOG_ROW_HEIGHT}px` }}
                 >
                     {log.timestamp && (
                         <span className="mr-3" style={{ color: colors.textSecondary }}>[{log.timestamp}]</span>
@@ -423,9 +478,8 @@ export default function MatrixPage() {
                         {log.message}
                     </span>
                 </div>
-            ))}
-            <div className="h-4" /> 
-        </div>
+            )}
+        />
 
         {/* Command Input */}
         <div 
@@ -14,6 +14,7 @@ import { useState, useEffect, useRef } from 'react';
 import { supabase } from '@/lib/supabase';
 import { useAgents } from '@/hooks/useAgents';
 import { useDashboardStats } from '@/hooks/useDashboardStats';
+import { isSSE, readSSE } from '@/lib/sse';
 import {
   Brain,
   Zap,
@@ -157,7 +158,7 @@ export default function QuantumBrainPage() {
   });
 
   // Hooks
-  const { agents, loading: agentsLoading } = useAgents();
+  const { agents, loading: agentsLoading, hasMore, total, loadMore } = useAgents();
   const dashboardStats = useDashboardStats();
 
   const terminalRef = useRef<HTMLTextAreaElement>(null);
@@ -230,17 +231,51 @@ export default function QuantumBrainPage() {
     try {
       const response = await fetch('/api/quantum/brain/execute', {
         method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
+        headers: { 'Content-Type': 'application/json', Accept: 'text/event-stream' },
         body: JSON.stringify({
           title: prompt,
           description: prompt,
           agent_id: selectedAgent === 'auto' ? undefined : selectedAgent,
           priority,
           multi_agent: multiAgentMode,
+          stream: true,
         }),
       });
 
-      const data = await response.json();
+      // Streaming: o texto aparece conforme chega; o evento `done` traz o
+      // mesmo payload do modo JSON. Erros antes da execução (401/429) e o
+      // ORION continuam vindo como JSON.
+      let data: any;
+      if (isSSE(response)) {
+        const startedAt = Date.now();
+        let partial = '';
+        let meta: any = null;
+        await readSSE(response, (event, payload) => {
+          if (event === 'start') meta = payload;
+          else if (event === 'delta') {
+            partial += payload.text;
+            setCurrentResult({
+              id: meta?.task_id || 'streaming',
+              success: true,
+              task_id: meta?.task_id || 'streaming',
+              agent_id: meta?.agent?.id || 'orion',
+              agent_name: meta?.agent?.name || 'ORION Supreme',
+              squad: meta?.squad || 'COMMAND',
+              result: partial,
+              execution_time_ms: Date.now() - startedAt,
+              tokens_used: 0,
+              cost_usd: 0,
+              timestamp: new Date().toISOString(),
+              status: 'processing',
+              title: prompt,
+              priority,
+            });
+          } else if (event === 'done' || event === 'error') data = payload;
+        });
+        data = data || { success: false, error: 'Stream encerrado sem resultado' };
+      } else {
+        data = await response.json();
+      }
 
       const result: TaskResult = {
         id: data.task_id || `task_${Date.now()}`,
@@ -326,6 +361,13 @@ export default function QuantumBrainPage() {
       agent.squad?.toLowerCase().includes(agentSearch.toLowerCase()),
   );
 
+  // useAgents pagina por cursor: o GOD VIEW (todos) e o dropdown (até 20
+  // resultados da busca) puxam páginas seguintes só enquanto precisam.
+  const needsMoreAgents = godViewMode || (showAgentDropdown && filteredAgents.length < 20);
+  useEffect(() => {
+    if (needsMoreAgents && hasMore) loadMore();
+  }, [needsMoreAgents, hasMore, agents, loadMore]);
+
   return (
     <div className="min-h-screen relative overflow-hidden">
       {/* Background Neural Grid */}
@@ -481,7 +523,7 @@ export default function QuantumBrainPage() {
               style={{ color: 'var(--color-text)' }}
             >
               <Eye className="w-6 h-6" style={{ color: 'var(--color-primary)' }} />
-              GOD VIEW - {agents?.length || 10} AGENTS
+              GOD VIEW - {total ?? (agents?.length || 10)} AGENTS
             </h2>
             <button
               onClick={() => setGodViewMode(false)}
@@ -938,7 +980,11 @@ export default function QuantumBrainPage() {
                     color: currentResult.success ? 'var(--color-success)' : 'var(--color-error)',
                   }}
                 >
-                  {currentResult.success ? '✓ SUCCESS' : '✗ FAILED'}
+                  {currentResult.status === 'processing'
+                    ? '… STREAMING'
+                    : currentResult.success
+                      ? '✓ SUCCESS'
+                      : '✗ FAILED'}
                 </span>
               )}
             </div>
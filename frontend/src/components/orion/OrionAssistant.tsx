@@ -28,6 +28,10 @@ import { useAudioVisualizer, useOrionPulse } from '@/hooks/useAudioVisualizer';
 import { useOrionChat, type Message } from '@/hooks/useOrionChat';
 import { useOrionSounds } from '@/hooks/useOrionSounds';
 import { useTheme } from '@/hooks/useTheme';
+import { VirtualList } from '@/components/ui/VirtualList';
+
+// Chave estável para a lista virtualizada (não recriar por render)
+const messageKey = (msg: Message) => msg.id;
 
 // ═══════════════════════════════════════════════════════════════════════════════
 // COMPONENTE PRINCIPAL
@@ -46,14 +50,13 @@ export default function OrionAssistant() {
   const [showParticles, setShowParticles] = useState(false);
   
   // ═══ REFS ═══
-  const messagesEndRef = useRef<HTMLDivElement>(null);
   const inputRef = useRef<HTMLInputElement>(null);
   
   // ═══ CUSTOM HOOKS ═══
   const { playSound } = useOrionSounds();
   const { pulseIntensity, getGlow, getRotation, getScale } = useOrionPulse();
   const { state: audioState, startAnalysis, stopAnalysis } = useAudioVisualizer();
-  const { state: chatState, sendMessage, addGreeting, toggleGodMode } = useOrionChat(pathname);
+  const { state: chatState, sendMessage, addGreeting, toggleGodMode, loadOlder } = useOrionChat(pathname);
   
   // Callback para quando transcrição estiver completa
   const handleTranscriptComplete = useCallback(async (transcript: string) => {
@@ -87,11 +90,6 @@ export default function OrionAssistant() {
   // EFEITOS
   // ═══════════════════════════════════════════════════════════════════════════════
 
-  // Auto-scroll para última mensagem
-  useEffect(() => {
-    messagesEndRef.current?.scrollIntoView({ behavior: 'smooth' });
-  }, [chatState.messages]);
-
   // Saudação inicial quando abre
   useEffect(() => {
     if (isOpen && !chatState.hasGreeted) {
@@ -603,56 +601,63 @@ export default function OrionAssistant() {
             </div>
 
             {/* ═══ MESSAGES ═══ */}
+            {/* Virtualizada: só as mensagens visíveis existem no DOM, a
+                altura de cada uma é medida; no topo busca a página anterior */}
             {!isMinimized && (
-              <div 
-                className="h-80 overflow-y-auto p-5 space-y-4"
-                style={{
-                  scrollbarWidth: 'thin',
-                  scrollbarColor: `${primaryColor}20 transparent`,
-                }}
-              >
-                {chatState.messages.map((msg: Message) => (
-                  <div
-                    key={msg.id}
-                    className={`flex ${msg.role === 'user' ? 'justify-end' : 'justify-start'} animate-fadeIn`}
-                  >
-                    <div 
-                      className="max-w-[85%] p-4 rounded-2xl"
-                      style={{
-                        background: msg.role === 'user'
-                          ? `linear-gradient(135deg, ${primaryColor}10 0%, ${primaryColor}05 100%)`
-                          : `${textColor}05`,
-                        border: `1px solid ${msg.role === 'user' ? `${primaryColor}20` : `${textColor}08`}`,
-                        borderRadius: msg.role === 'user' ? '20px 20px 4px 20px' : '20px 20px 20px 4px',
-                      }}
-                    >
-                      <div className="flex items-center gap-2 mb-2">
-                        {msg.role === 'orion' && <Sparkles className="w-3 h-3" style={{ color: primaryColor }} />}
-                        <span 
-                          className="text-[10px] uppercase tracking-wider font-mono"
-                          style={{ color: msg.role === 'user' ? primaryColor : textSecondaryColor }}
-                        >
-                          {msg.role === 'user' ? 'VOCÊ' : 'ORION'}
-                          {msg.isVoice && <Mic className="w-2.5 h-2.5 inline ml-1" style={{ color: errorColor }} />}
-                        </span>
-                      </div>
-                      <p className="text-sm leading-relaxed" style={{ color: `${textColor}E6` }}>{msg.content}</p>
-                      
-                      {chatState.godMode && msg.tokens && (
-                        <div 
-                          className="mt-3 pt-2 flex gap-3 text-[9px] font-mono"
-                          style={{ borderTop: `1px solid ${textColor}08`, color: textSecondaryColor }}
-                        >
-                          <span>{msg.tokens} tokens</span>
-                          <span>{msg.executionTime}ms</span>
+              <div className="h-80 flex flex-col">
+                <VirtualList
+                  items={chatState.messages}
+                  getKey={messageKey}
+                  rowHeight={96}
+                  gap={16}
+                  measure
+                  followTail
+                  onStartReached={chatState.hasOlder ? loadOlder : undefined}
+                  className="flex-1 min-h-0 px-5 pt-5"
+                  style={{
+                    scrollbarWidth: 'thin',
+                    scrollbarColor: `${primaryColor}20 transparent`,
+                  }}
+                  renderItem={(msg: Message) => (
+                    <div className={`flex ${msg.role === 'user' ? 'justify-end' : 'justify-start'}`}>
+                      <div 
+                        className="max-w-[85%] p-4 rounded-2xl"
+                        style={{
+                          background: msg.role === 'user'
+                            ? `linear-gradient(135deg, ${primaryColor}10 0%, ${primaryColor}05 100%)`
+                            : `${textColor}05`,
+                          border: `1px solid ${msg.role === 'user' ? `${primaryColor}20` : `${textColor}08`}`,
+                          borderRadius: msg.role === 'user' ? '20px 20px 4px 20px' : '20px 20px 20px 4px',
+                        }}
+                      >
+                        <div className="flex items-center gap-2 mb-2">
+                          {msg.role === 'orion' && <Sparkles className="w-3 h-3" style={{ color: primaryColor }} />}
+                          <span 
+                            className="text-[10px] uppercase tracking-wider font-mono"
+                            style={{ color: msg.role === 'user' ? primaryColor : textSecondaryColor }}
+                          >
+                            {msg.role === 'user' ? 'VOCÊ' : 'ORION'}
+                            {msg.isVoice && <Mic className="w-2.5 h-2.5 inline ml-1" style={{ color: errorColor }} />}
+                          </span>
                         </div>
-                      )}
+                        <p className="text-sm leading-relaxed" style={{ color: `${textColor}E6` }}>{msg.content}</p>
+                      
+                        {chatState.godMode && msg.tokens && (
+                          <div 
+                            className="mt-3 pt-2 flex gap-3 text-[9px] font-mono"
+                            style={{ borderTop: `1px solid ${textColor}08`, color: textSecondaryColor }}
+                          >
+                            <span>{msg.tokens} tokens</span>
+                            <span>{msg.executionTime}ms</span>
+                          </div>
+                        )}
+                      </div>
                     </div>
-                  </div>
-                ))}
-                
+                  )}
+                />
+
                 {isThinking && (
-                  <div className="flex justify-start animate-fadeIn">
+                  <div className="flex justify-start animate-fadeIn px-5 pb-4 pt-2">
                     <div 
                       className="p-4 rounded-2xl"
                       style={{
@@ -678,8 +683,6 @@ export default function OrionAssistant() {
                     </div>
                   </div>
                 )}
-                
-                <div ref={messagesEndRef} />
               </div>
             )}
 
@@ -97,7 +97,8 @@ export default function MatrixTerminal() {
         const { data, error } = await supabase
           .from('agent_logs')
           .select('agent_id, timestamp, event_type, message')
-          .order('timestamp', { ascending: false })
+          // created_at é a chave de partição: só as partições mais recentes são lidas
+          .order('created_at', { ascending: false })
           .limit(50);
 
         if (error) throw error;
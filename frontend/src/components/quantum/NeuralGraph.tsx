@@ -1,9 +1,24 @@
 'use client';
 
 import { useEffect, useMemo, useRef, useState } from 'react';
-import { Canvas, useFrame } from '@react-three/fiber';
+import * as THREE from 'three';
+import { Canvas, useFrame, useThree } from '@react-three/fiber';
 import { OrbitControls, Sphere, Line, Html } from '@react-three/drei';
-import { useQuantumStore } from '@/lib/store';
+import { useRealtimeAgent, useRealtimeAgentIds } from '@/hooks/useRealtimeAgents';
+import { useRealtimeAgentsStore, type RealtimeAgent } from '@/stores/useRealtimeAgentsStore';
+import { useForceLayout, type ForceLayout } from '@/hooks/useForceLayout';
+import { chainEdges } from '@/lib/force-layout';
+
+// Modo instanciado: um InstancedMesh para todos os nós, um LineSegments
+// para todas as arestas e UM useFrame escrevendo direto em typed arrays.
+// Custa ~3 draw calls (nós, arestas, picking) com qualquer número de
+// agentes; o modo por mesh (um Sphere + material + useFrame por nó) fica
+// para redes pequenas, onde o custo é irrelevante.
+export type NeuralGraphMode = 'auto' | 'instanced' | 'meshes';
+const INSTANCED_MIN_NODES = 150;
+// Com o ponteiro parado e a câmera girando (autoRotate), o nó sob o
+// ponteiro muda devagar: refaz o picking a cada N frames.
+const PICK_EVERY_FRAMES = 6;
 
 // Mapeamento de cores baseado no status do agente real
 const getStatusColor = (status: string) => {
@@ -27,13 +42,20 @@ const getStatusColor = (status: string) => {
   }
 };
 
-function Node({
-  agent,
-  position,
-}: {
-  agent: { status: string; name: string; efficiency: number; role?: string };
-  position: [number, number, number];
-}) {
+function cssColor(value: string, intensity = 1) {
+  const color = new THREE.Color();
+  color.setStyle(value);
+  return color.multiplyScalar(intensity);
+}
+
+function positionAt(buffer: Float32Array | null, i: number): [number, number, number] {
+  return buffer && buffer.length >= i * 3 + 3 ? [buffer[i * 3], buffer[i * 3 + 1], buffer[i * 3 + 2]] : [0, 0, 0];
+}
+
+// Cada nó lê só a SUA linha do store: um lote de eventos re-renderiza
+// apenas os nós cujos agentes mudaram.
+function Node({ id, position }: { id: string; position: [number, number, number] }) {
+  const agent = useRealtimeAgent(id) ?? { status: '', name: '', efficiency: 0, role: '' };
   // eslint-disable-next-line @typescript-eslint/no-explicit-any
   const ref = useRef<any>(null);
   const [hovered, setHover] = useState(false);
@@ -67,25 +89,35 @@ function Node({
       </Sphere>
 
       {/* Label Holográfico (Só aparece no hover) */}
-      {hovered && (
-        <Html distanceFactor={10}>
-          <div className="pointer-events-none select-none bg-background/80 backdrop-blur-md border border-border/20 p-2 rounded-lg min-w-[120px] transform -translate-x-1/2 -translate-y-full">
-            <h3 className="text-xs font-bold text-text whitespace-nowrap">{agent.name}</h3>
-            <p className="text-[10px] font-mono text-textSecondary uppercase">{agent.role}</p>
-            <div className="mt-1 h-0.5 w-full bg-surface rounded-full overflow-hidden">
-              <div
-                className="h-full bg-current transition-all duration-300"
-                style={{ width: `${agent.efficiency || 50}%`, color }}
-              />
-            </div>
-          </div>
-        </Html>
-      )}
+      {hovered && <NodeLabel agent={agent} color={color} />}
     </group>
   );
 }
 
-function Connections({ nodes }: { nodes: any[] }) {
+function NodeLabel({ agent, color }: { agent: Pick<RealtimeAgent, 'name' | 'role' | 'efficiency'>; color: string }) {
+  return (
+    <Html distanceFactor={10}>
+      <div className="pointer-events-none select-none bg-background/80 backdrop-blur-md border border-border/20 p-2 rounded-lg min-w-[120px] transform -translate-x-1/2 -translate-y-full">
+        <h3 className="text-xs font-bold text-text whitespace-nowrap">{agent.name}</h3>
+        <p className="text-[10px] font-mono text-textSecondary uppercase">{agent.role}</p>
+        <div className="mt-1 h-0.5 w-full bg-surface rounded-full overflow-hidden">
+          <div
+            className="h-full bg-current transition-all duration-300"
+            style={{ width: `${agent.efficiency || 50}%`, color }}
+          />
+        </div>
+      </div>
+    </Html>
+  );
+}
+
+function Connections({ nodes }: { nodes: { id: string; position: [number, number, number] }[] }) {
+  // Só o padrão "quem está PROCESSING" importa para as linhas: o seletor
+  // devolve uma string, então mudança de eficiência/tarefa não redesenha nada.
+  const processing = useRealtimeAgentsStore((s) =>
+    nodes.map((n) => (s.byId[n.id]?.status === 'PROCESSING' ? '1' : '0')).join('')
+  );
+
   const lines = useMemo(() => {
     const connections = [];
     // Conecta nós próximos (simulação de sinapses)
@@ -97,7 +129,7 @@ function Connections({ nodes }: { nodes: any[] }) {
           start: nodes[i].position,
           end: target.position,
           color:
-            nodes[i].agent.status === 'PROCESSING'
+            processing[i] === '1'
               ? typeof document !== 'undefined'
                 ? getComputedStyle(document.documentElement)
                     .getPropertyValue('--color-accent')
@@ -110,7 +142,7 @@ function Connections({ nodes }: { nodes: any[] }) {
       }
     }
     return connections;
-  }, [nodes]);
+  }, [nodes, processing]);
 
   return (
     <>
@@ -128,40 +160,315 @@ function Connections({ nodes }: { nodes: any[] }) {
   );
 }
 
-function Brain() {
-  const agents = useQuantumStore((state) => state.agents);
-
-  // Memoiza posições para que elas não mudem a cada render (evita "flicker")
-  // Mas re-calcula se o número de agentes mudar
+// Modo por mesh: posições como props, renovadas no ritmo de `version`
+function MeshBrain({ ids, layout }: { ids: string[]; layout: ForceLayout }) {
+  const { positions, version } = layout;
   const nodes = useMemo(() => {
-    return agents.map((agent) => ({
-      agent,
-      position: [
-        (Math.random() - 0.5) * 10,
-        (Math.random() - 0.5) * 10,
-        (Math.random() - 0.5) * 10,
-      ] as [number, number, number],
-    }));
-  }, [agents.length]); // Dependência apenas no tamanho, não no objeto inteiro
+    const buffer = positions.current?.length === ids.length * 3 ? positions.current : null;
+    return ids.map((id, i) => ({ id, position: positionAt(buffer, i) }));
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [ids, version]);
 
   return (
     <group>
-      {nodes.map((node, i) => (
-        <Node key={node.agent.id || i} agent={node.agent} position={node.position} />
+      {nodes.map((node) => (
+        <Node key={node.id} id={node.id} position={node.position} />
       ))}
       <Connections nodes={nodes} />
     </group>
   );
 }
 
-export default function NeuralGraph() {
-  const agentCount = useQuantumStore((state) => state.agents.length);
-  const syncAgents = useQuantumStore((state) => state.syncAgents);
+// Shader de picking: cada instância pinta o próprio índice (+1) em RGB.
+// Divide o instanceMatrix com o mesh visível, então pega o pulso também.
+const PICK_VERTEX = `
+flat varying int vId;
+void main() {
+  vId = gl_InstanceID + 1;
+  gl_Position = projectionMatrix * modelViewMatrix * instanceMatrix * vec4(position, 1.0);
+}
+`;
+const PICK_FRAGMENT = `
+flat varying int vId;
+void main() {
+  float id = float(vId);
+  gl_FragColor = vec4(mod(id, 256.0), mod(floor(id / 256.0), 256.0), floor(id / 65536.0), 255.0) / 255.0;
+}
+`;
 
-  // Carrega SOMENTE agentes reais do banco ao montar.
+interface GraphBuffers {
+  mesh: THREE.InstancedMesh;
+  pickMesh: THREE.InstancedMesh;
+  lines: THREE.LineSegments;
+  positions: Float32Array; // xyz por nó (cópia do buffer do layout)
+  speeds: Float32Array; // velocidade do pulso por nó
+  edges: Uint32Array; // pares (origem, destino)
+  copiedGeneration: number; // último buffer do layout copiado (-1 = nenhum)
+  seen: (RealtimeAgent | undefined)[]; // última linha do store aplicada por nó
+  dispose: () => void;
+}
+
+function buildBuffers(n: number): GraphBuffers {
+  const geometry = new THREE.SphereGeometry(0.18, 16, 16);
+  const material = new THREE.MeshBasicMaterial({ toneMapped: false });
+  const mesh = new THREE.InstancedMesh(geometry, material, Math.max(1, n));
+  // Só aparece quando o primeiro buffer do layout for copiado
+  mesh.count = 0;
+  mesh.frustumCulled = false;
+  mesh.instanceMatrix.setUsage(THREE.DynamicDrawUsage);
+  mesh.instanceColor = new THREE.InstancedBufferAttribute(new Float32Array(Math.max(1, n) * 3), 3);
+  // O hover sai do picking na GPU: sem raycast por instância na CPU.
+  mesh.raycast = () => {};
+
+  const pickMaterial = new THREE.ShaderMaterial({ vertexShader: PICK_VERTEX, fragmentShader: PICK_FRAGMENT });
+  const pickMesh = new THREE.InstancedMesh(geometry, pickMaterial, Math.max(1, n));
+  pickMesh.instanceMatrix = mesh.instanceMatrix;
+  pickMesh.count = 0;
+  pickMesh.frustumCulled = false;
+
+  // Mesma topologia do modo por mesh e do layout: cada nó liga aos 2 seguintes.
+  const edges = chainEdges(n);
+  const edgeCount = edges.length / 2;
+  const linePositions = new Float32Array(edgeCount * 6);
+  const lineGeometry = new THREE.BufferGeometry();
+  lineGeometry.setAttribute('position', new THREE.BufferAttribute(linePositions, 3).setUsage(THREE.DynamicDrawUsage));
+  lineGeometry.setAttribute('color', new THREE.BufferAttribute(new Float32Array(edgeCount * 6), 3));
+  const lineMaterial = new THREE.LineBasicMaterial({ vertexColors: true, transparent: true, opacity: 0.1 });
+  const lines = new THREE.LineSegments(lineGeometry, lineMaterial);
+  lines.frustumCulled = false;
+  lines.raycast = () => {};
+
+  return {
+    mesh,
+    pickMesh,
+    lines,
+    positions: new Float32Array(n * 3),
+    speeds: new Float32Array(n).fill(1.5),
+    edges,
+    copiedGeneration: -1,
+    seen: new Array(n),
+    dispose: () => {
+      geometry.dispose();
+      material.dispose();
+      pickMaterial.dispose();
+      lineGeometry.dispose();
+      lineMaterial.dispose();
+    },
+  };
+}
+
+function InstancedBrain({ ids, layout }: { ids: string[]; layout: ForceLayout }) {
+  const { gl, camera } = useThree();
+  const buffers = useMemo(() => buildBuffers(ids.length), [ids]);
+  useEffect(() => buffers.dispose, [buffers]);
+
+  // Cores resolvidas uma vez por status (getComputedStyle é caro)
+  const palette = useRef(new Map<string, { base: THREE.Color; hover: THREE.Color }>());
+  const paletteFor = (status: string) => {
+    let entry = palette.current.get(status);
+    if (!entry) {
+      const css = getStatusColor(status);
+      entry = { base: cssColor(css, 1.5), hover: cssColor(css, 3) };
+      palette.current.set(status, entry);
+    }
+    return entry;
+  };
+  const edgeColors = useMemo(() => {
+    const style = typeof document !== 'undefined' ? getComputedStyle(document.documentElement) : null;
+    return {
+      processing: cssColor(style?.getPropertyValue('--color-accent').trim() || '#a855f7'),
+      idle: cssColor(style?.getPropertyValue('--color-text').trim() || 'white'),
+    };
+  }, []);
+
+  const hoverIndex = useRef(-1);
+  const [hoverId, setHoverId] = useState<string | null>(null);
+
+  // Status → cor/velocidade, fora do React: o store avisa, só as linhas
+  // que mudaram de referência são reescritas nos buffers.
+  useEffect(() => {
+    const { mesh, lines, speeds, edges, seen } = buffers;
+    const colors = mesh.instanceColor!;
+    const lineColors = lines.geometry.getAttribute('color') as THREE.BufferAttribute;
+    const processing = new Uint8Array(ids.length);
+    hoverIndex.current = -1;
+
+    const apply = (byId: Record<string, RealtimeAgent>) => {
+      let changed = false;
+      for (let i = 0; i < ids.length; i++) {
+        const agent = byId[ids[i]];
+        if (agent === seen[i]) continue;
+        seen[i] = agent;
+        changed = true;
+        const status = agent?.status ?? '';
+        const entry = paletteFor(status);
+        const c = i === hoverIndex.current ? entry.hover : entry.base;
+        colors.setXYZ(i, c.r, c.g, c.b);
+        speeds[i] = status === 'PROCESSING' ? 3 : 1.5;
+        processing[i] = status === 'PROCESSING' ? 1 : 0;
+      }
+      if (!changed) return;
+      for (let e = 0; e < edges.length / 2; e++) {
+        const c = processing[edges[e * 2]] ? edgeColors.processing : edgeColors.idle;
+        lineColors.setXYZ(e * 2, c.r, c.g, c.b);
+        lineColors.setXYZ(e * 2 + 1, c.r, c.g, c.b);
+      }
+      colors.needsUpdate = true;
+      lineColors.needsUpdate = true;
+    };
+
+    apply(useRealtimeAgentsStore.getState().byId);
+    return useRealtimeAgentsStore.subscribe((state, prev) => {
+      if (state.byId !== prev.byId) apply(state.byId);
+    });
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [buffers, ids, edgeColors]);
+
+  // Ponteiro em pixels CSS do canvas; o picking roda no frame loop.
+  const pointer = useRef({ x: 0, y: 0, inside: false, dirty: false });
   useEffect(() => {
-    syncAgents();
-  }, [syncAgents]);
+    const el = gl.domElement;
+    const move = (ev: PointerEvent) => {
+      pointer.current = { x: ev.offsetX, y: ev.offsetY, inside: true, dirty: true };
+    };
+    const leave = () => {
+      pointer.current = { ...pointer.current, inside: false, dirty: true };
+    };
+    el.addEventListener('pointermove', move);
+    el.addEventListener('pointerleave', leave);
+    return () => {
+      el.removeEventListener('pointermove', move);
+      el.removeEventListener('pointerleave', leave);
+    };
+  }, [gl]);
+
+  const pick = useMemo(() => {
+    const scene = new THREE.Scene();
+    const target = new THREE.WebGLRenderTarget(1, 1);
+    return { scene, target, pixel: new Uint8Array(4), clear: new THREE.Color(0, 0, 0), frame: 0 };
+  }, []);
+  useEffect(() => () => pick.target.dispose(), [pick]);
+  useEffect(() => {
+    pick.scene.add(buffers.pickMesh);
+    return () => {
+      pick.scene.remove(buffers.pickMesh);
+    };
+  }, [pick, buffers]);
+
+  const setHover = (index: number) => {
+    if (index === hoverIndex.current) return;
+    const colors = buffers.mesh.instanceColor!;
+    const previous = hoverIndex.current;
+    hoverIndex.current = index;
+    for (const [i, key] of [[previous, 'base'], [index, 'hover']] as const) {
+      if (i < 0 || i >= ids.length) continue;
+      const entry = paletteFor(buffers.seen[i]?.status ?? '');
+      colors.setXYZ(i, entry[key].r, entry[key].g, entry[key].b);
+    }
+    colors.needsUpdate = true;
+    setHoverId(index >= 0 ? ids[index] : null);
+  };
+
+  // UM frame loop para todos os nós: escala + translação direto no
+  // instanceMatrix (sem Object3D/compose por instância).
+  useFrame((state) => {
+    const { mesh, pickMesh, lines, positions, speeds, edges } = buffers;
+
+    // Buffer novo do worker: só cópia (nós e pontas das arestas)
+    const source = layout.positions.current;
+    if (buffers.copiedGeneration !== layout.generation.current && source?.length === positions.length) {
+      buffers.copiedGeneration = layout.generation.current;
+      positions.set(source);
+      const line = lines.geometry.getAttribute('position') as THREE.BufferAttribute;
+      const lp = line.array as Float32Array;
+      for (let e = 0; e < edges.length / 2; e++) {
+        lp.set(positions.subarray(edges[e * 2] * 3, edges[e * 2] * 3 + 3), e * 6);
+        lp.set(positions.subarray(edges[e * 2 + 1] * 3, edges[e * 2 + 1] * 3 + 3), e * 6 + 3);
+      }
+      line.needsUpdate = true;
+      mesh.count = ids.length;
+      pickMesh.count = ids.length;
+    }
+    if (mesh.count === 0) return;
+
+    const m = mesh.instanceMatrix.array as Float32Array;
+    const t = state.clock.getElapsedTime();
+    for (let i = 0; i < ids.length; i++) {
+      const x = positions[i * 3];
+      const scale = (i === hoverIndex.current ? 1.5 : 1.0) + Math.sin(t * speeds[i] + x) * 0.15;
+      const o = i * 16;
+      m[o] = scale;
+      m[o + 5] = scale;
+      m[o + 10] = scale;
+      m[o + 12] = x;
+      m[o + 13] = positions[i * 3 + 1];
+      m[o + 14] = positions[i * 3 + 2];
+    }
+    mesh.instanceMatrix.needsUpdate = true;
+
+    // Picking na GPU: renderiza só o pixel sob o ponteiro (view offset 1x1)
+    // com o índice de cada instância como cor, e lê de volta 4 bytes.
+    const p = pointer.current;
+    pick.frame++;
+    if (!p.inside) {
+      if (p.dirty) setHover(-1);
+      p.dirty = false;
+      return;
+    }
+    if (!p.dirty && pick.frame % PICK_EVERY_FRAMES !== 0) return;
+    p.dirty = false;
+    if (!(camera instanceof THREE.PerspectiveCamera) || ids.length === 0) return;
+
+    const dpr = gl.getPixelRatio();
+    const prevClear = gl.getClearColor(new THREE.Color());
+    const prevAlpha = gl.getClearAlpha();
+    camera.setViewOffset(gl.domElement.width, gl.domElement.height, Math.floor(p.x * dpr), Math.floor(p.y * dpr), 1, 1);
+    gl.setRenderTarget(pick.target);
+    gl.setClearColor(pick.clear, 0);
+    gl.render(pick.scene, camera);
+    gl.setRenderTarget(null);
+    gl.setClearColor(prevClear, prevAlpha);
+    camera.clearViewOffset();
+    gl.readRenderTargetPixels(pick.target, 0, 0, 1, 1, pick.pixel);
+
+    const id = pick.pixel[0] + pick.pixel[1] * 256 + pick.pixel[2] * 65536;
+    setHover(id > 0 && id <= ids.length ? id - 1 : -1);
+  });
+
+  const hoverIndexNow = hoverId !== null ? ids.indexOf(hoverId) : -1;
+
+  return (
+    <group>
+      <primitive object={buffers.mesh} />
+      <primitive object={buffers.lines} />
+      {hoverIndexNow >= 0 && (
+        <InstancedLabel id={hoverId!} position={positionAt(buffers.positions, hoverIndexNow)} />
+      )}
+    </group>
+  );
+}
+
+function InstancedLabel({ id, position }: { id: string; position: [number, number, number] }) {
+  const agent = useRealtimeAgent(id) ?? { status: '', name: '', efficiency: 0, role: '' };
+  return (
+    <group position={position}>
+      <NodeLabel agent={agent} color={getStatusColor(agent.status)} />
+    </group>
+  );
+}
+
+function Brain({ mode }: { mode: NeuralGraphMode }) {
+  const ids = useRealtimeAgentIds();
+  // Posições vêm do worker de layout, com cache por agente entre sessões
+  const layout = useForceLayout(ids);
+  const instanced = mode === 'instanced' || (mode === 'auto' && ids.length >= INSTANCED_MIN_NODES);
+
+  return instanced ? <InstancedBrain ids={ids} layout={layout} /> : <MeshBrain ids={ids} layout={layout} />;
+}
+
+export default function NeuralGraph({ mode = 'auto' }: { mode?: NeuralGraphMode }) {
+  // SOMENTE agentes reais do banco, ao vivo (carga inicial + realtime).
+  const agentCount = useRealtimeAgentIds().length;
 
   const hasAgents = agentCount > 0;
 
@@ -210,7 +517,7 @@ export default function NeuralGraph() {
         <pointLight position={[10, 10, 10]} intensity={1.5} color="#a855f7" />
         <pointLight position={[-10, -10, -10]} intensity={0.5} color="#3b82f6" />
 
-        <Brain />
+        <Brain mode={mode} />
 
         <OrbitControls
           autoRotate
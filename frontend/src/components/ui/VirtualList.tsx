@@ -0,0 +1,263 @@
+'use client';
+
+/**
+ * ═══════════════════════════════════════════════════════════════
+ * ALSHAM QUANTUM - LISTA VIRTUALIZADA (janela de linhas)
+ * ═══════════════════════════════════════════════════════════════
+ * 📁 PATH: frontend/src/components/ui/VirtualList.tsx
+ * 🎯 Só as linhas visíveis (+ overscan) existem no DOM, qualquer que seja
+ *    o tamanho da lista. Altura de linha fixa; `columns` transforma cada
+ *    linha numa faixa de grid (cards). Avisa quando a rolagem chega perto
+ *    do fim/início para carregar a próxima página por cursor, segura a
+ *    posição quando linhas entram no topo e, com `followTail`, acompanha
+ *    o fim enquanto o usuário estiver lá (logs). Com `measure`, cada
+ *    linha tem a altura que o conteúdo pedir (chat): `rowHeight` vira a
+ *    estimativa de quem ainda não foi medido.
+ * ═══════════════════════════════════════════════════════════════
+ */
+
+import { useCallback, useEffect, useLayoutEffect, useMemo, useRef, useState } from 'react';
+
+interface VirtualListProps<T> {
+  items: T[];
+  rowHeight: number;
+  renderItem: (item: T, index: number) => React.ReactNode;
+  getKey: (item: T, index: number) => React.Key;
+  columns?: number | ((width: number) => number);
+  gap?: number;
+  overscan?: number;
+  className?: string;
+  style?: React.CSSProperties;
+  onEndReached?: () => void;
+  onStartReached?: () => void;
+  threshold?: number;
+  followTail?: boolean;
+  /** Altura variável, medida no DOM (só com uma coluna). */
+  measure?: boolean;
+}
+
+// Primeira linha cujo fim passa de `y` (offsets[i] = topo da linha i).
+function rowAt(offsets: Float64Array, y: number) {
+  let lo = 0;
+  let hi = offsets.length - 2;
+  while (lo < hi) {
+    const mid = (lo + hi + 1) >> 1;
+    if (offsets[mid] <= y) lo = mid;
+    else hi = mid - 1;
+  }
+  return Math.max(0, lo);
+}
+
+export function VirtualList<T>({
+  items,
+  rowHeight,
+  renderItem,
+  getKey,
+  columns = 1,
+  gap = 0,
+  overscan = 4,
+  className,
+  style,
+  onEndReached,
+  onStartReached,
+  threshold = 3,
+  followTail = false,
+  measure = false,
+}: VirtualListProps<T>) {
+  const ref = useRef<HTMLDivElement>(null);
+  const [scrollTop, setScrollTop] = useState(0);
+  const [size, setSize] = useState({ width: 0, height: 0 });
+
+  const cols = Math.max(1, typeof columns === 'function' ? columns(size.width) : columns);
+  const rowCount = Math.ceil(items.length / cols);
+  const stride = rowHeight + gap;
+
+  // Modo medido: altura por chave, topo de cada linha por soma acumulada.
+  const variable = measure && cols === 1;
+  const heights = useRef(new Map<string, number>());
+  const [measured, setMeasured] = useState(0);
+  const pendingShift = useRef(0);
+  const offsets = useMemo(() => {
+    if (!variable) return null;
+    const out = new Float64Array(items.length + 1);
+    for (let i = 0; i < items.length; i++) {
+      out[i + 1] = out[i] + (heights.current.get(String(getKey(items[i], i))) ?? rowHeight) + gap;
+    }
+    return out;
+    // `measured` muda quando alguma altura muda
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [variable, items, getKey, rowHeight, gap, measured]);
+  const offsetsRef = useRef(offsets);
+  offsetsRef.current = offsets;
+
+  useLayoutEffect(() => {
+    const el = ref.current;
+    if (!el) return;
+    const measureBox = () => setSize({ width: el.clientWidth, height: el.clientHeight });
+    measureBox();
+    if (typeof ResizeObserver === 'undefined') return;
+    const observer = new ResizeObserver(measureBox);
+    observer.observe(el);
+    return () => observer.disconnect();
+  }, []);
+
+  // Linhas novas no topo (página mais antiga de logs): desloca a rolagem
+  // pelo que entrou, e o que estava na tela fica parado.
+  // Linhas novas no fim com o usuário no fim: acompanha.
+  const firstKey = items.length > 0 ? getKey(items[0], 0) : null;
+  const prev = useRef<{ firstKey: React.Key | null; count: number; atBottom: boolean }>({
+    firstKey: null,
+    count: 0,
+    atBottom: true,
+  });
+  useLayoutEffect(() => {
+    const el = ref.current;
+    const before = prev.current;
+    if (el && before.count > 0 && firstKey !== before.firstKey && items.length > before.count) {
+      const shifted = items.findIndex((item, i) => getKey(item, i) === before.firstKey);
+      if (shifted > 0) el.scrollTop += offsets ? offsets[shifted] : Math.floor(shifted / cols) * stride;
+    } else if (el && followTail && before.atBottom && items.length !== before.count) {
+      el.scrollTop = el.scrollHeight;
+    }
+    prev.current = { ...before, firstKey, count: items.length };
+  }, [items, firstKey, getKey, cols, stride, followTail, offsets]);
+
+  // Modo medido: um ResizeObserver para as linhas, criado no primeiro ref
+  // de linha (os refs rodam antes dos effects).
+  const observer = useRef<ResizeObserver | null>(null);
+  const estimate = useRef(rowHeight);
+  estimate.current = rowHeight;
+  const getObserver = useCallback(() => {
+    if (observer.current || typeof ResizeObserver === 'undefined') return observer.current;
+    observer.current = new ResizeObserver(entries => {
+      const el = ref.current;
+      let changed = false;
+      for (const entry of entries) {
+        const target = entry.target as HTMLElement;
+        const key = target.dataset.vkey;
+        if (key === undefined) continue;
+        const height = entry.borderBoxSize?.[0]?.blockSize ?? target.offsetHeight;
+        const previous = heights.current.get(key) ?? estimate.current;
+        if (Math.abs(previous - height) < 0.5) continue;
+        heights.current.set(key, height);
+        changed = true;
+        const top = offsetsRef.current?.[Number(target.dataset.vindex)] ?? 0;
+        if (el && top < el.scrollTop) pendingShift.current += height - previous;
+      }
+      if (changed) setMeasured(m => m + 1);
+    });
+    return observer.current;
+  }, []);
+  useEffect(
+    () => () => {
+      observer.current?.disconnect();
+      observer.current = null;
+    },
+    []
+  );
+
+  // Uma linha acima da tela mudou de altura: compensa na rolagem para o que
+  // está visível não pular; no fim com followTail, continua no fim.
+  useLayoutEffect(() => {
+    const el = ref.current;
+    if (!el || !variable) return;
+    if (followTail && prev.current.atBottom) {
+      el.scrollTop = el.scrollHeight;
+    } else if (pendingShift.current !== 0) {
+      el.scrollTop += pendingShift.current;
+    }
+    pendingShift.current = 0;
+  }, [measured, variable, followTail]);
+
+  const observeRow = useCallback(
+    (node: HTMLDivElement | null) => {
+      const ro = node ? getObserver() : null;
+      if (!node || !ro) return;
+      ro.observe(node);
+      return () => ro.unobserve(node);
+    },
+    [getObserver]
+  );
+
+  const onScroll = useCallback(() => {
+    const el = ref.current;
+    if (!el) return;
+    prev.current.atBottom = el.scrollHeight - el.scrollTop - el.clientHeight <= rowHeight;
+    setScrollTop(el.scrollTop);
+  }, [rowHeight]);
+
+  const first = offsets
+    ? Math.max(0, rowAt(offsets, scrollTop) - overscan)
+    : Math.max(0, Math.floor(scrollTop / stride) - overscan);
+  const last = offsets
+    ? Math.min(rowCount, rowAt(offsets, scrollTop + size.height) + 1 + overscan)
+    : Math.min(rowCount, Math.ceil((scrollTop + size.height) / stride) + overscan);
+
+  // Um aviso por tamanho de lista: a página seguinte só é pedida de novo
+  // depois que a anterior chegou.
+  const endSignaled = useRef(-1);
+  const startSignaled = useRef<React.Key | null>(null);
+  useEffect(() => {
+    if (size.height === 0 || rowCount === 0) return;
+    if (onEndReached && last >= rowCount - threshold && endSignaled.current !== items.length) {
+      endSignaled.current = items.length;
+      onEndReached();
+    }
+    // scrollTop real: um ajuste feito no layout effect ainda não virou estado.
+    const top = ref.current?.scrollTop ?? scrollTop;
+    if (onStartReached && top < threshold * stride && startSignaled.current !== firstKey) {
+      startSignaled.current = firstKey;
+      onStartReached();
+    }
+  }, [first, last, rowCount, threshold, items.length, scrollTop, stride, size.height, firstKey, onEndReached, onStartReached]);
+
+  const rows: React.ReactNode[] = [];
+  for (let r = first; r < last; r++) {
+    if (offsets) {
+      const key = getKey(items[r], r);
+      rows.push(
+        <div
+          key={key}
+          ref={observeRow}
+          data-vkey={String(key)}
+          data-vindex={r}
+          style={{ position: 'absolute', top: offsets[r], left: 0, right: 0 }}
+        >
+          {renderItem(items[r], r)}
+        </div>
+      );
+      continue;
+    }
+    const start = r * cols;
+    const slice = items.slice(start, start + cols);
+    rows.push(
+      <div
+        key={getKey(slice[0], start)}
+        style={{
+          position: 'absolute',
+          top: r * stride,
+          left: 0,
+          right: 0,
+          height: rowHeight,
+          display: cols > 1 ? 'grid' : undefined,
+          gridTemplateColumns: cols > 1 ? `repeat(${cols}, minmax(0, 1fr))` : undefined,
+          gap: cols > 1 ? gap : undefined,
+        }}
+      >
+        {slice.map((item, i) => (
+          <div key={getKey(item, start + i)} style={{ height: rowHeight, minWidth: 0 }}>
+            {renderItem(item, start + i)}
+          </div>
+        ))}
+      </div>
+    );
+  }
+
+  return (
+    <div ref={ref} onScroll={onScroll} className={className} style={{ overflowY: 'auto', position: 'relative', ...style }}>
+      <div style={{ position: 'relative', height: Math.max(0, (offsets ? offsets[items.length] : rowCount * stride) - gap) }}>
+        {rows}
+      </div>
+    </div>
+  );
+}
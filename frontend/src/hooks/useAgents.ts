@@ -1,47 +1,93 @@
 /**
  * Hook para gerenciar agents com Zustand store
+ *
+ * Carrega por páginas (keyset em name, id — ver lib/keyset.ts) em vez da
+ * tabela inteira: squad e busca vão para a query, e `loadMore` traz a
+ * página seguinte quando a lista virtualizada chega perto do fim.
  */
-import { useEffect } from 'react';
+import { useCallback, useEffect } from 'react';
 import { supabase } from '@/lib/supabase';
-import { useAgentsStore } from '@/stores/useAgentsStore';
+import { applyKeyset, toKeysetPage } from '@/lib/keyset';
+import { useAgentsStore, type Agent } from '@/stores/useAgentsStore';
+
+const PAGE_SIZE = 60;
+const SEARCH_DEBOUNCE_MS = 250;
+
+function keyOf(squad: string | null, search: string) {
+  return `${squad && squad !== 'ALL' ? squad : ''}|${search.trim().toLowerCase()}`;
+}
+
+async function fetchPage(squad: string | null, search: string, cursor: string | null) {
+  let query = supabase
+    .from('agents')
+    .select('*', cursor ? undefined : { count: 'exact' });
+  if (squad && squad !== 'ALL') query = query.eq('role', squad);
+  // Vírgula e parênteses quebrariam o filtro `or` do PostgREST
+  const term = search.trim().replace(/[,()]/g, ' ');
+  if (term) query = query.or(`name.ilike.%${term}%,current_task.ilike.%${term}%`);
+
+  const { data, error, count } = await applyKeyset(query, { column: 'name', cursor, limit: PAGE_SIZE });
+  if (error) throw error;
+
+  const page = toKeysetPage((data || []) as Agent[], 'name', PAGE_SIZE);
+  // Normalizar dados
+  const agents = page.rows.map((agent: any) => ({
+    ...agent,
+    currentTask: agent.current_task || 'Aguardando comando',
+  }));
+  return { agents, nextCursor: page.nextCursor, total: cursor ? undefined : count ?? null };
+}
 
 export function useAgents() {
   const store = useAgentsStore();
+  const { filteredSquad, searchQuery } = store;
 
   useEffect(() => {
-    async function fetchAgents() {
-      // Só buscar se store estiver vazia
-      if (store.agents.length > 0) return;
+    const queryKey = keyOf(filteredSquad, searchQuery);
+    // Mesmos filtros já carregados (ex.: voltando à página): não busca de novo
+    const current = useAgentsStore.getState();
+    if (current.queryKey === queryKey && current.agents.length > 0) return;
 
+    let cancelled = false;
+    const timer = setTimeout(async () => {
       try {
-        store.setLoading(true);
-        
-        const { data, error } = await supabase
-          .from('agents')
-          .select('*')
-          .order('created_at', { ascending: true });
-
-        if (error) {
-          console.error('Error fetching agents:', error);
-          store.setError(error.message);
-        } else if (data && data.length > 0) {
-          // Normalizar dados
-          const normalizedData = data.map((agent: any) => ({
-            ...agent,
-            currentTask: agent.current_task || 'Aguardando comando',
-          }));
-          store.setAgents(normalizedData);
-        }
+        useAgentsStore.getState().setLoading(true);
+        const page = await fetchPage(filteredSquad, searchQuery, null);
+        if (cancelled) return;
+        useAgentsStore.getState().setPage({ ...page, queryKey, append: false });
+        useAgentsStore.getState().setError(null);
       } catch (err: any) {
         console.error('Failed to fetch agents:', err);
-        store.setError(err.message);
+        if (!cancelled) useAgentsStore.getState().setError(err.message);
       } finally {
-        store.setLoading(false);
+        if (!cancelled) useAgentsStore.getState().setLoading(false);
       }
-    }
+    }, current.queryKey === null ? 0 : SEARCH_DEBOUNCE_MS);
+
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+  }, [filteredSquad, searchQuery]);
 
-    fetchAgents();
+  const loadMore = useCallback(async () => {
+    const { nextCursor, loadingMore, loading, queryKey, filteredSquad: squad, searchQuery: search } =
+      useAgentsStore.getState();
+    // Filtro mudou e a primeira página nova ainda não chegou: o cursor é do antigo
+    const key = keyOf(squad, search);
+    if (!nextCursor || loadingMore || loading || queryKey !== key) return;
+
+    try {
+      useAgentsStore.getState().setLoadingMore(true);
+      const page = await fetchPage(squad, search, nextCursor);
+      useAgentsStore.getState().setPage({ ...page, queryKey: key, append: true });
+    } catch (err: any) {
+      console.error('Failed to fetch more agents:', err);
+      useAgentsStore.getState().setError(err.message);
+    } finally {
+      useAgentsStore.getState().setLoadingMore(false);
+    }
   }, []);
 
-  return store;
+  return { ...store, loadMore };
 }
@@ -3,8 +3,8 @@
  * DATA HONESTY: Apenas dados REAIS do banco
  */
 import { useEffect } from 'react';
-import { supabase } from '@/lib/supabase';
 import { useAnalyticsStore } from '@/stores';
+import type { DashboardGlobalStats, DashboardRequestStats } from '@/lib/dashboard-stats';
 
 export function useAnalytics() {
   const store = useAnalyticsStore();
@@ -18,58 +18,35 @@ export function useAnalytics() {
       store.setLoading(true);
       store.setError(null);
 
-      // 1. Buscar agents agrupados por ROLE (não squad!)
-      const { data: agents, error: agentsError } = await supabase
-        .from('agents')
-        .select('role, efficiency, status');
-
-      if (agentsError) throw agentsError;
-
-      // Agrupar por role
-      const roleMap = new Map<string, { count: number; totalEff: number }>();
-      agents?.forEach((agent: { role?: string; efficiency?: number; status?: string }) => {
-        const role = agent.role || 'UNKNOWN';
-        const current = roleMap.get(role) || { count: 0, totalEff: 0 };
-        roleMap.set(role, {
-          count: current.count + 1,
-          totalEff: current.totalEff + (agent.efficiency || 0)
-        });
-      });
-
-      const agentsBySquad = Array.from(roleMap.entries()).map(([squad, data]) => ({
-        squad,
-        count: data.count,
-        avgEfficiency: data.count > 0 ? Math.round(data.totalEff / data.count) : 0
+      // 1. Agrupamentos prontos do servidor (/api/dashboard/stats →
+      //    dashboard_stats()): nada de baixar agents/requests inteiros
+      const response = await fetch('/api/dashboard/stats?include=requests');
+      const data = await response.json();
+      if (!response.ok || !data.success) throw new Error(data.error || `HTTP ${response.status}`);
+      const stats = data.global as DashboardGlobalStats;
+      const requests = (data.requests as DashboardRequestStats | null) ?? { total: 0, by_status: {} };
+
+      // Agentes por ROLE (não squad!)
+      const agentsBySquad = stats.by_role.map(r => ({
+        squad: r.role,
+        count: r.count,
+        avgEfficiency: Math.round(r.avg_efficiency),
       }));
 
-      // 2. Buscar requests agrupados por status
-      const { data: requests, error: requestsError } = await supabase
-        .from('requests')
-        .select('status');
-
-      if (requestsError) throw requestsError;
-
-      const statusMap = new Map<string, number>();
-      requests?.forEach((req: { status?: string }) => {
-        const status = req.status || 'unknown';
-        statusMap.set(status, (statusMap.get(status) || 0) + 1);
-      });
-
-      const requestsByStatus = Array.from(statusMap.entries()).map(([status, count]) => ({
+      // 2. Requests por status
+      const requestsByStatus = Object.entries(requests.by_status).map(([status, count]) => ({
         status,
-        count
+        count: Number(count) || 0,
       }));
 
-      // 3. Calcular métricas gerais
-      const totalAgents = agents?.length || 0;
-      const activeAgents = agents?.filter((a: { status?: string }) => a.status === 'running').length || 0;
-      const avgEfficiency = totalAgents > 0
-        ? Math.round(agents!.reduce((sum: number, a: { efficiency?: number }) => sum + (a.efficiency || 0), 0) / totalAgents)
-        : 0;
+      // 3. Métricas gerais ("ativo" = operacional, como no dashboard)
+      const totalAgents = stats.agents.total;
+      const activeAgents = stats.agents.operational;
+      const avgEfficiency = Math.round(stats.agents.avg_efficiency);
 
       // 4. Gerar dados de eficiência ao longo do tempo
       const days = store.timeRange === '7d' ? 7 : store.timeRange === '30d' ? 30 : 90;
-      const efficiencyOverTime = generateTimeSeriesFromAgents(agents || [], days);
+      const efficiencyOverTime = generateTimeSeries(stats.agents.avg_efficiency, days);
 
       store.setData({
         agentsBySquad,
@@ -79,7 +56,7 @@ export function useAnalytics() {
           totalAgents,
           activeAgents,
           avgEfficiency,
-          totalRequests: requests?.length || 0,
+          totalRequests: requests.total,
           uptime: calculateUptime()
         }
       });
@@ -98,11 +75,8 @@ export function useAnalytics() {
   };
 }
 
-function generateTimeSeriesFromAgents(agents: { efficiency?: number }[], days: number) {
+function generateTimeSeries(baseEfficiency: number, days: number) {
   const result = [];
-  const baseEfficiency = agents.length > 0
-    ? agents.reduce((sum: number, a: { efficiency?: number }) => sum + (a.efficiency || 0), 0) / agents.length
-    : 0;
 
   for (let i = days - 1; i >= 0; i--) {
     const date = new Date();
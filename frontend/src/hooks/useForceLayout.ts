@@ -0,0 +1,190 @@
+/**
+ * Hook do layout de forças da rede neural (NeuralGraph)
+ *
+ * A simulação roda num Web Worker (lib/force-layout.worker.ts); aqui só
+ * entram e saem buffers:
+ *   - ids mudaram → 'sync' com arestas, pesos por status e posições do
+ *     cache (localStorage, por agent id) para quem já foi visto antes
+ *   - status mudou em alguns agentes → 'heat' só com esses índices
+ *   - chegou um buffer → vira `positions.current`, o anterior volta ao
+ *     worker para reuso; quem desenha copia no próprio frame loop
+ * `version` é um estado com no máximo ~4 trocas por segundo, para quem
+ * precisa re-renderizar (modo por mesh); o modo instanciado lê o ref.
+ */
+import { useEffect, useRef, useState } from 'react';
+import { useRealtimeAgentsStore, type RealtimeAgent } from '@/stores/useRealtimeAgentsStore';
+import { chainEdges, DISPLAY_RADIUS, type LayoutRequest, type LayoutResponse } from '@/lib/force-layout';
+
+const CACHE_KEY = 'alsham:neural-layout:v1';
+const CACHE_MAX_ENTRIES = 5000;
+const VERSION_EVERY_MS = 250;
+
+// Agentes em atividade empurram mais os vizinhos: abrem espaço na rede
+function statusWeight(status: string | undefined) {
+  switch (status) {
+    case 'PROCESSING':
+      return 1.8;
+    case 'WARNING':
+    case 'ERROR':
+    case 'CRITICAL':
+      return 1.4;
+    default:
+      return 1;
+  }
+}
+
+type LayoutCache = Record<string, [number, number, number]>;
+
+function readCache(): LayoutCache {
+  try {
+    const raw = localStorage.getItem(CACHE_KEY);
+    return raw ? (JSON.parse(raw) as LayoutCache) : {};
+  } catch {
+    return {};
+  }
+}
+
+// Ordem das chaves = ordem de uso: quem assentou por último fica no fim
+// (o handler de 'settled' reinsere), e o corte descarta os mais antigos.
+function writeCache(cache: LayoutCache) {
+  try {
+    const entries = Object.entries(cache);
+    const trimmed = entries.length > CACHE_MAX_ENTRIES ? Object.fromEntries(entries.slice(-CACHE_MAX_ENTRIES)) : cache;
+    localStorage.setItem(CACHE_KEY, JSON.stringify(trimmed));
+  } catch {
+    // Quota cheia/modo privado: o layout só não sobrevive ao reload
+  }
+}
+
+// Sem Worker (SSR, navegador antigo): posições do cache ou aleatórias, fixas.
+function staticLayout(ids: string[], cache: LayoutCache) {
+  const out = new Float32Array(ids.length * 3);
+  ids.forEach((id, i) => {
+    const cached = cache[id];
+    for (let k = 0; k < 3; k++) out[i * 3 + k] = cached ? cached[k] : (Math.random() - 0.5) * 2 * DISPLAY_RADIUS;
+  });
+  return out;
+}
+
+export interface ForceLayout {
+  /** xyz por nó, alinhado com `ids` quando `positions.current.length === ids.length * 3`. */
+  positions: React.MutableRefObject<Float32Array | null>;
+  /** Conta os buffers recebidos: o frame loop só copia quando muda. */
+  generation: React.MutableRefObject<number>;
+  version: number;
+}
+
+export function useForceLayout(ids: string[]): ForceLayout {
+  const positions = useRef<Float32Array | null>(null);
+  const generation = useRef(0);
+  const [version, setVersion] = useState(0);
+
+  const worker = useRef<Worker | null>(null);
+  const seq = useRef(0);
+  const cache = useRef<LayoutCache | null>(null);
+  const weights = useRef<Float32Array>(new Float32Array(0));
+  const lastVersionAt = useRef(0);
+
+  useEffect(() => {
+    cache.current = readCache();
+    if (typeof Worker === 'undefined') return;
+
+    const w = new Worker(new URL('../lib/force-layout.worker.ts', import.meta.url));
+    worker.current = w;
+    w.onmessage = (event: MessageEvent<LayoutResponse>) => {
+      const msg = event.data;
+      if (msg.type === 'positions') {
+        if (msg.seq !== seq.current) return;
+        const previous = positions.current;
+        positions.current = msg.buffer;
+        generation.current++;
+        if (previous && previous.length === msg.buffer.length) {
+          w.postMessage({ type: 'recycle', buffer: previous } satisfies LayoutRequest, [previous.buffer]);
+        }
+        const now = performance.now();
+        if (msg.settled || now - lastVersionAt.current >= VERSION_EVERY_MS) {
+          lastVersionAt.current = now;
+          setVersion((v) => v + 1);
+        }
+      } else if (msg.type === 'settled') {
+        const next = cache.current ?? {};
+        msg.ids.forEach((id, i) => {
+          delete next[id];
+          next[id] = [
+            Math.round(msg.raw[i * 3] * 1000) / 1000,
+            Math.round(msg.raw[i * 3 + 1] * 1000) / 1000,
+            Math.round(msg.raw[i * 3 + 2] * 1000) / 1000,
+          ];
+        });
+        cache.current = next;
+        writeCache(next);
+      }
+    };
+    return () => {
+      w.terminate();
+      worker.current = null;
+    };
+  }, []);
+
+  // Composição mudou: o worker reaproveita quem já estava e só aquece o resto
+  useEffect(() => {
+    const known = cache.current ?? (cache.current = readCache());
+    const byId = useRealtimeAgentsStore.getState().byId;
+    const weight = new Float32Array(ids.length);
+    const cached = new Float32Array(ids.length * 3).fill(NaN);
+    ids.forEach((id, i) => {
+      weight[i] = statusWeight(byId[id]?.status);
+      const hit = known[id];
+      if (hit) cached.set(hit, i * 3);
+    });
+    weights.current = weight.slice();
+    seq.current++;
+
+    const w = worker.current;
+    if (!w) {
+      positions.current = staticLayout(ids, known);
+      generation.current++;
+      setVersion((v) => v + 1);
+      return;
+    }
+    // Buffer antigo é de outra ordem de ids: ninguém copia até o do novo seq
+    positions.current = null;
+    const edges = chainEdges(ids.length);
+    w.postMessage({ type: 'sync', seq: seq.current, ids, edges, weight, cached } satisfies LayoutRequest, [
+      edges.buffer,
+      weight.buffer,
+      cached.buffer,
+    ]);
+  }, [ids]);
+
+  // Troca de status: manda só os índices cujo peso mudou
+  useEffect(() => {
+    const index = new Map<string, number>();
+    ids.forEach((id, i) => index.set(id, i));
+
+    return useRealtimeAgentsStore.subscribe((state, prev) => {
+      if (state.byId === prev.byId || !worker.current) return;
+      const changed: number[] = [];
+      const next: number[] = [];
+      for (const [id, agent] of Object.entries(state.byId) as [string, RealtimeAgent][]) {
+        if (agent === prev.byId[id]) continue;
+        const i = index.get(id);
+        if (i === undefined) continue;
+        const weight = statusWeight(agent.status);
+        if (weight === weights.current[i]) continue;
+        weights.current[i] = weight;
+        changed.push(i);
+        next.push(weight);
+      }
+      if (changed.length === 0) return;
+      const indices = Uint32Array.from(changed);
+      const values = Float32Array.from(next);
+      worker.current.postMessage(
+        { type: 'heat', seq: seq.current, indices, weights: values } satisfies LayoutRequest,
+        [indices.buffer, values.buffer]
+      );
+    });
+  }, [ids]);
+
+  return { positions, generation, version };
+}
@@ -5,10 +5,16 @@
  * 📁 PATH: frontend/src/hooks/useOrionChat.ts
  * 💬 Histórico de mensagens + Envio + Contexto de página
  * 💎 Comandos especiais + Integração com API
+ * 🧠 Conversa guardada no servidor (orion_turns): a tela mantém no máximo
+ *    MAX_MESSAGES_IN_MEMORY mensagens e busca as anteriores por cursor ao
+ *    rolar para o topo; o modelo recebe resumo + janela recente, montados
+ *    na rota (quantum-brain/orion-history.ts)
  * ═══════════════════════════════════════════════════════════════════════════════
  */
 
-import { useState, useCallback, useRef } from 'react';
+import { useState, useCallback, useEffect, useRef } from 'react';
+import { fetchOrionTurnsPage, type OrionTurnRow } from '@/lib/api';
+import { encodeCursor } from '@/lib/keyset';
 
 // ═══════════════════════════════════════════════════════════════════════════════
 // TYPES
@@ -22,6 +28,8 @@ export interface Message {
   isVoice?: boolean;
   tokens?: number;
   executionTime?: number;
+  /** Posição no servidor (keyset): só mensagens gravadas em orion_turns. */
+  cursor?: string;
 }
 
 export interface ChatState {
@@ -29,6 +37,9 @@ export interface ChatState {
   isThinking: boolean;
   hasGreeted: boolean;
   godMode: boolean;
+  conversationId: string | null;
+  hasOlder: boolean;
+  isLoadingOlder: boolean;
 }
 
 export interface UseOrionChatReturn {
@@ -37,6 +48,61 @@ export interface UseOrionChatReturn {
   addGreeting: () => void;
   toggleGodMode: () => void;
   clearMessages: () => void;
+  loadOlder: () => Promise<void>;
+}
+
+// ═══════════════════════════════════════════════════════════════════════════════
+// JANELA DE MENSAGENS NA TELA
+// ═══════════════════════════════════════════════════════════════════════════════
+
+const CONVERSATION_KEY = 'alsham:orion-conversation:v1';
+const MAX_MESSAGES_IN_MEMORY = 200;
+const PAGE_SIZE = 30;
+const GREETING_ID = 'orion_greeting';
+
+interface SavedTurns {
+  user: { id: string; created_at: string };
+  orion: { id: string; created_at: string };
+}
+
+function readConversationId(): string | null {
+  try {
+    return localStorage.getItem(CONVERSATION_KEY);
+  } catch {
+    return null;
+  }
+}
+
+function writeConversationId(id: string | null) {
+  try {
+    if (id) localStorage.setItem(CONVERSATION_KEY, id);
+    else localStorage.removeItem(CONVERSATION_KEY);
+  } catch {
+    // Modo privado: a conversa só não sobrevive ao reload
+  }
+}
+
+function turnToMessage(row: OrionTurnRow): Message {
+  return {
+    id: row.id,
+    role: row.role,
+    content: row.content,
+    timestamp: new Date(row.created_at),
+    tokens: row.tokens || undefined,
+    cursor: encodeCursor({ v: row.created_at, id: row.id }),
+  };
+}
+
+// Mensagens novas no fim; as mais antigas saem da memória (continuam no
+// servidor e voltam pelo loadOlder).
+function appendCapped(prev: ChatState, ...added: Message[]): Pick<ChatState, 'messages' | 'hasOlder'> {
+  const messages = prev.messages.concat(added);
+  if (messages.length <= MAX_MESSAGES_IN_MEMORY) return { messages, hasOlder: prev.hasOlder };
+  const dropped = messages.slice(0, messages.length - MAX_MESSAGES_IN_MEMORY);
+  return {
+    messages: messages.slice(-MAX_MESSAGES_IN_MEMORY),
+    hasOlder: prev.hasOlder || dropped.some(m => m.cursor),
+  };
 }
 
 // ═══════════════════════════════════════════════════════════════════════════════
@@ -152,10 +218,41 @@ export function useOrionChat(pathname: string): UseOrionChatReturn {
     isThinking: false,
     hasGreeted: false,
     godMode: false,
+    conversationId: null,
+    hasOlder: false,
+    isLoadingOlder: false,
   });
 
   // ═══ REFS ═══
   const messageIdCounter = useRef(0);
+  const stateRef = useRef(state);
+  stateRef.current = state;
+
+  // ═══════════════════════════════════════════════════════════════════════════════
+  // RETOMAR A CONVERSA SALVA (só a página mais recente)
+  // ═══════════════════════════════════════════════════════════════════════════════
+
+  useEffect(() => {
+    const conversationId = readConversationId();
+    if (!conversationId) return;
+    let cancelled = false;
+    setState(prev => ({ ...prev, conversationId, isLoadingOlder: true }));
+    fetchOrionTurnsPage(conversationId, { limit: PAGE_SIZE }).then(page => {
+      if (cancelled) return;
+      const loaded = page.rows.map(turnToMessage).reverse();
+      setState(prev => ({
+        ...prev,
+        // Com histórico, a saudação sai; o resto desta sessão fica depois
+        messages: loaded.length > 0 ? loaded.concat(prev.messages.filter(m => m.id !== GREETING_ID)) : prev.messages,
+        hasGreeted: prev.hasGreeted || loaded.length > 0,
+        hasOlder: page.nextCursor !== null,
+        isLoadingOlder: false,
+      }));
+    });
+    return () => {
+      cancelled = true;
+    };
+  }, []);
 
   // ═══════════════════════════════════════════════════════════════════════════════
   // GERAR ID DE MENSAGEM
@@ -174,7 +271,7 @@ export function useOrionChat(pathname: string): UseOrionChatReturn {
     if (state.hasGreeted) return;
 
     const greeting: Message = {
-      id: generateMessageId(),
+      id: GREETING_ID,
       role: 'orion',
       content: 'Olá. Sou ORION, assistente do ALSHAM QUANTUM. 10 agentes estão sob meu comando. Como posso ajudar?',
       timestamp: new Date(),
@@ -182,10 +279,10 @@ export function useOrionChat(pathname: string): UseOrionChatReturn {
 
     setState(prev => ({
       ...prev,
-      messages: [greeting],
+      messages: prev.messages.length > 0 ? prev.messages : [greeting],
       hasGreeted: true,
     }));
-  }, [state.hasGreeted, generateMessageId]);
+  }, [state.hasGreeted]);
 
   // ═══════════════════════════════════════════════════════════════════════════════
   // TOGGLE GOD MODE
@@ -199,14 +296,44 @@ export function useOrionChat(pathname: string): UseOrionChatReturn {
   // LIMPAR MENSAGENS
   // ═══════════════════════════════════════════════════════════════════════════════
 
+  // Limpar começa uma conversa nova (a anterior continua salva).
   const clearMessages = useCallback(() => {
+    writeConversationId(null);
     setState(prev => ({
       ...prev,
       messages: [],
       hasGreeted: false,
+      conversationId: null,
+      hasOlder: false,
     }));
   }, []);
 
+  // ═══════════════════════════════════════════════════════════════════════════════
+  // CARREGAR MENSAGENS ANTERIORES (rolagem no topo)
+  // ═══════════════════════════════════════════════════════════════════════════════
+
+  const loadOlder = useCallback(async () => {
+    const current = stateRef.current;
+    if (!current.conversationId || !current.hasOlder || current.isLoadingOlder) return;
+    const cursor = current.messages.find(m => m.cursor)?.cursor ?? null;
+    const conversationId = current.conversationId;
+
+    setState(prev => ({ ...prev, isLoadingOlder: true }));
+    const page = await fetchOrionTurnsPage(conversationId, { cursor, limit: PAGE_SIZE });
+    setState(prev => {
+      if (prev.conversationId !== conversationId) return { ...prev, isLoadingOlder: false };
+      const older = page.rows.map(turnToMessage).reverse();
+      return {
+        ...prev,
+        // Só cresce quando o usuário sobe a rolagem; o próximo envio volta
+        // a aparar o topo (appendCapped).
+        messages: older.concat(prev.messages),
+        hasOlder: page.nextCursor !== null,
+        isLoadingOlder: false,
+      };
+    });
+  }, []);
+
   // ═══════════════════════════════════════════════════════════════════════════════
   // ENVIAR MENSAGEM
   // ═══════════════════════════════════════════════════════════════════════════════
@@ -226,7 +353,7 @@ export function useOrionChat(pathname: string): UseOrionChatReturn {
 
     setState(prev => ({
       ...prev,
-      messages: [...prev.messages, userMessage],
+      ...appendCapped(prev, userMessage),
       isThinking: true,
     }));
 
@@ -246,7 +373,7 @@ export function useOrionChat(pathname: string): UseOrionChatReturn {
 
       setState(prev => ({
         ...prev,
-        messages: [...prev.messages, orionMessage],
+        ...appendCapped(prev, orionMessage),
         isThinking: false,
       }));
 
@@ -260,7 +387,11 @@ export function useOrionChat(pathname: string): UseOrionChatReturn {
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({
           title: messageText,
+          // Sem login (sem conversa salva), a rota usa description como antes
           description: `${getOrionPersonality(pathname)}\n\nUsuário disse: ${messageText}`,
+          message: messageText,
+          context: getOrionPersonality(pathname),
+          conversation_id: stateRef.current.conversationId,
           agent_id: 'orion',
         }),
       });
@@ -278,11 +409,24 @@ export function useOrionChat(pathname: string): UseOrionChatReturn {
         executionTime: data.execution_time_ms,
       };
 
-      setState(prev => ({
-        ...prev,
-        messages: [...prev.messages, orionMessage],
-        isThinking: false,
-      }));
+      // Gravada no servidor: as duas mensagens ganham cursor (base do loadOlder)
+      const turns = data.turns as SavedTurns | null | undefined;
+      if (turns?.orion) orionMessage.cursor = encodeCursor({ v: turns.orion.created_at, id: turns.orion.id });
+      const userCursor = turns?.user ? encodeCursor({ v: turns.user.created_at, id: turns.user.id }) : undefined;
+      const conversationId: string | null = data.conversation_id ?? null;
+      if (conversationId) writeConversationId(conversationId);
+
+      setState(prev => {
+        const withCursor = userCursor
+          ? prev.messages.map(m => (m.id === userMessage.id ? { ...m, cursor: userCursor } : m))
+          : prev.messages;
+        return {
+          ...prev,
+          ...appendCapped({ ...prev, messages: withCursor }, orionMessage),
+          conversationId: conversationId ?? prev.conversationId,
+          isThinking: false,
+        };
+      });
 
       return responseContent;
 
@@ -298,7 +442,7 @@ export function useOrionChat(pathname: string): UseOrionChatReturn {
 
       setState(prev => ({
         ...prev,
-        messages: [...prev.messages, errorMessage],
+        ...appendCapped(prev, errorMessage),
         isThinking: false,
       }));
 
@@ -312,6 +456,7 @@ export function useOrionChat(pathname: string): UseOrionChatReturn {
     addGreeting,
     toggleGodMode,
     clearMessages,
+    loadOlder,
   };
 }
 
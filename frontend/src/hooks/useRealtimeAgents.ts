@@ -1,96 +1,131 @@
 /**
  * ALSHAM QUANTUM - Realtime Agents Hook
  * Real-time subscription for agents table
+ *
+ * Uma assinatura só por aba, compartilhada por todos os componentes (contagem
+ * de referências). Os eventos vão para o store normalizado
+ * (stores/useRealtimeAgentsStore) em lotes de um animation frame: um tick do
+ * heartbeat que toca 1000 agentes vira UM set() — e só re-renderiza quem lê
+ * uma linha que mudou de fato.
  */
 
-import { useState, useEffect, useMemo } from 'react';
+import { useEffect, useMemo } from 'react';
+import { useShallow } from 'zustand/react/shallow';
 import { createClient } from '@/lib/supabase/client';
+import { createFrameBatcher } from '@/lib/frame-batcher';
+import {
+  useRealtimeAgentsStore,
+  REALTIME_AGENT_COLUMNS,
+  selectAgent,
+  selectAgentIds,
+  type AgentChange,
+  type RealtimeAgent,
+} from '@/stores/useRealtimeAgentsStore';
 import type { RealtimeChannel } from '@supabase/supabase-js';
 
-export interface Agent {
-  id: string;
-  name: string;
-  role: string;
-  status: string;
-  efficiency: number;
-  current_task: string;
-  last_active: string;
-  created_at: string;
-  updated_at: string;
-}
+export type Agent = RealtimeAgent;
 
-export function useRealtimeAgents() {
-  const [agents, setAgents] = useState<Agent[]>([]);
-  const [loading, setLoading] = useState(true);
-  const [error, setError] = useState<string | null>(null);
-  const supabase = useMemo(() => createClient(), []);
+let subscribers = 0;
+let teardown: (() => void) | null = null;
 
-  useEffect(() => {
-    let channel: RealtimeChannel;
+function pick(row: Record<string, unknown>): Partial<RealtimeAgent> & { id: string } {
+  const out: Record<string, unknown> = {};
+  for (const col of REALTIME_AGENT_COLUMNS) {
+    if (col in row) out[col] = row[col];
+  }
+  return out as Partial<RealtimeAgent> & { id: string };
+}
 
-    async function setupRealtimeSubscription() {
-      try {
-        // Initial fetch
-        const { data, error: fetchError } = await supabase
-          .from('agents')
-          .select('*')
-          .order('name', { ascending: true });
+function start() {
+  const supabase = createClient();
+  const store = useRealtimeAgentsStore.getState();
+  const batcher = createFrameBatcher<AgentChange>(changes =>
+    useRealtimeAgentsStore.getState().applyChanges(changes)
+  );
+  let channel: RealtimeChannel | null = null;
+  let stopped = false;
 
-        if (fetchError) {
-          throw fetchError;
-        }
+  (async () => {
+    try {
+      // Assina antes da carga inicial e segura os eventos até ela chegar:
+      // nada que mude no meio se perde.
+      const early: AgentChange[] = [];
+      let hydrated = false;
 
-        setAgents(data || []);
-        setLoading(false);
+      channel = supabase
+        .channel('agents-channel')
+        .on(
+          'postgres_changes',
+          { event: '*', schema: 'public', table: 'agents' },
+          (payload) => {
+            const change: AgentChange =
+              payload.eventType === 'DELETE'
+                ? { type: 'delete', id: (payload.old as { id: string }).id }
+                : { type: 'upsert', row: pick(payload.new as Record<string, unknown>) };
+            if (hydrated) batcher.push(change);
+            else early.push(change);
+          }
+        )
+        .subscribe((status) => {
+          if (status === 'CHANNEL_ERROR' || status === 'TIMED_OUT') {
+            console.error('❌ Realtime agents subscription:', status);
+          }
+        });
 
-        // Setup realtime subscription
-        channel = supabase
-          .channel('agents-channel')
-          .on(
-            'postgres_changes',
-            {
-              event: '*', // Listen to all events (INSERT, UPDATE, DELETE)
-              schema: 'public',
-              table: 'agents',
-            },
-            (payload) => {
-              console.log('🔄 Agent change detected:', payload);
+      const { data, error: fetchError } = await supabase
+        .from('agents')
+        .select(REALTIME_AGENT_COLUMNS.join(', '))
+        .order('name', { ascending: true });
 
-              if (payload.eventType === 'INSERT') {
-                setAgents((prev) => [...prev, payload.new as Agent]);
-              } else if (payload.eventType === 'UPDATE') {
-                setAgents((prev) =>
-                  prev.map((agent) =>
-                    agent.id === payload.new.id ? (payload.new as Agent) : agent
-                  )
-                );
-              } else if (payload.eventType === 'DELETE') {
-                setAgents((prev) =>
-                  prev.filter((agent) => agent.id !== payload.old.id)
-                );
-              }
-            }
-          )
-          .subscribe((status) => {
-            console.log('📡 Agents subscription status:', status);
-          });
+      if (fetchError) throw fetchError;
+      if (stopped) return;
 
-      } catch (err) {
-        console.error('❌ Realtime agents error:', err);
-        setError(err instanceof Error ? err.message : 'Unknown error');
-        setLoading(false);
-      }
+      store.hydrate((data || []) as unknown as Array<RealtimeAgent>);
+      hydrated = true;
+      if (early.length > 0) useRealtimeAgentsStore.getState().applyChanges(early);
+    } catch (err) {
+      console.error('❌ Realtime agents error:', err);
+      useRealtimeAgentsStore.getState().setError(err instanceof Error ? err.message : 'Unknown error');
     }
+  })();
 
-    setupRealtimeSubscription();
+  return () => {
+    stopped = true;
+    batcher.cancel();
+    if (channel) supabase.removeChannel(channel);
+  };
+}
 
-    // Cleanup subscription on unmount
+/** Mantém a assinatura viva enquanto algum componente montado precisar dela. */
+export function useAgentsSubscription() {
+  useEffect(() => {
+    if (subscribers++ === 0) teardown = start();
     return () => {
-      if (channel) {
-        supabase.removeChannel(channel);
+      if (--subscribers === 0 && teardown) {
+        teardown();
+        teardown = null;
       }
     };
-  }, [supabase]);
+  }, []);
+}
+
+/** Uma linha: re-renderiza só quando ESTE agente muda. */
+export function useRealtimeAgent(id: string): RealtimeAgent | undefined {
+  return useRealtimeAgentsStore(useMemo(() => selectAgent(id), [id]));
+}
 
+/** Ids ordenados por nome: muda só com entrada/saída/renomeação. */
+export function useRealtimeAgentIds(): string[] {
+  useAgentsSubscription();
+  return useRealtimeAgentsStore(selectAgentIds);
+}
+
+/** Lista completa (para telas de lista). Re-renderiza a cada lote com mudança. */
+export function useRealtimeAgents() {
+  useAgentsSubscription();
+  const { byId, ids, loading, error } = useRealtimeAgentsStore(
+    useShallow((s) => ({ byId: s.byId, ids: s.ids, loading: s.loading, error: s.error }))
+  );
+  const agents = useMemo(() => ids.map((id) => byId[id]), [byId, ids]);
   return { agents, loading, error };
 }
@@ -1,32 +1,127 @@
 import { supabase } from './supabase';
 import { Agent } from '@/types/quantum';
+import { applyKeyset, clampPageSize, toKeysetPage, type KeysetPage } from './keyset';
+
+const AGENT_LIST_COLUMNS = 'id, name, role, status, efficiency, current_task';
+
+function toAgent(a: Record<string, unknown>): Agent {
+  return {
+    id: a.id as string,
+    name: (a.name as string) || 'Unknown Unit',
+    role: ((a.role as string) || 'SPECIALIST') as Agent['role'],
+    status: ((a.status as string) || 'IDLE') as Agent['status'],
+    efficiency: (a.efficiency as number) || 0,
+    currentTask: (a.current_task as string) || 'Aguardando comando',
+    lastActive: new Date().toLocaleTimeString(),
+  };
+}
 
 export async function fetchAgents(): Promise<Agent[]> {
   try {
     const { data, error } = await supabase
       .from('agents')
-      .select('*')
+      .select(AGENT_LIST_COLUMNS)
       .order('name', { ascending: true });
 
     if (error) throw error;
 
     if (!data || data.length === 0) return [];
 
-    return data.map((a: Record<string, unknown>) => ({
-      id: a.id as string,
-      name: (a.name as string) || 'Unknown Unit',
-      role: ((a.role as string) || 'SPECIALIST') as Agent['role'],
-      status: ((a.status as string) || 'IDLE') as Agent['status'],
-      efficiency: (a.efficiency as number) || 0,
-      currentTask: (a.current_task as string) || 'Aguardando comando',
-      lastActive: new Date().toLocaleTimeString(),
-    }));
+    return data.map(toAgent);
   } catch (error) {
     console.error('fetchAgents failed:', error);
     return [];
   }
 }
 
+// Página de agentes por nome (keyset em (name, id) / (role, name, id)).
+export async function fetchAgentsPage(
+  opts: { cursor?: string | null; limit?: number; role?: string | null; search?: string } = {}
+): Promise<KeysetPage<Agent>> {
+  const limit = clampPageSize(opts.limit, 60);
+  try {
+    let query = supabase.from('agents').select(AGENT_LIST_COLUMNS);
+    if (opts.role) query = query.eq('role', opts.role);
+    if (opts.search) query = query.ilike('name', `%${opts.search}%`);
+
+    const { data, error } = await applyKeyset(query, { column: 'name', cursor: opts.cursor, limit });
+    if (error) throw error;
+
+    const page = toKeysetPage((data || []) as unknown as Array<Record<string, unknown> & { id: string }>, 'name', limit);
+    return { rows: page.rows.map(toAgent), nextCursor: page.nextCursor };
+  } catch (error) {
+    console.error('fetchAgentsPage failed:', error);
+    return { rows: [], nextCursor: null };
+  }
+}
+
+export interface AgentLogRow {
+  id: string;
+  agent_id: string | null;
+  event_type: string;
+  message: string | null;
+  created_at: string;
+}
+
+// Logs mais recentes primeiro; o cursor anda para trás no tempo.
+export async function fetchAgentLogsPage(
+  opts: { cursor?: string | null; limit?: number; agentId?: string | null } = {}
+): Promise<KeysetPage<AgentLogRow>> {
+  const limit = clampPageSize(opts.limit, 100);
+  try {
+    let query = supabase.from('agent_logs').select('id, agent_id, event_type, message, created_at');
+    if (opts.agentId) query = query.eq('agent_id', opts.agentId);
+
+    const { data, error } = await applyKeyset(query, {
+      column: 'created_at',
+      ascending: false,
+      cursor: opts.cursor,
+      limit,
+    });
+    if (error) throw error;
+
+    return toKeysetPage((data || []) as AgentLogRow[], 'created_at', limit);
+  } catch (error) {
+    console.error('fetchAgentLogsPage failed:', error);
+    return { rows: [], nextCursor: null };
+  }
+}
+
+export interface OrionTurnRow {
+  id: string;
+  role: 'user' | 'orion';
+  content: string;
+  tokens: number;
+  created_at: string;
+}
+
+// Turnos de uma conversa do ORION, mais recentes primeiro (RLS: só o dono lê).
+export async function fetchOrionTurnsPage(
+  conversationId: string,
+  opts: { cursor?: string | null; limit?: number } = {}
+): Promise<KeysetPage<OrionTurnRow>> {
+  const limit = clampPageSize(opts.limit, 30);
+  try {
+    const query = supabase
+      .from('orion_turns')
+      .select('id, role, content, tokens, created_at')
+      .eq('conversation_id', conversationId);
+
+    const { data, error } = await applyKeyset(query, {
+      column: 'created_at',
+      ascending: false,
+      cursor: opts.cursor,
+      limit,
+    });
+    if (error) throw error;
+
+    return toKeysetPage((data || []) as OrionTurnRow[], 'created_at', limit);
+  } catch (error) {
+    console.error('fetchOrionTurnsPage failed:', error);
+    return { rows: [], nextCursor: null };
+  }
+}
+
 export async function fetchSystemStatus() {
   try {
     const { data, error } = await supabase
@@ -0,0 +1,183 @@
+/**
+ * ═══════════════════════════════════════════════════════════════
+ * ALSHAM QUANTUM - ESTATÍSTICAS DO DASHBOARD (SERVER-ONLY)
+ * ═══════════════════════════════════════════════════════════════
+ * 📁 PATH: frontend/src/lib/dashboard-stats.ts
+ * 🎯 Uma chamada a dashboard_stats() (migration 20261018_dashboard_stats)
+ *    traz contagens e agrupamentos juntos, e o resultado fica em cache no
+ *    processo com stale-while-revalidate:
+ *      - fresco (< DASHBOARD_STATS_TTL_MS): sai da memória
+ *      - vencido: sai da memória na hora e recarrega em segundo plano
+ *      - ausente ou velho demais: espera a carga
+ *    Uma recarga por vez por parte: a global é de todos e tem a sua;
+ *    `requests` segue a RLS (por dono), fica em cache por usuário e tem
+ *    uma por usuário. N dashboards abertos = uma leitura global por
+ *    intervalo, venham eles pedindo o próprio usuário ou não.
+ *    deals e support_tickets não têm policy de leitura para
+ *    `authenticated` (20260727_rls_lockdown_suna_core): só fundador
+ *    recebe essas contagens; os demais recebem null.
+ * ═══════════════════════════════════════════════════════════════
+ */
+
+import { createAdminClient } from '@/lib/supabase/admin';
+
+const TTL_MS = Number(process.env.DASHBOARD_STATS_TTL_MS || 10_000);
+// Além disso, o valor antigo não é servido nem enquanto recarrega.
+const MAX_STALE_MS = TTL_MS * 6;
+const MAX_USERS = 1000;
+
+export interface DashboardGlobalStats {
+  agents: { total: number; operational: number; avg_efficiency: number };
+  by_role: { role: string; count: number; avg_efficiency: number }[];
+  by_status: Record<string, number>;
+  efficiencies: number[];
+  /** null = não visível para quem pediu (só fundador). */
+  deals: number | null;
+  tickets: number | null;
+  posts: number;
+}
+
+export interface DashboardRequestStats {
+  total: number;
+  by_status: Record<string, number>;
+}
+
+export type DashboardCacheState = 'hit' | 'stale' | 'miss';
+
+export interface DashboardStats {
+  global: DashboardGlobalStats;
+  requests: DashboardRequestStats | null;
+  generated_at: string;
+  cache: DashboardCacheState;
+}
+
+interface Entry<T> {
+  value: T;
+  generatedAt: string;
+  loadedAt: number;
+}
+
+let global: Entry<DashboardGlobalStats> | null = null;
+// Map em ordem de uso: o primeiro é o que sai quando passa de MAX_USERS
+const byUser = new Map<string, Entry<DashboardRequestStats>>();
+// Recargas em voo: a global e a de cada usuário, cada uma compartilhada
+// por quem precisar dela enquanto não termina.
+let loadingGlobal: Promise<void> | null = null;
+const loadingUser = new Map<string, Promise<void>>();
+
+function toGlobal(raw: any): DashboardGlobalStats {
+  return {
+    agents: {
+      total: Number(raw?.agents?.total) || 0,
+      operational: Number(raw?.agents?.operational) || 0,
+      avg_efficiency: Number(raw?.agents?.avg_efficiency) || 0,
+    },
+    by_role: ((raw?.by_role || []) as any[]).map(r => ({
+      role: String(r.role),
+      count: Number(r.count) || 0,
+      avg_efficiency: Number(r.avg_efficiency) || 0,
+    })),
+    by_status: raw?.by_status || {},
+    efficiencies: ((raw?.efficiencies || []) as unknown[]).map(e => Number(e) || 0),
+    deals: Number(raw?.deals) || 0,
+    tickets: Number(raw?.tickets) || 0,
+    posts: Number(raw?.posts) || 0,
+  };
+}
+
+function toRequests(raw: any): DashboardRequestStats {
+  return { total: Number(raw?.total) || 0, by_status: raw?.by_status || {} };
+}
+
+function rememberUser(userId: string, entry: Entry<DashboardRequestStats>) {
+  byUser.delete(userId);
+  byUser.set(userId, entry);
+  while (byUser.size > MAX_USERS) byUser.delete(byUser.keys().next().value as string);
+}
+
+// Uma ida ao banco preenche o que estiver pedido: global, o usuário, ou os dois.
+function fetchStats(wantGlobal: boolean, userId: string | null): Promise<void> {
+  const pending: Promise<void> = (async () => {
+    const { data, error } = await createAdminClient().rpc('dashboard_stats', {
+      p_global: wantGlobal,
+      p_requests_user: userId,
+    });
+    if (error) throw new Error(`Dashboard stats failed: ${error.message}`);
+    const now = Date.now();
+    const generatedAt = (data?.generated_at as string) || new Date(now).toISOString();
+    if (wantGlobal && data?.global) global = { value: toGlobal(data.global), generatedAt, loadedAt: now };
+    if (userId && data?.requests) rememberUser(userId, { value: toRequests(data.requests), generatedAt, loadedAt: now });
+  })().finally(() => {
+    if (loadingGlobal === pending) loadingGlobal = null;
+    if (userId && loadingUser.get(userId) === pending) loadingUser.delete(userId);
+  });
+  if (wantGlobal) loadingGlobal = pending;
+  if (userId) loadingUser.set(userId, pending);
+  return pending;
+}
+
+// Pega carona no que já está em voo e só vai ao banco pelo que faltar.
+function load(wantGlobal: boolean, userId: string | null): Promise<void> {
+  const waits: Promise<void>[] = [];
+  let needGlobal = wantGlobal;
+  if (needGlobal && loadingGlobal) {
+    waits.push(loadingGlobal);
+    needGlobal = false;
+  }
+  let needUser = userId;
+  const userPending = userId ? loadingUser.get(userId) : undefined;
+  if (userPending) {
+    if (!waits.includes(userPending)) waits.push(userPending);
+    needUser = null;
+  }
+  if (needGlobal || needUser) waits.push(fetchStats(needGlobal, needUser));
+  return waits.length === 1 ? waits[0] : Promise.all(waits).then(() => undefined);
+}
+
+function ageOf(entry: Entry<unknown> | null | undefined, now: number) {
+  return entry ? now - entry.loadedAt : Infinity;
+}
+
+/**
+ * Estatísticas do dashboard; com `userId`, inclui `requests` daquele
+ * usuário. Sem `founder`, deals e tickets saem como null. `cache` diz se veio fresco da memória, vencido (recarga em
+ * segundo plano) ou do banco agora.
+ */
+export async function getDashboardStats(
+  opts: { userId?: string | null; founder?: boolean } = {}
+): Promise<DashboardStats> {
+  const userId = opts.userId ?? null;
+  const now = Date.now();
+  const globalAge = ageOf(global, now);
+  const userAge = userId ? ageOf(byUser.get(userId), now) : 0;
+
+  const refreshGlobal = globalAge > TTL_MS;
+  const refreshUser = userId !== null && userAge > TTL_MS;
+  const mustWait = globalAge > MAX_STALE_MS || userAge > MAX_STALE_MS;
+
+  let cache: DashboardCacheState = 'hit';
+  if (refreshGlobal || refreshUser) {
+    const pending = load(refreshGlobal, refreshUser ? userId : null);
+    if (mustWait) {
+      await pending;
+      cache = 'miss';
+    } else {
+      pending.catch(e => console.error('[dashboard-stats] recarga falhou, servindo o valor anterior:', String(e)));
+      cache = 'stale';
+    }
+  }
+
+  const requests = userId ? byUser.get(userId) ?? null : null;
+  return {
+    global: opts.founder ? global!.value : { ...global!.value, deals: null, tickets: null },
+    requests: requests?.value ?? null,
+    generated_at: requests && requests.generatedAt < global!.generatedAt ? requests.generatedAt : global!.generatedAt,
+    cache,
+  };
+}
+
+/** Força a próxima chamada a ir ao banco (ex.: após seed de agentes). */
+export function invalidateDashboardStats(): void {
+  global = null;
+  byUser.clear();
+}
@@ -0,0 +1,491 @@
+/**
+ * ═══════════════════════════════════════════════════════════════
+ * ALSHAM QUANTUM - LAYOUT DE FORÇAS (BARNES-HUT 3D)
+ * ═══════════════════════════════════════════════════════════════
+ * 📁 PATH: frontend/src/lib/force-layout.ts
+ * 🎯 Simulação de forças da rede neural sobre typed arrays, sem DOM:
+ *    roda dentro do Web Worker (force-layout.worker.ts) e, nos testes,
+ *    direto no Node.
+ *
+ * - Repulsão por octree Barnes-Hut: O(n log n) por passo em vez de O(n²).
+ * - Molas nas arestas, gravidade para o centro, resfriamento por alpha
+ *   (mesmos parâmetros relativos do d3-force).
+ * - Incremental: cada nó tem uma mobilidade. Agente novo ou que mudou
+ *   de status (e os vizinhos) ficam "quentes"; o resto fica parado,
+ *   então uma troca de status não refaz a rede inteira.
+ * ═══════════════════════════════════════════════════════════════
+ */
+
+export interface LayoutOptions {
+  linkDistance: number;
+  chargeStrength: number;
+  gravity: number;
+  theta: number;
+  velocityDecay: number;
+  alphaDecay: number;
+  alphaMin: number;
+  /** Alpha de reaquecimento numa mudança local. */
+  reheatAlpha: number;
+  /** Mobilidade dos nós fora da mudança (0 = parados). */
+  coldMobility: number;
+}
+
+export const LAYOUT_DEFAULTS: LayoutOptions = {
+  linkDistance: 1.2,
+  chargeStrength: -0.05,
+  gravity: 0.05,
+  theta: 0.9,
+  velocityDecay: 0.4,
+  alphaDecay: 0.0228,
+  alphaMin: 0.001,
+  reheatAlpha: 0.3,
+  coldMobility: 0,
+};
+
+export interface Simulation {
+  n: number;
+  ids: string[];
+  pos: Float32Array; // xyz por nó, espaço do layout
+  vel: Float32Array;
+  weight: Float32Array; // peso da carga (status)
+  mobility: Float32Array;
+  edges: Uint32Array; // pares (a, b)
+  linkStrength: Float32Array;
+  linkBias: Float32Array;
+  adjOffsets: Uint32Array; // vizinhança em CSR
+  adj: Uint32Array;
+  alpha: number;
+  tree: Octree;
+  options: LayoutOptions;
+}
+
+/** Topologia usada pelo NeuralGraph: cada nó liga aos 2 seguintes. */
+export function chainEdges(n: number): Uint32Array {
+  const count = Math.max(0, n - 1) + Math.max(0, n - 2);
+  const edges = new Uint32Array(count * 2);
+  let e = 0;
+  for (let i = 0; i < n; i++) {
+    for (let j = i + 1; j < Math.min(n, i + 3); j++) {
+      edges[e++] = i;
+      edges[e++] = j;
+    }
+  }
+  return edges;
+}
+
+// ─── Octree em arrays paralelos ─────────────────────────────────
+
+const EMPTY = -1;
+const INTERNAL = -2;
+const MULTI = -3; // folha com vários corpos coincidentes (profundidade máxima)
+const MAX_DEPTH = 20;
+
+interface Octree {
+  cap: number;
+  count: number;
+  cx: Float32Array;
+  cy: Float32Array;
+  cz: Float32Array;
+  half: Float32Array;
+  mass: Float32Array;
+  mx: Float32Array;
+  my: Float32Array;
+  mz: Float32Array;
+  child: Int32Array;
+  body: Int32Array;
+  stack: Int32Array;
+}
+
+function createOctree(cap: number): Octree {
+  return {
+    cap,
+    count: 0,
+    cx: new Float32Array(cap),
+    cy: new Float32Array(cap),
+    cz: new Float32Array(cap),
+    half: new Float32Array(cap),
+    mass: new Float32Array(cap),
+    mx: new Float32Array(cap),
+    my: new Float32Array(cap),
+    mz: new Float32Array(cap),
+    child: new Int32Array(cap * 8),
+    body: new Int32Array(cap),
+    stack: new Int32Array(cap * 8),
+  };
+}
+
+function growOctree(t: Octree) {
+  const bigger = createOctree(t.cap * 2);
+  bigger.count = t.count;
+  for (const key of ['cx', 'cy', 'cz', 'half', 'mass', 'mx', 'my', 'mz', 'child', 'body'] as const) {
+    (bigger[key] as Float32Array | Int32Array).set(t[key] as Float32Array & Int32Array);
+  }
+  Object.assign(t, bigger);
+}
+
+function allocNode(t: Octree, cx: number, cy: number, cz: number, half: number): number {
+  if (t.count === t.cap) growOctree(t);
+  const k = t.count++;
+  t.cx[k] = cx;
+  t.cy[k] = cy;
+  t.cz[k] = cz;
+  t.half[k] = half;
+  t.mass[k] = 0;
+  t.mx[k] = 0;
+  t.my[k] = 0;
+  t.mz[k] = 0;
+  t.child.fill(-1, k * 8, k * 8 + 8);
+  t.body[k] = EMPTY;
+  return k;
+}
+
+function childOf(t: Octree, k: number, x: number, y: number, z: number): number {
+  const oct = (x >= t.cx[k] ? 1 : 0) | (y >= t.cy[k] ? 2 : 0) | (z >= t.cz[k] ? 4 : 0);
+  let c = t.child[k * 8 + oct];
+  if (c < 0) {
+    const h = t.half[k] / 2;
+    c = allocNode(t, t.cx[k] + (oct & 1 ? h : -h), t.cy[k] + (oct & 2 ? h : -h), t.cz[k] + (oct & 4 ? h : -h), h);
+    t.child[k * 8 + oct] = c;
+  }
+  return c;
+}
+
+function buildOctree(sim: Simulation) {
+  const { n, pos, weight, tree: t } = sim;
+  let minX = Infinity, minY = Infinity, minZ = Infinity;
+  let maxX = -Infinity, maxY = -Infinity, maxZ = -Infinity;
+  for (let i = 0; i < n; i++) {
+    const x = pos[i * 3], y = pos[i * 3 + 1], z = pos[i * 3 + 2];
+    if (x < minX) minX = x;
+    if (x > maxX) maxX = x;
+    if (y < minY) minY = y;
+    if (y > maxY) maxY = y;
+    if (z < minZ) minZ = z;
+    if (z > maxZ) maxZ = z;
+  }
+  const half = Math.max(maxX - minX, maxY - minY, maxZ - minZ, 1e-3) / 2 + 1e-3;
+
+  t.count = 0;
+  allocNode(t, (minX + maxX) / 2, (minY + maxY) / 2, (minZ + maxZ) / 2, half);
+
+  for (let i = 0; i < n; i++) {
+    const x = pos[i * 3], y = pos[i * 3 + 1], z = pos[i * 3 + 2];
+    const w = weight[i];
+    let k = 0;
+    let depth = 0;
+    for (;;) {
+      t.mass[k] += w;
+      t.mx[k] += x * w;
+      t.my[k] += y * w;
+      t.mz[k] += z * w;
+      const b = t.body[k];
+      if (b === EMPTY) {
+        t.body[k] = i;
+        break;
+      }
+      if (b === MULTI) break;
+      if (b >= 0) {
+        if (depth >= MAX_DEPTH) {
+          t.body[k] = MULTI;
+          break;
+        }
+        // Folha ocupada: desce o corpo que estava aqui um nível
+        t.body[k] = INTERNAL;
+        const bx = pos[b * 3], by = pos[b * 3 + 1], bz = pos[b * 3 + 2];
+        const c = childOf(t, k, bx, by, bz);
+        t.mass[c] = weight[b];
+        t.mx[c] = bx * weight[b];
+        t.my[c] = by * weight[b];
+        t.mz[c] = bz * weight[b];
+        t.body[c] = b;
+      }
+      k = childOf(t, k, x, y, z);
+      depth++;
+    }
+  }
+
+  // Somas → centro de massa
+  for (let k = 0; k < t.count; k++) {
+    const m = t.mass[k];
+    if (m > 0) {
+      t.mx[k] /= m;
+      t.my[k] /= m;
+      t.mz[k] /= m;
+    }
+  }
+}
+
+// ─── Simulação ──────────────────────────────────────────────────
+
+function buildLinks(sim: Simulation) {
+  const { n, edges } = sim;
+  const m = edges.length / 2;
+  const degree = new Uint32Array(n);
+  for (let e = 0; e < edges.length; e++) degree[edges[e]]++;
+
+  sim.linkStrength = new Float32Array(m);
+  sim.linkBias = new Float32Array(m);
+  for (let e = 0; e < m; e++) {
+    const a = edges[e * 2], b = edges[e * 2 + 1];
+    sim.linkStrength[e] = 1 / Math.max(1, Math.min(degree[a], degree[b]));
+    sim.linkBias[e] = degree[a] / Math.max(1, degree[a] + degree[b]);
+  }
+
+  sim.adjOffsets = new Uint32Array(n + 1);
+  for (let i = 0; i < n; i++) sim.adjOffsets[i + 1] = sim.adjOffsets[i] + degree[i];
+  sim.adj = new Uint32Array(edges.length);
+  const fill = sim.adjOffsets.slice(0, n);
+  for (let e = 0; e < m; e++) {
+    const a = edges[e * 2], b = edges[e * 2 + 1];
+    sim.adj[fill[a]++] = b;
+    sim.adj[fill[b]++] = a;
+  }
+}
+
+function heatNode(sim: Simulation, i: number) {
+  sim.mobility[i] = 1;
+  for (let p = sim.adjOffsets[i]; p < sim.adjOffsets[i + 1]; p++) sim.mobility[sim.adj[p]] = 1;
+}
+
+// Posição inicial de um nó sem histórico: perto dos vizinhos já
+// posicionados, senão numa esfera do tamanho esperado da rede.
+function seedPosition(sim: Simulation, i: number, placed: Uint8Array) {
+  let sx = 0, sy = 0, sz = 0, count = 0;
+  for (let p = sim.adjOffsets[i]; p < sim.adjOffsets[i + 1]; p++) {
+    const j = sim.adj[p];
+    if (!placed[j]) continue;
+    sx += sim.pos[j * 3];
+    sy += sim.pos[j * 3 + 1];
+    sz += sim.pos[j * 3 + 2];
+    count++;
+  }
+  const jitter = sim.options.linkDistance;
+  if (count > 0) {
+    sim.pos[i * 3] = sx / count + (Math.random() - 0.5) * jitter;
+    sim.pos[i * 3 + 1] = sy / count + (Math.random() - 0.5) * jitter;
+    sim.pos[i * 3 + 2] = sz / count + (Math.random() - 0.5) * jitter;
+  } else {
+    const r = Math.cbrt(Math.max(1, sim.n)) * sim.options.linkDistance;
+    sim.pos[i * 3] = (Math.random() - 0.5) * 2 * r;
+    sim.pos[i * 3 + 1] = (Math.random() - 0.5) * 2 * r;
+    sim.pos[i * 3 + 2] = (Math.random() - 0.5) * 2 * r;
+  }
+}
+
+/**
+ * (Re)monta a simulação para uma nova lista de ids. Quem já estava
+ * mantém posição e velocidade; quem tem posição em `cached` (xyz, NaN =
+ * sem cache) começa dela; o resto nasce perto dos vizinhos. Só os nós
+ * novos e seus vizinhos esquentam — sem estado anterior nem cache,
+ * é um layout completo.
+ */
+export function syncSimulation(
+  prev: Simulation | null,
+  ids: string[],
+  edges: Uint32Array,
+  weight: Float32Array,
+  cached: Float32Array,
+  options: LayoutOptions = prev?.options ?? LAYOUT_DEFAULTS
+): Simulation {
+  const n = ids.length;
+  const sim: Simulation = {
+    n,
+    ids,
+    pos: new Float32Array(n * 3),
+    vel: new Float32Array(n * 3),
+    weight,
+    mobility: new Float32Array(n).fill(options.coldMobility),
+    edges,
+    linkStrength: new Float32Array(0),
+    linkBias: new Float32Array(0),
+    adjOffsets: new Uint32Array(n + 1),
+    adj: new Uint32Array(0),
+    alpha: prev?.alpha ?? 0,
+    tree: prev?.tree ?? createOctree(Math.max(64, n * 2)),
+    options,
+  };
+  buildLinks(sim);
+
+  const previous = new Map<string, number>();
+  prev?.ids.forEach((id, i) => previous.set(id, i));
+
+  const placed = new Uint8Array(n);
+  const fresh: number[] = [];
+  let known = 0;
+  for (let i = 0; i < n; i++) {
+    const j = previous.get(ids[i]);
+    if (j !== undefined && prev) {
+      sim.pos.set(prev.pos.subarray(j * 3, j * 3 + 3), i * 3);
+      sim.vel.set(prev.vel.subarray(j * 3, j * 3 + 3), i * 3);
+      sim.mobility[i] = prev.mobility[j];
+      placed[i] = 1;
+      known++;
+    } else if (!Number.isNaN(cached[i * 3])) {
+      sim.pos.set(cached.subarray(i * 3, i * 3 + 3), i * 3);
+      placed[i] = 1;
+      known++;
+    } else {
+      fresh.push(i);
+    }
+  }
+
+  if (known === 0) {
+    for (const i of fresh) seedPosition(sim, i, placed);
+    sim.mobility.fill(1);
+    sim.alpha = 1;
+    return sim;
+  }
+  for (const i of fresh) {
+    seedPosition(sim, i, placed);
+    placed[i] = 1;
+    heatNode(sim, i);
+  }
+  // Remoções mexem na vizinhança de quem ficou: aquece as pontas novas
+  if (fresh.length > 0 || (prev && prev.n !== n - fresh.length)) {
+    sim.alpha = Math.max(sim.alpha, options.reheatAlpha);
+  }
+  return sim;
+}
+
+/** Troca de peso (status) de alguns nós: só eles e os vizinhos esquentam. */
+export function heatNodes(sim: Simulation, indices: Uint32Array, weights: Float32Array) {
+  for (let k = 0; k < indices.length; k++) {
+    const i = indices[k];
+    if (i >= sim.n) continue;
+    sim.weight[i] = weights[k];
+    heatNode(sim, i);
+  }
+  if (indices.length > 0) sim.alpha = Math.max(sim.alpha, sim.options.reheatAlpha);
+}
+
+export function isSettled(sim: Simulation): boolean {
+  return sim.alpha < sim.options.alphaMin;
+}
+
+/** Um passo da simulação. Devolve false se já estava em repouso. */
+export function stepSimulation(sim: Simulation): boolean {
+  const o = sim.options;
+  if (sim.n === 0 || isSettled(sim)) return false;
+  sim.alpha += (0 - sim.alpha) * o.alphaDecay;
+  const alpha = sim.alpha;
+  const { n, pos, vel, mobility } = sim;
+
+  // Repulsão (Barnes-Hut)
+  buildOctree(sim);
+  const t = sim.tree;
+  const theta2 = o.theta * o.theta;
+  const distanceMin2 = 1e-4;
+  for (let i = 0; i < n; i++) {
+    if (mobility[i] === 0) continue;
+    const x = pos[i * 3], y = pos[i * 3 + 1], z = pos[i * 3 + 2];
+    let vx = 0, vy = 0, vz = 0;
+    let sp = 0;
+    t.stack[sp++] = 0;
+    while (sp > 0) {
+      const k = t.stack[--sp];
+      if (t.mass[k] === 0) continue;
+      const b = t.body[k];
+      if (b === i) continue;
+      const dx = t.mx[k] - x, dy = t.my[k] - y, dz = t.mz[k] - z;
+      let l = dx * dx + dy * dy + dz * dz;
+      const size = t.half[k] * 2;
+      if (b === INTERNAL && size * size >= theta2 * l) {
+        for (let c = 0; c < 8; c++) {
+          const child = t.child[k * 8 + c];
+          if (child >= 0) t.stack[sp++] = child;
+        }
+        continue;
+      }
+      if (l === 0) continue;
+      if (l < distanceMin2) l = Math.sqrt(distanceMin2 * l);
+      const f = (o.chargeStrength * t.mass[k] * alpha) / l;
+      vx += dx * f;
+      vy += dy * f;
+      vz += dz * f;
+    }
+    vel[i * 3] += vx;
+    vel[i * 3 + 1] += vy;
+    vel[i * 3 + 2] += vz;
+  }
+
+  // Molas
+  const { edges, linkStrength, linkBias } = sim;
+  for (let e = 0; e < linkStrength.length; e++) {
+    const a = edges[e * 2], b = edges[e * 2 + 1];
+    let dx = pos[b * 3] + vel[b * 3] - pos[a * 3] - vel[a * 3];
+    let dy = pos[b * 3 + 1] + vel[b * 3 + 1] - pos[a * 3 + 1] - vel[a * 3 + 1];
+    let dz = pos[b * 3 + 2] + vel[b * 3 + 2] - pos[a * 3 + 2] - vel[a * 3 + 2];
+    let l = Math.sqrt(dx * dx + dy * dy + dz * dz) || 1e-6;
+    l = ((l - o.linkDistance) / l) * alpha * linkStrength[e];
+    dx *= l;
+    dy *= l;
+    dz *= l;
+    const bias = linkBias[e];
+    vel[b * 3] -= dx * bias;
+    vel[b * 3 + 1] -= dy * bias;
+    vel[b * 3 + 2] -= dz * bias;
+    vel[a * 3] += dx * (1 - bias);
+    vel[a * 3 + 1] += dy * (1 - bias);
+    vel[a * 3 + 2] += dz * (1 - bias);
+  }
+
+  // Gravidade + integração
+  const decay = 1 - o.velocityDecay;
+  const g = o.gravity * alpha;
+  for (let i = 0; i < n * 3; i++) {
+    vel[i] -= pos[i] * g;
+    pos[i] += vel[i] * mobility[(i / 3) | 0];
+    vel[i] *= decay;
+  }
+
+  // Em repouso: todo mundo esfria para a próxima mudança ser local
+  if (isSettled(sim)) mobility.fill(o.coldMobility);
+  return true;
+}
+
+/**
+ * Escala de exibição: o NeuralGraph espera a rede num raio ~`radius`.
+ * Escreve em `out` (xyz, espaço da cena) a partir do espaço do layout.
+ */
+export function writeDisplayPositions(sim: Simulation, out: Float32Array, radius: number) {
+  const { n, pos } = sim;
+  let cx = 0, cy = 0, cz = 0;
+  for (let i = 0; i < n; i++) {
+    cx += pos[i * 3];
+    cy += pos[i * 3 + 1];
+    cz += pos[i * 3 + 2];
+  }
+  cx /= n || 1;
+  cy /= n || 1;
+  cz /= n || 1;
+  let sum = 0;
+  for (let i = 0; i < n; i++) {
+    const dx = pos[i * 3] - cx, dy = pos[i * 3 + 1] - cy, dz = pos[i * 3 + 2] - cz;
+    sum += dx * dx + dy * dy + dz * dz;
+  }
+  const rms = Math.sqrt(sum / (n || 1));
+  const scale = rms > 0 ? radius / (rms * 1.6) : 1;
+  for (let i = 0; i < n; i++) {
+    out[i * 3] = (pos[i * 3] - cx) * scale;
+    out[i * 3 + 1] = (pos[i * 3 + 1] - cy) * scale;
+    out[i * 3 + 2] = (pos[i * 3 + 2] - cz) * scale;
+  }
+}
+
+// ─── Protocolo com o worker ─────────────────────────────────────
+// Todo Float32Array/Uint32Array vai como transferable (sem cópia).
+
+export type LayoutRequest =
+  | { type: 'sync'; seq: number; ids: string[]; edges: Uint32Array; weight: Float32Array; cached: Float32Array }
+  | { type: 'heat'; seq: number; indices: Uint32Array; weights: Float32Array }
+  /** Devolve um buffer já copiado pela UI para o worker reaproveitar. */
+  | { type: 'recycle'; buffer: Float32Array };
+
+export type LayoutResponse =
+  /** Posições de exibição (espaço da cena), alinhadas com os ids do `seq`. */
+  | { type: 'positions'; seq: number; buffer: Float32Array; settled: boolean }
+  /** Em repouso: posições do layout, para o cache por agente. */
+  | { type: 'settled'; seq: number; ids: string[]; raw: Float32Array };
+
+/** Raio aproximado da rede na cena (a câmera do NeuralGraph fica a 14). */
+export const DISPLAY_RADIUS = 6;
@@ -0,0 +1,86 @@
+/**
+ * ═══════════════════════════════════════════════════════════════
+ * ALSHAM QUANTUM - WORKER DO LAYOUT DE FORÇAS
+ * ═══════════════════════════════════════════════════════════════
+ * 📁 PATH: frontend/src/lib/force-layout.worker.ts
+ * 🎯 Roda a simulação (force-layout.ts) fora da thread da UI. A cada
+ *    fatia de ~12 ms manda as posições num Float32Array transferido;
+ *    a UI copia e devolve o buffer ('recycle'), então em regime nenhum
+ *    lado aloca. Em repouso manda as posições cruas para o cache.
+ * ═══════════════════════════════════════════════════════════════
+ */
+
+import {
+  DISPLAY_RADIUS,
+  heatNodes,
+  isSettled,
+  stepSimulation,
+  syncSimulation,
+  writeDisplayPositions,
+  type LayoutRequest,
+  type LayoutResponse,
+  type Simulation,
+} from './force-layout';
+
+const SLICE_MS = 12;
+const FRAME_MS = 16;
+
+const ctx = self as unknown as {
+  postMessage(message: LayoutResponse, transfer?: Transferable[]): void;
+  onmessage: ((event: MessageEvent<LayoutRequest>) => void) | null;
+};
+
+let sim: Simulation | null = null;
+let seq = 0;
+let timer: ReturnType<typeof setTimeout> | null = null;
+const pool: Float32Array[] = [];
+
+function post(settled: boolean) {
+  if (!sim) return;
+  const size = sim.n * 3;
+  let buffer = pool.pop();
+  while (buffer && buffer.length !== size) buffer = pool.pop();
+  if (!buffer) buffer = new Float32Array(size);
+  writeDisplayPositions(sim, buffer, DISPLAY_RADIUS);
+  ctx.postMessage({ type: 'positions', seq, buffer, settled }, [buffer.buffer]);
+
+  if (settled) {
+    const raw = sim.pos.slice();
+    ctx.postMessage({ type: 'settled', seq, ids: sim.ids, raw }, [raw.buffer]);
+  }
+}
+
+function tick() {
+  timer = null;
+  if (!sim) return;
+  const start = performance.now();
+  while (!isSettled(sim) && performance.now() - start < SLICE_MS) stepSimulation(sim);
+  const settled = isSettled(sim);
+  post(settled);
+  if (!settled) timer = setTimeout(tick, Math.max(0, FRAME_MS - (performance.now() - start)));
+}
+
+function schedule() {
+  if (timer === null) timer = setTimeout(tick, 0);
+}
+
+ctx.onmessage = (event) => {
+  const msg = event.data;
+  switch (msg.type) {
+    case 'sync':
+      seq = msg.seq;
+      sim = syncSimulation(sim, msg.ids, msg.edges, msg.weight, msg.cached);
+      // Mesmo sem nada a simular, a UI precisa das posições deste seq
+      if (isSettled(sim)) post(true);
+      else schedule();
+      break;
+    case 'heat':
+      if (!sim || msg.seq !== seq) return;
+      heatNodes(sim, msg.indices, msg.weights);
+      schedule();
+      break;
+    case 'recycle':
+      if (pool.length < 4) pool.push(msg.buffer);
+      break;
+  }
+};
@@ -0,0 +1,48 @@
+/**
+ * ALSHAM QUANTUM - Frame Batcher
+ * Junta itens que chegam em rajada e entrega UM lote por animation frame
+ * (setTimeout de ~16ms fora do browser / aba em segundo plano).
+ */
+
+export interface FrameBatcher<T> {
+  push: (item: T) => void;
+  flush: () => void;
+  cancel: () => void;
+}
+
+export function createFrameBatcher<T>(onFlush: (items: T[]) => void): FrameBatcher<T> {
+  let queue: T[] = [];
+  let handle: number | ReturnType<typeof setTimeout> | null = null;
+  const hasRaf = typeof window !== 'undefined' && typeof window.requestAnimationFrame === 'function';
+
+  const flush = () => {
+    handle = null;
+    if (queue.length === 0) return;
+    const items = queue;
+    queue = [];
+    onFlush(items);
+  };
+
+  return {
+    push(item) {
+      queue.push(item);
+      if (handle !== null) return;
+      handle = hasRaf ? window.requestAnimationFrame(flush) : setTimeout(flush, 16);
+    },
+    flush() {
+      if (handle !== null) {
+        if (hasRaf) window.cancelAnimationFrame(handle as number);
+        else clearTimeout(handle as ReturnType<typeof setTimeout>);
+      }
+      flush();
+    },
+    cancel() {
+      if (handle !== null) {
+        if (hasRaf) window.cancelAnimationFrame(handle as number);
+        else clearTimeout(handle as ReturnType<typeof setTimeout>);
+      }
+      handle = null;
+      queue = [];
+    },
+  };
+}
@@ -0,0 +1,109 @@
+/**
+ * ═══════════════════════════════════════════════════════════════
+ * ALSHAM QUANTUM - PAGINAÇÃO POR CURSOR (KEYSET)
+ * ═══════════════════════════════════════════════════════════════
+ * 📁 PATH: frontend/src/lib/keyset.ts
+ * 🎯 Páginas estáveis sobre (coluna, id) sem OFFSET:
+ *      where col > v or (col = v and id > id0)  order by col, id
+ *    O custo de cada página não cresce com a profundidade, e inserções
+ *    no meio da rolagem não repetem nem pulam linhas. Cada ordenação usada
+ *    aqui tem o índice composto correspondente
+ *    (supabase/migrations/20261018_keyset_indexes.sql).
+ * ═══════════════════════════════════════════════════════════════
+ */
+
+export interface KeysetCursor {
+  v: string | number;
+  id: string;
+}
+
+export interface KeysetPage<T> {
+  rows: T[];
+  nextCursor: string | null;
+}
+
+export interface KeysetOptions {
+  column: string;
+  ascending?: boolean;
+  cursor?: string | null;
+  limit: number;
+}
+
+// O mínimo do query builder do supabase-js que a paginação usa.
+interface KeysetQuery<Self> {
+  or(filters: string): Self;
+  order(column: string, options: { ascending: boolean }): Self;
+  limit(count: number): Self;
+}
+
+// Cursor opaco para o cliente: base64url do JSON { v, id }.
+export function encodeCursor(cursor: KeysetCursor): string {
+  const json = JSON.stringify(cursor);
+  const b64 = typeof btoa === 'function' ? btoa(unescape(encodeURIComponent(json))) : Buffer.from(json).toString('base64');
+  return b64.replace(/\+/g, '-').replace(/\//g, '_').replace(/=+$/, '');
+}
+
+export function decodeCursor(raw?: string | null): KeysetCursor | null {
+  if (!raw) return null;
+  try {
+    const b64 = raw.replace(/-/g, '+').replace(/_/g, '/');
+    const json =
+      typeof atob === 'function' ? decodeURIComponent(escape(atob(b64))) : Buffer.from(b64, 'base64').toString();
+    const parsed = JSON.parse(json);
+    if (parsed && (typeof parsed.v === 'string' || typeof parsed.v === 'number') && typeof parsed.id === 'string') {
+      return { v: parsed.v, id: parsed.id };
+    }
+  } catch {
+    // cursor inválido = primeira página
+  }
+  return null;
+}
+
+// Valores entre aspas no filtro do PostgREST: nomes com vírgula/parênteses
+// e timestamps com '+' não quebram o `or=(...)`.
+function quote(value: string | number): string {
+  return `"${String(value).replace(/\\/g, '\\\\').replace(/"/g, '\\"')}"`;
+}
+
+/**
+ * Aplica cursor, ordem e limite (limit + 1, para saber se há próxima página).
+ * A coluna não pode ser nula nas linhas paginadas (name, created_at).
+ */
+export function applyKeyset<Q extends KeysetQuery<Q>>(query: Q, opts: KeysetOptions): Q {
+  const ascending = opts.ascending ?? true;
+  const op = ascending ? 'gt' : 'lt';
+  const cursor = decodeCursor(opts.cursor);
+
+  let q = query;
+  if (cursor) {
+    const v = quote(cursor.v);
+    q = q.or(`${opts.column}.${op}.${v},and(${opts.column}.eq.${v},id.${op}.${quote(cursor.id)})`);
+  }
+  return q
+    .order(opts.column, { ascending })
+    .order('id', { ascending })
+    .limit(opts.limit + 1);
+}
+
+/** Corta a linha extra e monta o cursor da próxima página a partir da última. */
+export function toKeysetPage<T extends { id: string }>(
+  rows: T[] | null | undefined,
+  column: string,
+  limit: number
+): KeysetPage<T> {
+  const all = rows ?? [];
+  if (all.length <= limit) return { rows: all, nextCursor: null };
+
+  const page = all.slice(0, limit);
+  const last = page[page.length - 1] as T & Record<string, unknown>;
+  const v = last[column];
+  if (typeof v !== 'string' && typeof v !== 'number') return { rows: page, nextCursor: null };
+  return { rows: page, nextCursor: encodeCursor({ v, id: last.id }) };
+}
+
+/** Limite pedido pelo cliente, preso a [1, max]. */
+export function clampPageSize(raw: unknown, fallback: number, max = 200): number {
+  const n = Number(raw);
+  if (!Number.isFinite(n) || n < 1) return fallback;
+  return Math.min(Math.floor(n), max);
+}
@@ -2,18 +2,108 @@
  * ═══════════════════════════════════════════════════════════════
  * ALSHAM QUANTUM - LAZY CLIENT INITIALIZATION
  * ═══════════════════════════════════════════════════════════════
+ * 📁 PATH: frontend/src/lib/lazy-clients.ts
  * 🔒 Evita erros de build ao não inicializar clients no top-level
+ * 🎯 Registro único de clientes do servidor:
+ *    - SDK pesado (openai, anthropic, octokit, stripe) só entra por
+ *      import() na primeira chamada: a rota que não usa não carrega,
+ *      e o bundler separa o SDK num chunk próprio
+ *    - um cliente por upstream (e por chave), reaproveitado entre
+ *      invocações da mesma instância — junto com o pool de conexões
+ *      keep-alive dele (ver KEEP-ALIVE abaixo)
+ *    - getClientTimings(): quanto custou importar e construir cada um
+ *      e quando, desde o boot do processo
+ *
+ *    KEEP-ALIVE: supabase-js, openai, anthropic e octokit usam o fetch
+ *    do Node (undici), que já mantém um pool keep-alive por origem; o
+ *    que faltava era não recriar o cliente a cada request. O stripe usa
+ *    node:https — ganha um https.Agent keepAlive próprio.
  * ═══════════════════════════════════════════════════════════════
  */
 
 import { createClient, SupabaseClient } from '@supabase/supabase-js';
 import type Anthropic from '@anthropic-ai/sdk';
+import type OpenAI from 'openai';
 import type { Octokit } from '@octokit/rest';
+import type Stripe from 'stripe';
+
+export const STRIPE_API_VERSION = '2023-10-16';
+const STRIPE_MAX_SOCKETS = Number(process.env.STRIPE_MAX_SOCKETS || 16);
 
 // Cached instances
 let supabaseInstance: SupabaseClient | null = null;
+let supabaseAdminInstance: SupabaseClient | null = null;
 let anthropicInstance: Anthropic | null = null;
 let octokitInstance: Octokit | null = null;
+let stripeInstance: Stripe | null = null;
+// Por chave: o executor pode receber a chave do OpenAI de fora do env
+const openaiInstances = new Map<string, OpenAI>();
+// Import em andamento: duas chamadas na mesma partida a frio dividem um import()
+const pending = new Map<string, Promise<unknown>>();
+
+// ─────────────────────────────────────────────────────────────
+// Instrumentação de partida
+// ─────────────────────────────────────────────────────────────
+
+export interface ClientTiming {
+  /** Tempo do import() do SDK (0 para os que vêm no bundle da rota). */
+  import_ms: number;
+  /** Tempo do construtor. */
+  init_ms: number;
+  /** Quando foi criado, em ms desde o início do processo. */
+  created_at_uptime_ms: number;
+  /** Chamadas atendidas pelo cliente já criado. */
+  reuses: number;
+}
+
+const timings = new Map<string, ClientTiming>();
+const round = (ms: number) => Math.round(ms * 100) / 100;
+
+function record(name: string, importMs: number, initMs: number) {
+  timings.set(name, {
+    import_ms: round(importMs),
+    init_ms: round(initMs),
+    created_at_uptime_ms: Math.round(process.uptime() * 1000),
+    reuses: 0,
+  });
+}
+
+function reused<T>(name: string, client: T): T {
+  const timing = timings.get(name);
+  if (timing) timing.reuses++;
+  return client;
+}
+
+// Carrega o SDK uma vez e mede; chamadas concorrentes esperam o mesmo import.
+// `key` separa clientes do mesmo SDK (chaves diferentes); `name` é o da medição.
+function load<T>(
+  name: string,
+  importer: () => Promise<{ build: () => T }>,
+  key: string = name
+): Promise<T> {
+  let loading = pending.get(key) as Promise<T> | undefined;
+  if (!loading) {
+    loading = (async () => {
+      const t0 = performance.now();
+      const { build } = await importer();
+      const t1 = performance.now();
+      const client = build();
+      record(name, t1 - t0, performance.now() - t1);
+      return client;
+    })().finally(() => pending.delete(key));
+    pending.set(key, loading);
+  }
+  return loading;
+}
+
+/** Custo de partida de cada cliente já criado nesta instância. */
+export function getClientTimings(): Record<string, ClientTiming> {
+  return Object.fromEntries(timings);
+}
+
+// ─────────────────────────────────────────────────────────────
+// Supabase
+// ─────────────────────────────────────────────────────────────
 
 /**
  * Get Supabase client (lazy initialization)
@@ -22,55 +112,143 @@ export function getSupabase(): SupabaseClient {
   if (!supabaseInstance) {
     const url = process.env.NEXT_PUBLIC_SUPABASE_URL;
     const key = process.env.SUPABASE_SERVICE_ROLE_KEY || process.env.NEXT_PUBLIC_SUPABASE_ANON_KEY;
-    
+
     if (!url || !key) {
       throw new Error('Supabase configuration missing');
     }
-    
+
+    const t0 = performance.now();
     supabaseInstance = createClient(url, key);
+    record('supabase', 0, performance.now() - t0);
+    return supabaseInstance;
   }
-  return supabaseInstance;
+  return reused('supabase', supabaseInstance);
 }
 
+/**
+ * Cliente Supabase com SERVICE ROLE, um por processo. Sem sessão nem
+ * refresh de token, então é seguro dividir entre requests.
+ * Usado por createAdminClient() e getSupabaseAdmin().
+ */
+export function getSupabaseServiceClient(): SupabaseClient {
+  if (!supabaseAdminInstance) {
+    const url = process.env.NEXT_PUBLIC_SUPABASE_URL;
+    const serviceRoleKey = process.env.SUPABASE_SERVICE_ROLE_KEY;
+
+    if (!url || !serviceRoleKey) {
+      throw new Error(
+        'Supabase admin client requer NEXT_PUBLIC_SUPABASE_URL e SUPABASE_SERVICE_ROLE_KEY.',
+      );
+    }
+
+    const t0 = performance.now();
+    supabaseAdminInstance = createClient(url, serviceRoleKey, {
+      auth: { persistSession: false, autoRefreshToken: false },
+    });
+    record('supabase-admin', 0, performance.now() - t0);
+    return supabaseAdminInstance;
+  }
+  return reused('supabase-admin', supabaseAdminInstance);
+}
+
+// ─────────────────────────────────────────────────────────────
+// SDKs de LLM
+// ─────────────────────────────────────────────────────────────
+
 /**
  * Get Anthropic client (lazy initialization)
  */
 export async function getAnthropic(): Promise<Anthropic | null> {
-  if (!anthropicInstance) {
-    const apiKey = process.env.ANTHROPIC_API_KEY;
-    
-    if (!apiKey) {
-      console.warn('ANTHROPIC_API_KEY not configured - Claude features disabled');
-      return null;
-    }
-    
-    const Anthropic = (await import('@anthropic-ai/sdk')).default;
-    anthropicInstance = new Anthropic({ apiKey });
+  if (anthropicInstance) return reused('anthropic', anthropicInstance);
+
+  const apiKey = process.env.ANTHROPIC_API_KEY;
+  if (!apiKey) {
+    console.warn('ANTHROPIC_API_KEY not configured - Claude features disabled');
+    return null;
   }
+
+  anthropicInstance = await load('anthropic', async () => {
+    const sdk = await import('@anthropic-ai/sdk');
+    return { build: () => new sdk.default({ apiKey }) };
+  });
   return anthropicInstance;
 }
 
+/**
+ * Get OpenAI client (lazy initialization). Sem chave, lança — como o
+ * construtor do SDK fazia quando era criado direto nas rotas.
+ */
+export async function getOpenAI(apiKey: string | undefined = process.env.OPENAI_API_KEY): Promise<OpenAI> {
+  if (!apiKey) {
+    throw new Error('OPENAI_API_KEY not configured');
+  }
+
+  const cached = openaiInstances.get(apiKey);
+  if (cached) return reused('openai', cached);
+
+  const client = await load(
+    'openai',
+    async () => {
+      const sdk = await import('openai');
+      return { build: () => new sdk.default({ apiKey }) };
+    },
+    `openai:${apiKey}`
+  );
+  openaiInstances.set(apiKey, client);
+  return client;
+}
+
+// ─────────────────────────────────────────────────────────────
+// GitHub e Stripe
+// ─────────────────────────────────────────────────────────────
+
 /**
  * Get Octokit client (lazy initialization)
  */
 export async function getOctokit(): Promise<Octokit | null> {
-  if (!octokitInstance) {
-    const token = process.env.GITHUB_TOKEN;
-    
-    if (!token) {
-      console.warn('GITHUB_TOKEN not configured - GitHub features disabled');
-      return null;
-    }
-    
-    const { Octokit } = await import('@octokit/rest');
-    octokitInstance = new Octokit({ auth: token });
+  if (octokitInstance) return reused('octokit', octokitInstance);
+
+  const token = process.env.GITHUB_TOKEN;
+  if (!token) {
+    console.warn('GITHUB_TOKEN not configured - GitHub features disabled');
+    return null;
   }
+
+  octokitInstance = await load('octokit', async () => {
+    const sdk = await import('@octokit/rest');
+    return { build: () => new sdk.Octokit({ auth: token }) };
+  });
   return octokitInstance;
 }
 
+/**
+ * Get Stripe client (lazy initialization), com um https.Agent keep-alive
+ * só para api.stripe.com. Sem STRIPE_SECRET_KEY devolve null.
+ */
+export async function getStripe(): Promise<Stripe | null> {
+  if (stripeInstance) return reused('stripe', stripeInstance);
+
+  const secretKey = process.env.STRIPE_SECRET_KEY;
+  if (!secretKey) {
+    console.warn('STRIPE_SECRET_KEY not configured - payments disabled');
+    return null;
+  }
+
+  stripeInstance = await load('stripe', async () => {
+    const [sdk, https] = await Promise.all([import('stripe'), import('node:https')]);
+    return {
+      build: () =>
+        new sdk.default(secretKey, {
+          apiVersion: STRIPE_API_VERSION as Stripe.LatestApiVersion,
+          httpAgent: new https.Agent({ keepAlive: true, maxSockets: STRIPE_MAX_SOCKETS }),
+        }),
+    };
+  });
+  return stripeInstance;
+}
+
 // GitHub config
 export const GITHUB_CONFIG = {
   owner: process.env.GITHUB_OWNER || 'AbnadabyBonaparte',
   repo: process.env.GITHUB_REPO || 'suna-alsham-automl',
 };
-
@@ -8,18 +8,7 @@
  */
 
 import { getSupabaseAdmin } from '@/lib/supabase-admin';
-import OpenAI from 'openai';
-
-// Lazy initialization do cliente OpenAI
-let _openai: OpenAI | null = null;
-function getOpenAI(): OpenAI {
-  if (!_openai) {
-    _openai = new OpenAI({
-      apiKey: process.env.OPENAI_API_KEY,
-    });
-  }
-  return _openai;
-}
+import { getOpenAI } from '@/lib/lazy-clients';
 
 export interface ProcessRequestResult {
   success: boolean;
@@ -29,6 +18,19 @@ export interface ProcessRequestResult {
   result?: string;
   error?: string;
   details?: string;
+  /** Duração da chamada ao OpenAI (sucesso ou erro), em ms. */
+  llm_ms?: number;
+  /** O OpenAI respondeu 429; retry_after_secs vem do cabeçalho, se houver. */
+  rate_limited?: boolean;
+  retry_after_secs?: number;
+}
+
+// retry-after-ms (OpenAI) tem precedência; retry-after vem em segundos.
+function retryAfterSecs(headers: Headers | undefined): number | undefined {
+  const ms = Number(headers?.get('retry-after-ms'));
+  if (Number.isFinite(ms) && ms > 0) return Math.ceil(ms / 1000);
+  const secs = Number(headers?.get('retry-after'));
+  return Number.isFinite(secs) && secs > 0 ? Math.ceil(secs) : undefined;
 }
 
 /**
@@ -47,7 +49,6 @@ export async function processRequest(
     console.log(`[PROCESS-SERVICE] Iniciando processamento da request ${request_id}`);
     
     const supabaseAdmin = getSupabaseAdmin();
-    const openai = getOpenAI();
 
     // 1. Buscar a request no banco
     const { data: requestData, error: requestError } = await supabaseAdmin
@@ -68,50 +69,7 @@ export async function processRequest(
 
     console.log(`[PROCESS-SERVICE] Request encontrada:`, requestData);
 
-    // 2. Selecionar agent (específico ou disponível)
-    let agent;
-    if (agent_id) {
-      // Usar agent específico
-      const { data: agentData, error: agentError } = await supabaseAdmin
-        .from('agents')
-        .select('*')
-        .eq('id', agent_id)
-        .eq('status', 'idle')
-        .single();
-
-      if (agentError || !agentData) {
-        console.error('[PROCESS-SERVICE] Agent específico não disponível:', agentError);
-        return {
-          success: false,
-          request_id,
-          error: 'Agent específico não disponível',
-          details: agentError?.message
-        };
-      }
-      agent = agentData;
-    } else {
-      // Selecionar agent disponível automaticamente
-      const { data: agents, error: agentsError } = await supabaseAdmin
-        .from('agents')
-        .select('*')
-        .eq('status', 'idle')
-        .limit(1);
-
-      if (agentsError || !agents || agents.length === 0) {
-        console.error('[PROCESS-SERVICE] Nenhum agent disponível:', agentsError);
-        return {
-          success: false,
-          request_id,
-          error: 'Nenhum agent disponível',
-          details: agentsError?.message
-        };
-      }
-      agent = agents[0];
-    }
-
-    console.log(`[PROCESS-SERVICE] Agent selecionado: ${agent.name} (${agent.id})`);
-
-    // 3. Atualizar status da request para 'processing'
+    // 2. Atualizar status da request para 'processing'
     await supabaseAdmin
       .from('requests')
       .update({
@@ -120,21 +78,122 @@ export async function processRequest(
       })
       .eq('id', request_id);
 
-    // 4. Atualizar status do agent para 'processing' e current_task
+    // 3. Executar (agent + OpenAI)
+    const result = await executeRequest(requestData, agent_id, timeout);
+
+    // Sem agent disponível a request volta ao status anterior (não marca falha).
+    if (!result.agent_id) {
+      await supabaseAdmin
+        .from('requests')
+        .update({
+          status: requestData.status,
+          updated_at: new Date().toISOString()
+        })
+        .eq('id', request_id);
+      return result;
+    }
+
+    // 4. Status final da request
     await supabaseAdmin
-      .from('agents')
+      .from('requests')
       .update({
-        status: 'processing',
-        current_task: requestData.title,
-        last_active: new Date().toISOString()
+        status: result.success ? 'completed' : 'failed',
+        updated_at: new Date().toISOString()
       })
-      .eq('id', agent.id);
+      .eq('id', request_id);
+
+    return result;
+
+  } catch (error: unknown) {
+    console.error('[PROCESS-SERVICE] Erro geral:', error);
+    return {
+      success: false,
+      request_id,
+      error: 'Erro ao processar request',
+      details: error instanceof Error ? error.message : String(error)
+    };
+  }
+}
+
+/**
+ * Escolhe o agent e executa a request no OpenAI, SEM gravar o status da
+ * request — quem chama decide (processRequest grava direto; a fila
+ * durável em task-queue.ts fecha em lote via requests_settle).
+ * @param requestData - Linha de requests (id, title, description)
+ * @param agent_id - ID do agent específico (opcional)
+ * @param timeout - Timeout em segundos da chamada ao OpenAI
+ */
+export async function executeRequest(
+  requestData: { id: string; title: string; description?: string | null },
+  agent_id?: string,
+  timeout: number = 60
+): Promise<ProcessRequestResult> {
+  const request_id = requestData.id;
+  const supabaseAdmin = getSupabaseAdmin();
+  const openai = await getOpenAI();
+
+  // 1. Selecionar agent (específico ou disponível)
+  let agent;
+  if (agent_id) {
+    // Usar agent específico
+    const { data: agentData, error: agentError } = await supabaseAdmin
+      .from('agents')
+      .select('*')
+      .eq('id', agent_id)
+      .eq('status', 'idle')
+      .single();
+
+    if (agentError || !agentData) {
+      console.error('[PROCESS-SERVICE] Agent específico não disponível:', agentError);
+      return {
+        success: false,
+        request_id,
+        error: 'Agent específico não disponível',
+        details: agentError?.message
+      };
+    }
+    agent = agentData;
+  } else {
+    // Selecionar agent disponível automaticamente
+    const { data: agents, error: agentsError } = await supabaseAdmin
+      .from('agents')
+      .select('*')
+      .eq('status', 'idle')
+      .limit(1);
+
+    if (agentsError || !agents || agents.length === 0) {
+      console.error('[PROCESS-SERVICE] Nenhum agent disponível:', agentsError);
+      return {
+        success: false,
+        request_id,
+        error: 'Nenhum agent disponível',
+        details: agentsError?.message
+      };
+    }
+    agent = agents[0];
+  }
+
+  console.log(`[PROCESS-SERVICE] Agent selecionado: ${agent.name} (${agent.id})`);
+
+  // 2. Atualizar status do agent para 'processing' e current_task
+  await supabaseAdmin
+    .from('agents')
+    .update({
+      status: 'processing',
+      current_task: requestData.title,
+      last_active: new Date().toISOString()
+    })
+    .eq('id', agent.id);
 
-    console.log(`[PROCESS-SERVICE] Chamando OpenAI API...`);
+  console.log(`[PROCESS-SERVICE] Chamando OpenAI API...`);
 
-    // 5. Chamar OpenAI API com o prompt do agent (com timeout)
-    try {
-      const completionPromise = openai.chat.completions.create({
+  // 3. Chamar OpenAI API com o prompt do agent. O timeout é do próprio SDK:
+  //    aborta a requisição HTTP em vez de deixá-la correndo atrás de um
+  //    Promise.race.
+  const llmStart = Date.now();
+  try {
+    const completion = await openai.chat.completions.create(
+      {
         model: 'gpt-4o-mini',
         messages: [
           {
@@ -148,84 +207,48 @@ export async function processRequest(
         ],
         temperature: 0.7,
         max_tokens: 1000,
-      });
-
-      // Aplicar timeout
-      const timeoutPromise = new Promise((_, reject) =>
-        setTimeout(() => reject(new Error('Timeout ao processar request')), timeout * 1000)
-      );
-
-      const completion = (await Promise.race([completionPromise, timeoutPromise])) as {
-        choices?: Array<{ message?: { content?: string | null } }>;
-      };
-      const result = completion.choices?.[0]?.message?.content || 'Sem resposta';
-      console.log(`[PROCESS-SERVICE] OpenAI respondeu com sucesso`);
-
-      // 6. Salvar resultado e atualizar status da request para 'completed'
-      await supabaseAdmin
-        .from('requests')
-        .update({
-          status: 'completed',
-          updated_at: new Date().toISOString()
-        })
-        .eq('id', request_id);
-
-      // 7. Atualizar agent para 'idle' e atualizar last_active
-      await supabaseAdmin
-        .from('agents')
-        .update({
-          status: 'idle',
-          current_task: 'Aguardando próxima tarefa',
-          last_active: new Date().toISOString()
-        })
-        .eq('id', agent.id);
+      },
+      { timeout: timeout * 1000, maxRetries: 0 }
+    );
+    const result = completion.choices?.[0]?.message?.content || 'Sem resposta';
+    console.log(`[PROCESS-SERVICE] OpenAI respondeu com sucesso`);
 
-      console.log(`[PROCESS-SERVICE] Request ${request_id} processada com sucesso!`);
+    console.log(`[PROCESS-SERVICE] Request ${request_id} processada com sucesso!`);
 
-      return {
-        success: true,
-        request_id,
-        agent_id: agent.id,
-        agent_name: agent.name,
-        result
-      };
-
-    } catch (openaiError: unknown) {
-      console.error('[PROCESS-SERVICE] Erro ao chamar OpenAI:', openaiError);
-
-      // Reverter status em caso de erro
-      await supabaseAdmin
-        .from('requests')
-        .update({
-          status: 'failed',
-          updated_at: new Date().toISOString()
-        })
-        .eq('id', request_id);
+    return {
+      success: true,
+      request_id,
+      agent_id: agent.id,
+      agent_name: agent.name,
+      result,
+      llm_ms: Date.now() - llmStart,
+    };
 
-      await supabaseAdmin
-        .from('agents')
-        .update({
-          status: 'idle',
-          current_task: 'Aguardando próxima tarefa',
-          last_active: new Date().toISOString()
-        })
-        .eq('id', agent.id);
+  } catch (openaiError: unknown) {
+    console.error('[PROCESS-SERVICE] Erro ao chamar OpenAI:', openaiError);
+    // Módulo já carregado pelo getOpenAI() acima: o import() só resolve do cache
+    const { APIError, RateLimitError } = await import('openai');
 
-      return {
-        success: false,
-        request_id,
-        error: 'Erro ao processar com OpenAI',
-        details: openaiError instanceof Error ? openaiError.message : String(openaiError)
-      };
-    }
-
-  } catch (error: unknown) {
-    console.error('[PROCESS-SERVICE] Erro geral:', error);
     return {
       success: false,
       request_id,
-      error: 'Erro ao processar request',
-      details: error instanceof Error ? error.message : String(error)
+      agent_id: agent.id,
+      agent_name: agent.name,
+      error: 'Erro ao processar com OpenAI',
+      details: openaiError instanceof Error ? openaiError.message : String(openaiError),
+      llm_ms: Date.now() - llmStart,
+      rate_limited: openaiError instanceof RateLimitError,
+      retry_after_secs: retryAfterSecs(openaiError instanceof APIError ? openaiError.headers : undefined),
     };
+  } finally {
+    // 4. Agent volta para 'idle' (sucesso ou erro)
+    await supabaseAdmin
+      .from('agents')
+      .update({
+        status: 'idle',
+        current_task: 'Aguardando próxima tarefa',
+        last_active: new Date().toISOString()
+      })
+      .eq('id', agent.id);
   }
 }
@@ -3,7 +3,8 @@
 // ═══════════════════════════════════════════════════════════════
 
 import { createAdminClient } from '@/lib/supabase/admin';
-import { Agent, AgentRole, AgentStatus, ACTIVE_STATUSES } from './types';
+import { Agent, AgentRole, AgentStatus } from './types';
+import { createRouter, getRoutingSnapshot, noteAgentLoad } from './routing-index';
 
 // Palavras-chave para roteamento por ROLE (não squad)
 const ROLE_KEYWORDS: Record<AgentRole, string[]> = {
@@ -50,70 +51,18 @@ export async function getAgentById(agentId: string): Promise<Agent | null> {
   return (data as Agent) || null;
 }
 
-export async function routeToAgent(taskDescription: string): Promise<Agent> {
-  const supabase = createAdminClient();
-  const lowerDesc = taskDescription.toLowerCase();
-
-  // 1. Tentar match por nome do agent (especialização)
-  for (const [agentName, keywords] of Object.entries(AGENT_SPECIALIZATIONS)) {
-    if (keywords.some(kw => lowerDesc.includes(kw))) {
-      const { data: agent } = await supabase
-        .from('agents')
-        .select('*')
-        .eq('name', agentName)
-        .in('status', ACTIVE_STATUSES)
-        .single();
-
-      if (agent) return agent as Agent;
-    }
-  }
-
-  // 2. Match por ROLE
-  let targetRole: AgentRole = 'CORE'; // Default
-  let bestScore = 0;
-
-  for (const [role, keywords] of Object.entries(ROLE_KEYWORDS)) {
-    const score = keywords.filter(kw => lowerDesc.includes(kw)).length;
-    if (score > bestScore) {
-      bestScore = score;
-      targetRole = role as AgentRole;
-    }
-  }
-
-  // 3. Buscar agent disponível com maior efficiency
-  const { data: agents } = await supabase
-    .from('agents')
-    .select('*')
-    .eq('role', targetRole)
-    .in('status', ACTIVE_STATUSES)
-    .order('efficiency', { ascending: false })
-    .limit(5);
-
-  if (agents && agents.length > 0) {
-    // Escolher o com menor neural_load entre os top 5
-    const sorted = agents.sort((a, b) => (a.neural_load || 0) - (b.neural_load || 0));
-    return sorted[0] as Agent;
-  }
+const route = createRouter({
+  specializations: AGENT_SPECIALIZATIONS,
+  roleKeywords: ROLE_KEYWORDS,
+  fallbackName: 'ORCHESTRATOR ALPHA',
+});
 
-  // 4. Fallback: ORCHESTRATOR ALPHA
-  const { data: orchestrator } = await supabase
-    .from('agents')
-    .select('*')
-    .eq('name', 'ORCHESTRATOR ALPHA')
-    .single();
-
-  if (orchestrator) return orchestrator as Agent;
-
-  // 5. Último recurso: qualquer agent operacional
-  const { data: anyAgent } = await supabase
-    .from('agents')
-    .select('*')
-    .in('status', ACTIVE_STATUSES)
-    .order('efficiency', { ascending: false })
-    .limit(1)
-    .single();
-
-  if (anyAgent) return anyAgent as Agent;
+// Escolha local sobre o índice em memória (routing-index.ts): sem query
+// por tarefa, só a recarga do snapshot quando o TTL vence.
+export async function routeToAgent(taskDescription: string): Promise<Agent> {
+  const snapshot = await getRoutingSnapshot();
+  const agent = route(snapshot, taskDescription);
+  if (agent) return agent;
 
   throw new Error('No available agents found');
 }
@@ -136,38 +85,57 @@ export async function updateAgentStatus(
     .eq('id', agentId);
 }
 
-export async function incrementNeuralLoad(agentId: string, amount: number = 10): Promise<void> {
+// ───────────────────────────────────────────────────────────────
+// CONTABILIDADE DE CARGA — atômica, uma escrita por transição
+// agent_load_transition (migration 20261018_agent_load_atomic) soma o delta
+// de neural_load grampeado em [0, 100] e, opcionalmente, troca status e
+// current_task — tudo num UPDATE só. Sem leitura prévia: nada de update
+// perdido quando duas tarefas caem no mesmo agente.
+// ───────────────────────────────────────────────────────────────
+export async function transitionAgent(
+  agentId: string,
+  loadDelta: number,
+  status?: AgentStatus,
+  currentTask?: string
+): Promise<number | null> {
   const supabase = createAdminClient();
 
-  const { data: agent } = await supabase
-    .from('agents')
-    .select('neural_load')
-    .eq('id', agentId)
-    .single();
+  const { data, error } = await supabase.rpc('agent_load_transition', {
+    p_agent_id: agentId,
+    p_delta: loadDelta,
+    p_status: status ?? null,
+    p_current_task: status ? currentTask || 'Aguardando comando' : null,
+  });
 
-  if (agent) {
-    const newLoad = Math.min(100, (agent.neural_load || 0) + amount);
-    await supabase
-      .from('agents')
-      .update({ neural_load: newLoad })
-      .eq('id', agentId);
+  if (error) {
+    console.error('[agent-router] agent_load_transition falhou:', error.message);
+    return null;
   }
+  if (data === null) return null;
+  // O índice de roteamento enxerga a carga nova já na próxima escolha.
+  noteAgentLoad(agentId, Number(data), status);
+  return Number(data);
 }
 
-export async function decrementNeuralLoad(agentId: string, amount: number = 10): Promise<void> {
-  const supabase = createAdminClient();
+// Início da tarefa: PROCESSING + carga, numa escrita.
+export function beginAgentTask(agentId: string, currentTask: string, load: number = 10) {
+  return transitionAgent(agentId, load, 'PROCESSING', currentTask);
+}
 
-  const { data: agent } = await supabase
-    .from('agents')
-    .select('neural_load')
-    .eq('id', agentId)
-    .single();
+// Fim da tarefa: status final + alívio da carga, numa escrita.
+export function finishAgentTask(
+  agentId: string,
+  status: AgentStatus,
+  currentTask: string = 'Aguardando comando',
+  load: number = 10
+) {
+  return transitionAgent(agentId, -load, status, currentTask);
+}
 
-  if (agent) {
-    const newLoad = Math.max(0, (agent.neural_load || 0) - amount);
-    await supabase
-      .from('agents')
-      .update({ neural_load: newLoad })
-      .eq('id', agentId);
-  }
+export async function incrementNeuralLoad(agentId: string, amount: number = 10): Promise<void> {
+  await transitionAgent(agentId, amount);
+}
+
+export async function decrementNeuralLoad(agentId: string, amount: number = 10): Promise<void> {
+  await transitionAgent(agentId, -amount);
 }
@@ -4,8 +4,12 @@
 
 import { createAdminClient } from '@/lib/supabase/admin';
 import { Agent } from './types';
+import { applyEvolutionBatch, getEvolutionStats, loadEvolutionCandidates } from './evolution-executor';
 
 const EFFICIENCY_THRESHOLD = 80; // Agents abaixo disso são candidatos
+// Com o UPDATE em lote o custo não cresce com o teto; ele só limita o
+// quanto um ciclo mexe no sistema.
+const MAX_CANDIDATES_PER_CYCLE = 200;
 
 export interface EvolutionResult {
   cycle_id: string;
@@ -17,78 +21,65 @@ export interface EvolutionResult {
   success: boolean;
 }
 
-export async function runEvolutionCycle(): Promise<EvolutionResult> {
+export async function runEvolutionCycle(
+  maxCandidates: number = MAX_CANDIDATES_PER_CYCLE
+): Promise<EvolutionResult> {
   const supabase = createAdminClient();
   const startTime = Date.now();
   
   // Gerar cycle_id único
   const cycleId = `evolution-${Date.now()}`;
   
-  // 1. Buscar todos os agents
-  const { data: agents } = await supabase
-    .from('agents')
-    .select('*')
-    .order('efficiency', { ascending: true });
+  // 1. Retrato do sistema por agregados (sem puxar a tabela)
+  const stats = await getEvolutionStats(supabase, EFFICIENCY_THRESHOLD);
   
-  if (!agents || agents.length === 0) {
+  if (stats.total === 0) {
     throw new Error('No agents found');
   }
   
-  const avgEfficiencyBefore = agents.reduce((sum, a) => sum + (a.efficiency || 0), 0) / agents.length;
-  
-  // 2. Identificar candidatos (efficiency < threshold)
-  const candidates = agents.filter(a => (a.efficiency || 0) < EFFICIENCY_THRESHOLD);
-  
-  // 3. Aplicar melhorias (incremento de 1-3% na efficiency)
-  let improvementsApplied = 0;
-  
-  for (const agent of candidates.slice(0, 20)) { // Limitar a 20 por ciclo
-    const improvement = 1 + Math.random() * 2; // 1-3%
-    const newEfficiency = Math.min(100, (agent.efficiency || 0) + improvement);
-    
-    await supabase
-      .from('agents')
-      .update({
-        efficiency: newEfficiency,
-        updated_at: new Date().toISOString(),
-      })
-      .eq('id', agent.id);
-    
-    improvementsApplied++;
-  }
-  
-  // 4. Calcular nova média
-  const { data: agentsAfter } = await supabase
-    .from('agents')
-    .select('efficiency');
+  // 2. Candidatos (efficiency < threshold), piores primeiro
+  const candidates = await loadEvolutionCandidates<Pick<Agent, 'id' | 'efficiency'>>(supabase, {
+    threshold: EFFICIENCY_THRESHOLD,
+    limit: maxCandidates,
+    columns: 'id, efficiency',
+  });
   
-  const avgEfficiencyAfter = agentsAfter
-    ? agentsAfter.reduce((sum, a) => sum + (a.efficiency || 0), 0) / agentsAfter.length
-    : avgEfficiencyBefore;
+  // 3. Aplicar melhorias (incremento de 1-3% na efficiency) num UPDATE só;
+  //    a média antes/depois vem da mesma transação
+  const applied = await applyEvolutionBatch(
+    supabase,
+    candidates.map(agent => ({ id: agent.id, delta: 1 + Math.random() * 2 }))
+  );
+  const improvementsApplied = applied.updated;
+  const avgEfficiencyBefore = candidates.length > 0 ? applied.avg_before : stats.avg_efficiency;
+  const avgEfficiencyAfter = candidates.length > 0 ? applied.avg_after : stats.avg_efficiency;
   
   const durationSeconds = (Date.now() - startTime) / 1000;
   
-  // 5. Registrar na tabela evolution_cycles EXISTENTE
+  // 4. Registrar na tabela evolution_cycles EXISTENTE
   await supabase.from('evolution_cycles').insert({
     cycle_id: cycleId,
     core_evolution: {
-      candidates_found: candidates.length,
+      candidates_found: stats.below,
       improvements_applied: improvementsApplied,
     },
     metrics_analysis: {
       efficiency_before: avgEfficiencyBefore,
       efficiency_after: avgEfficiencyAfter,
-      improvement_percentage: ((avgEfficiencyAfter - avgEfficiencyBefore) / avgEfficiencyBefore) * 100,
+      improvement_percentage: avgEfficiencyBefore > 0
+        ? ((avgEfficiencyAfter - avgEfficiencyBefore) / avgEfficiencyBefore) * 100
+        : 0,
+      batch_db_ms: applied.db_ms,
     },
     validation_results: {
       threshold: EFFICIENCY_THRESHOLD,
-      agents_below_threshold: candidates.length,
+      agents_below_threshold: stats.below,
     },
     overall_success: improvementsApplied > 0,
     duration_seconds: durationSeconds,
   });
   
-  // 6. Atualizar quantum_brain_state
+  // 5. Atualizar quantum_brain_state
   const { data: brainState } = await supabase
     .from('quantum_brain_state')
     .select('current_evolution_cycle')
@@ -105,7 +96,7 @@ export async function runEvolutionCycle(): Promise<EvolutionResult> {
   
   return {
     cycle_id: cycleId,
-    agents_analyzed: agents.length,
+    agents_analyzed: stats.total,
     improvements_applied: improvementsApplied,
     average_efficiency_before: avgEfficiencyBefore,
     average_efficiency_after: avgEfficiencyAfter,
@@ -0,0 +1,248 @@
+// ═══════════════════════════════════════════════════════════════
+// EXECUTOR DE EVOLUÇÃO - CICLOS EM LOTE E CONCORRENTES
+// ═══════════════════════════════════════════════════════════════
+// Um ciclo de evolução em quatro idas ao banco, qualquer que seja o
+// número de agentes:
+//   1. agents_evolution_stats() — retrato "antes" por agregados
+//   2. candidatos: só as colunas que o plano usa, piores primeiro
+//   3. plano por agente (Claude ou regra local) rodando em paralelo,
+//      com teto de concorrência e orçamento de tempo
+//   4. agents_evolve_batch() — todas as mudanças num UPDATE só, com a
+//      média antes/depois calculada na mesma transação
+// Migration: supabase/migrations/20261018_evolution_bulk.sql
+//
+// Prompt NÃO passa por agents (agents.system_prompt é legível por
+// qualquer usuário logado — 20260727_agent_prompts_cofre): o que a
+// evolução reescreve sai e volta para o cofre, public.agent_prompts,
+// que é de onde executeTask lê. Cofre só com cliente service_role.
+//
+// Recebe o SupabaseClient por parâmetro: o motor usa createAdminClient,
+// as rotas /api/evolution/* usam getSupabase (lazy-clients) e
+// getSupabaseServiceClient para o cofre.
+// ═══════════════════════════════════════════════════════════════
+
+import type { SupabaseClient } from '@supabase/supabase-js';
+import { invalidatePromptCache } from './prompt-cache';
+
+export interface EvolutionStats {
+  total: number;
+  avg_efficiency: number;
+  below: number;
+  active: number;
+  by_role: Record<string, number>;
+  requests: { total: number; completed: number; failed: number } | null;
+}
+
+export interface AgentEvolutionChange {
+  id: string;
+  /** Eficiência absoluta; se ausente, `delta` é somado à atual. */
+  efficiency?: number;
+  delta?: number;
+  capabilities?: string[];
+  /** Conta como evolução: evolution_count + 1 e last_evolved_at. */
+  evolved?: boolean;
+}
+
+export interface BatchApplyResult {
+  updated: number;
+  avg_before: number;
+  avg_after: number;
+  db_ms: number;
+}
+
+export interface BudgetRunResult<R> {
+  results: R[];
+  failed: number;
+  /** Itens que nem começaram (orçamento esgotado) ou foram abortados. */
+  skipped: number;
+}
+
+export interface BudgetOptions {
+  concurrency: number;
+  budgetMs: number;
+}
+
+export async function getEvolutionStats(
+  supabase: SupabaseClient,
+  threshold: number,
+  requestsSince?: Date
+): Promise<EvolutionStats> {
+  const { data, error } = await supabase.rpc('agents_evolution_stats', {
+    p_limiar: threshold,
+    p_desde: requestsSince ? requestsSince.toISOString() : null,
+  });
+  if (error) throw error;
+  const stats = (data || {}) as Partial<EvolutionStats>;
+  return {
+    total: Number(stats.total) || 0,
+    avg_efficiency: Number(stats.avg_efficiency) || 0,
+    below: Number(stats.below) || 0,
+    active: Number(stats.active) || 0,
+    by_role: stats.by_role || {},
+    requests: stats.requests || null,
+  };
+}
+
+/** Agentes abaixo do limiar, piores primeiro, só com as colunas pedidas. */
+export async function loadEvolutionCandidates<T = Record<string, unknown>>(
+  supabase: SupabaseClient,
+  opts: { threshold: number; limit: number; columns: string }
+): Promise<T[]> {
+  const { data, error } = await supabase
+    .from('agents')
+    .select(opts.columns)
+    .lt('efficiency', opts.threshold)
+    .order('efficiency', { ascending: true })
+    .order('id', { ascending: true })
+    .limit(opts.limit);
+  if (error) throw error;
+  return (data || []) as T[];
+}
+
+/**
+ * Os `perRole` melhores de cada role (eficiência >= `minEfficiency`), numa
+ * query só. O corte é por role, no banco: um squad grande não toma a vez
+ * dos outros.
+ */
+export async function loadTopByRole<T = Record<string, unknown>>(
+  supabase: SupabaseClient,
+  roles: string[],
+  opts: { minEfficiency: number; perRole: number }
+): Promise<Map<string, T[]>> {
+  const byRole = new Map<string, T[]>();
+  if (roles.length === 0) return byRole;
+  const { data, error } = await supabase.rpc('agents_top_by_role', {
+    p_roles: roles,
+    p_min: opts.minEfficiency,
+    p_por_role: opts.perRole,
+  });
+  if (error) throw error;
+  for (const row of (data || []) as Array<T & { role: string }>) {
+    const list = byRole.get(row.role) || [];
+    list.push(row);
+    byRole.set(row.role, list);
+  }
+  return byRole;
+}
+
+/** Todas as mudanças do ciclo num UPDATE só (a última por agente vence). */
+export async function applyEvolutionBatch(
+  supabase: SupabaseClient,
+  changes: AgentEvolutionChange[]
+): Promise<BatchApplyResult> {
+  const byId = new Map<string, AgentEvolutionChange>();
+  for (const change of changes) byId.set(change.id, change);
+
+  const { data, error } = await supabase.rpc('agents_evolve_batch', { changes: Array.from(byId.values()) });
+  if (error) throw error;
+  const row = (Array.isArray(data) ? data[0] : data) || {};
+  return {
+    updated: Number(row.updated) || 0,
+    avg_before: Number(row.avg_before) || 0,
+    avg_after: Number(row.avg_after) || 0,
+    db_ms: Number(row.db_ms) || 0,
+  };
+}
+
+/** Prompts em uso no cofre, por agente (quem não tem prompt fica de fora). */
+export async function loadVaultPrompts(
+  vault: SupabaseClient,
+  agentIds: string[]
+): Promise<Map<string, string>> {
+  const prompts = new Map<string, string>();
+  if (agentIds.length === 0) return prompts;
+  const { data, error } = await vault
+    .from('agent_prompts')
+    .select('agent_id, system_prompt')
+    .in('agent_id', agentIds);
+  if (error) throw error;
+  for (const row of data || []) prompts.set(row.agent_id, row.system_prompt);
+  return prompts;
+}
+
+/**
+ * Prompts reescritos de volta ao cofre, num upsert só. Só vai o que mudou
+ * em relação a `current`: o trigger de versao (20261018_agent_prompts_versao)
+ * avança o carimbo desses agentes, e o cache de prompts e o de respostas
+ * de cada processo os descartam na próxima checagem — neste, na hora.
+ */
+export async function saveVaultPrompts(
+  vault: SupabaseClient,
+  rewrites: { agent_id: string; system_prompt: string }[],
+  opts: { current: Map<string, string>; author: string }
+): Promise<number> {
+  const changed = rewrites.filter(r => r.system_prompt.trim() && r.system_prompt !== opts.current.get(r.agent_id));
+  if (changed.length === 0) return 0;
+
+  const now = new Date().toISOString();
+  const { error } = await vault.from('agent_prompts').upsert(
+    changed.map(r => ({
+      agent_id: r.agent_id,
+      system_prompt: r.system_prompt,
+      atualizado_em: now,
+      atualizado_por: opts.author,
+    })),
+    { onConflict: 'agent_id' }
+  );
+  if (error) throw error;
+  for (const r of changed) invalidatePromptCache(r.agent_id);
+  return changed.length;
+}
+
+/**
+ * Roda `fn` sobre os itens com no máximo `concurrency` ao mesmo tempo.
+ * Passado `budgetMs`, nenhum item novo começa e os em voo recebem abort
+ * pelo signal (o SDK da Anthropic aceita `{ signal }`). Falha de um item
+ * não derruba os outros; `null` = item sem mudança.
+ */
+export async function runWithBudget<T, R>(
+  items: T[],
+  opts: BudgetOptions,
+  fn: (item: T, signal: AbortSignal) => Promise<R | null>
+): Promise<BudgetRunResult<R>> {
+  const controller = new AbortController();
+  const timer = setTimeout(() => controller.abort(), Math.max(0, opts.budgetMs));
+  const results: R[] = [];
+  let failed = 0;
+  let skipped = 0;
+  let next = 0;
+
+  const worker = async () => {
+    while (next < items.length) {
+      const item = items[next++];
+      if (controller.signal.aborted) {
+        skipped++;
+        continue;
+      }
+      try {
+        const result = await fn(item, controller.signal);
+        if (result !== null) results.push(result);
+      } catch (err) {
+        if (controller.signal.aborted) {
+          skipped++;
+        } else {
+          failed++;
+          console.error('[EVOLUTION] Falha no plano de um agente:', err);
+        }
+      }
+    }
+  };
+
+  try {
+    const workers = Math.max(1, Math.min(opts.concurrency, items.length));
+    await Promise.all(Array.from({ length: workers }, worker));
+  } finally {
+    clearTimeout(timer);
+  }
+  return { results, failed, skipped };
+}
+
+/** Concorrência e orçamento dos ciclos com LLM, por env. */
+export function evolutionBudgetFromEnv(defaults: BudgetOptions): BudgetOptions {
+  const concurrency = Number(process.env.EVOLUTION_CONCURRENCY);
+  const budgetMs = Number(process.env.EVOLUTION_BUDGET_MS);
+  return {
+    concurrency: Number.isFinite(concurrency) && concurrency >= 1 ? Math.floor(concurrency) : defaults.concurrency,
+    budgetMs: Number.isFinite(budgetMs) && budgetMs > 0 ? budgetMs : defaults.budgetMs,
+  };
+}
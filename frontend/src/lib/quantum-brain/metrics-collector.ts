@@ -4,6 +4,7 @@
 // ═══════════════════════════════════════════════════════════════
 
 import { createAdminClient } from '@/lib/supabase/admin';
+import { applyKeyset, clampPageSize, toKeysetPage } from '@/lib/keyset';
 import {
   QuantumBrainState,
   RoleStats,
@@ -11,78 +12,73 @@ import {
   AgentRole,
   ROLE_TO_SQUAD,
   SQUAD_COLORS,
-  ACTIVE_STATUSES,
   isActiveStatus,
 } from './types';
 
-export async function getBrainState(): Promise<QuantumBrainState> {
-  const supabase = createAdminClient();
+// ───────────────────────────────────────────────────────────────
+// SNAPSHOT AGREGADO — uma ida ao banco por poll
+// quantum_metrics_snapshot() (migration 20261018_quantum_metrics_snapshot)
+// devolve agentes, fila, contadores de tarefas, latência, erro e top
+// agentes num jsonb. Os contadores são mantidos por trigger: o custo não
+// cresce com o histórico de quantum_tasks.
+// ───────────────────────────────────────────────────────────────
+export interface MetricsSnapshot {
+  generated_at: string;
+  brain: Record<string, unknown> | null;
+  agents: {
+    total: number;
+    operational: number;
+    avg_efficiency: number;
+    by_status: Record<string, number>;
+  };
+  queue_size: number;
+  tasks: {
+    total: number;
+    completed: number;
+    failed: number;
+    last_minute: number;
+    avg_latency_ms: number;
+    error_rate: number;
+  };
+  top_agents: { id: string; name: string; efficiency: number }[];
+}
 
-  // 1. Buscar estado do cérebro
-  const { data: state } = await supabase
-    .from('quantum_brain_state')
-    .select('*')
-    .single();
+export async function getMetricsSnapshot(
+  options: { latencyWindow?: number; errorWindow?: number } = {}
+): Promise<MetricsSnapshot> {
+  const supabase = createAdminClient();
+  const { data, error } = await supabase.rpc('quantum_metrics_snapshot', {
+    latency_window: options.latencyWindow ?? 100,
+    error_window: options.errorWindow ?? 100,
+  });
 
-  if (!state) {
-    throw new Error('Brain state not found. Run initialization SQL first.');
+  if (error || !data) {
+    throw new Error(`Metrics snapshot failed: ${error?.message ?? 'empty response'}`);
   }
 
-  // 2. Calcular métricas em tempo real dos agents REAIS
-  const { data: agents } = await supabase
-    .from('agents')
-    .select('status, efficiency');
-
-  const totalAgents = agents?.length || 0;
-  const activeAgents = agents?.filter(a => isActiveStatus(a.status)).length || 0;
-  const avgEfficiency = agents && agents.length > 0
-    ? agents.reduce((sum, a) => sum + (a.efficiency || 0), 0) / agents.length
-    : 0;
-
-  // 3. Contar fila (requests com status='queued')
-  const { count: queueSize } = await supabase
-    .from('requests')
-    .select('*', { count: 'exact', head: true })
-    .eq('status', 'queued');
-
-  // 4. Calcular success rate de quantum_tasks
-  const { count: totalTasks } = await supabase
-    .from('quantum_tasks')
-    .select('*', { count: 'exact', head: true });
-
-  const { count: completedTasks } = await supabase
-    .from('quantum_tasks')
-    .select('*', { count: 'exact', head: true })
-    .eq('status', 'completed');
-
-  const successRate = totalTasks && totalTasks > 0
-    ? (completedTasks || 0) / totalTasks
-    : 0;
+  return data as MetricsSnapshot;
+}
 
-  // 5. Média de tempo de resposta
-  const { data: recentTasks } = await supabase
-    .from('quantum_tasks')
-    .select('execution_time_ms')
-    .eq('status', 'completed')
-    .order('completed_at', { ascending: false })
-    .limit(100);
+export async function getBrainState(): Promise<QuantumBrainState> {
+  const snapshot = await getMetricsSnapshot({ latencyWindow: 100 });
+  const state = snapshot.brain as unknown as QuantumBrainState | null;
 
-  const avgResponseTime = recentTasks && recentTasks.length > 0
-    ? recentTasks.reduce((sum, t) => sum + (t.execution_time_ms || 0), 0) / recentTasks.length
-    : 0;
+  if (!state) {
+    throw new Error('Brain state not found. Run initialization SQL first.');
+  }
 
-  // 6. Calcular uptime
+  const { total, completed } = snapshot.tasks;
   const uptimeStart = new Date(state.uptime_started_at);
   const uptimeSeconds = Math.floor((Date.now() - uptimeStart.getTime()) / 1000);
 
   return {
     ...state,
-    total_agents: totalAgents,
-    active_agents: activeAgents,
-    average_efficiency: avgEfficiency,
-    tasks_in_queue: queueSize || 0,
-    success_rate: successRate,
-    average_response_time_ms: avgResponseTime,
+    total_agents: Number(snapshot.agents.total),
+    active_agents: Number(snapshot.agents.operational),
+    average_efficiency: Number(snapshot.agents.avg_efficiency),
+    tasks_in_queue: Number(snapshot.queue_size),
+    success_rate: total > 0 ? completed / total : 0,
+    average_response_time_ms: Number(snapshot.tasks.avg_latency_ms),
     uptime_seconds: uptimeSeconds,
   };
 }
@@ -138,95 +134,70 @@ export async function getRoleStats(): Promise<RoleStats[]> {
 }
 
 export async function getRealTimeMetrics(): Promise<RealTimeMetrics> {
-  const supabase = createAdminClient();
+  const snapshot = await getMetricsSnapshot({ latencyWindow: 50, errorWindow: 100 });
 
-  const oneMinuteAgo = new Date(Date.now() - 60000).toISOString();
-  const { count: tasksLastMinute } = await supabase
-    .from('quantum_tasks')
-    .select('*', { count: 'exact', head: true })
-    .gte('created_at', oneMinuteAgo);
-
-  const { count: activeAgents } = await supabase
-    .from('agents')
-    .select('*', { count: 'exact', head: true })
-    .in('status', ACTIVE_STATUSES);
-
-  const { count: queueSize } = await supabase
-    .from('requests')
-    .select('*', { count: 'exact', head: true })
-    .eq('status', 'queued');
+  return {
+    timestamp: snapshot.generated_at ?? new Date().toISOString(),
+    tasks_per_minute: Number(snapshot.tasks.last_minute),
+    active_agents: Number(snapshot.agents.operational),
+    queue_size: Number(snapshot.queue_size),
+    average_latency_ms: Number(snapshot.tasks.avg_latency_ms),
+    error_rate: Number(snapshot.tasks.error_rate),
+    top_agents: snapshot.top_agents.map(a => ({ ...a, efficiency: Number(a.efficiency) })),
+  };
+}
 
-  const { data: recentTasks } = await supabase
-    .from('quantum_tasks')
-    .select('execution_time_ms')
-    .eq('status', 'completed')
-    .order('completed_at', { ascending: false })
-    .limit(50);
+const TASK_LIST_COLUMNS = `
+  id,
+  agent_id,
+  status,
+  execution_time_ms,
+  tokens_used,
+  cost_usd,
+  created_at,
+  completed_at
+`;
+
+// Página de tarefas, mais recentes primeiro (keyset em (created_at, id) /
+// (agent_id, created_at, id) — migration 20261018_keyset_indexes).
+export async function getTasksPage(
+  opts: { cursor?: string | null; limit?: number; agentId?: string | null } = {}
+) {
+  const supabase = createAdminClient();
+  const limit = clampPageSize(opts.limit, 50);
 
-  const avgLatency = recentTasks && recentTasks.length > 0
-    ? recentTasks.reduce((sum, t) => sum + (t.execution_time_ms || 0), 0) / recentTasks.length
-    : 0;
+  let query = supabase.from('quantum_tasks').select(TASK_LIST_COLUMNS);
+  if (opts.agentId) query = query.eq('agent_id', opts.agentId);
 
-  const { data: lastTasks } = await supabase
-    .from('quantum_tasks')
-    .select('status')
-    .order('created_at', { ascending: false })
-    .limit(100);
+  const { data } = await applyKeyset(query, {
+    column: 'created_at',
+    ascending: false,
+    cursor: opts.cursor,
+    limit,
+  });
+  const page = toKeysetPage((data || []) as Array<{ id: string; agent_id: string }>, 'created_at', limit);
 
-  const errorCount = lastTasks?.filter(t => t.status === 'failed').length || 0;
-  const errorRate = lastTasks && lastTasks.length > 0 ? errorCount / lastTasks.length : 0;
+  if (page.rows.length === 0) return { tasks: [], nextCursor: null };
 
-  const { data: topAgents } = await supabase
+  const agentIds = [...new Set(page.rows.map(t => t.agent_id))];
+  const { data: agents } = await supabase
     .from('agents')
-    .select('id, name, efficiency')
-    .in('status', ACTIVE_STATUSES)
-    .order('efficiency', { ascending: false })
-    .limit(5);
+    .select('id, name, role')
+    .in('id', agentIds);
 
-  return {
-    timestamp: new Date().toISOString(),
-    tasks_per_minute: tasksLastMinute || 0,
-    active_agents: activeAgents || 0,
-    queue_size: queueSize || 0,
-    average_latency_ms: avgLatency,
-    error_rate: errorRate,
-    top_agents: topAgents || [],
-  };
-}
-
-export async function getRecentTasks(limit: number = 10) {
-  const supabase = createAdminClient();
+  const agentMap = new Map(agents?.map(a => [a.id, a]) || []);
 
-  const { data } = await supabase
-    .from('quantum_tasks')
-    .select(`
-      id,
-      agent_id,
-      status,
-      execution_time_ms,
-      tokens_used,
-      cost_usd,
-      created_at,
-      completed_at
-    `)
-    .order('created_at', { ascending: false })
-    .limit(limit);
-
-  if (data && data.length > 0) {
-    const agentIds = [...new Set(data.map(t => t.agent_id))];
-    const { data: agents } = await supabase
-      .from('agents')
-      .select('id, name, role')
-      .in('id', agentIds);
-
-    const agentMap = new Map(agents?.map(a => [a.id, a]) || []);
-
-    return data.map(task => ({
+  return {
+    tasks: page.rows.map(task => ({
       ...task,
       agent_name: agentMap.get(task.agent_id)?.name || 'Unknown',
       agent_role: agentMap.get(task.agent_id)?.role || 'SPECIALIST',
-    }));
-  }
+    })),
+    nextCursor: page.nextCursor,
+  };
+}
 
-  return data || [];
+export async function getRecentTasks(limit: number = 10) {
+  const { tasks } = await getTasksPage({ limit });
+  return tasks;
 }
@@ -0,0 +1,274 @@
+// ═══════════════════════════════════════════════════════════════
+// HISTÓRICO DO ORION - JANELA DE TOKENS + RESUMO CORRIDO (SERVER-ONLY)
+// ═══════════════════════════════════════════════════════════════
+// O modelo recebe sempre uma janela limitada:
+//   system (ORION + contexto da página + resumo) + turnos recentes que
+//   cabem em ORION_WINDOW_TOKENS + a mensagem nova
+// Turnos que saem da janela entram no resumo por dobras: resumo anterior
+// + no máximo FOLD_MAX_TURNS turnos, num modelo barato, DEPOIS de a
+// resposta ter saído. Nenhuma etapa lê a conversa inteira.
+//
+// Tabelas e RPCs: supabase/migrations/20261018_orion_conversations.sql
+// Recebe o SupabaseClient por parâmetro (a rota usa createAdminClient).
+// ═══════════════════════════════════════════════════════════════
+
+import type { SupabaseClient } from '@supabase/supabase-js';
+import { withResponseCache, type ResponseSource } from './response-cache';
+
+const WINDOW_TOKENS = Number(process.env.ORION_WINDOW_TOKENS || 1500);
+// Teto de linhas lidas por turno: a janela nunca passa disso.
+const WINDOW_MAX_TURNS = 24;
+// Dobra quando há pelo menos isso fora da janela e fora do resumo.
+const FOLD_MIN_TURNS = 4;
+const FOLD_MAX_TURNS = 16;
+const SUMMARY_MAX_TOKENS = 350;
+const SUMMARY_MODEL = 'claude-3-haiku-20240307';
+
+export interface OrionTurn {
+  id: string;
+  role: 'user' | 'orion';
+  content: string;
+  created_at: string;
+}
+
+export interface OrionConversation {
+  id: string;
+  summary: string;
+  summaryThrough: string | null;
+  /** Turnos mais recentes posteriores ao resumo, do mais antigo ao mais novo. */
+  recent: OrionTurn[];
+}
+
+export interface OrionWindow {
+  system: string;
+  messages: Array<{ role: 'user' | 'assistant'; content: string }>;
+  /** Turnos que ficaram fora da janela e ainda não estão no resumo. */
+  overflow: OrionTurn[];
+  tokens: number;
+}
+
+/** Estimativa barata (~4 caracteres por token), boa para orçamento. */
+export function estimateTokens(text: string): number {
+  return Math.ceil(text.length / 4);
+}
+
+/** Conversa do usuário com o resumo e os turnos recentes (null = não existe/não é dele). */
+export async function loadConversation(
+  supabase: SupabaseClient,
+  userId: string,
+  conversationId: string
+): Promise<OrionConversation | null> {
+  const { data: conv, error } = await supabase
+    .from('orion_conversations')
+    .select('id, summary, summary_through')
+    .eq('id', conversationId)
+    .eq('user_id', userId)
+    .maybeSingle();
+  if (error) throw error;
+  if (!conv) return null;
+
+  let query = supabase
+    .from('orion_turns')
+    .select('id, role, content, created_at')
+    .eq('conversation_id', conv.id);
+  if (conv.summary_through) query = query.gt('created_at', conv.summary_through);
+  const { data: turns, error: turnsError } = await query
+    .order('created_at', { ascending: false })
+    .order('id', { ascending: false })
+    .limit(WINDOW_MAX_TURNS);
+  if (turnsError) throw turnsError;
+
+  return {
+    id: conv.id,
+    summary: conv.summary || '',
+    summaryThrough: conv.summary_through ?? null,
+    recent: ((turns || []) as OrionTurn[]).reverse(),
+  };
+}
+
+/**
+ * Monta o que vai para o modelo. Entra do turno mais novo para o mais
+ * antigo enquanto couber no orçamento; o resto vira `overflow` (candidato
+ * à próxima dobra). A API da Anthropic quer papéis alternados começando
+ * por `user`: falas seguidas do mesmo lado são juntadas.
+ */
+export function buildWindow(opts: {
+  baseSystem: string;
+  summary: string;
+  recent: OrionTurn[];
+  message: string;
+  budgetTokens?: number;
+}): OrionWindow {
+  const budget = opts.budgetTokens ?? WINDOW_TOKENS;
+  const system = opts.summary
+    ? `${opts.baseSystem}\n\n═══ RESUMO DA CONVERSA ATÉ AQUI ═══\n${opts.summary}`
+    : opts.baseSystem;
+
+  let used = estimateTokens(system) + estimateTokens(opts.message);
+  let start = opts.recent.length;
+  while (start > 0) {
+    const cost = estimateTokens(opts.recent[start - 1].content);
+    if (used + cost > budget) break;
+    used += cost;
+    start--;
+  }
+
+  const messages: OrionWindow['messages'] = [];
+  for (const turn of [...opts.recent.slice(start), { role: 'user' as const, content: opts.message }]) {
+    const role = turn.role === 'orion' ? 'assistant' : 'user';
+    const last = messages[messages.length - 1];
+    if (last && last.role === role) last.content += `\n\n${turn.content}`;
+    else if (messages.length > 0 || role === 'user') messages.push({ role, content: turn.content });
+  }
+
+  return { system, messages, overflow: opts.recent.slice(0, start), tokens: used };
+}
+
+export async function appendExchange(
+  supabase: SupabaseClient,
+  input: { userId: string; conversationId: string | null; userText: string; orionText: string; tokens: number }
+): Promise<{
+  conversationId: string;
+  turnCount: number;
+  turns: { user: Pick<OrionTurn, 'id' | 'created_at'>; orion: Pick<OrionTurn, 'id' | 'created_at'> };
+}> {
+  const { data, error } = await supabase.rpc('orion_append_exchange', {
+    p_user_id: input.userId,
+    p_conversation_id: input.conversationId,
+    p_user_text: input.userText,
+    p_orion_text: input.orionText,
+    p_tokens: input.tokens,
+  });
+  if (error) throw error;
+  const row = (Array.isArray(data) ? data[0] : data) || {};
+  return {
+    conversationId: row.conversation_id,
+    turnCount: Number(row.turn_count) || 0,
+    turns: {
+      user: { id: row.user_turn_id, created_at: row.user_turn_at },
+      orion: { id: row.orion_turn_id, created_at: row.orion_turn_at },
+    },
+  };
+}
+
+export interface OrionAnswer {
+  result: string;
+  tokensUsed: number;
+  costUsd: number;
+}
+
+/**
+ * Um turno do ORION: resposta (do cache de respostas, com `cacheKey`, ou
+ * do modelo) e, com `admin` e `userId`, a troca gravada — seja qual for a
+ * origem da resposta. Só turno sem histórico (pergunta avulsa ou abertura
+ * de conversa) passa pelo cache: com `conversationId` a resposta depende
+ * da conversa e vai sempre ao modelo. Quem repete a abertura também ganha
+ * a conversa; só o token gravado é zero quando o modelo não rodou.
+ * Falha ao gravar não derruba a resposta (`saved: false`).
+ */
+export async function runOrionTurn<V extends OrionAnswer>(opts: {
+  admin: SupabaseClient | null;
+  userId: string | null;
+  conversationId: string | null;
+  userText: string;
+  cacheKey: string | null;
+  call: () => Promise<V>;
+}): Promise<{
+  value: V;
+  source: ResponseSource;
+  conversationId: string | null;
+  turns: Awaited<ReturnType<typeof appendExchange>>['turns'] | null;
+  saved: boolean;
+}> {
+  const { value, source } = opts.cacheKey && !opts.conversationId
+    ? await withResponseCache({
+        key: opts.cacheKey,
+        agentId: 'orion-supreme',
+        compute: opts.call,
+        cacheable: () => true,
+        cost: v => ({ usd: v.costUsd, tokens: v.tokensUsed }),
+      })
+    : { value: await opts.call(), source: 'llm' as const };
+
+  let conversationId = opts.conversationId;
+  if (!opts.admin || !opts.userId) return { value, source, conversationId, turns: null, saved: false };
+  try {
+    const saved = await appendExchange(opts.admin, {
+      userId: opts.userId,
+      conversationId,
+      userText: opts.userText,
+      orionText: value.result,
+      tokens: source === 'llm' ? value.tokensUsed : 0,
+    });
+    conversationId = saved.conversationId;
+    return { value, source, conversationId, turns: saved.turns, saved: true };
+  } catch (e) {
+    console.error('[ORION] falha ao gravar a conversa:', String(e));
+    return { value, source, conversationId, turns: null, saved: false };
+  }
+}
+
+/**
+ * Dobra no resumo os turnos mais antigos que saíram da janela (`overflow`
+ * do buildWindow deste turno): lê do banco os primeiros FOLD_MAX_TURNS
+ * depois do resumo, até o último do overflow — inclusive os que nem
+ * couberam na leitura da janela, se uma dobra anterior falhou. A troca é
+ * compare-and-set: uma dobra concorrente só faz esta desistir. Devolve
+ * quantos turnos entraram.
+ */
+export async function foldSummary(
+  supabase: SupabaseClient,
+  anthropic: any,
+  conv: Pick<OrionConversation, 'id' | 'summary' | 'summaryThrough'>,
+  overflow: OrionTurn[]
+): Promise<number> {
+  if (overflow.length < FOLD_MIN_TURNS) return 0;
+
+  let query = supabase
+    .from('orion_turns')
+    .select('id, role, content, created_at')
+    .eq('conversation_id', conv.id)
+    .lte('created_at', overflow[overflow.length - 1].created_at);
+  if (conv.summaryThrough) query = query.gt('created_at', conv.summaryThrough);
+  const { data: rows, error: rowsError } = await query
+    .order('created_at', { ascending: true })
+    .order('id', { ascending: true })
+    .limit(FOLD_MAX_TURNS);
+  if (rowsError) throw rowsError;
+  const batch = (rows || []) as OrionTurn[];
+  if (batch.length === 0) return 0;
+
+  const transcript = batch.map(t => `${t.role === 'user' ? 'USUÁRIO' : 'ORION'}: ${t.content}`).join('\n');
+
+  const message = await anthropic.messages.create({
+    model: SUMMARY_MODEL,
+    max_tokens: SUMMARY_MAX_TOKENS,
+    temperature: 0,
+    system:
+      'Você mantém o resumo corrido de uma conversa entre um usuário e ORION. Atualize o resumo com os novos turnos. ' +
+      'Guarde fatos, decisões, preferências e pendências do usuário; descarte saudações e repetições. ' +
+      'Responda só com o resumo, em português, em no máximo 12 linhas.',
+    messages: [
+      {
+        role: 'user',
+        content: `RESUMO ATUAL:\n${conv.summary || '(vazio)'}\n\nNOVOS TURNOS:\n${transcript}`,
+      },
+    ],
+  });
+  const summary = (message.content || [])
+    .filter((b: any) => b.type === 'text')
+    .map((b: any) => b.text)
+    .join('\n')
+    .trim();
+  if (!summary) return 0;
+
+  const { data, error } = await supabase.rpc('orion_fold_summary', {
+    p_conversation_id: conv.id,
+    p_expected: conv.summaryThrough,
+    p_through: batch[batch.length - 1].created_at,
+    p_summary: summary,
+    p_folded: batch.length,
+  });
+  if (error) throw error;
+  return data === true ? batch.length : 0;
+}
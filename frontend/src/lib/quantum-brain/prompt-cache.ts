@@ -0,0 +1,164 @@
+// ═══════════════════════════════════════════════════════════════
+// CACHE DE PROMPTS DO COFRE - LRU POR AGENTE (SERVER-ONLY)
+// ═══════════════════════════════════════════════════════════════
+// O prompt de um agente só muda quando a carga de almas roda, mas o
+// executor abria o cofre (public.agent_prompts) a cada tarefa.
+//
+// Agora o prompt fica em memória, com o carimbo `versao` do agente
+// (migration 20261018_agent_prompts_versao). De tempos em tempos
+// (PROMPT_CACHE_CHECK_MS) uma única RPC pergunta ao cofre o que mudou
+// desde a última marca d'água vista e derruba só as entradas com carimbo
+// diferente; remoção no cofre derruba tudo. Quem grava prompt no mesmo processo pode avisar
+// direto com invalidatePromptCache().
+//
+// Falha do cofre nunca derruba a execução: o chamador cai no fallback.
+// ═══════════════════════════════════════════════════════════════
+
+import { createAdminClient } from '@/lib/supabase/admin';
+
+const MAX_ENTRIES = Number(process.env.PROMPT_CACHE_MAX || 256);
+const CHECK_MS = Number(process.env.PROMPT_CACHE_CHECK_MS || 30_000);
+
+interface Entry {
+  prompt: string | null; // null = agente sem prompt no cofre (também é cacheado)
+  versao: number | null;
+}
+
+export interface PromptCacheStats {
+  size: number;
+  max_entries: number;
+  hits: number;
+  misses: number;
+  hit_rate: number;
+  invalidations: number;
+  vault_version: number | null;
+  last_check_at: string | null;
+}
+
+// Map mantém ordem de inserção: o primeiro é o menos usado (LRU).
+const entries = new Map<string, Entry>();
+let hits = 0;
+let misses = 0;
+let invalidations = 0;
+let vaultVersion: number | null = null;
+let lastRemoval: number | null = null;
+let lastCheck = 0;
+let checking: Promise<void> | null = null;
+
+function touch(agentId: string, entry: Entry) {
+  entries.delete(agentId);
+  entries.set(agentId, entry);
+  while (entries.size > MAX_ENTRIES) {
+    entries.delete(entries.keys().next().value as string);
+  }
+}
+
+async function syncVersion(): Promise<void> {
+  try {
+    const { data, error } = await createAdminClient().rpc('agent_prompts_mudancas', {
+      p_desde: vaultVersion,
+    });
+    if (error) throw new Error(error.message);
+
+    const mudancas = data as {
+      versao: number;
+      remocao: number | null;
+      mudaram: Array<{ agent_id: string; versao: number }>;
+    };
+    const remocao = mudancas.remocao == null ? null : Number(mudancas.remocao);
+    if (vaultVersion === null || remocao !== lastRemoval) {
+      // Primeira sincronização (não sabemos desde quando o cache existe) ou remoção.
+      invalidations += entries.size;
+      entries.clear();
+    } else {
+      // A janela repete mudanças já vistas: quem já tem o carimbo fica.
+      for (const { agent_id, versao } of mudancas.mudaram) {
+        const cached = entries.get(agent_id);
+        if (cached && cached.versao !== Number(versao)) {
+          entries.delete(agent_id);
+          invalidations++;
+        }
+      }
+    }
+    vaultVersion = Number(mudancas.versao);
+    lastRemoval = remocao;
+  } catch (e) {
+    // Sem como saber o que mudou: descarta tudo, a staleness fica limitada a CHECK_MS.
+    console.error('[prompt-cache] checagem de versao falhou, limpando cache:', String(e));
+    invalidations += entries.size;
+    entries.clear();
+  }
+  lastCheck = Date.now();
+}
+
+function ensureFresh(): Promise<void> | void {
+  if (Date.now() - lastCheck < CHECK_MS) return;
+  if (!checking) {
+    checking = syncVersion().finally(() => {
+      checking = null;
+    });
+  }
+  return checking;
+}
+
+/**
+ * Prompt do cofre para o agente, ou undefined se não houver / cofre fora.
+ * Agentes quentes não tocam o banco entre duas checagens de versão.
+ */
+export async function getVaultPrompt(agentId: string): Promise<string | undefined> {
+  await ensureFresh();
+
+  const cached = entries.get(agentId);
+  if (cached) {
+    hits++;
+    touch(agentId, cached);
+    return cached.prompt ?? undefined;
+  }
+
+  misses++;
+  const { data, error } = await createAdminClient()
+    .from('agent_prompts')
+    .select('system_prompt, versao')
+    .eq('agent_id', agentId)
+    .maybeSingle();
+  if (error) throw new Error(`agent_prompts read failed: ${error.message}`);
+
+  const entry: Entry = {
+    prompt: (data?.system_prompt as string | undefined) ?? null,
+    versao: data?.versao == null ? null : Number(data.versao),
+  };
+  touch(agentId, entry);
+  return entry.prompt ?? undefined;
+}
+
+/**
+ * Carimbo `versao` do prompt em cache para o agente (null = sem prompt no
+ * cofre ou fora do cache). Sem I/O: chame depois de getVaultPrompt.
+ */
+export function getVaultPromptVersion(agentId: string): number | null {
+  return entries.get(agentId)?.versao ?? null;
+}
+
+/** Aviso de mudança: um agente, ou o cache inteiro sem argumento. */
+export function invalidatePromptCache(agentId?: string): void {
+  if (agentId === undefined) {
+    invalidations += entries.size;
+    entries.clear();
+    return;
+  }
+  if (entries.delete(agentId)) invalidations++;
+}
+
+export function getPromptCacheStats(): PromptCacheStats {
+  const total = hits + misses;
+  return {
+    size: entries.size,
+    max_entries: MAX_ENTRIES,
+    hits,
+    misses,
+    hit_rate: total > 0 ? Math.round((hits / total) * 10000) / 100 : 0,
+    invalidations,
+    vault_version: vaultVersion,
+    last_check_at: lastCheck > 0 ? new Date(lastCheck).toISOString() : null,
+  };
+}
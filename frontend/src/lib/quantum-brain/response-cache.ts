@@ -0,0 +1,215 @@
+// ═══════════════════════════════════════════════════════════════
+// CACHE DE RESPOSTAS - LRU POR USUÁRIO + COALESCÊNCIA (SERVER-ONLY)
+// ═══════════════════════════════════════════════════════════════
+// Prompts repetidos (saudações, comandos comuns) para o mesmo agente
+// faziam o caminho inteiro: rota → cofre → LLM → escrita em requests,
+// quantum_tasks, agents e agent_logs.
+//
+// Agora a resposta fica em memória, por chave
+//   usuário · agente · versão do prompt · entrada normalizada
+// com TTL (RESPONSE_CACHE_TTL_MS) e teto LRU (RESPONSE_CACHE_MAX).
+// A versão do prompt é o carimbo `versao` do cofre (prompt-cache.ts) ou
+// o hash do prompt efetivo: mudou a alma, a chave muda junto.
+//
+// Duas chamadas idênticas ao mesmo tempo dividem UMA chamada ao LLM
+// (coalescência): a segunda espera a primeira. Só resposta bem-sucedida
+// é guardada; erro nunca fica em cache.
+//
+// Hit e coalescida não gastam token nem gravam linhas — e a cota
+// (quota.ts) conta linhas de `requests`. O custo evitado sai em
+// getResponseCacheStats().
+// ═══════════════════════════════════════════════════════════════
+
+import { createHash } from 'crypto';
+
+const MAX_ENTRIES = Number(process.env.RESPONSE_CACHE_MAX || 500);
+const TTL_MS = Number(process.env.RESPONSE_CACHE_TTL_MS || 10 * 60_000);
+
+export type ResponseSource = 'llm' | 'cache' | 'coalesced';
+
+export interface ResponseCost {
+  usd: number;
+  tokens: number;
+}
+
+interface Entry {
+  value: unknown;
+  agentId: string;
+  cost: ResponseCost;
+  expiresAt: number;
+}
+
+export interface ResponseCacheStats {
+  size: number;
+  max_entries: number;
+  ttl_ms: number;
+  hits: number;
+  coalesced: number;
+  misses: number;
+  hit_rate: number;
+  evictions: number;
+  expirations: number;
+  tokens_avoided: number;
+  cost_avoided_usd: number;
+}
+
+// Map mantém ordem de inserção: o primeiro é o menos usado (LRU).
+const entries = new Map<string, Entry>();
+const inflight = new Map<string, Promise<{ value: unknown; cacheable: boolean }>>();
+let hits = 0;
+let coalesced = 0;
+let misses = 0;
+let evictions = 0;
+let expirations = 0;
+let tokensAvoided = 0;
+let costAvoided = 0;
+
+/** Caixa, acentos compostos, espaços e pontuação final não mudam a pergunta. */
+export function normalizeInput(text: string): string {
+  return text
+    .normalize('NFKC')
+    .toLowerCase()
+    .replace(/\s+/g, ' ')
+    .replace(/[\s.!?…]+$/u, '')
+    .trim();
+}
+
+// JSON com chaves ordenadas: { a, b } e { b, a } dão a mesma chave.
+function stableStringify(value: unknown): string {
+  if (value === null || typeof value !== 'object') return JSON.stringify(value) ?? 'null';
+  if (Array.isArray(value)) return `[${value.map(stableStringify).join(',')}]`;
+  const obj = value as Record<string, unknown>;
+  return `{${Object.keys(obj)
+    .sort()
+    .filter(k => obj[k] !== undefined)
+    .map(k => `${JSON.stringify(k)}:${stableStringify(obj[k])}`)
+    .join(',')}}`;
+}
+
+export function hashText(text: string): string {
+  return createHash('sha256').update(text).digest('hex').slice(0, 16);
+}
+
+export interface ResponseKeyParts {
+  userId: string | null;
+  agentId: string;
+  promptVersion: string | number | null;
+  input: string;
+  data?: unknown;
+}
+
+export function responseCacheKey(parts: ResponseKeyParts): string {
+  const data = parts.data === undefined ? '' : stableStringify(parts.data);
+  return createHash('sha256')
+    .update(
+      [parts.userId ?? 'anon', parts.agentId, String(parts.promptVersion ?? ''), normalizeInput(parts.input), data].join(
+        '\u0000'
+      )
+    )
+    .digest('hex');
+}
+
+function touch(key: string, entry: Entry) {
+  entries.delete(key);
+  entries.set(key, entry);
+  while (entries.size > MAX_ENTRIES) {
+    entries.delete(entries.keys().next().value as string);
+    evictions++;
+  }
+}
+
+function lookup(key: string): Entry | undefined {
+  const entry = entries.get(key);
+  if (!entry) return undefined;
+  if (entry.expiresAt <= Date.now()) {
+    entries.delete(key);
+    expirations++;
+    return undefined;
+  }
+  touch(key, entry);
+  return entry;
+}
+
+export interface CachedCall<T> {
+  key: string;
+  agentId: string;
+  /** Executa de fato (só o primeiro de um grupo de chamadas idênticas). */
+  compute: () => Promise<T>;
+  /** Só respostas bem-sucedidas vão para o cache. */
+  cacheable: (value: T) => boolean;
+  cost: (value: T) => ResponseCost;
+}
+
+/**
+ * Resposta do cache, da chamada idêntica em voo, ou do `compute`.
+ * `source` diz de onde veio — 'llm' é o único que gastou token.
+ */
+export async function withResponseCache<T>(call: CachedCall<T>): Promise<{ value: T; source: ResponseSource }> {
+  const cached = lookup(call.key);
+  if (cached) {
+    hits++;
+    tokensAvoided += cached.cost.tokens;
+    costAvoided += cached.cost.usd;
+    return { value: cached.value as T, source: 'cache' };
+  }
+
+  const pending = inflight.get(call.key);
+  if (pending) {
+    const shared = await pending.catch(() => null);
+    // O líder falhou: quem esperava não herda o erro dele, tenta por conta
+    if (!shared || !shared.cacheable) {
+      misses++;
+      return { value: await call.compute(), source: 'llm' };
+    }
+    coalesced++;
+    const cost = call.cost(shared.value as T);
+    tokensAvoided += cost.tokens;
+    costAvoided += cost.usd;
+    return { value: shared.value as T, source: 'coalesced' };
+  }
+
+  misses++;
+  const run = call.compute().then(value => {
+    const cacheable = call.cacheable(value);
+    if (cacheable) {
+      touch(call.key, { value, agentId: call.agentId, cost: call.cost(value), expiresAt: Date.now() + TTL_MS });
+    }
+    return { value: value as unknown, cacheable };
+  });
+  inflight.set(call.key, run);
+  try {
+    const { value } = await run;
+    return { value: value as T, source: 'llm' };
+  } finally {
+    inflight.delete(call.key);
+  }
+}
+
+/** Derruba as respostas de um agente (ou tudo, sem argumento). */
+export function invalidateResponseCache(agentId?: string): void {
+  if (agentId === undefined) {
+    entries.clear();
+    return;
+  }
+  for (const [key, entry] of entries) {
+    if (entry.agentId === agentId) entries.delete(key);
+  }
+}
+
+export function getResponseCacheStats(): ResponseCacheStats {
+  const served = hits + coalesced;
+  const total = served + misses;
+  return {
+    size: entries.size,
+    max_entries: MAX_ENTRIES,
+    ttl_ms: TTL_MS,
+    hits,
+    coalesced,
+    misses,
+    hit_rate: total > 0 ? Math.round((served / total) * 10000) / 100 : 0,
+    evictions,
+    expirations,
+    tokens_avoided: tokensAvoided,
+    cost_avoided_usd: Math.round(costAvoided * 1e6) / 1e6,
+  };
+}
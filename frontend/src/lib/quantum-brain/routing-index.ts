@@ -0,0 +1,246 @@
+// ═══════════════════════════════════════════════════════════════
+// ÍNDICE DE ROTEAMENTO - SNAPSHOT LOCAL DOS AGENTS (SERVER-ONLY)
+// ═══════════════════════════════════════════════════════════════
+// routeToAgent fazia uma query por grupo de especialização que casasse,
+// outra por role, outra de fallback... Cada tarefa pagava várias idas ao
+// banco só para escolher o agente.
+//
+// Agora:
+//  - um snapshot dos agents fica em memória, agrupado por nome e por role,
+//    recarregado por TTL (stale-while-revalidate, uma recarga por vez);
+//  - as palavras-chave viram um autômato Aho-Corasick: uma passada pela
+//    descrição acha todas as ocorrências (mesma semântica do antigo
+//    `includes`, sem N varreduras);
+//  - a escolha olha neural_load, que o próprio processo atualiza a cada
+//    transição (transitionAgent) — não espera a próxima recarga.
+// ═══════════════════════════════════════════════════════════════
+
+import { createAdminClient } from '@/lib/supabase/admin';
+import { Agent, AgentRole, isActiveStatus } from './types';
+
+// ───────────────────────────────────────────────────────────────
+// AHO-CORASICK
+// ───────────────────────────────────────────────────────────────
+interface AcNode {
+  next: Map<string, number>;
+  fail: number;
+  out: number[]; // índices em `keywords`
+}
+
+export type KeywordMatcher = (text: string) => Map<string, Set<string>>;
+
+/**
+ * Compila { grupo: [palavras] } num autômato. O matcher devolve, para cada
+ * grupo, o conjunto de palavras distintas encontradas no texto (já em
+ * minúsculas — quem chama normaliza).
+ */
+export function compileMatcher(groups: Record<string, string[]>): KeywordMatcher {
+  const keywords: { group: string; word: string }[] = [];
+  const nodes: AcNode[] = [{ next: new Map(), fail: 0, out: [] }];
+
+  for (const [group, words] of Object.entries(groups)) {
+    for (const raw of words) {
+      const word = raw.toLowerCase();
+      if (!word) continue;
+      let cur = 0;
+      for (const ch of word) {
+        let nxt = nodes[cur].next.get(ch);
+        if (nxt === undefined) {
+          nxt = nodes.length;
+          nodes.push({ next: new Map(), fail: 0, out: [] });
+          nodes[cur].next.set(ch, nxt);
+        }
+        cur = nxt;
+      }
+      nodes[cur].out.push(keywords.length);
+      keywords.push({ group, word });
+    }
+  }
+
+  // BFS: links de falha + saídas herdadas
+  const queue: number[] = [...nodes[0].next.values()];
+  while (queue.length > 0) {
+    const u = queue.shift()!;
+    for (const [ch, v] of nodes[u].next) {
+      let f = nodes[u].fail;
+      while (f !== 0 && !nodes[f].next.has(ch)) f = nodes[f].fail;
+      const target = nodes[f].next.get(ch);
+      nodes[v].fail = target !== undefined && target !== v ? target : 0;
+      nodes[v].out.push(...nodes[nodes[v].fail].out);
+      queue.push(v);
+    }
+  }
+
+  return (text: string) => {
+    const found = new Map<string, Set<string>>();
+    let cur = 0;
+    for (const ch of text) {
+      while (cur !== 0 && !nodes[cur].next.has(ch)) cur = nodes[cur].fail;
+      cur = nodes[cur].next.get(ch) ?? 0;
+      for (const k of nodes[cur].out) {
+        const { group, word } = keywords[k];
+        let set = found.get(group);
+        if (!set) found.set(group, (set = new Set()));
+        set.add(word);
+      }
+    }
+    return found;
+  };
+}
+
+// ───────────────────────────────────────────────────────────────
+// SNAPSHOT + ESCOLHA
+// ───────────────────────────────────────────────────────────────
+export interface RoutingSnapshot {
+  loadedAt: number;
+  all: Agent[];
+  byName: Map<string, Agent[]>;
+  byRole: Map<AgentRole, Agent[]>; // só operacionais, efficiency desc
+}
+
+export function buildSnapshot(agents: Agent[], loadedAt: number = Date.now()): RoutingSnapshot {
+  const byName = new Map<string, Agent[]>();
+  const byRole = new Map<AgentRole, Agent[]>();
+  for (const a of agents) {
+    const named = byName.get(a.name);
+    if (named) named.push(a);
+    else byName.set(a.name, [a]);
+    if (!isActiveStatus(a.status)) continue;
+    const list = byRole.get(a.role);
+    if (list) list.push(a);
+    else byRole.set(a.role, [a]);
+  }
+  for (const list of byRole.values()) list.sort((a, b) => (b.efficiency || 0) - (a.efficiency || 0));
+  return { loadedAt, all: agents, byName, byRole };
+}
+
+export interface RoutingRules {
+  specializations: Record<string, string[]>;
+  roleKeywords: Record<AgentRole, string[]>;
+  fallbackName: string;
+}
+
+/**
+ * A mesma ordem de decisão do roteador antigo, sobre o snapshot:
+ *  1. especialização por nome (na ordem declarada), se o agent estiver operacional
+ *  2. role com mais palavras-chave (empate fica com a primeira; default CORE)
+ *  3. entre os 5 mais eficientes da role, o de menor neural_load
+ *  4. fallback pelo nome (qualquer status)
+ *  5. qualquer operacional, o mais eficiente
+ */
+export function createRouter(rules: RoutingRules) {
+  const specMatcher = compileMatcher(rules.specializations);
+  const roleMatcher = compileMatcher(rules.roleKeywords);
+  const specOrder = Object.keys(rules.specializations);
+  const roleOrder = Object.keys(rules.roleKeywords) as AgentRole[];
+
+  return (snapshot: RoutingSnapshot, taskDescription: string): Agent | null => {
+    const text = taskDescription.toLowerCase();
+
+    const specHits = specMatcher(text);
+    for (const name of specOrder) {
+      if (!specHits.has(name)) continue;
+      // `.eq('name').in('status', ativos).single()` antigo: um só operacional
+      // com o nome; duplicado parado não conta, dois operacionais = ambíguo
+      const active = (snapshot.byName.get(name) ?? []).filter(a => isActiveStatus(a.status));
+      if (active.length === 1) return active[0];
+    }
+
+    const roleHits = roleMatcher(text);
+    let targetRole: AgentRole = 'CORE';
+    let bestScore = 0;
+    for (const role of roleOrder) {
+      const score = roleHits.get(role)?.size ?? 0;
+      if (score > bestScore) {
+        bestScore = score;
+        targetRole = role;
+      }
+    }
+
+    const candidates = (snapshot.byRole.get(targetRole) ?? []).slice(0, 5);
+    if (candidates.length > 0) {
+      return candidates.reduce((best, a) => ((a.neural_load || 0) < (best.neural_load || 0) ? a : best));
+    }
+
+    const fallback = snapshot.byName.get(rules.fallbackName);
+    if (fallback && fallback.length === 1) return fallback[0];
+
+    let any: Agent | null = null;
+    for (const a of snapshot.all) {
+      if (isActiveStatus(a.status) && (!any || (a.efficiency || 0) > (any.efficiency || 0))) any = a;
+    }
+    return any;
+  };
+}
+
+// ───────────────────────────────────────────────────────────────
+// CACHE DO PROCESSO
+// ───────────────────────────────────────────────────────────────
+const ROUTING_TTL_MS = Number(process.env.ROUTING_INDEX_TTL_MS || 15_000);
+
+let current: RoutingSnapshot | null = null;
+let loading: Promise<RoutingSnapshot> | null = null;
+
+async function loadSnapshot(): Promise<RoutingSnapshot> {
+  const supabase = createAdminClient();
+  const { data, error } = await supabase.from('agents').select('*');
+  if (error) throw new Error(`Routing index load failed: ${error.message}`);
+  return buildSnapshot((data || []) as Agent[]);
+}
+
+function refresh(): Promise<RoutingSnapshot> {
+  if (!loading) {
+    loading = loadSnapshot()
+      .then(s => (current = s))
+      .finally(() => {
+        loading = null;
+      });
+  }
+  return loading;
+}
+
+/**
+ * Snapshot atual. Vencido: devolve o antigo na hora e recarrega em segundo
+ * plano; sem snapshot nenhum (primeira chamada): espera a carga.
+ */
+export async function getRoutingSnapshot(): Promise<RoutingSnapshot> {
+  if (!current) return refresh();
+  if (Date.now() - current.loadedAt > ROUTING_TTL_MS) {
+    refresh().catch(e => console.error('[routing-index] recarga falhou, usando snapshot antigo:', String(e)));
+  }
+  return current;
+}
+
+const replaceIn = (list: Agent[] | undefined, old: Agent, next: Agent) =>
+  list?.map(a => (a === old ? next : a));
+
+/**
+ * Aplica localmente a carga devolvida pelo banco após uma transição. Nunca
+ * muda o Agent de quem já recebeu o snapshot (ou o agente escolhido): troca
+ * por uma cópia num snapshot novo.
+ */
+export function noteAgentLoad(agentId: string, neuralLoad: number, status?: Agent['status']): void {
+  const snap = current;
+  const agent = snap?.all.find(a => a.id === agentId);
+  if (!snap || !agent) return;
+  const next: Agent = { ...agent, neural_load: neuralLoad, ...(status ? { status } : {}) };
+  const all = replaceIn(snap.all, agent, next)!;
+
+  if (next.status !== agent.status) {
+    // status mexe nos grupos por role: reagrupa sem ir ao banco
+    current = buildSnapshot(all, snap.loadedAt);
+    return;
+  }
+  // Só a carga: mesma posição nos grupos (a ordem é por efficiency)
+  const byName = new Map(snap.byName);
+  byName.set(agent.name, replaceIn(snap.byName.get(agent.name), agent, next)!);
+  const byRole = new Map(snap.byRole);
+  const roleList = replaceIn(snap.byRole.get(agent.role), agent, next);
+  if (roleList) byRole.set(agent.role, roleList);
+  current = { loadedAt: snap.loadedAt, all, byName, byRole };
+}
+
+/** Força a próxima chamada a recarregar (ex.: após seed/polimento de almas). */
+export function invalidateRoutingIndex(): void {
+  current = null;
+}
@@ -3,16 +3,21 @@
 // SERVER-ONLY (usa service role para ignorar RLS nos inserts)
 // ═══════════════════════════════════════════════════════════════
 
-import OpenAI from 'openai';
+import type OpenAI from 'openai';
 import { createAdminClient } from '@/lib/supabase/admin';
+import { getOpenAI } from '@/lib/lazy-clients';
 import { Agent } from './types';
 import {
   routeToAgent,
   getAgentById,
-  updateAgentStatus,
-  incrementNeuralLoad,
-  decrementNeuralLoad,
+  beginAgentTask,
+  finishAgentTask,
 } from './agent-router';
+import { getVaultPrompt, getVaultPromptVersion } from './prompt-cache';
+import { hashText, responseCacheKey, withResponseCache, type ResponseSource } from './response-cache';
+
+// Carga que cada tarefa em execução soma ao neural_load do agente.
+const TASK_LOAD = 15;
 
 // Custos gpt-4o-mini
 const COST_PER_1K_INPUT = 0.00015;
@@ -46,6 +51,7 @@ export interface TaskInput {
   priority?: 'low' | 'normal' | 'high' | 'critical';
   user_id?: string;
   agent_id?: string; // quando o usuário escolhe um agente específico no picker
+  cache?: boolean; // false => ignora o cache de respostas (sempre chama o LLM)
 }
 
 export interface TaskResult {
@@ -63,23 +69,158 @@ export interface TaskResult {
   cost_usd: number;
   status: 'completed' | 'failed';
   error_message?: string;
+  first_token_ms?: number; // só no modo streaming
+  cache?: ResponseSource; // 'cache'/'coalesced' => resposta reaproveitada, zero token
+  cost_avoided_usd?: number;
+}
+
+// Modo streaming: com onDelta, os tokens saem conforme chegam e o texto
+// parcial é anexado em quantum_tasks.partial_output (migration
+// 20261018_quantum_tasks_streaming). Sem hooks, o comportamento é o de sempre.
+export interface ExecuteHooks {
+  onStart?: (meta: { task_id: string; request_id: string; agent: TaskResult['agent'] }) => void;
+  onDelta?: (text: string) => void;
+}
+
+// Pedaços do texto parcial: grava ao juntar PARTIAL_FLUSH_CHARS ou a cada
+// PARTIAL_FLUSH_MS, uma escrita por vez (a ordem é garantida pelo partial_seq).
+const PARTIAL_FLUSH_CHARS = 512;
+const PARTIAL_FLUSH_MS = 750;
+
+function createPartialWriter(supabase: ReturnType<typeof createAdminClient>, taskId: string) {
+  let buffer = '';
+  let seq = 0;
+  let lastFlush = Date.now();
+  let chain: Promise<void> = Promise.resolve();
+
+  const flush = () => {
+    if (!buffer) return chain;
+    const chunk = buffer;
+    const next = ++seq;
+    buffer = '';
+    lastFlush = Date.now();
+    chain = chain.then(async () => {
+      const { error } = await supabase.rpc('quantum_task_append', {
+        p_task_id: taskId,
+        p_seq: next,
+        p_chunk: chunk,
+      });
+      // Parcial é só conveniência: falha aqui não derruba a execução.
+      if (error) console.error('[task-executor] quantum_task_append falhou:', error.message);
+    });
+    return chain;
+  };
+
+  return {
+    push(text: string) {
+      buffer += text;
+      if (buffer.length >= PARTIAL_FLUSH_CHARS || Date.now() - lastFlush >= PARTIAL_FLUSH_MS) {
+        void flush();
+      }
+    },
+    close: () => flush(),
+  };
 }
 
 function getApiKey(): string | undefined {
   return process.env.OPENAI_API_KEY;
 }
 
-export async function executeTask(input: TaskInput): Promise<TaskResult> {
-  const supabase = createAdminClient();
+function agentSummary(agent: Agent): TaskResult['agent'] {
+  return { id: agent.id, name: agent.name, role: agent.role, efficiency: agent.efficiency };
+}
+
+// System prompt — COFRE primeiro, depois os antigos, depois default.
+// `public.agent_prompts` só é alcançável pelo service_role (migration
+// 20260727_agent_prompts_cofre). Este módulo usa createAdminClient, que
+// carrega SUPABASE_SERVICE_ROLE_KEY — por isso o cofre abre aqui e não
+// abre para nenhum cliente logado. A leitura passa pelo cache de
+// prompts (prompt-cache.ts): agente quente não vai ao banco.
+// `version` entra na chave do cache de respostas: `versao` do cofre ou
+// hash do prompt efetivo.
+async function resolveSystemPrompt(agent: Agent): Promise<{ prompt: string; version: string }> {
+  let promptDoCofre: string | undefined;
+  try {
+    promptDoCofre = await getVaultPrompt(agent.id);
+  } catch (e) {
+    // Cofre indisponível não derruba a execução: cai no fallback.
+    console.error('[task-executor] cofre inacessivel, usando fallback:', String(e));
+  }
+
+  const prompt =
+    promptDoCofre ||
+    (agent.metadata?.system_prompt as string | undefined) ||
+    DEFAULT_PROMPTS[agent.role] ||
+    DEFAULT_PROMPTS.SPECIALIST;
+
+  const versao = promptDoCofre ? getVaultPromptVersion(agent.id) : null;
+  return { prompt, version: versao !== null ? `v${versao}` : `h${hashText(prompt)}` };
+}
+
+export async function executeTask(input: TaskInput, hooks: ExecuteHooks = {}): Promise<TaskResult> {
   const startTime = Date.now();
 
   const apiKey = getApiKey();
   if (!apiKey) {
     throw new Error('OPENAI_API_KEY não configurada. Defina-a nas variáveis de ambiente.');
   }
-  const openai = new OpenAI({ apiKey });
 
-  // 1. Criar request na fila (tabela existente)
+  // 1. Selecionar agent: id explícito do picker OU roteamento automático
+  const agent: Agent =
+    (input.agent_id ? await getAgentById(input.agent_id) : null) ||
+    (await routeToAgent(`${input.title} ${input.description}`));
+
+  // 2. Obter system prompt (cofre → metadata → default) e sua versão
+  const systemPrompt = await resolveSystemPrompt(agent);
+  const run = () => runTask(input, hooks, agent, systemPrompt.prompt, startTime, apiKey);
+  if (input.cache === false) return run();
+
+  // 3. Cache de respostas: mesma pergunta, mesmo agente, mesma versão do
+  //    prompt → reaproveita. Chamadas idênticas simultâneas dividem uma
+  //    execução. Só runTask grava requests/quantum_tasks: reaproveitada
+  //    não grava e não conta na cota (quota.ts conta linhas de requests).
+  const { value, source } = await withResponseCache({
+    key: responseCacheKey({
+      userId: input.user_id ?? null,
+      agentId: agent.id,
+      promptVersion: systemPrompt.version,
+      input: `${input.title}\n${input.description}`,
+      data: input.data,
+    }),
+    agentId: agent.id,
+    compute: run,
+    cacheable: r => r.status === 'completed',
+    cost: r => ({ usd: r.cost_usd, tokens: r.tokens_used }),
+  });
+  if (source === 'llm') return { ...value, cache: source };
+
+  // Quem usa streaming recebe o mesmo formato: `start` e o texto inteiro num delta.
+  hooks.onStart?.({ task_id: value.task_id, request_id: value.request_id ?? '', agent: value.agent });
+  hooks.onDelta?.(typeof value.result === 'string' ? value.result : JSON.stringify(value.result, null, 2));
+  return {
+    ...value,
+    execution_time_ms: Date.now() - startTime,
+    tokens_used: 0,
+    cost_usd: 0,
+    first_token_ms: undefined,
+    cache: source,
+    cost_avoided_usd: value.cost_usd,
+  };
+}
+
+// Execução de fato: request → quantum_tasks → LLM → persistência e logs.
+async function runTask(
+  input: TaskInput,
+  hooks: ExecuteHooks,
+  agent: Agent,
+  systemPrompt: string,
+  startTime: number,
+  apiKey: string
+): Promise<TaskResult> {
+  const supabase = createAdminClient();
+  const openai = await getOpenAI(apiKey);
+
+  // 4. Criar request na fila (tabela existente)
   const { data: request, error: reqError } = await supabase
     .from('requests')
     .insert({
@@ -96,16 +237,7 @@ export async function executeTask(input: TaskInput): Promise<TaskResult> {
     throw new Error(`Failed to create request: ${reqError.message}`);
   }
 
-  // 2. Selecionar agent: id explícito do picker OU roteamento automático
-  let agent: Agent | null = null;
-  if (input.agent_id) {
-    agent = await getAgentById(input.agent_id);
-  }
-  if (!agent) {
-    agent = await routeToAgent(`${input.title} ${input.description}`);
-  }
-
-  // 3. Criar registro em quantum_tasks
+  // 5. Criar registro em quantum_tasks
   const { data: task, error: taskError } = await supabase
     .from('quantum_tasks')
     .insert({
@@ -126,42 +258,23 @@ export async function executeTask(input: TaskInput): Promise<TaskResult> {
     throw new Error(`Failed to create task: ${taskError.message}`);
   }
 
-  // 4. Atualizar status do agent (ocupado)
-  await updateAgentStatus(agent.id, 'PROCESSING', `Executando: ${input.title}`);
-  await incrementNeuralLoad(agent.id, 15);
-
-  try {
-    // 5. Obter system prompt — COFRE primeiro, depois os antigos, depois default.
-    //    `public.agent_prompts` só é alcançável pelo service_role (migration
-    //    20260727_agent_prompts_cofre). Este módulo usa createAdminClient, que
-    //    carrega SUPABASE_SERVICE_ROLE_KEY — por isso o cofre abre aqui e não
-    //    abre para nenhum cliente logado.
-    let promptDoCofre: string | undefined;
-    try {
-      const { data: cofre } = await createAdminClient()
-        .from('agent_prompts')
-        .select('system_prompt')
-        .eq('agent_id', agent.id)
-        .maybeSingle();
-      promptDoCofre = cofre?.system_prompt ?? undefined;
-    } catch (e) {
-      // Cofre indisponível não derruba a execução: cai no fallback.
-      console.error('[task-executor] cofre inacessivel, usando fallback:', String(e));
-    }
+  // 6. Atualizar status do agent (ocupado) + carga — uma escrita atômica
+  await beginAgentTask(agent.id, `Executando: ${input.title}`, TASK_LOAD);
 
-    const systemPrompt =
-      promptDoCofre ||
-      (agent.metadata?.system_prompt as string | undefined) ||
-      DEFAULT_PROMPTS[agent.role] ||
-      DEFAULT_PROMPTS.SPECIALIST;
+  hooks.onStart?.({
+    task_id: task.id,
+    request_id: request.id,
+    agent: agentSummary(agent),
+  });
 
-    // 6. Executar via OpenAI
-    const completion = await openai.chat.completions.create({
+  try {
+    // 7. Executar via OpenAI
+    const params = {
       model: 'gpt-4o-mini',
       messages: [
-        { role: 'system', content: systemPrompt },
+        { role: 'system' as const, content: systemPrompt },
         {
-          role: 'user',
+          role: 'user' as const,
           content: `TAREFA: ${input.title}
 
 DESCRIÇÃO: ${input.description}
@@ -173,25 +286,55 @@ Execute a tarefa e responda em JSON estruturado.`,
       ],
       temperature: 0.7,
       max_tokens: 2000,
-    });
+    };
+
+    let content: string;
+    let usage: OpenAI.CompletionUsage | undefined;
+    let firstTokenMs: number | null = null;
+
+    if (hooks.onDelta) {
+      // Streaming: o último chunk traz o usage exato (include_usage), então o
+      // custo é o mesmo do modo bloqueante.
+      const partial = createPartialWriter(supabase, task.id);
+      const stream = await openai.chat.completions.create({
+        ...params,
+        stream: true,
+        stream_options: { include_usage: true },
+      });
+      content = '';
+      for await (const chunk of stream) {
+        const delta = chunk.choices[0]?.delta?.content;
+        if (delta) {
+          if (firstTokenMs === null) firstTokenMs = Date.now() - startTime;
+          content += delta;
+          hooks.onDelta(delta);
+          partial.push(delta);
+        }
+        if (chunk.usage) usage = chunk.usage;
+      }
+      await partial.close();
+    } else {
+      const completion = await openai.chat.completions.create(params);
+      content = completion.choices[0]?.message?.content || '{}';
+      usage = completion.usage;
+    }
 
     const executionTime = Date.now() - startTime;
-    const tokensUsed = completion.usage?.total_tokens || 0;
-    const inputTokens = completion.usage?.prompt_tokens || 0;
-    const outputTokens = completion.usage?.completion_tokens || 0;
+    const tokensUsed = usage?.total_tokens || 0;
+    const inputTokens = usage?.prompt_tokens || 0;
+    const outputTokens = usage?.completion_tokens || 0;
     const cost =
       (inputTokens / 1000) * COST_PER_1K_INPUT + (outputTokens / 1000) * COST_PER_1K_OUTPUT;
 
-    // 7. Parse resultado
+    // 8. Parse resultado
     let result: unknown;
     try {
-      const content = completion.choices[0]?.message?.content || '{}';
-      result = JSON.parse(content.replace(/```json\n?|\n?```/g, '').trim());
+      result = JSON.parse((content || '{}').replace(/```json\n?|\n?```/g, '').trim());
     } catch {
-      result = { raw_response: completion.choices[0]?.message?.content };
+      result = { raw_response: content };
     }
 
-    // 8. Atualizar quantum_tasks
+    // 9. Atualizar quantum_tasks
     await supabase
       .from('quantum_tasks')
       .update({
@@ -200,21 +343,22 @@ Execute a tarefa e responda em JSON estruturado.`,
         execution_time_ms: executionTime,
         tokens_used: tokensUsed,
         cost_usd: cost,
+        first_token_ms: firstTokenMs,
+        partial_output: null,
         completed_at: new Date().toISOString(),
       })
       .eq('id', task.id);
 
-    // 9. Atualizar request original
+    // 10. Atualizar request original
     await supabase
       .from('requests')
       .update({ status: 'completed', updated_at: new Date().toISOString() })
       .eq('id', request.id);
 
-    // 10. Atualizar agent (liberado)
-    await updateAgentStatus(agent.id, 'IDLE', 'Aguardando comando');
-    await decrementNeuralLoad(agent.id, 15);
+    // 11. Atualizar agent (liberado) + carga — uma escrita atômica
+    await finishAgentTask(agent.id, 'IDLE', 'Aguardando comando', TASK_LOAD);
 
-    // 11. Criar log (tabela existente usa event_type, não log_level)
+    // 12. Criar log (tabela existente usa event_type, não log_level)
     await supabase.from('agent_logs').insert({
       agent_id: agent.id,
       event_type: 'task_complete',
@@ -229,17 +373,13 @@ Execute a tarefa e responda em JSON estruturado.`,
     return {
       task_id: task.id,
       request_id: request.id,
-      agent: {
-        id: agent.id,
-        name: agent.name,
-        role: agent.role,
-        efficiency: agent.efficiency,
-      },
+      agent: agentSummary(agent),
       result,
       execution_time_ms: executionTime,
       tokens_used: tokensUsed,
       cost_usd: cost,
       status: 'completed',
+      ...(firstTokenMs !== null ? { first_token_ms: firstTokenMs } : {}),
     };
   } catch (error) {
     const executionTime = Date.now() - startTime;
@@ -261,8 +401,7 @@ Execute a tarefa e responda em JSON estruturado.`,
       .update({ status: 'failed', updated_at: new Date().toISOString() })
       .eq('id', request.id);
 
-    await updateAgentStatus(agent.id, 'WARNING', `Erro: ${errorMessage.slice(0, 50)}`);
-    await decrementNeuralLoad(agent.id, 15);
+    await finishAgentTask(agent.id, 'WARNING', `Erro: ${errorMessage.slice(0, 50)}`, TASK_LOAD);
 
     // Log de erro
     await supabase.from('agent_logs').insert({
@@ -275,12 +414,7 @@ Execute a tarefa e responda em JSON estruturado.`,
     return {
       task_id: task.id,
       request_id: request.id,
-      agent: {
-        id: agent.id,
-        name: agent.name,
-        role: agent.role,
-        efficiency: agent.efficiency,
-      },
+      agent: agentSummary(agent),
       result: null,
       execution_time_ms: executionTime,
       tokens_used: 0,
@@ -20,6 +20,10 @@
  * A TRAVA anti-vazamento: enquanto QUALQUER reembolso é possível, o uso
  * nunca passa de Q. Logo, o custo máximo de token de honrar um reembolso é Q.
  *
+ * O uso é a contagem de linhas em `requests` na janela. Resposta servida
+ * pelo cache de respostas (quantum-brain/response-cache.ts) não gasta
+ * token e não grava linha: não conta.
+ *
  * Esta função é PURA — recebe estado e devolve decisão. Zero I/O, zero token.
  * Testável em dry-run (ver scripts/prova-cota-garantia.ts).
  * ═══════════════════════════════════════════════════════════════
@@ -0,0 +1,63 @@
+/**
+ * ═══════════════════════════════════════════════════════════════
+ * ALSHAM QUANTUM - SERVER-SENT EVENTS (servidor + cliente)
+ * ═══════════════════════════════════════════════════════════════
+ * 📁 PATH: frontend/src/lib/sse.ts
+ * 🎯 Formato mínimo `event:` + `data:` (JSON) usado pelas rotas de
+ *    execução em streaming, e o leitor correspondente via fetch
+ *    (EventSource não faz POST).
+ * ═══════════════════════════════════════════════════════════════
+ */
+
+const encoder = new TextEncoder();
+
+export function encodeSSE(event: string, data: unknown): Uint8Array {
+  return encoder.encode(`event: ${event}\ndata: ${JSON.stringify(data)}\n\n`);
+}
+
+export const SSE_HEADERS = {
+  'Content-Type': 'text/event-stream; charset=utf-8',
+  'Cache-Control': 'no-cache, no-transform',
+  Connection: 'keep-alive',
+  'X-Accel-Buffering': 'no',
+} as const;
+
+export function isSSE(response: Response): boolean {
+  return (response.headers.get('content-type') || '').includes('text/event-stream');
+}
+
+/** Lê um corpo SSE e chama onEvent para cada evento completo. */
+export async function readSSE(
+  response: Response,
+  onEvent: (event: string, data: any) => void
+): Promise<void> {
+  if (!response.body) return;
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    let sep: number;
+    while ((sep = buffer.indexOf('\n\n')) !== -1) {
+      const raw = buffer.slice(0, sep);
+      buffer = buffer.slice(sep + 2);
+
+      let event = 'message';
+      const data: string[] = [];
+      for (const line of raw.split('\n')) {
+        if (line.startsWith('event:')) event = line.slice(6).trim();
+        else if (line.startsWith('data:')) data.push(line.slice(5).trimStart());
+      }
+      if (data.length === 0) continue;
+      try {
+        onEvent(event, JSON.parse(data.join('\n')));
+      } catch {
+        onEvent(event, data.join('\n'));
+      }
+    }
+  }
+}
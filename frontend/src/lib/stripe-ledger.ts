@@ -0,0 +1,425 @@
+/**
+ * ═══════════════════════════════════════════════════════════════
+ * ALSHAM QUANTUM - LIVRO-RAZÃO DE EVENTOS DO STRIPE (SERVER-ONLY)
+ * ═══════════════════════════════════════════════════════════════
+ * 📁 PATH: frontend/src/lib/stripe-ledger.ts
+ * 🎯 O webhook só registra; quem escreve em profiles é o aplicador
+ *
+ * - recordStripeEvent: grava o evento em stripe_events (migration
+ *   20261018_stripe_event_ledger). Chave = event.id: reentrega do
+ *   Stripe vira 'duplicate' e não faz mais nada.
+ * - reduceCustomerEvents: soma os eventos de UM cliente, do mais antigo
+ *   ao mais novo, num patch só de profiles (função pura).
+ * - applyStripeEvents: reserva clientes (stripe_events_claim), resolve
+ *   o plano quando o checkout não trouxe, manda os patches do lote numa
+ *   chamada (stripe_apply_profiles → uma escrita por cliente) e fecha
+ *   os eventos em lote (stripe_events_settle).
+ *
+ * Recebe o SupabaseClient por parâmetro (sem alias '@/') para rodar
+ * também fora do Next — ver scripts/prova-stripe-webhook.ts.
+ * ═══════════════════════════════════════════════════════════════
+ */
+
+import type { SupabaseClient } from '@supabase/supabase-js';
+import type Stripe from 'stripe';
+
+export type PlanId = 'free' | 'starter' | 'pro' | 'enterprise';
+export type StripeEventOutcome = 'applied' | 'ignored' | 'failed' | 'retry';
+
+/** Tipos que mexem em profiles; o resto entra no livro já como 'ignored'. */
+export const HANDLED_STRIPE_EVENTS = new Set([
+  'checkout.session.completed',
+  'customer.subscription.updated',
+  'customer.subscription.deleted',
+]);
+
+// Sem profile para o customer: o checkout dele pode ainda não ter sido
+// aplicado. Tenta de novo com espera crescente até max_attempts; depois,
+// 'failed' com log — o mapeamento que falta fica visível e o evento volta
+// com stripe_events_replay() quando o profile existir.
+const UNMATCHED_RETRY_SECS = 30;
+const RETRY_BASE_SECS = 5;
+
+export interface LedgerEvent {
+  id: string;
+  type: string;
+  customer_key: string;
+  stripe_created: string;
+  payload: any;
+  attempts: number;
+  max_attempts: number;
+  claim_token: string;
+}
+
+export interface ProfilePatch {
+  key: string;
+  /** Com user_id escreve nesse profile; sem, nos do customer_id. */
+  user_id: string | null;
+  customer_id: string | null;
+  fields: Record<string, unknown>;
+  start_guarantee: boolean;
+  /** created do evento mais novo somado (ordem em profiles.stripe_event_at). */
+  event_at: string;
+}
+
+export interface CustomerReduction {
+  patch: ProfilePatch | null;
+  used: LedgerEvent[];
+  ignored: Array<{ event: LedgerEvent; reason: string }>;
+}
+
+// Mapeia um Stripe Price ID -> plano, usando as env vars dos preços.
+export function planFromPriceId(priceId?: string | null): PlanId | null {
+  if (!priceId) return null;
+  const map: Record<string, PlanId> = {};
+  const starter = process.env.NEXT_PUBLIC_STRIPE_PRICE_STARTER;
+  const pro = process.env.NEXT_PUBLIC_STRIPE_PRICE_PRO;
+  const enterprise = process.env.NEXT_PUBLIC_STRIPE_PRICE_ENTERPRISE;
+  if (starter) map[starter] = 'starter';
+  if (pro) map[pro] = 'pro';
+  if (enterprise) map[enterprise] = 'enterprise';
+  return map[priceId] || null;
+}
+
+// Traduz o status da subscription do Stripe para o enum de profiles.
+export function mapSubscriptionStatus(
+  status: Stripe.Subscription.Status,
+): 'active' | 'inactive' | 'cancelled' | 'past_due' {
+  switch (status) {
+    case 'active':
+    case 'trialing':
+      return 'active';
+    case 'past_due':
+    case 'unpaid':
+      return 'past_due';
+    case 'canceled':
+    case 'incomplete_expired':
+      return 'cancelled';
+    default:
+      return 'inactive';
+  }
+}
+
+// customer/subscription vêm como id ou, expandidos, como objeto.
+function idOf(value: unknown): string | null {
+  if (typeof value === 'string') return value;
+  if (value && typeof value === 'object' && typeof (value as { id?: unknown }).id === 'string') {
+    return (value as { id: string }).id;
+  }
+  return null;
+}
+
+const isoFromUnix = (secs: number) => new Date(secs * 1000).toISOString();
+
+/** Agrupamento do aplicador: customer; sem ele, o usuário do checkout; sem nada, o evento. */
+export function customerKeyOf(event: Pick<Stripe.Event, 'id' | 'data'>): string {
+  const obj = event.data.object as { customer?: unknown; client_reference_id?: string | null };
+  const customer = idOf(obj.customer);
+  if (customer) return customer;
+  if (obj.client_reference_id) return `user:${obj.client_reference_id}`;
+  return `event:${event.id}`;
+}
+
+/**
+ * Registra o evento no livro. 'duplicate' = o Stripe já tinha entregue
+ * este event.id (nada muda). Lança se o banco falhar: o webhook responde
+ * 500 e o Stripe reentrega.
+ */
+export async function recordStripeEvent(
+  supabase: SupabaseClient,
+  event: Pick<Stripe.Event, 'id' | 'type' | 'created' | 'data'>
+): Promise<'new' | 'duplicate'> {
+  const handled = HANDLED_STRIPE_EVENTS.has(event.type);
+  const { data, error } = await supabase
+    .from('stripe_events')
+    .upsert(
+      {
+        id: event.id,
+        type: event.type,
+        customer_key: customerKeyOf(event),
+        stripe_created: isoFromUnix(event.created),
+        payload: event.data.object,
+        status: handled ? 'pending' : 'ignored',
+        applied_at: handled ? null : new Date().toISOString(),
+      },
+      { onConflict: 'id', ignoreDuplicates: true }
+    )
+    .select('id');
+  if (error) throw new Error(`stripe_events insert failed: ${error.message}`);
+  return data && data.length > 0 ? 'new' : 'duplicate';
+}
+
+/**
+ * Soma os eventos de um cliente num patch de profiles. Cada evento
+ * sobrescreve o que o anterior escreveu, na ordem do Stripe; o checkout
+ * ainda amarra o profile (user_id) e liga a âncora da garantia.
+ * `plans` traz o plano das subscriptions cujo checkout veio sem metadata.
+ */
+export function reduceCustomerEvents(
+  events: LedgerEvent[],
+  plans: Map<string, PlanId | null> = new Map()
+): CustomerReduction {
+  const sorted = [...events].sort(
+    (a, b) => Date.parse(a.stripe_created) - Date.parse(b.stripe_created) || a.id.localeCompare(b.id)
+  );
+  const used: LedgerEvent[] = [];
+  const ignored: CustomerReduction['ignored'] = [];
+  const fields: Record<string, unknown> = {};
+  let userId: string | null = null;
+  let customerId: string | null = null;
+  let startGuarantee = false;
+
+  for (const ev of sorted) {
+    const obj = ev.payload || {};
+    switch (ev.type) {
+      // ── Assinatura criada via Checkout ──
+      case 'checkout.session.completed': {
+        const session = obj as Stripe.Checkout.Session;
+        if (!session.client_reference_id) {
+          ignored.push({ event: ev, reason: 'checkout.session.completed sem client_reference_id' });
+          continue;
+        }
+        const subscriptionId = idOf(session.subscription);
+        const plan =
+          ((session.metadata?.planId || session.metadata?.plan) as PlanId | undefined) ||
+          (subscriptionId ? plans.get(subscriptionId) : null) ||
+          'pro';
+        userId = session.client_reference_id;
+        customerId = idOf(session.customer) ?? customerId;
+        Object.assign(fields, {
+          subscription_plan: plan,
+          subscription_status: 'active',
+          billing_cycle: (session.metadata?.billingCycle as 'monthly' | 'yearly') || 'monthly',
+          stripe_customer_id: idOf(session.customer),
+          stripe_subscription_id: subscriptionId,
+        });
+        startGuarantee = true;
+        break;
+      }
+
+      // ── Assinatura alterada (upgrade/downgrade/renovação/past_due) ──
+      case 'customer.subscription.updated': {
+        const sub = obj as Stripe.Subscription;
+        customerId = idOf(sub.customer) ?? customerId;
+        const plan = planFromPriceId(sub.items?.data?.[0]?.price?.id);
+        Object.assign(fields, {
+          subscription_status: mapSubscriptionStatus(sub.status),
+          stripe_subscription_id: sub.id,
+          subscription_end: sub.cancel_at ? isoFromUnix(sub.cancel_at) : null,
+        });
+        if (plan) fields.subscription_plan = plan;
+        break;
+      }
+
+      // ── Assinatura cancelada/expirada ──
+      case 'customer.subscription.deleted': {
+        const sub = obj as Stripe.Subscription;
+        customerId = idOf(sub.customer) ?? customerId;
+        Object.assign(fields, {
+          subscription_status: 'cancelled',
+          subscription_plan: 'free',
+          subscription_end: ev.stripe_created,
+        });
+        break;
+      }
+
+      default:
+        ignored.push({ event: ev, reason: `tipo não tratado: ${ev.type}` });
+        continue;
+    }
+    used.push(ev);
+  }
+
+  if (used.length === 0 || (!userId && !customerId)) {
+    return {
+      patch: null,
+      used: [],
+      ignored: [...ignored, ...used.map(event => ({ event, reason: 'evento sem customer nem usuário' }))],
+    };
+  }
+  return {
+    patch: {
+      key: sorted[0].customer_key,
+      user_id: userId,
+      customer_id: customerId,
+      fields,
+      start_guarantee: startGuarantee,
+      event_at: used[used.length - 1].stripe_created,
+    },
+    used,
+    ignored,
+  };
+}
+
+export interface ApplyOptions {
+  worker: string;
+  /** Clientes por reserva (cada um com todos os seus eventos pendentes). */
+  customersPerBatch?: number;
+  /** Laços de reserva em paralelo — o banco garante um cliente por laço. */
+  concurrency?: number;
+  visibilitySecs?: number;
+  /** Orçamento de tempo para reservar lotes novos. */
+  maxMs: number;
+  /** Plano de uma subscription (checkout sem metadata). Ausente = 'pro'. */
+  resolvePlan?: (subscriptionId: string) => Promise<PlanId | null>;
+  /** Espera base antes de tentar de novo um cliente sem profile (× tentativa). */
+  unmatchedRetrySecs?: number;
+}
+
+export interface ApplyStats {
+  events: number;
+  customers: number;
+  batches: number;
+  profile_writes: number;
+  applied: number;
+  stale: number;
+  ignored: number;
+  failed: number;
+  retried: number;
+  wall_ms: number;
+  events_per_s: number;
+}
+
+type Settlement = { id: string; claim_token: string; outcome: StripeEventOutcome; error?: string; retry_in_secs?: number };
+
+async function claimBatch(supabase: SupabaseClient, opts: ApplyOptions): Promise<LedgerEvent[]> {
+  const { data, error } = await supabase.rpc('stripe_events_claim', {
+    p_worker: opts.worker,
+    p_customers: opts.customersPerBatch ?? 25,
+    p_visibility_secs: opts.visibilitySecs ?? 60,
+  });
+  if (error) throw new Error(`stripe_events_claim failed: ${error.message}`);
+  return (data || []) as LedgerEvent[];
+}
+
+async function resolvePlans(events: LedgerEvent[], opts: ApplyOptions): Promise<Map<string, PlanId | null>> {
+  const plans = new Map<string, PlanId | null>();
+  if (!opts.resolvePlan) return plans;
+  const missing = new Set<string>();
+  for (const ev of events) {
+    if (ev.type !== 'checkout.session.completed') continue;
+    const meta = ev.payload?.metadata || {};
+    const sub = idOf(ev.payload?.subscription);
+    if (sub && !meta.planId && !meta.plan) missing.add(sub);
+  }
+  await Promise.all(
+    [...missing].map(async sub => {
+      plans.set(sub, await opts.resolvePlan!(sub));
+    })
+  );
+  return plans;
+}
+
+// Um lote: agrupa por cliente, soma, escreve e fecha. Devolve quantos eventos pegou.
+async function applyBatch(supabase: SupabaseClient, opts: ApplyOptions, stats: ApplyStats): Promise<number> {
+  const events = await claimBatch(supabase, opts);
+  if (events.length === 0) return 0;
+  stats.batches++;
+  stats.events += events.length;
+
+  const groups = new Map<string, LedgerEvent[]>();
+  for (const ev of events) {
+    const list = groups.get(ev.customer_key) ?? [];
+    list.push(ev);
+    groups.set(ev.customer_key, list);
+  }
+  stats.customers += groups.size;
+
+  const settle: Settlement[] = [];
+  const close = (ev: LedgerEvent, outcome: StripeEventOutcome, error?: string, retry_in_secs?: number) =>
+    settle.push({ id: ev.id, claim_token: ev.claim_token, outcome, error, retry_in_secs });
+
+  try {
+    const plans = await resolvePlans(events, opts);
+    const reductions = [...groups.values()].map(list => reduceCustomerEvents(list, plans));
+    for (const r of reductions) {
+      for (const { event, reason } of r.ignored) close(event, 'ignored', reason);
+    }
+
+    const withPatch = reductions.filter(r => r.patch);
+    const outcomes = new Map<string, string>();
+    if (withPatch.length > 0) {
+      const { data, error } = await supabase.rpc('stripe_apply_profiles', {
+        p_patches: withPatch.map(r => r.patch),
+      });
+      if (error) throw new Error(`stripe_apply_profiles failed: ${error.message}`);
+      for (const row of (data || []) as Array<{ key: string; outcome: string }>) outcomes.set(row.key, row.outcome);
+    }
+
+    for (const r of withPatch) {
+      const outcome = outcomes.get(r.patch!.key);
+      if (outcome === 'applied' || outcome === 'stale') {
+        if (outcome === 'applied') stats.profile_writes++;
+        else stats.stale++;
+        r.used.forEach(ev => close(ev, 'applied'));
+      } else {
+        const exhausted = r.used.filter(ev => ev.attempts >= ev.max_attempts);
+        if (exhausted.length > 0) {
+          console.error(
+            `[STRIPE-LEDGER] nenhum profile para o customer ${r.patch!.key} após ${exhausted[0].attempts} tentativas;` +
+              ` eventos marcados 'failed': ${exhausted.map(ev => ev.id).join(', ')}`
+          );
+        }
+        for (const ev of r.used) {
+          if (ev.attempts >= ev.max_attempts) close(ev, 'failed', 'nenhum profile para este customer');
+          else
+            close(
+              ev,
+              'retry',
+              'nenhum profile para este customer (ainda)',
+              (opts.unmatchedRetrySecs ?? UNMATCHED_RETRY_SECS) * ev.attempts
+            );
+        }
+      }
+    }
+  } catch (e) {
+    // Lote inteiro volta para a fila; a reserva vence sozinha se até o settle falhar.
+    const message = e instanceof Error ? e.message : String(e);
+    console.error('[STRIPE-LEDGER] lote falhou:', message);
+    settle.length = 0;
+    events.forEach(ev => close(ev, 'retry', message, RETRY_BASE_SECS * 2 ** Math.max(0, ev.attempts - 1)));
+  }
+
+  for (const s of settle) {
+    if (s.outcome === 'applied') stats.applied++;
+    else if (s.outcome === 'ignored') stats.ignored++;
+    else if (s.outcome === 'failed') stats.failed++;
+    else stats.retried++;
+  }
+  const { error } = await supabase.rpc('stripe_events_settle', { p_results: settle });
+  if (error) console.error('[STRIPE-LEDGER] stripe_events_settle falhou:', error.message);
+  return events.length;
+}
+
+/**
+ * Aplica os eventos pendentes até a fila esvaziar ou o orçamento acabar.
+ * Seguro em paralelo com outras instâncias (webhook + cron): cada cliente
+ * fica com um aplicador só.
+ */
+export async function applyStripeEvents(supabase: SupabaseClient, opts: ApplyOptions): Promise<ApplyStats> {
+  const started = Date.now();
+  const stats: ApplyStats = {
+    events: 0,
+    customers: 0,
+    batches: 0,
+    profile_writes: 0,
+    applied: 0,
+    stale: 0,
+    ignored: 0,
+    failed: 0,
+    retried: 0,
+    wall_ms: 0,
+    events_per_s: 0,
+  };
+
+  const loop = async () => {
+    while (Date.now() - started < opts.maxMs) {
+      if ((await applyBatch(supabase, opts, stats)) === 0) return;
+    }
+  };
+  await Promise.all(Array.from({ length: Math.max(1, opts.concurrency ?? 1) }, loop));
+
+  stats.wall_ms = Date.now() - started;
+  stats.events_per_s = stats.wall_ms > 0 ? Math.round((stats.events / stats.wall_ms) * 100_000) / 100 : 0;
+  return stats;
+}
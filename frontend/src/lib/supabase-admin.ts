@@ -1,15 +1,11 @@
 /** @deprecated Use getSupabaseAdmin from '@/lib/supabase-admin' with new pattern */
 
-import { createClient, SupabaseClient } from '@supabase/supabase-js';
-
-// Lazy initialization - só cria o cliente quando for realmente usado
-let _supabaseAdmin: SupabaseClient | null = null;
+import type { SupabaseClient } from '@supabase/supabase-js';
+import { getSupabaseServiceClient } from '@/lib/lazy-clients';
 
+// Lazy initialization - só cria o cliente quando for realmente usado.
+// O cliente é o mesmo de createAdminClient() (registro em lib/lazy-clients.ts).
 export function getSupabaseAdmin(): SupabaseClient {
-  if (_supabaseAdmin) {
-    return _supabaseAdmin;
-  }
-
   const supabaseUrl = process.env.NEXT_PUBLIC_SUPABASE_URL;
   const supabaseServiceRoleKey = process.env.SUPABASE_SERVICE_ROLE_KEY;
 
@@ -34,14 +30,7 @@ export function getSupabaseAdmin(): SupabaseClient {
     } as unknown as SupabaseClient;
   }
 
-  _supabaseAdmin = createClient(supabaseUrl, supabaseServiceRoleKey, {
-    auth: {
-      autoRefreshToken: false,
-      persistSession: false
-    }
-  });
-
-  return _supabaseAdmin;
+  return getSupabaseServiceClient();
 }
 
 // Export direto do cliente admin para retrocompatibilidade
@@ -1,4 +1,5 @@
-import { createClient, type SupabaseClient } from '@supabase/supabase-js';
+import type { SupabaseClient } from '@supabase/supabase-js';
+import { getSupabaseServiceClient } from '@/lib/lazy-clients';
 
 /**
  * Cliente Supabase com SERVICE ROLE (admin).
@@ -6,18 +7,11 @@ import { createClient, type SupabaseClient } from '@supabase/supabase-js';
  * ⚠️ SERVER-ONLY. Nunca importe este módulo em componentes client —
  * a service role key ignora RLS e não pode vazar para o browser.
  * Use apenas em route handlers, server actions e cron jobs.
+ *
+ * Devolve sempre o mesmo cliente do processo (lib/lazy-clients.ts): sem
+ * sessão, ele é seguro de dividir, e chamar isto várias vezes num mesmo
+ * request não cria clientes nem conexões novas.
  */
 export function createAdminClient(): SupabaseClient {
-  const url = process.env.NEXT_PUBLIC_SUPABASE_URL;
-  const serviceRoleKey = process.env.SUPABASE_SERVICE_ROLE_KEY;
-
-  if (!url || !serviceRoleKey) {
-    throw new Error(
-      'Supabase admin client requer NEXT_PUBLIC_SUPABASE_URL e SUPABASE_SERVICE_ROLE_KEY.',
-    );
-  }
-
-  return createClient(url, serviceRoleKey, {
-    auth: { persistSession: false, autoRefreshToken: false },
-  });
+  return getSupabaseServiceClient();
 }
@@ -0,0 +1,373 @@
+/**
+ * ═══════════════════════════════════════════════════════════════
+ * ALSHAM QUANTUM - FILA DURÁVEL DE REQUESTS (SERVER-ONLY)
+ * ═══════════════════════════════════════════════════════════════
+ * 📁 PATH: frontend/src/lib/task-queue.ts
+ * 🎯 Reserva requests com SKIP LOCKED e executa num pool de workers
+ *
+ * - claimRequests: requests_claim() (migration 20261018_requests_queue)
+ *   reserva linhas com claim_token + prazo de visibilidade.
+ * - createSettler: junta os desfechos e fecha em lote (requests_settle).
+ * - runWorkerPool: concorrência total, por prioridade e por chave
+ *   (agente); retry com backoff; mede vazão e espera na fila.
+ * - createConcurrencyLimiter: o teto total se ajusta à latência e aos
+ *   429 do provedor de LLM (AIMD: +1 por janela boa, metade no 429).
+ *
+ * Recebe o SupabaseClient por parâmetro (sem alias '@/') para rodar
+ * também fora do Next — ver scripts/prova-fila.ts.
+ * ═══════════════════════════════════════════════════════════════
+ */
+
+import type { SupabaseClient } from '@supabase/supabase-js';
+
+export type RequestPriority = 'urgent' | 'high' | 'normal' | 'low';
+const PRIORITY_ORDER: RequestPriority[] = ['urgent', 'high', 'normal', 'low'];
+
+export interface QueuedRequest {
+  id: string;
+  user_id: string;
+  title: string;
+  description: string | null;
+  priority: RequestPriority;
+  agent_id: string | null;
+  attempts: number;
+  claim_token: string;
+  created_at: string;
+  claimed_at: string;
+}
+
+export interface RequestOutcome {
+  outcome: 'completed' | 'failed' | 'retry';
+  agent_id?: string;
+  processing_time_ms?: number;
+  error?: string;
+  retry_in_secs?: number;
+  /** Sinais do provedor para o limite adaptativo (não vão para o banco). */
+  latency_ms?: number;
+  throttled?: boolean;
+}
+
+export interface ClaimOptions {
+  worker: string;
+  limit: number;
+  visibilitySecs: number;
+  priorities?: RequestPriority[];
+}
+
+export async function claimRequests(
+  supabase: SupabaseClient,
+  opts: ClaimOptions
+): Promise<QueuedRequest[]> {
+  if (opts.limit <= 0) return [];
+  const { data, error } = await supabase.rpc('requests_claim', {
+    p_worker: opts.worker,
+    p_limit: opts.limit,
+    p_visibility_secs: opts.visibilitySecs,
+    p_priorities: opts.priorities ?? null,
+  });
+  if (error) throw new Error(`requests_claim failed: ${error.message}`);
+  return (data || []) as QueuedRequest[];
+}
+
+/**
+ * Acumula desfechos e grava em lote: ao encher `maxBatch` ou após
+ * `flushMs` do primeiro pendente. flush() força a gravação do resto.
+ */
+export function createSettler(
+  supabase: SupabaseClient,
+  { maxBatch = 25, flushMs = 200 }: { maxBatch?: number; flushMs?: number } = {}
+) {
+  let pending: Array<RequestOutcome & { id: string; claim_token: string }> = [];
+  let timer: ReturnType<typeof setTimeout> | null = null;
+  let writing: Promise<void> = Promise.resolve();
+  const stats = { batches: 0, settled: 0, errors: 0 };
+
+  const write = () => {
+    if (timer) {
+      clearTimeout(timer);
+      timer = null;
+    }
+    if (pending.length === 0) return writing;
+    const batch = pending;
+    pending = [];
+    writing = writing.then(async () => {
+      const { data, error } = await supabase.rpc('requests_settle', { p_results: batch });
+      stats.batches++;
+      if (error) {
+        // A reserva vence sozinha e a linha volta para a fila: não perde request.
+        stats.errors++;
+        console.error('[TASK-QUEUE] requests_settle falhou:', error.message);
+        return;
+      }
+      stats.settled += Number(data ?? 0);
+    });
+    return writing;
+  };
+
+  return {
+    push(row: QueuedRequest, outcome: RequestOutcome) {
+      pending.push({ ...outcome, id: row.id, claim_token: row.claim_token });
+      if (pending.length >= maxBatch) void write();
+      else if (!timer) timer = setTimeout(() => void write(), flushMs);
+    },
+    flush: () => write(),
+    stats,
+  };
+}
+
+export interface AdaptiveConcurrencyOptions {
+  min: number;
+  max: number;
+  /** Latência média (EWMA) do provedor acima disto encolhe o limite. */
+  targetLatencyMs: number;
+}
+
+export interface ConcurrencyStats {
+  start: number;
+  end: number;
+  min: number;
+  max: number;
+  throttles: number;
+  latency_ewma_ms: number | null;
+}
+
+/**
+ * Limite de concorrência AIMD. Sem `adaptive`, fica fixo em `initial`.
+ * - janela boa (`limit` resultados seguidos com EWMA abaixo do alvo): +1
+ * - EWMA acima do alvo: -1, no máximo uma vez por janela
+ * - 429: metade, e nada de reserva nova até o retry-after passar
+ */
+export function createConcurrencyLimiter(initial: number, adaptive?: AdaptiveConcurrencyOptions) {
+  const clamp = (n: number) => (adaptive ? Math.min(adaptive.max, Math.max(adaptive.min, 1, n)) : initial);
+  let limit = clamp(initial);
+  let ewma: number | null = null;
+  let sinceChange = 0;
+  let pausedUntil = 0;
+  const stats = { start: limit, min: limit, max: limit, throttles: 0 };
+
+  const set = (next: number) => {
+    limit = clamp(next);
+    sinceChange = 0;
+    stats.min = Math.min(stats.min, limit);
+    stats.max = Math.max(stats.max, limit);
+  };
+
+  return {
+    get limit() {
+      return limit;
+    },
+    /** ms até poder reservar de novo (0 = livre). */
+    pauseMs: () => Math.max(0, pausedUntil - Date.now()),
+    observe(outcome: RequestOutcome) {
+      if (!adaptive) return;
+      if (outcome.throttled) {
+        stats.throttles++;
+        pausedUntil = Math.max(pausedUntil, Date.now() + (outcome.retry_in_secs ?? 5) * 1000);
+        set(Math.floor(limit / 2));
+        return;
+      }
+      if (outcome.latency_ms === undefined) return;
+      ewma = ewma === null ? outcome.latency_ms : 0.8 * ewma + 0.2 * outcome.latency_ms;
+      sinceChange++;
+      if (sinceChange < limit) return;
+      set(ewma > adaptive.targetLatencyMs ? limit - 1 : limit + 1);
+    },
+    stats: (): ConcurrencyStats => ({
+      ...stats,
+      end: limit,
+      latency_ewma_ms: ewma === null ? null : Math.round(ewma),
+    }),
+  };
+}
+
+export interface WorkerPoolOptions {
+  worker: string;
+  /** Teto total; com `adaptive`, é o ponto de partida. */
+  concurrency: number;
+  adaptive?: AdaptiveConcurrencyOptions;
+  /** Teto de execuções simultâneas por prioridade (ausente = só o total). */
+  perPriority?: Partial<Record<RequestPriority, number>>;
+  /** Teto por chave — ex.: por agente. Quem excede espera a vez localmente. */
+  perKey?: number;
+  keyOf?: (row: QueuedRequest) => string;
+  visibilitySecs?: number;
+  /** Orçamento de tempo para pegar trabalho novo. */
+  maxMs: number;
+  /** Sem trabalho: espera este tanto e tenta de novo; 0 = para quando a fila esvazia. */
+  pollMs?: number;
+  /** Com pollMs: para depois de tanto tempo seguido sem trabalho (drenou). */
+  idleMs?: number;
+  /** Backoff do retry: base * 2^(tentativa-1), em segundos. */
+  retryBaseSecs?: number;
+}
+
+export interface WorkerPoolStats {
+  claimed: number;
+  completed: number;
+  failed: number;
+  retried: number;
+  claim_calls: number;
+  settle_batches: number;
+  wall_ms: number;
+  throughput_per_s: number;
+  queue_wait_ms: { p50: number; p95: number; max: number };
+  run_ms: { p50: number; p95: number; max: number };
+  concurrency: ConcurrencyStats;
+}
+
+function percentiles(values: number[]) {
+  if (values.length === 0) return { p50: 0, p95: 0, max: 0 };
+  const s = [...values].sort((a, b) => a - b);
+  const at = (p: number) => s[Math.min(s.length - 1, Math.floor(p * s.length))];
+  return { p50: Math.round(at(0.5)), p95: Math.round(at(0.95)), max: Math.round(s[s.length - 1]) };
+}
+
+export async function runWorkerPool(
+  supabase: SupabaseClient,
+  handler: (row: QueuedRequest) => Promise<RequestOutcome>,
+  opts: WorkerPoolOptions
+): Promise<WorkerPoolStats> {
+  const started = Date.now();
+  const visibilitySecs = opts.visibilitySecs ?? 120;
+  const retryBase = opts.retryBaseSecs ?? 5;
+  const keyOf = opts.keyOf ?? (() => '*');
+  const settler = createSettler(supabase);
+  const limiter = createConcurrencyLimiter(opts.concurrency, opts.adaptive);
+  const sleep = (ms: number) => new Promise(r => setTimeout(r, ms));
+
+  const stats = { claimed: 0, completed: 0, failed: 0, retried: 0, claim_calls: 0 };
+  const waits: number[] = [];
+  const runs: number[] = [];
+
+  const inflight = new Set<Promise<void>>();
+  const byPriority = new Map<RequestPriority, number>();
+  const byKey = new Map<string, number>();
+  const keyWaiters = new Map<string, Array<() => void>>();
+
+  const acquireKey = async (key: string) => {
+    if (!opts.perKey) return;
+    while ((byKey.get(key) ?? 0) >= opts.perKey) {
+      await new Promise<void>(resolve => {
+        const list = keyWaiters.get(key) ?? [];
+        list.push(resolve);
+        keyWaiters.set(key, list);
+      });
+    }
+    byKey.set(key, (byKey.get(key) ?? 0) + 1);
+  };
+  const releaseKey = (key: string) => {
+    if (!opts.perKey) return;
+    byKey.set(key, (byKey.get(key) ?? 1) - 1);
+    keyWaiters.get(key)?.shift()?.();
+  };
+
+  const execute = async (row: QueuedRequest) => {
+    const key = keyOf(row);
+    await acquireKey(key);
+    const t0 = Date.now();
+    let outcome: RequestOutcome;
+    try {
+      outcome = await handler(row);
+    } catch (e) {
+      outcome = { outcome: 'retry', error: e instanceof Error ? e.message : String(e) };
+    } finally {
+      releaseKey(key);
+    }
+    runs.push(Date.now() - t0);
+    limiter.observe(outcome);
+    const result: RequestOutcome = { ...outcome };
+    delete result.latency_ms;
+    delete result.throttled;
+    if (result.outcome === 'retry' && result.retry_in_secs === undefined) {
+      result.retry_in_secs = retryBase * 2 ** Math.max(0, row.attempts - 1);
+    }
+    stats[result.outcome === 'completed' ? 'completed' : result.outcome === 'failed' ? 'failed' : 'retried']++;
+    settler.push(row, { processing_time_ms: Date.now() - t0, ...result });
+  };
+
+  const launch = (row: QueuedRequest) => {
+    stats.claimed++;
+    waits.push(Date.parse(row.claimed_at) - Date.parse(row.created_at));
+    byPriority.set(row.priority, (byPriority.get(row.priority) ?? 0) + 1);
+    const p = execute(row).finally(() => {
+      byPriority.set(row.priority, (byPriority.get(row.priority) ?? 1) - 1);
+      inflight.delete(p);
+    });
+    inflight.add(p);
+  };
+
+  // Reserva o que cabe: uma chamada sem tetos por prioridade, ou uma por
+  // prioridade com folga (em ordem de urgência).
+  const claimFree = async (free: number): Promise<number> => {
+    if (!opts.perPriority) {
+      stats.claim_calls++;
+      const rows = await claimRequests(supabase, { worker: opts.worker, limit: free, visibilitySecs });
+      rows.forEach(launch);
+      return rows.length;
+    }
+    let got = 0;
+    for (const priority of PRIORITY_ORDER) {
+      const cap = opts.perPriority[priority];
+      const room = cap === undefined ? free - got : Math.min(free - got, cap - (byPriority.get(priority) ?? 0));
+      if (room <= 0) continue;
+      stats.claim_calls++;
+      const rows = await claimRequests(supabase, {
+        worker: opts.worker,
+        limit: room,
+        visibilitySecs,
+        priorities: [priority],
+      });
+      rows.forEach(launch);
+      got += rows.length;
+      if (got >= free) break;
+    }
+    return got;
+  };
+
+  let idleSince: number | null = null;
+  while (Date.now() - started < opts.maxMs) {
+    // Provedor mandou esperar (429): termina o que está rodando, não reserva.
+    const pause = Math.min(limiter.pauseMs(), opts.maxMs - (Date.now() - started));
+    if (pause > 0) {
+      await (inflight.size > 0 ? Promise.race([...inflight, sleep(pause)]) : sleep(pause));
+      continue;
+    }
+
+    const free = limiter.limit - inflight.size;
+    if (free > 0) {
+      let got = 0;
+      try {
+        got = await claimFree(free);
+      } catch (e) {
+        console.error('[TASK-QUEUE] claim falhou:', e instanceof Error ? e.message : String(e));
+      }
+      if (got > 0) {
+        idleSince = null;
+        continue;
+      }
+      if (inflight.size === 0) {
+        if (!opts.pollMs) break;
+        idleSince ??= Date.now();
+        if (opts.idleMs !== undefined && Date.now() - idleSince >= opts.idleMs) break;
+        await sleep(opts.pollMs);
+        continue;
+      }
+    }
+    // Lotado, ou sem trabalho novo enquanto há execuções: espera uma terminar.
+    await Promise.race(inflight);
+  }
+
+  await Promise.all(inflight);
+  await settler.flush();
+
+  const wall = Date.now() - started;
+  return {
+    ...stats,
+    settle_batches: settler.stats.batches,
+    wall_ms: wall,
+    throughput_per_s: wall > 0 ? Math.round((stats.completed / wall) * 100000) / 100 : 0,
+    queue_wait_ms: percentiles(waits),
+    run_ms: percentiles(runs),
+    concurrency: limiter.stats(),
+  };
+}
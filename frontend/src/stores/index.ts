@@ -11,6 +11,7 @@ export { useNotificationStore } from './useNotificationStore';
 export { useLoadingStore } from './useLoadingStore';
 export { useSupportStore } from './useSupportStore';
 export { useSalesStore } from './useSalesStore';
+export { useRealtimeAgentsStore } from './useRealtimeAgentsStore';
 
 // Re-export types
 export type { Request } from './useRequestsStore';
@@ -20,3 +21,4 @@ export type { Profile } from './useProfileStore';
 export type { Notification, NotificationType } from './useNotificationStore';
 export type { SupportTicket, SupportStats } from './useSupportStore';
 export type { Deal, SalesStats } from './useSalesStore';
+export type { RealtimeAgent, AgentChange } from './useRealtimeAgentsStore';
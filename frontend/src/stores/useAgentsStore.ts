@@ -18,7 +18,16 @@ interface AgentsStore {
   error: string | null;
   filteredSquad: string | null;
   searchQuery: string;
+  // Paginação por cursor (keyset em name, id): a página seguinte começa
+  // depois do último nome carregado. `queryKey` = filtros da carga atual.
+  nextCursor: string | null;
+  hasMore: boolean;
+  loadingMore: boolean;
+  total: number | null;
+  queryKey: string | null;
   setAgents: (agents: Agent[]) => void;
+  setPage: (page: { agents: Agent[]; nextCursor: string | null; queryKey: string; total?: number | null; append: boolean }) => void;
+  setLoadingMore: (loadingMore: boolean) => void;
   setLoading: (loading: boolean) => void;
   setError: (error: string | null) => void;
   setFilteredSquad: (squad: string | null) => void;
@@ -32,8 +41,25 @@ export const useAgentsStore = create<AgentsStore>((set, get) => ({
   error: null,
   filteredSquad: null,
   searchQuery: '',
+  nextCursor: null,
+  hasMore: false,
+  loadingMore: false,
+  total: null,
+  queryKey: null,
   
   setAgents: (agents) => set({ agents }),
+  setPage: ({ agents, nextCursor, queryKey, total, append }) =>
+    set((state) => {
+      if (append && state.queryKey !== queryKey) return {}; // resposta de filtro antigo
+      return {
+        agents: append ? [...state.agents, ...agents] : agents,
+        nextCursor,
+        hasMore: nextCursor !== null,
+        queryKey,
+        ...(total !== undefined ? { total } : {}),
+      };
+    }),
+  setLoadingMore: (loadingMore) => set({ loadingMore }),
   setLoading: (loading) => set({ loading }),
   setError: (error) => set({ error }),
   setFilteredSquad: (squad) => set({ filteredSquad: squad }),
@@ -0,0 +1,110 @@
+import { create } from 'zustand';
+
+// Colunas que a UI ao vivo usa. O resto da linha (last_active, updated_at,
+// metadata…) muda a cada heartbeat e não aparece em tela — fica de fora da
+// carga inicial e é descartado dos eventos, então um tick que só mexe nelas
+// não re-renderiza nada.
+export const REALTIME_AGENT_COLUMNS = [
+  'id',
+  'name',
+  'role',
+  'status',
+  'efficiency',
+  'current_task',
+  'neural_load',
+] as const;
+
+export interface RealtimeAgent {
+  id: string;
+  name: string;
+  role: string;
+  status: string;
+  efficiency: number;
+  current_task: string | null;
+  neural_load: number | null;
+}
+
+export type AgentChange =
+  | { type: 'upsert'; row: Partial<RealtimeAgent> & { id: string } }
+  | { type: 'delete'; id: string };
+
+interface RealtimeAgentsStore {
+  byId: Record<string, RealtimeAgent>;
+  ids: string[]; // ordenado por nome; só troca de referência se mudar a composição/ordem
+  loading: boolean;
+  error: string | null;
+  hydrate: (rows: Array<Partial<RealtimeAgent> & { id: string }>) => void;
+  applyChanges: (changes: AgentChange[]) => void;
+  setError: (error: string | null) => void;
+}
+
+function project(row: Partial<RealtimeAgent> & { id: string }, prev?: RealtimeAgent): RealtimeAgent {
+  return {
+    id: row.id,
+    name: row.name ?? prev?.name ?? '',
+    role: row.role ?? prev?.role ?? '',
+    status: row.status ?? prev?.status ?? '',
+    efficiency: row.efficiency ?? prev?.efficiency ?? 0,
+    current_task: row.current_task !== undefined ? row.current_task : prev?.current_task ?? null,
+    neural_load: row.neural_load !== undefined ? row.neural_load : prev?.neural_load ?? null,
+  };
+}
+
+function sameAgent(a: RealtimeAgent, b: RealtimeAgent) {
+  return REALTIME_AGENT_COLUMNS.every(k => a[k] === b[k]);
+}
+
+function sortIds(byId: Record<string, RealtimeAgent>) {
+  return Object.keys(byId).sort((a, b) => byId[a].name.localeCompare(byId[b].name));
+}
+
+export const useRealtimeAgentsStore = create<RealtimeAgentsStore>((set, get) => ({
+  byId: {},
+  ids: [],
+  loading: true,
+  error: null,
+
+  hydrate: (rows) => {
+    const byId: Record<string, RealtimeAgent> = {};
+    for (const row of rows) byId[row.id] = project(row);
+    set({ byId, ids: sortIds(byId), loading: false, error: null });
+  },
+
+  // Um lote (tipicamente um frame de eventos) = no máximo um set().
+  // Linhas sem mudança visível mantêm a MESMA referência, então seletores
+  // por linha (s => s.byId[id]) não disparam render.
+  applyChanges: (changes) => {
+    const { byId: current, ids } = get();
+    let byId: Record<string, RealtimeAgent> | null = null;
+    let reorder = false;
+
+    for (const change of changes) {
+      const source = byId ?? current;
+      if (change.type === 'delete') {
+        if (!(change.id in source)) continue;
+        byId = byId ?? { ...current };
+        delete byId[change.id];
+        reorder = true;
+        continue;
+      }
+      const prev = source[change.row.id];
+      const next = project(change.row, prev);
+      if (prev && sameAgent(prev, next)) continue;
+      byId = byId ?? { ...current };
+      byId[next.id] = next;
+      if (!prev || prev.name !== next.name) reorder = true;
+    }
+
+    if (!byId) return;
+    set(reorder ? { byId, ids: sortIds(byId) } : { byId, ids });
+  },
+
+  setError: (error) => set({ error, loading: false }),
+}));
+
+// ───────────────────────────────────────────────────────────────
+// Seletores
+// ───────────────────────────────────────────────────────────────
+export const selectAgent = (id: string) => (s: RealtimeAgentsStore) => s.byId[id];
+export const selectAgentIds = (s: RealtimeAgentsStore) => s.ids;
+export const selectAgentCount = (s: RealtimeAgentsStore) => s.ids.length;
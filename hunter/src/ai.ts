@@ -1,7 +1,7 @@
-import type { z } from "zod";
 import { config } from "./config.js";
 import { fetchRetry, NL } from "./util.js";
-import { TriageSchema, AnalysisSchema, type RawItem, type Analysis } from "./types.js";
+import { cacheKey, type ResponseCache, type CacheEntry, type CachePut } from "./cache.js";
+import { TriageSchema, TriageVerdictSchema, AnalysisSchema, type RawItem, type Analysis, type TriageResult } from "./types.js";
 
 const GUARD = [
   "Voce e um analista de triagem do HUNTER, um cacador de tecnologia de agentes de IA.",
@@ -13,12 +13,24 @@ const GUARD = [
   "Responda SOMENTE com JSON valido no formato pedido, nada mais.",
 ].join(" ");
 
+// Versao do texto de cada prompt. Entra na chave do cache: mudou a instrucao,
+// SUBA a versao — senao o cache devolve resposta de um prompt que nao existe mais.
+export const TRIAGE_PROMPT_VERSION = "triage-v1";
+export const ANALYSIS_PROMPT_VERSION = "analysis-v1";
+
 export const cost = {
   triageIn: 0,
   triageOut: 0,
   analysisIn: 0,
   analysisOut: 0,
   embed: 0,
+  // Tokens que NAO foram pagos porque a resposta veio do cache. Contados pelo
+  // que a chamada original custou — a economia e medida, nao estimada.
+  cacheHits: 0,
+  savedTriageIn: 0,
+  savedTriageOut: 0,
+  savedAnalysisIn: 0,
+  savedAnalysisOut: 0,
   usd(): number {
     return (
       (this.triageIn / 1e6) * config.priceTriageIn() +
@@ -28,6 +40,14 @@ export const cost = {
       (this.embed / 1e6) * config.priceEmbed()
     );
   },
+  savedUsd(): number {
+    return (
+      (this.savedTriageIn / 1e6) * config.priceTriageIn() +
+      (this.savedTriageOut / 1e6) * config.priceTriageOut() +
+      (this.savedAnalysisIn / 1e6) * config.priceAnalysisIn() +
+      (this.savedAnalysisOut / 1e6) * config.priceAnalysisOut()
+    );
+  },
   tokensNote(): string {
     return (
       "triagem in/out=" +
@@ -39,7 +59,11 @@ export const cost = {
       "/" +
       this.analysisOut +
       " embed=" +
-      this.embed
+      this.embed +
+      " · cache hits=" +
+      this.cacheHits +
+      " economia=US$ " +
+      this.savedUsd().toFixed(4)
     );
   },
 };
@@ -86,24 +110,94 @@ async function chat(model: string, system: string, user: string): Promise<{ cont
   };
 }
 
-export async function triageBatch(items: RawItem[]): Promise<z.infer<typeof TriageSchema>["results"]> {
-  if (!items.length) return [];
-  const listing = items.map((it, i) => "[" + i + "] (" + it.source + ") " + it.title + NL + it.rawText.slice(0, 600)).join(NL + NL);
-  const hint = process.env.HUNTER_SCORING_HINT ?? "";
-  const user = [
+function triageInstructions(hint: string): string[] {
+  return [
     "Classifique CADA item abaixo para a caca de tecnologia de agentes de IA.",
     "Para cada indice, retorne verdict ('lixo'|'talvez'|'ouro'), score 0-100 e has_personal_data.",
     hint ? "Regras de score da missao: " + hint : "",
     'Formato exato: {"results":[{"idx":0,"verdict":"ouro","score":80,"has_personal_data":false}]}',
-    inert(listing),
-  ].join(NL);
-  const { content, pin, pout } = await chat(config.triageModel(), GUARD, user);
+  ];
+}
+
+function triageLine(it: RawItem, i: number): string {
+  return "[" + i + "] (" + it.source + ") " + it.title + NL + it.rawText.slice(0, config.triageItemChars());
+}
+
+// Estimativa barata (~4 caracteres por token) para o empacotador de lotes.
+// Nao precisa ser exata: o lote que estoura e bissectado e o orcamento encolhe.
+const CHARS_POR_TOKEN = 4;
+const TOKENS_SAIDA_POR_ITEM = 25;
+
+export function triageItemTokens(it: RawItem): number {
+  return Math.ceil(triageLine(it, 999).length / CHARS_POR_TOKEN) + TOKENS_SAIDA_POR_ITEM;
+}
+
+export function triageOverheadTokens(): number {
+  const fixo = GUARD + triageInstructions(process.env.HUNTER_SCORING_HINT ?? "").join(NL);
+  return Math.ceil(fixo.length / CHARS_POR_TOKEN);
+}
+
+// Itens com resposta no cache nao vao ao modelo; so os misses formam o lote.
+// O idx devolvido e SEMPRE o do array recebido, com ou sem cache.
+export async function triageBatch(items: RawItem[], cache: ResponseCache | null = null): Promise<TriageResult[]> {
+  if (!items.length) return [];
+  const model = config.triageModel();
+  const hint = process.env.HUNTER_SCORING_HINT ?? "";
+  const keys = items.map((it) => cacheKey("triage", model, TRIAGE_PROMPT_VERSION, hint, it));
+  const hits = cache ? await cache.get(keys) : new Map<string, CacheEntry>();
+
+  const out: TriageResult[] = [];
+  const misses: number[] = [];
+  for (let i = 0; i < items.length; i++) {
+    const h = hits.get(keys[i]);
+    const parsed = h ? TriageVerdictSchema.safeParse(h.response) : null;
+    if (!h || !parsed?.success) {
+      misses.push(i);
+      continue;
+    }
+    out.push({ idx: i, ...parsed.data });
+    cost.cacheHits++;
+    cost.savedTriageIn += h.tokensIn;
+    cost.savedTriageOut += h.tokensOut;
+  }
+  if (!misses.length) return out;
+
+  const pending = misses.map((i) => items[i]);
+  const listing = pending.map((it, i) => triageLine(it, i)).join(NL + NL);
+  const user = [...triageInstructions(hint), inert(listing)].join(NL);
+  const { content, pin, pout } = await chat(model, GUARD, user);
   cost.triageIn += pin;
   cost.triageOut += pout;
-  return TriageSchema.parse(JSON.parse(stripFences(content))).results;
+  const results = TriageSchema.parse(JSON.parse(stripFences(content))).results;
+
+  // O lote paga junto; no cache, cada item leva a sua fracao do custo.
+  const shareIn = Math.round(pin / pending.length);
+  const shareOut = Math.round(pout / pending.length);
+  const puts: CachePut[] = [];
+  for (const t of results) {
+    const orig = misses[t.idx];
+    if (orig === undefined) continue;
+    const { idx: _idx, ...verdict } = t;
+    out.push({ ...verdict, idx: orig });
+    puts.push({ key: keys[orig], kind: "triage", model, promptVersion: TRIAGE_PROMPT_VERSION, response: verdict, tokensIn: shareIn, tokensOut: shareOut });
+  }
+  if (cache && puts.length) await cache.put(puts);
+  return out;
 }
 
-export async function analyze(item: RawItem): Promise<Analysis> {
+export async function analyze(item: RawItem, cache: ResponseCache | null = null): Promise<Analysis> {
+  const model = config.analysisModel();
+  const key = cacheKey("analysis", model, ANALYSIS_PROMPT_VERSION, process.env.HUNTER_SCORING_HINT ?? "", item);
+  if (cache) {
+    const h = (await cache.get([key])).get(key);
+    const parsed = h ? AnalysisSchema.safeParse(h.response) : null;
+    if (h && parsed?.success) {
+      cost.cacheHits++;
+      cost.savedAnalysisIn += h.tokensIn;
+      cost.savedAnalysisOut += h.tokensOut;
+      return parsed.data;
+    }
+  }
   const user = [
     "Analise a fundo o item abaixo e produza SOMENTE o JSON pedido.",
     "Campos: kind (tech|paper|tool|pattern|soul|threat|market), summary_md (resumo PROPRIO, sem copia),",
@@ -113,10 +207,12 @@ export async function analyze(item: RawItem): Promise<Analysis> {
     "Item: " + item.title + " (" + item.source + ") " + item.url,
     inert(item.rawText),
   ].join(NL);
-  const { content, pin, pout } = await chat(config.analysisModel(), GUARD, user);
+  const { content, pin, pout } = await chat(model, GUARD, user);
   cost.analysisIn += pin;
   cost.analysisOut += pout;
-  return AnalysisSchema.parse(JSON.parse(stripFences(content)));
+  const a = AnalysisSchema.parse(JSON.parse(stripFences(content)));
+  if (cache) await cache.put([{ key, kind: "analysis", model, promptVersion: ANALYSIS_PROMPT_VERSION, response: a, tokensIn: pin, tokensOut: pout }]);
+  return a;
 }
 
 export async function embed(text: string): Promise<number[]> {
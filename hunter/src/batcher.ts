@@ -0,0 +1,224 @@
+// ============================================================================
+// LOTES ADAPTATIVOS DA TRIAGEM — um 429 nao joga 300 itens na quarentena
+// ============================================================================
+// Antes: grupos fixos de 25 itens, qualquer que fosse o modelo ou o limite por
+// minuto do provedor. Um unico 429 (apos os retries do fetchRetry) derrubava a
+// triagem INTEIRA: "triagem caiu", tudo para a quarentena.
+//
+// Agora:
+//   - o lote e empacotado por TOKENS estimados, ate um orcamento configuravel;
+//   - 429 ou resposta fora do schema ENCOLHE o orcamento e BISSECTA o lote que
+//     falhou — as metades voltam para a frente da fila;
+//   - so o item que falha SOZINHO vai para a quarentena;
+//   - depois de um 429 a triagem PAUSA antes de reenviar: o retry-after do
+//     provedor, se veio, senao backoff exponencial com jitter. Sem isso, com
+//     a janela do medidor vazia, as metades saiam na hora e levavam outro 429;
+//   - a vazao em tokens/minuto e medida. No 429, o que passou no ultimo minuto
+//     vira o teto aprendido; cada sucesso o alarga um pouco. O orcamento
+//     converge para o limite REAL do provedor, nao para um chute.
+//
+// Erro que nao e de taxa nem de schema (chave invalida, provedor fora) nao e
+// bissectado: 300 chamadas para descobrir que a chave expirou e desperdicio.
+// Esse sobe, e a caca cai no caminho antigo (tudo para a quarentena).
+// ============================================================================
+import { config } from "./config.js";
+import { sleep } from "./util.js";
+import { triageBatch, triageItemTokens, triageOverheadTokens, cost } from "./ai.js";
+import type { ResponseCache } from "./cache.js";
+import type { RawItem, TriageResult } from "./types.js";
+
+export type FalhaLote = "rate" | "schema";
+
+export type BatcherOpts = {
+  budgetTokens: number;
+  minTokens: number;
+  maxTokens: number;
+  maxItems: number;
+  tpm: number; // teto de tokens/minuto; 0 = desconhecido (aprende no 1o 429)
+  maxFailures: number;
+  overhead: number;
+  estimate: (it: RawItem) => number;
+  now?: () => number;
+  wait?: (ms: number) => Promise<void>;
+};
+
+export type BatchStats = {
+  lotes: number;
+  bisseccoes: number;
+  falhas: number;
+  orcamentoFinal: number;
+  tpmMedido: number;
+  tpmTeto: number;
+};
+
+export type TriageRun = (batch: RawItem[]) => Promise<{ results: TriageResult[]; tokens: number }>;
+
+const JANELA_MS = 60_000;
+const ALARGA_SUCESSO = 1.25;
+const ALARGA_TETO = 1.05;
+const BACKOFF_BASE_MS = 1_000;
+const BACKOFF_MAX_MS = 60_000;
+
+export function classificarFalha(e: unknown): FalhaLote | null {
+  const msg = String(e);
+  if (/HTTP 429/.test(msg)) return "rate";
+  const nome = (e as { name?: string } | null)?.name;
+  if (nome === "ZodError" || nome === "SyntaxError") return "schema";
+  return null;
+}
+
+// Pausa depois de um 429: o retry-after que o fetchRetry anexou a mensagem
+// ("[retry-after Nms]") manda; sem ele, 1s, 2s, 4s... por 429 seguido, ate
+// 60s, com jitter (metade fixa, metade sorteada) para lotes irmaos nao
+// voltarem todos no mesmo instante.
+export function pausaAposRate(e: unknown, seguidas: number, random: () => number = Math.random): number {
+  const hinted = /\[retry-after (\d+)ms\]/.exec(String(e));
+  if (hinted) return Math.min(Number(hinted[1]), BACKOFF_MAX_MS);
+  const teto = Math.min(BACKOFF_BASE_MS * Math.pow(2, Math.max(seguidas - 1, 0)), BACKOFF_MAX_MS);
+  return Math.round(teto / 2 + random() * (teto / 2));
+}
+
+// Janela deslizante de 60s: quanto foi gasto, e quanto esperar para caber.
+export function tokenMeter(tpm: number, now: () => number = Date.now) {
+  const janela: { t: number; tokens: number }[] = [];
+  const inicio = now();
+  let total = 0;
+  const podar = () => {
+    while (janela.length && now() - janela[0].t >= JANELA_MS) janela.shift();
+  };
+  return {
+    tpm,
+    usado(): number {
+      podar();
+      return janela.reduce((s, j) => s + j.tokens, 0);
+    },
+    registrar(tokens: number) {
+      janela.push({ t: now(), tokens });
+      total += tokens;
+    },
+    // Quanto esperar (ms) para que `est` tokens caibam no teto. Janela vazia
+    // nunca espera: um lote maior que o teto inteiro ainda precisa sair.
+    espera(est: number): number {
+      podar();
+      if (!this.tpm || !janela.length || this.usado() + est <= this.tpm) return 0;
+      return Math.max(janela[0].t + JANELA_MS - now(), 0);
+    },
+    // O 429 diz que usado + est passou do limite; o que ja passou no minuto
+    // diz que `usado` coube. O teto fica no meio — e so desce, nunca sobe aqui.
+    aprenderTeto(est: number, piso: number) {
+      const novo = Math.max(piso, Math.round((this.usado() + est) / 2));
+      this.tpm = this.tpm ? Math.min(this.tpm, novo) : novo;
+    },
+    alargarTeto() {
+      if (this.tpm) this.tpm = Math.round(this.tpm * ALARGA_TETO);
+    },
+    vazao(): number {
+      const min = (now() - inicio) / JANELA_MS;
+      return min > 0 ? Math.round(total / min) : 0;
+    },
+  };
+}
+
+// Empacota a partir de `cursor` ate o orcamento (sempre ao menos 1 item).
+export function empacotar(items: RawItem[], cursor: number, orcamento: number, maxItems: number, overhead: number, estimate: (it: RawItem) => number): number[] {
+  const lote: number[] = [];
+  let tokens = overhead;
+  for (let i = cursor; i < items.length && lote.length < maxItems; i++) {
+    const t = estimate(items[i]);
+    if (lote.length && tokens + t > orcamento) break;
+    lote.push(i);
+    tokens += t;
+  }
+  return lote;
+}
+
+export async function triageAdaptive(
+  items: RawItem[],
+  run: TriageRun,
+  o: BatcherOpts
+): Promise<{ results: TriageResult[]; failed: { idx: number; reason: FalhaLote }[]; stats: BatchStats }> {
+  const now = o.now ?? Date.now;
+  const wait = o.wait ?? sleep;
+  const meter = tokenMeter(o.tpm, now);
+  const results: TriageResult[] = [];
+  const failed: { idx: number; reason: FalhaLote }[] = [];
+  const fila: number[][] = []; // metades de lotes bissectados — vao primeiro
+  const stats: BatchStats = { lotes: 0, bisseccoes: 0, falhas: 0, orcamentoFinal: o.budgetTokens, tpmMedido: 0, tpmTeto: 0 };
+  let orcamento = o.budgetTokens;
+  let cursor = 0;
+  let rateSeguidas = 0;
+
+  while (fila.length || cursor < items.length) {
+    let lote: number[];
+    if (fila.length) lote = fila.shift()!;
+    else {
+      lote = empacotar(items, cursor, orcamento, o.maxItems, o.overhead, o.estimate);
+      cursor += lote.length;
+    }
+    const est = o.overhead + lote.reduce((s, i) => s + o.estimate(items[i]), 0);
+    const ms = meter.espera(est);
+    if (ms > 0) await wait(ms);
+
+    try {
+      stats.lotes++;
+      const r = await run(lote.map((i) => items[i]));
+      meter.registrar(r.tokens);
+      for (const t of r.results) {
+        const orig = lote[t.idx];
+        if (orig !== undefined) results.push({ ...t, idx: orig });
+      }
+      orcamento = Math.min(o.maxTokens, Math.round(orcamento * ALARGA_SUCESSO));
+      meter.alargarTeto();
+      rateSeguidas = 0;
+    } catch (e) {
+      const tipo = classificarFalha(e);
+      if (!tipo) throw e;
+      stats.falhas++;
+      console.error("[hunter] lote de " + lote.length + " falhou (" + tipo + "), orcamento " + orcamento + " tokens:", String(e).slice(0, 160));
+      if (tipo === "rate") meter.aprenderTeto(est, o.minTokens);
+      orcamento = Math.max(o.minTokens, Math.floor(orcamento / 2));
+
+      // Estourou o limite de falhas: o resto vai para a quarentena sem mais
+      // chamadas. Nao e a triagem inteira — so o que ainda nao passou.
+      if (stats.falhas >= o.maxFailures) {
+        for (const l of [lote, ...fila]) for (const i of l) failed.push({ idx: i, reason: tipo });
+        for (let i = cursor; i < items.length; i++) failed.push({ idx: i, reason: tipo });
+        fila.length = 0;
+        cursor = items.length;
+        break;
+      }
+      if (tipo === "rate") await wait(pausaAposRate(e, ++rateSeguidas));
+      if (lote.length === 1) {
+        failed.push({ idx: lote[0], reason: tipo });
+        continue;
+      }
+      const meio = Math.ceil(lote.length / 2);
+      fila.unshift(lote.slice(0, meio), lote.slice(meio));
+      stats.bisseccoes++;
+    }
+  }
+
+  stats.orcamentoFinal = orcamento;
+  stats.tpmMedido = meter.vazao();
+  stats.tpmTeto = meter.tpm;
+  return { results, failed, stats };
+}
+
+// A triagem de verdade: triageBatch + medidor de tokens pelo `cost` real.
+export function triageAll(items: RawItem[], cache: ResponseCache | null) {
+  const run: TriageRun = async (batch) => {
+    const antes = cost.triageIn + cost.triageOut;
+    const results = await triageBatch(batch, cache);
+    return { results, tokens: cost.triageIn + cost.triageOut - antes };
+  };
+  return triageAdaptive(items, run, {
+    budgetTokens: config.triageBatchTokens(),
+    minTokens: config.triageBatchMinTokens(),
+    maxTokens: config.triageBatchMaxTokens(),
+    maxItems: config.triageBatchMaxItems(),
+    tpm: config.triageTpm(),
+    maxFailures: config.triageMaxFailures(),
+    overhead: triageOverheadTokens(),
+    estimate: triageItemTokens,
+  });
+}
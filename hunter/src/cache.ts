@@ -0,0 +1,107 @@
+// ============================================================================
+// CACHE DE RESPOSTAS DO LLM — item repetido custa zero token
+// ============================================================================
+// Triagem e analise rodam com temperature 0. O item que volta da quarentena,
+// ou que reaparece em outra mina, ja teve resposta — e ela era jogada fora.
+//
+// Chave = tipo | modelo | versao do prompt | hash da dica de score da missao |
+// hash do conteudo (titulo + texto). Fonte e url ficam FORA do hash de
+// conteudo de proposito: o mesmo texto vindo de outra mina e o mesmo item.
+//
+// Lei 8 (falhar barato): o cache e otimizacao, nunca dependencia. Se a tabela
+// cair, tudo vira miss e a caca segue pagando token como antes.
+// ============================================================================
+import { createHash } from "node:crypto";
+import type { SupabaseClient } from "@supabase/supabase-js";
+import { config } from "./config.js";
+import { getCachedResponses, putCachedResponses, touchCachedResponses } from "./db.js";
+import { NL } from "./util.js";
+import type { RawItem } from "./types.js";
+
+export type CacheKind = "triage" | "analysis";
+
+// Resposta guardada + os tokens que a chamada ORIGINAL pagou. Os tokens sao o
+// que o hit economiza — e o que o relatorio declara em US$.
+export type CacheEntry = { response: unknown; tokensIn: number; tokensOut: number };
+
+export type CachePut = CacheEntry & { key: string; kind: CacheKind; model: string; promptVersion: string };
+
+export interface ResponseCache {
+  get(keys: string[]): Promise<Map<string, CacheEntry>>;
+  put(entries: CachePut[]): Promise<void>;
+}
+
+export function sha256(s: string): string {
+  return createHash("sha256").update(s, "utf8").digest("hex");
+}
+
+export function contentHash(it: RawItem): string {
+  return sha256(it.title + NL + it.rawText);
+}
+
+export function cacheKey(kind: CacheKind, model: string, promptVersion: string, hint: string, it: RawItem): string {
+  return sha256([kind, model, promptVersion, sha256(hint), contentHash(it)].join("|"));
+}
+
+// Cache na tabela hunter_llm_cache. TTL na escrita; o despejo por tamanho
+// roda ao fim da caca (evictLlmCache).
+export function tableCache(sb: SupabaseClient): ResponseCache {
+  let avisou = false;
+  const falhou = (onde: string, e: unknown) => {
+    if (avisou) return;
+    avisou = true;
+    console.error("[hunter] cache " + onde + " falhou — seguindo sem cache:", String(e));
+  };
+  return {
+    async get(keys) {
+      const out = new Map<string, CacheEntry>();
+      try {
+        const rows = await getCachedResponses(sb, keys);
+        for (const r of rows) out.set(r.key, { response: r.response, tokensIn: r.tokens_in, tokensOut: r.tokens_out });
+        await touchCachedResponses(sb, [...out.keys()]);
+      } catch (e) {
+        falhou("leitura", e);
+      }
+      return out;
+    },
+    async put(entries) {
+      const expires = new Date(Date.now() + config.cacheTtlDays() * 86400000).toISOString();
+      try {
+        await putCachedResponses(
+          sb,
+          entries.map((e) => ({
+            key: e.key,
+            kind: e.kind,
+            model: e.model,
+            prompt_version: e.promptVersion,
+            response: e.response,
+            tokens_in: e.tokensIn,
+            tokens_out: e.tokensOut,
+            expires_at: expires,
+          }))
+        );
+      } catch (e) {
+        falhou("escrita", e);
+      }
+    },
+  };
+}
+
+// Cache em memoria: para as provas e para rodar local sem banco.
+export function memoryCache(): ResponseCache & { size(): number } {
+  const m = new Map<string, CacheEntry>();
+  return {
+    async get(keys) {
+      const out = new Map<string, CacheEntry>();
+      for (const k of keys) {
+        const v = m.get(k);
+        if (v) out.set(k, v);
+      }
+      return out;
+    },
+    async put(entries) {
+      for (const e of entries) m.set(e.key, { response: e.response, tokensIn: e.tokensIn, tokensOut: e.tokensOut });
+    },
+    size: () => m.size,
+  };
+}
@@ -0,0 +1,107 @@
+// ============================================================================
+// CHECKPOINT / RETOMADA DA CACA
+// ============================================================================
+// O processo pode morrer no meio (timeout do Actions, OOM, provedor fora).
+// Antes, tudo que estava em memoria sumia e a caca do dia seguinte comecava do
+// zero. Agora cada etapa grava seu resultado em hunter_checkpoints, e
+// `--resume <hunt_id>` retoma a MESMA caca:
+//
+//   collected .. pula a coleta (e a leitura da quarentena)
+//   triaged .... pula a triagem — zero token gasto de novo
+//   analysis ... pula cada finalista ja resolvido
+//
+// A conta de tokens volta do checkpoint (nao zera, nao cobra duas vezes), e as
+// escritas que podem ter acontecido logo antes da queda (achado, quarentena)
+// sao conferidas no banco antes de repetir.
+// ============================================================================
+import type { SupabaseClient } from "@supabase/supabase-js";
+import { cost } from "./ai.js";
+import { saveCheckpoint, loadCheckpoints, type CheckpointStage } from "./db.js";
+import type { ReportItem } from "./report.js";
+import type { RawItem, TriageResult } from "./types.js";
+
+export type Coleta = {
+  items: RawItem[];
+  quarantineIds: number[];
+  sourcesOk: number;
+  sourcesFail: number;
+  failNotes: string[];
+};
+
+// retried: linhas da quarentena que falharam de novo — [id, motivo]. Sem
+// isto, a retomada as marcaria como processadas e o item se perderia.
+export type Triagem = { triage: TriageResult[]; failNotes: string[]; retried: [number, string][] };
+
+export type Analise = {
+  done: number[]; // idx (em toTriage) dos finalistas ja resolvidos
+  findings: ReportItem[];
+  itemsKept: number;
+  analysisFailed: boolean;
+  failNotes: string[];
+  retried: [number, string][];
+};
+
+export type Retomada = { collected?: Coleta; triaged?: Triagem; analysis?: Analise };
+
+const CONTADORES = [
+  "triageIn",
+  "triageOut",
+  "analysisIn",
+  "analysisOut",
+  "embed",
+  "cacheHits",
+  "savedTriageIn",
+  "savedTriageOut",
+  "savedAnalysisIn",
+  "savedAnalysisOut",
+] as const;
+
+export type CostSnapshot = Partial<Record<(typeof CONTADORES)[number], number>>;
+
+export function costSnapshot(): CostSnapshot {
+  const s: CostSnapshot = {};
+  for (const k of CONTADORES) s[k] = cost[k];
+  return s;
+}
+
+export function restoreCost(s: CostSnapshot) {
+  for (const k of CONTADORES) cost[k] = Number(s[k] ?? 0);
+}
+
+// `--resume 42` ou `--resume=42`. Sem a flag, null (caca nova).
+export function resumeArg(argv: string[] = process.argv.slice(2)): number | null {
+  for (let i = 0; i < argv.length; i++) {
+    const a = argv[i];
+    const v = a === "--resume" ? argv[i + 1] : a.startsWith("--resume=") ? a.slice("--resume=".length) : null;
+    if (v === null) continue;
+    const n = Number(v);
+    if (!Number.isInteger(n) || n <= 0) throw new Error("--resume exige o id numerico da caca. Recebido: " + JSON.stringify(v));
+    return n;
+  }
+  return null;
+}
+
+// Le os checkpoints e devolve a conta de tokens ao ponto do mais recente.
+export async function loadRetomada(sb: SupabaseClient, huntId: number): Promise<Retomada> {
+  const rows = await loadCheckpoints(sb, huntId);
+  const r: Retomada = {};
+  for (const row of rows) r[row.stage] = row.payload;
+  const ultimo = rows[rows.length - 1];
+  if (ultimo) restoreCost(ultimo.cost ?? {});
+  return r;
+}
+
+let avisou = false;
+
+export async function checkpoint(sb: SupabaseClient, huntId: number, stage: "collected", payload: Coleta): Promise<void>;
+export async function checkpoint(sb: SupabaseClient, huntId: number, stage: "triaged", payload: Triagem): Promise<void>;
+export async function checkpoint(sb: SupabaseClient, huntId: number, stage: "analysis", payload: Analise): Promise<void>;
+export async function checkpoint(sb: SupabaseClient, huntId: number, stage: CheckpointStage, payload: unknown): Promise<void> {
+  // Best-effort (Lei 8): sem checkpoint a caca ainda roda — so nao retoma.
+  try {
+    await saveCheckpoint(sb, huntId, stage, payload, costSnapshot());
+  } catch (e) {
+    if (!avisou) console.error("[hunter] checkpoint '" + stage + "' falhou — caca segue sem retomada:", String(e));
+    avisou = true;
+  }
+}
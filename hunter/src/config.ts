@@ -36,4 +36,19 @@ export const config = {
   priceAnalysisIn: () => num("HUNTER_PRICE_ANALYSIS_IN", 0),
   priceAnalysisOut: () => num("HUNTER_PRICE_ANALYSIS_OUT", 0),
   priceEmbed: () => num("HUNTER_PRICE_EMBED", 0),
+  triageItemChars: () => num("HUNTER_TRIAGE_ITEM_CHARS", 600),
+  triageBatchTokens: () => num("HUNTER_TRIAGE_BATCH_TOKENS", 6000),
+  triageBatchMinTokens: () => num("HUNTER_TRIAGE_BATCH_MIN_TOKENS", 500),
+  triageBatchMaxTokens: () => num("HUNTER_TRIAGE_BATCH_MAX_TOKENS", 24000),
+  triageBatchMaxItems: () => num("HUNTER_TRIAGE_BATCH_MAX_ITEMS", 50),
+  triageTpm: () => num("HUNTER_TRIAGE_TPM", 0),
+  triageMaxFailures: () => num("HUNTER_TRIAGE_MAX_FAILURES", 12),
+  quarantineMaxAttempts: () => num("HUNTER_QUARANTINE_MAX_ATTEMPTS", 5),
+  drainPageSize: () => num("HUNTER_DRAIN_PAGE_SIZE", 200),
+  drainConcurrency: () => num("HUNTER_DRAIN_CONCURRENCY", 4),
+  drainMaxMinutes: () => num("HUNTER_DRAIN_MAX_MINUTES", 10),
+  drainTokenBudget: () => num("HUNTER_DRAIN_TOKEN_BUDGET", 500000),
+  cacheEnabled: () => opt("HUNTER_CACHE", "true").toLowerCase() !== "false",
+  cacheTtlDays: () => num("HUNTER_CACHE_TTL_DAYS", 14),
+  cacheMaxRows: () => num("HUNTER_CACHE_MAX_ROWS", 20000),
 };
@@ -28,10 +28,81 @@ export async function closeHunt(sb: SupabaseClient, id: number, patch: Record<st
   if (error) throw new Error("closeHunt: " + error.message);
 }
 
-export async function getQuarantine(sb: SupabaseClient) {
-  const { data, error } = await sb.from("hunter_raw_queue").select("*").eq("processed", false).limit(500);
-  if (error) throw new Error("getQuarantine: " + error.message);
-  return data ?? [];
+export async function getHunt(sb: SupabaseClient, id: number): Promise<{ id: number; mission_id: number | null; status: string } | null> {
+  const { data, error } = await sb.from("hunter_hunts").select("id,mission_id,status").eq("id", id).limit(1);
+  if (error) throw new Error("getHunt: " + error.message);
+  const h = data?.[0];
+  return h ? { id: Number(h.id), mission_id: h.mission_id === null ? null : Number(h.mission_id), status: String(h.status) } : null;
+}
+
+// ── QUARENTENA (Lei 8) ──────────────────────────────────────────────────────
+// Lida em ordem de prioridade (motivo, idade, mina) por keyset: o cursor e a
+// ultima linha da pagina anterior. Ver 20261018_hunter_quarantine_drain.sql.
+export type QuarantineRow = {
+  id: number;
+  hunt_id: number | null;
+  source: string;
+  url: string;
+  raw_payload: any;
+  queued_reason: string;
+  reason_rank: number;
+  attempts: number;
+  created_at: string;
+};
+
+export type QuarantineCursor = Pick<QuarantineRow, "id" | "reason_rank" | "source" | "created_at">;
+
+export async function quarantinePage(sb: SupabaseClient, after: QuarantineCursor | null, pageSize: number): Promise<QuarantineRow[]> {
+  const { data, error } = await sb.rpc("hunter_quarantine_page", {
+    after_created: after?.created_at ?? null,
+    after_rank: after?.reason_rank ?? null,
+    after_source: after?.source ?? null,
+    after_id: after?.id ?? null,
+    page_size: pageSize,
+  });
+  if (error) throw new Error("quarantinePage: " + error.message);
+  return ((data ?? []) as any[]).map((q) => ({ ...q, id: Number(q.id), hunt_id: q.hunt_id === null ? null : Number(q.hunt_id) }));
+}
+
+// A caca diaria le so a primeira pagina — as mais prioritarias. O resto fica
+// na fila, intocado, para a proxima caca ou para a drenagem.
+export async function getQuarantine(sb: SupabaseClient, limit = 500): Promise<QuarantineRow[]> {
+  return quarantinePage(sb, null, limit);
+}
+
+// Assenta um lote: done sai da fila, retry ganha +1 tentativa NA MESMA LINHA
+// (e sai como morto no teto). Nunca insere linha nova.
+export async function settleQuarantine(
+  sb: SupabaseClient,
+  doneIds: number[],
+  retryIds: number[],
+  retryReason: string | null,
+  maxAttempts: number
+): Promise<{ processed: number; retried: number; dead: number }> {
+  if (!doneIds.length && !retryIds.length) return { processed: 0, retried: 0, dead: 0 };
+  const { data, error } = await sb.rpc("hunter_quarantine_settle", {
+    done_ids: doneIds,
+    retry_ids: retryIds,
+    retry_reason: retryReason,
+    max_attempts: maxAttempts,
+  });
+  if (error) throw new Error("settleQuarantine: " + error.message);
+  const r = (data as any[])?.[0] ?? {};
+  return { processed: Number(r.processed ?? 0), retried: Number(r.retried ?? 0), dead: Number(r.dead ?? 0) };
+}
+
+export type QuarantineStats = { depth: number; oldestAt: string | null; processedWindow: number; deadWindow: number };
+
+export async function quarantineStats(sb: SupabaseClient, windowHours = 24): Promise<QuarantineStats> {
+  const { data, error } = await sb.rpc("hunter_quarantine_stats", { window_hours: windowHours });
+  if (error) throw new Error("quarantineStats: " + error.message);
+  const r = (data as any[])?.[0] ?? {};
+  return {
+    depth: Number(r.depth ?? 0),
+    oldestAt: r.oldest_at ?? null,
+    processedWindow: Number(r.processed_window ?? 0),
+    deadWindow: Number(r.dead_window ?? 0),
+  };
 }
 
 export async function enqueueRaw(sb: SupabaseClient, huntId: number, source: string, url: string, payload: unknown, reason: string) {
@@ -39,10 +110,12 @@ export async function enqueueRaw(sb: SupabaseClient, huntId: number, source: str
   if (error) throw new Error("enqueueRaw: " + error.message);
 }
 
-export async function markProcessed(sb: SupabaseClient, ids: number[]) {
-  if (!ids.length) return;
-  const { error } = await sb.from("hunter_raw_queue").update({ processed: true }).in("id", ids);
-  if (error) throw new Error("markProcessed: " + error.message);
+// URLs que ESTA caca ja mandou para a quarentena. Na retomada, impede que o
+// mesmo item entre duas vezes na fila.
+export async function queuedUrls(sb: SupabaseClient, huntId: number): Promise<Set<string>> {
+  const { data, error } = await sb.from("hunter_raw_queue").select("url").eq("hunt_id", huntId);
+  if (error) throw new Error("queuedUrls: " + error.message);
+  return new Set((data ?? []).map((r) => String(r.url)));
 }
 
 export async function matchFinding(sb: SupabaseClient, embedding: number[], threshold: number): Promise<boolean> {
@@ -57,6 +130,19 @@ export async function insertFinding(sb: SupabaseClient, row: Record<string, unkn
   return data.id as number;
 }
 
+// Achado ja gravado NESTA caca para a url? A retomada usa isto para nao
+// inserir de novo o finding que entrou logo antes da queda.
+export async function getHuntFinding(sb: SupabaseClient, huntId: number, url: string) {
+  const { data, error } = await sb
+    .from("hunter_findings")
+    .select("id,kind,title,url,source,summary_md,relevance,single_source,license")
+    .eq("hunt_id", huntId)
+    .eq("url", url)
+    .limit(1);
+  if (error) throw new Error("getHuntFinding: " + error.message);
+  return data?.[0] ?? null;
+}
+
 export async function insertEdges(sb: SupabaseClient, findingId: number, edges: any[]) {
   if (!edges.length) return;
   const rows = edges.map((e) => ({ finding_id: findingId, subject: e.subject, relation: e.relation, object: e.object, confidence: e.confidence }));
@@ -69,6 +155,76 @@ export async function insertSoul(sb: SupabaseClient, findingId: number, soul: an
   if (error) throw new Error("insertSoul: " + error.message);
 }
 
+// ── CACHE DO LLM ────────────────────────────────────────────────────────────
+// Respostas deterministicas (temperature 0) guardadas por chave. Ver
+// supabase/migrations/20261018_hunter_llm_cache.sql e src/cache.ts.
+export type CacheRow = {
+  key: string;
+  kind: "triage" | "analysis";
+  model: string;
+  prompt_version: string;
+  response: unknown;
+  tokens_in: number;
+  tokens_out: number;
+  expires_at: string;
+};
+
+export async function getCachedResponses(sb: SupabaseClient, keys: string[]): Promise<CacheRow[]> {
+  if (!keys.length) return [];
+  const { data, error } = await sb
+    .from("hunter_llm_cache")
+    .select("key,kind,model,prompt_version,response,tokens_in,tokens_out,expires_at")
+    .in("key", keys)
+    .gt("expires_at", new Date().toISOString());
+  if (error) throw new Error("getCachedResponses: " + error.message);
+  return (data ?? []) as CacheRow[];
+}
+
+export async function putCachedResponses(sb: SupabaseClient, rows: CacheRow[]) {
+  if (!rows.length) return;
+  const { error } = await sb.from("hunter_llm_cache").upsert(rows, { onConflict: "key" });
+  if (error) throw new Error("putCachedResponses: " + error.message);
+}
+
+// Carimba o uso: o despejo por tamanho tira primeiro o que ninguem le.
+export async function touchCachedResponses(sb: SupabaseClient, keys: string[]) {
+  if (!keys.length) return;
+  const { error } = await sb.from("hunter_llm_cache").update({ last_hit_at: new Date().toISOString() }).in("key", keys);
+  if (error) throw new Error("touchCachedResponses: " + error.message);
+}
+
+export async function evictLlmCache(sb: SupabaseClient, maxRows: number): Promise<number> {
+  const { data, error } = await sb.rpc("hunter_llm_cache_evict", { max_rows: maxRows });
+  if (error) throw new Error("evictLlmCache: " + error.message);
+  return Number(data ?? 0);
+}
+
+// ── CHECKPOINTS DA CACA ─────────────────────────────────────────────────────
+// Uma linha por (caca, etapa). Ver src/checkpoint.ts.
+export type CheckpointStage = "collected" | "triaged" | "analysis";
+
+export async function saveCheckpoint(sb: SupabaseClient, huntId: number, stage: CheckpointStage, payload: unknown, cost: unknown) {
+  const { error } = await sb
+    .from("hunter_checkpoints")
+    .upsert({ hunt_id: huntId, stage, payload, cost, updated_at: new Date().toISOString() }, { onConflict: "hunt_id,stage" });
+  if (error) throw new Error("saveCheckpoint: " + error.message);
+}
+
+export async function loadCheckpoints(sb: SupabaseClient, huntId: number): Promise<{ stage: CheckpointStage; payload: any; cost: any; updated_at: string }[]> {
+  const { data, error } = await sb
+    .from("hunter_checkpoints")
+    .select("stage,payload,cost,updated_at")
+    .eq("hunt_id", huntId)
+    .order("updated_at", { ascending: true });
+  if (error) throw new Error("loadCheckpoints: " + error.message);
+  return (data ?? []) as any[];
+}
+
+export async function deleteCheckpoints(sb: SupabaseClient, huntId: number) {
+  const { error } = await sb.from("hunter_checkpoints").delete().eq("hunt_id", huntId);
+  if (error) throw new Error("deleteCheckpoints: " + error.message);
+}
+
 // ── FASE 3 · peca 2 — RESSURGIR OS PENDENTES ────────────────────────────────
 // Todo achado de caca ANTERIOR que ainda nao recebeu veredito. Sem isto, o
 // pending de ontem some do relatorio de hoje e nunca chega ao tribunal.
@@ -107,68 +263,40 @@ export async function getPendingFindings(
 }
 
 // ── FASE 3 · peca 4 — CHECAGENS DA RONDA ────────────────────────────────────
-export async function lastFinishedHunt(sb: SupabaseClient) {
-  const { data, error } = await sb
-    .from("hunter_hunts")
-    .select("id,status,started_at,finished_at")
-    .in("status", ["done", "partial"])
-    .not("finished_at", "is", null)
-    .order("finished_at", { ascending: false })
-    .limit(1);
-  if (error) throw new Error("lastFinishedHunt: " + error.message);
-  return data?.[0] ?? null;
-}
-
-// A COLHEITA, nao a porta. lastFinishedHunt responde "rodou?"; esta responde
-// "trouxe alguma coisa?". Sao perguntas diferentes: 17 cacas seguidas rodaram
-// (status partial, exit 0, PR aberto) e nao trouxeram nada — e todo vigia
-// passou verde porque so perguntava a primeira.
-export type HuntYield = {
-  id: number;
-  status: string;
-  finished_at: string;
-  items_kept: number;
-  items_queued: number;
-  cost_usd: number;
+// Uma linha, mantida por trigger (20261018_hunter_yield_rollups.sql): a ultima
+// caca fechada, quantas cacas vazias seguidas e a profundidade da quarentena.
+// A COLHEITA, nao a porta: "rodou?" e "trouxe alguma coisa?" sao perguntas
+// diferentes — 17 cacas seguidas rodaram (status partial, exit 0, PR aberto)
+// e nao trouxeram nada. Vazia = nada mantido E custo zero.
+export type RondaStats = {
+  lastHuntId: number | null;
+  lastStatus: string | null;
+  lastFinishedAt: string | null;
+  lastItemsKept: number;
+  lastItemsQueued: number;
+  lastCostUsd: number;
+  emptyStreak: number;
+  quarantineDepth: number;
 };
 
-export async function recentHunts(sb: SupabaseClient, limit = 7): Promise<HuntYield[]> {
+export async function rondaStats(sb: SupabaseClient): Promise<RondaStats> {
   const { data, error } = await sb
-    .from("hunter_hunts")
-    .select("id,status,finished_at,items_kept,items_queued,cost_usd")
-    .in("status", ["done", "partial"])
-    .not("finished_at", "is", null)
-    .order("finished_at", { ascending: false })
-    .limit(limit);
-  if (error) throw new Error("recentHunts: " + error.message);
-  return (data ?? []).map((h) => ({
-    id: Number(h.id),
-    status: String(h.status),
-    finished_at: String(h.finished_at),
-    items_kept: Number(h.items_kept ?? 0),
-    items_queued: Number(h.items_queued ?? 0),
-    cost_usd: Number(h.cost_usd ?? 0),
-  }));
-}
-
-// Quantas cacas fechadas seguidas, a partir da mais recente, vieram vazias.
-// Vazia = nada mantido E custo zero (o custo zero prova que a analise nem rodou).
-export function streakVazio(hunts: HuntYield[]): number {
-  let n = 0;
-  for (const h of hunts) {
-    if (h.items_kept === 0 && h.cost_usd === 0) n++;
-    else break;
-  }
-  return n;
-}
-
-export async function quarantineDepth(sb: SupabaseClient): Promise<number> {
-  const { count, error } = await sb
-    .from("hunter_raw_queue")
-    .select("id", { count: "exact", head: true })
-    .eq("processed", false);
-  if (error) throw new Error("quarantineDepth: " + error.message);
-  return count ?? 0;
+    .from("hunter_ronda_stats")
+    .select("last_hunt_id,last_status,last_finished_at,last_items_kept,last_items_queued,last_cost_usd,empty_streak,quarantine_depth")
+    .limit(1);
+  if (error) throw new Error("rondaStats: " + error.message);
+  const r = data?.[0];
+  if (!r) throw new Error("rondaStats: hunter_ronda_stats vazia — rode hunter_rollup_rebuild()");
+  return {
+    lastHuntId: r.last_hunt_id === null ? null : Number(r.last_hunt_id),
+    lastStatus: r.last_status ?? null,
+    lastFinishedAt: r.last_finished_at ?? null,
+    lastItemsKept: Number(r.last_items_kept ?? 0),
+    lastItemsQueued: Number(r.last_items_queued ?? 0),
+    lastCostUsd: Number(r.last_cost_usd ?? 0),
+    emptyStreak: Number(r.empty_streak ?? 0),
+    quarantineDepth: Number(r.quarantine_depth ?? 0),
+  };
 }
 
 // Query ANONIMA real contra a memoria dos irmaos. Prova, nao promessa:
@@ -304,14 +432,35 @@ export async function getHuntsSince(sb: SupabaseClient, desdeISO: string) {
   return data ?? [];
 }
 
-export async function getFindingsSince(sb: SupabaseClient, desdeISO: string): Promise<FindingJulgado[]> {
+// ── CONTADORES DO ESPELHO ───────────────────────────────────────────────────
+// Mantidos por trigger a cada achado inserido ou julgado. Janela de N dias =
+// N x minas linhas, qualquer que seja o tamanho do historico.
+export type SourceDaily = { source: string; trazidos: number; adopt: number; watch: number; discard: number; pending: number };
+export type CalibrationDaily = { band: "alto" | "medio" | "baixo"; single_source: boolean; verdict: string; n: number };
+
+export async function sourceRollup(sb: SupabaseClient, desdeDia: string): Promise<SourceDaily[]> {
+  const { data, error } = await sb.from("hunter_source_daily").select("source,trazidos,adopt,watch,discard,pending").gte("day", desdeDia);
+  if (error) throw new Error("sourceRollup: " + error.message);
+  return (data ?? []) as SourceDaily[];
+}
+
+export async function calibrationRollup(sb: SupabaseClient, desdeDia: string): Promise<CalibrationDaily[]> {
+  const { data, error } = await sb.from("hunter_calibration_daily").select("band,single_source,verdict,n").gte("day", desdeDia);
+  if (error) throw new Error("calibrationRollup: " + error.message);
+  return (data ?? []) as CalibrationDaily[];
+}
+
+// So os divergentes (alto descartado, baixo adotado) — o relatorio os cita
+// por titulo. Indice parcial idx_hunter_findings_divergentes.
+export async function getDivergentes(sb: SupabaseClient, desdeDia: string): Promise<FindingJulgado[]> {
   const { data, error } = await sb
     .from("hunter_findings")
     .select("id,hunt_id,source,kind,title,relevance,single_source,verdict,created_at")
-    .gte("created_at", desdeISO)
+    .or("and(verdict.eq.discard,relevance.gte.71),and(verdict.eq.adopt,relevance.lt.41)")
+    .gte("created_at", desdeDia)
     .order("created_at", { ascending: true })
-    .limit(2000);
-  if (error) throw new Error("getFindingsSince: " + error.message);
+    .limit(500);
+  if (error) throw new Error("getDivergentes: " + error.message);
   return (data ?? []) as FindingJulgado[];
 }
 
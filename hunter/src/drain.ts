@@ -0,0 +1,76 @@
+// ============================================================================
+// `npm run drain` — esvazia a quarentena sob orcamento de tempo e tokens
+// ============================================================================
+// Roda depois da caca diaria (hunter.yml) ou na mao. Achado que sai daqui
+// fica com o hunt_id da caca que o enfileirou. O motor esta em drenagem.ts;
+// aqui so se liga banco, modelo e metricas.
+//
+// Saida: taxa de drenagem (itens/min) e a fila que ficou — profundidade e
+// idade do mais antigo. A Ronda (checarDrenagem) cobra as mesmas metricas.
+// ============================================================================
+import { db, getActiveMission, quarantinePage, settleQuarantine, quarantineStats, existingHunterIssueTitles } from "./db.js";
+import { cost } from "./ai.js";
+import { triageAll } from "./batcher.js";
+import { tableCache } from "./cache.js";
+import { analisarEGravar } from "./finding.js";
+import { drenar, taxaDrenagem } from "./drenagem.js";
+import { config } from "./config.js";
+
+async function main() {
+  const sb = db();
+  const mission = await getActiveMission(sb);
+  if (!mission) {
+    // A triagem precisa do mandato; sem missao, nao se drena (Lei 7).
+    console.error("[drain] sem missao ativa — drenagem abortada.");
+    process.exit(1);
+  }
+  if (mission.scoring_rules) process.env.HUNTER_SCORING_HINT = JSON.stringify(mission.scoring_rules).slice(0, 1500);
+
+  const cache = config.cacheEnabled() ? tableCache(sb) : null;
+  let issuesConhecidas = new Set<string>();
+  try {
+    issuesConhecidas = (await existingHunterIssueTitles()).titles;
+  } catch (e) {
+    console.error("[drain] listagem de issues falhou — ameaca pode duplicar:", String(e));
+  }
+
+  const gasto = () => cost.triageIn + cost.triageOut + cost.analysisIn + cost.analysisOut;
+  const max = config.quarantineMaxAttempts();
+  const st = await drenar(
+    {
+      page: (after, size) => quarantinePage(sb, after, size),
+      triage: (items) => triageAll(items, cache),
+      analisar: async (row, it) => {
+        const r = await analisarEGravar(sb, row.hunt_id, it, cache, issuesConhecidas);
+        for (const n of r.notas) console.error("[drain] " + n);
+        return r.item !== null;
+      },
+      settle: (done, retry, reason) => settleQuarantine(sb, done, retry, reason, max),
+      tokens: gasto,
+    },
+    {
+      pageSize: config.drainPageSize(),
+      concurrency: config.drainConcurrency(),
+      maxMs: config.drainMaxMinutes() * 60_000,
+      tokenBudget: config.drainTokenBudget(),
+      finalistsCap: config.finalistsCap(),
+    }
+  );
+
+  console.log(
+    "[drain] parada: " + st.parada + " · " + st.paginas + " pagina(s) · " + st.lidos + " lido(s) · " + st.drenados + " drenado(s) · " + st.achados + " achado(s) · " + st.retentados + " de volta a fila · " + st.mortos + " descartado(s) · " + st.intocados + " intocado(s)"
+  );
+  console.log("[drain] taxa: " + taxaDrenagem(st) + " itens/min em " + (st.ms / 1000).toFixed(1) + "s · " + cost.tokensNote());
+  try {
+    const q = await quarantineStats(sb, 24);
+    const idadeH = q.oldestAt ? (Date.now() - new Date(q.oldestAt).getTime()) / 3600000 : 0;
+    console.log("[drain] fila: " + q.depth + " item(ns) · mais antigo ha " + idadeH.toFixed(1) + "h · " + q.processedWindow + " drenado(s) em 24h");
+  } catch (e) {
+    console.error("[drain] metricas da fila NAO VERIFICADAS:", String(e));
+  }
+}
+
+main().catch((e) => {
+  console.error("Drenagem falhou:", e);
+  process.exit(1);
+});
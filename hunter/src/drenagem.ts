@@ -0,0 +1,156 @@
+// ============================================================================
+// DRENAGEM DA QUARENTENA — o motor
+// ============================================================================
+// Lei 8 diz que a quarentena e transitoria. Na pratica ela so era lida pela
+// caca diaria (ate 500 linhas, select *), e o que sobrava voltava como linha
+// nova. Este motor a esvazia de verdade:
+//
+//   - pagina por keyset na ordem de prioridade (motivo, idade, mina) — custo
+//     constante por pagina, sem OFFSET. O retry troca o motivo (e o rank):
+//     linha ja tratada nesta drenagem que reaparece adiante e pulada;
+//   - triagem em lotes adaptativos (batcher.ts) e analise dos finalistas em
+//     paralelo, com teto de concorrencia;
+//   - para quando acaba o tempo OU o orcamento de tokens — o que nao comecou
+//     fica na fila, intocado, para a proxima drenagem;
+//   - cada pagina e assentada NO LUGAR (settleQuarantine): saiu, ou ganhou +1
+//     tentativa. Provedor fora nao conta tentativa — a culpa nao e do item.
+//
+// Sem banco e sem modelo aqui: tudo entra por `DrenagemDeps`. O entrypoint
+// (drain.ts) liga no Supabase; a prova (test/prova-drenagem.ts) liga numa fila
+// falsa.
+// ============================================================================
+import { pool } from "./util.js";
+import type { QuarantineRow, QuarantineCursor } from "./db.js";
+import type { RawItem, TriageResult } from "./types.js";
+
+export type DrenagemDeps = {
+  page: (after: QuarantineCursor | null, size: number) => Promise<QuarantineRow[]>;
+  triage: (items: RawItem[]) => Promise<{ results: TriageResult[]; failed: { idx: number; reason: string }[] }>;
+  // true = achado gravado; false = ja existia (dedup). Lancar = volta para a fila.
+  analisar: (row: QuarantineRow, it: RawItem) => Promise<boolean>;
+  settle: (doneIds: number[], retryIds: number[], reason: string | null) => Promise<{ processed: number; retried: number; dead: number }>;
+  tokens: () => number; // tokens gastos desde o inicio da drenagem
+};
+
+export type DrenagemOpts = {
+  pageSize: number;
+  concurrency: number;
+  maxMs: number;
+  tokenBudget: number;
+  finalistsCap: number;
+  now?: () => number;
+};
+
+export type DrenagemStats = {
+  paginas: number;
+  lidos: number;
+  drenados: number; // sairam da fila (triados, analisados ou dedup)
+  retentados: number; // +1 tentativa, seguem na fila
+  mortos: number; // sairam no teto de tentativas
+  achados: number;
+  intocados: number; // nao chegaram a comecar: orcamento acabou
+  ms: number;
+  parada: "fila vazia" | "tempo" | "tokens" | "triagem caiu";
+};
+
+// Linha da fila -> item da caca. A caca diaria (index.ts) usa o mesmo molde.
+export function itemDaFila(q: QuarantineRow): RawItem {
+  return { source: q.source, url: q.url, title: q.raw_payload?.title ?? q.url, rawText: q.raw_payload?.rawText ?? "" };
+}
+
+export async function drenar(deps: DrenagemDeps, o: DrenagemOpts): Promise<DrenagemStats> {
+  const now = o.now ?? Date.now;
+  const inicio = now();
+  const st: DrenagemStats = { paginas: 0, lidos: 0, drenados: 0, retentados: 0, mortos: 0, achados: 0, intocados: 0, ms: 0, parada: "fila vazia" };
+  const esgotou = (): DrenagemStats["parada"] | null => {
+    if (now() - inicio >= o.maxMs) return "tempo";
+    if (o.tokenBudget > 0 && deps.tokens() >= o.tokenBudget) return "tokens";
+    return null;
+  };
+
+  let after: QuarantineCursor | null = null;
+  const tratadas = new Set<number>();
+  for (;;) {
+    const motivo = esgotou();
+    if (motivo) {
+      st.parada = motivo;
+      break;
+    }
+    const pagina = await deps.page(after, o.pageSize);
+    if (!pagina.length) break;
+    const ultima = pagina[pagina.length - 1];
+    after = { created_at: ultima.created_at, reason_rank: ultima.reason_rank, source: ultima.source, id: ultima.id };
+    const rows = pagina.filter((r) => !tratadas.has(r.id));
+    if (!rows.length) continue;
+    for (const r of rows) tratadas.add(r.id);
+    st.paginas++;
+    st.lidos += rows.length;
+    const items = rows.map(itemDaFila);
+
+    let t: Awaited<ReturnType<DrenagemDeps["triage"]>>;
+    try {
+      t = await deps.triage(items);
+    } catch (e) {
+      // Provedor fora: a pagina fica como esta, sem gastar tentativa.
+      console.error("[drain] triagem caiu — pagina intocada:", String(e).slice(0, 160));
+      st.intocados += rows.length;
+      st.parada = "triagem caiu";
+      break;
+    }
+
+    const done: number[] = [];
+    const retry = new Map<string, number[]>();
+    const retentar = (id: number, reason: string) => retry.set(reason, [...(retry.get(reason) ?? []), id]);
+
+    const falhos = new Set<number>();
+    for (const f of t.failed) {
+      falhos.add(f.idx);
+      retentar(rows[f.idx].id, f.reason);
+    }
+    const vistos = new Set(t.results.map((r) => r.idx));
+    // Sem veredito e sem falha declarada: o modelo pulou o item.
+    rows.forEach((r, i) => {
+      if (!vistos.has(i) && !falhos.has(i)) retentar(r.id, "schema");
+    });
+
+    const kept = t.results.filter((r) => r.verdict !== "lixo" && !r.has_personal_data).sort((a, b) => b.score - a.score);
+    const finalistas = kept.slice(0, o.finalistsCap);
+    const finalIdx = new Set(finalistas.map((f) => f.idx));
+    for (const r of t.results) if (!finalIdx.has(r.idx)) done.push(rows[r.idx].id);
+
+    const feitos = await pool(
+      finalistas,
+      o.concurrency,
+      async (f) => {
+        const row = rows[f.idx];
+        try {
+          if (await deps.analisar(row, items[f.idx])) st.achados++;
+          done.push(row.id);
+        } catch (e) {
+          console.error("[drain] analise falhou:", row.url, String(e).slice(0, 160));
+          retentar(row.id, "llm_down");
+        }
+        return true;
+      },
+      () => esgotou() !== null
+    );
+    st.intocados += feitos.filter((x) => x === undefined).length;
+
+    const a = await deps.settle(done, [], null);
+    st.drenados += a.processed;
+    for (const [reason, ids] of retry) {
+      const r = await deps.settle([], ids, reason);
+      st.retentados += r.retried - r.dead;
+      st.mortos += r.dead;
+    }
+  }
+
+  st.ms = now() - inicio;
+  return st;
+}
+
+// Itens (drenados + mortos) por minuto de relogio.
+export function taxaDrenagem(st: DrenagemStats): number {
+  const min = st.ms / 60_000;
+  return min > 0 ? Math.round(((st.drenados + st.mortos) / min) * 10) / 10 : 0;
+}
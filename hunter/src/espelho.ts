@@ -14,7 +14,9 @@
 import {
   db,
   getHuntsSince,
-  getFindingsSince,
+  sourceRollup,
+  calibrationRollup,
+  getDivergentes,
   getActiveMissionOrThrow,
   maxMissionVersion,
   insertMissionProposal,
@@ -22,6 +24,8 @@ import {
   ESPELHO_AUTOR,
   createIssue,
   type FindingJulgado,
+  type SourceDaily,
+  type CalibrationDaily,
 } from "./db.js";
 import { writeEspelho, type PorFonte, type Calibracao } from "./espelho-report.js";
 import { NL, todayUTC } from "./util.js";
@@ -36,21 +40,43 @@ const JANELA_DIAS = Number(process.env.HUNTER_ESPELHO_DIAS || 7);
 
 const JULGADOS = ["adopt", "watch", "discard"];
 
-export function medirPorFonte(fs: FindingJulgado[]): PorFonte[] {
+// ── CONTADORES ──────────────────────────────────────────────────────────────
+// Em producao o Espelho le os contadores que o banco mantem por trigger
+// (hunter_source_daily / hunter_calibration_daily). medirPorFonte e
+// medirCalibracao rolam os achados na MESMA forma e passam pelo mesmo
+// caminho — a prova mede exatamente o que a producao mede.
+export function faixa(relevance: number): CalibrationDaily["band"] {
+  return relevance >= 71 ? "alto" : relevance >= 41 ? "medio" : "baixo";
+}
+
+export function rolarFontes(fs: FindingJulgado[]): SourceDaily[] {
+  return fs.map((f) => ({
+    source: f.source,
+    trazidos: 1,
+    adopt: f.verdict === "adopt" ? 1 : 0,
+    watch: f.verdict === "watch" ? 1 : 0,
+    discard: f.verdict === "discard" ? 1 : 0,
+    pending: f.verdict === "pending" ? 1 : 0,
+  }));
+}
+
+export function rolarCalibracao(fs: FindingJulgado[]): CalibrationDaily[] {
+  return fs.map((f) => ({ band: faixa(f.relevance), single_source: f.single_source, verdict: f.verdict, n: 1 }));
+}
+
+export function porFonteDoRollup(rows: SourceDaily[]): PorFonte[] {
   const mapa = new Map<string, PorFonte>();
-  for (const f of fs) {
-    const cur = mapa.get(f.source) ?? { fonte: f.source, trazidos: 0, julgados: 0, adopt: 0, watch: 0, discard: 0, pending: 0, taxaAdocao: null, taxaDescarte: null, suficiente: false };
-    cur.trazidos++;
-    if (f.verdict === "pending") cur.pending++;
-    if (JULGADOS.includes(f.verdict)) {
-      cur.julgados++;
-      if (f.verdict === "adopt") cur.adopt++;
-      else if (f.verdict === "watch") cur.watch++;
-      else cur.discard++;
-    }
-    mapa.set(f.source, cur);
+  for (const r of rows) {
+    const cur = mapa.get(r.source) ?? { fonte: r.source, trazidos: 0, julgados: 0, adopt: 0, watch: 0, discard: 0, pending: 0, taxaAdocao: null, taxaDescarte: null, suficiente: false };
+    cur.trazidos += Number(r.trazidos);
+    cur.adopt += Number(r.adopt);
+    cur.watch += Number(r.watch);
+    cur.discard += Number(r.discard);
+    cur.pending += Number(r.pending);
+    mapa.set(r.source, cur);
   }
   for (const v of mapa.values()) {
+    v.julgados = v.adopt + v.watch + v.discard;
     v.suficiente = v.julgados >= MIN_VEREDITOS_FONTE;
     // Taxa so existe com denominador. Sem veredito, e null — nunca 0%.
     v.taxaAdocao = v.julgados ? v.adopt / v.julgados : null;
@@ -59,31 +85,38 @@ export function medirPorFonte(fs: FindingJulgado[]): PorFonte[] {
   return [...mapa.values()].sort((a, b) => b.trazidos - a.trazidos);
 }
 
-export function medirCalibracao(fs: FindingJulgado[]): Calibracao {
-  const julgados = fs.filter((f) => JULGADOS.includes(f.verdict));
+// `divergentes`: achados julgados da janela que contradizem a faixa (alto
+// descartado, baixo adotado). Vem do indice parcial, nunca da janela inteira.
+export function calibracaoDoRollup(rows: CalibrationDaily[], divergentes: FindingJulgado[]): Calibracao {
   // Faixas historicas do HUNTER (a antiga suggest(): >=71 ADOTAR · 41-70 OBSERVAR
   // · <41 DESCARTAR). suggest() foi REMOVIDA — o limiar de 71 ficava abaixo do
   // piso da triagem (72), entao 100% dos achados saiam sugeridos como ADOTAR.
   // As faixas seguem valendo AQUI, onde medem calibracao contra o veredito real
   // do tribunal: e a unica leitura em que o numero tem significado.
-  const superestimou = julgados.filter((f) => f.relevance >= 71 && f.verdict === "discard");
-  const subestimou = julgados.filter((f) => f.relevance < 41 && f.verdict === "adopt");
-  const acertouAlto = julgados.filter((f) => f.relevance >= 71 && f.verdict === "adopt");
-  // Regra da missao v2: fonte unica + baixa tracao = teto de OBSERVAR.
-  // O schema NAO guarda tracao (estrelas/pontos) — so single_source. Medimos
-  // a metade que existe e declaramos a outra como NAO VERIFICAVEL.
-  const fonteUnicaAcimaDoTeto = julgados.filter((f) => f.single_source && f.relevance >= 71);
-  const fonteUnicaAdotada = fonteUnicaAcimaDoTeto.filter((f) => f.verdict === "adopt");
+  const soma = (p: (r: CalibrationDaily) => boolean) => rows.filter(p).reduce((s, r) => s + Number(r.n), 0);
+  const julgado = (r: CalibrationDaily) => JULGADOS.includes(r.verdict);
+  const div = (f: FindingJulgado) => ({ id: f.id, rel: f.relevance, fonte: f.source, titulo: f.title });
   return {
-    julgados: julgados.length,
-    superestimou: superestimou.map((f) => ({ id: f.id, rel: f.relevance, fonte: f.source, titulo: f.title })),
-    subestimou: subestimou.map((f) => ({ id: f.id, rel: f.relevance, fonte: f.source, titulo: f.title })),
-    acertouAlto: acertouAlto.length,
-    fonteUnicaAcimaDoTeto: fonteUnicaAcimaDoTeto.length,
-    fonteUnicaAdotada: fonteUnicaAdotada.length,
+    julgados: soma(julgado),
+    superestimou: divergentes.filter((f) => f.relevance >= 71 && f.verdict === "discard").map(div),
+    subestimou: divergentes.filter((f) => f.relevance < 41 && f.verdict === "adopt").map(div),
+    acertouAlto: soma((r) => r.band === "alto" && r.verdict === "adopt"),
+    // Regra da missao v2: fonte unica + baixa tracao = teto de OBSERVAR.
+    // O schema NAO guarda tracao (estrelas/pontos) — so single_source. Medimos
+    // a metade que existe e declaramos a outra como NAO VERIFICAVEL.
+    fonteUnicaAcimaDoTeto: soma((r) => r.single_source && r.band === "alto" && julgado(r)),
+    fonteUnicaAdotada: soma((r) => r.single_source && r.band === "alto" && r.verdict === "adopt"),
   };
 }
 
+export function medirPorFonte(fs: FindingJulgado[]): PorFonte[] {
+  return porFonteDoRollup(rolarFontes(fs));
+}
+
+export function medirCalibracao(fs: FindingJulgado[]): Calibracao {
+  return calibracaoDoRollup(rolarCalibracao(fs), fs.filter((f) => JULGADOS.includes(f.verdict)));
+}
+
 export type Veredito = { propoe: boolean; motivo: string; achados: string[] };
 
 // A decisao de propor ou nao. Isolada de proposito: e o que o teste crava.
@@ -117,14 +150,15 @@ export function decidir(porFonte: PorFonte[], cal: Calibracao): Veredito {
 async function main() {
   const sb = db();
   const desde = new Date(Date.now() - JANELA_DIAS * 86400000).toISOString();
+  // Os contadores sao por dia (UTC): a janela comeca no dia inteiro.
+  const desdeDia = desde.slice(0, 10);
   const hoje = todayUTC();
 
   const missao = await getActiveMissionOrThrow(sb);
   const hunts = await getHuntsSince(sb, desde);
-  const finds = await getFindingsSince(sb, desde);
-
-  const porFonte = medirPorFonte(finds);
-  const cal = medirCalibracao(finds);
+  const porFonte = porFonteDoRollup(await sourceRollup(sb, desdeDia));
+  const cal = calibracaoDoRollup(await calibrationRollup(sb, desdeDia), await getDivergentes(sb, desdeDia));
+  const totalFindings = porFonte.reduce((s, f) => s + f.trazidos, 0);
   const v = decidir(porFonte, cal);
 
   let propostaId: number | null = null;
@@ -161,7 +195,7 @@ async function main() {
     janelaDias: JANELA_DIAS,
     missaoAtiva: missao.version,
     hunts: hunts.map((h: any) => ({ id: h.id, status: h.status, itemsSeen: h.items_seen, itemsKept: h.items_kept, custo: Number(h.cost_usd ?? 0) })),
-    totalFindings: finds.length,
+    totalFindings,
     porFonte,
     cal,
     veredito: v,
@@ -0,0 +1,84 @@
+// ============================================================================
+// UM FINALISTA, DO EMBEDDING AO BANCO
+// ============================================================================
+// Passos 'e' a 'g' da liturgia, compartilhados pela caca diaria (index.ts) e
+// pela drenagem da quarentena (drain.ts): dedup semantica -> analise ->
+// achado -> issue de ameaca -> arestas/alma.
+//
+// Lanca se a analise ou o insert falharem (o chamador manda para a
+// quarentena). Devolve null quando o item ja existe no banco (dedup).
+// ============================================================================
+import type { SupabaseClient } from "@supabase/supabase-js";
+import { matchFinding, insertFinding, insertEdges, insertSoul, openThreatIssue, THREAT_RELEVANCE_MIN } from "./db.js";
+import { analyze, embed } from "./ai.js";
+import { config } from "./config.js";
+import { NL } from "./util.js";
+import type { ResponseCache } from "./cache.js";
+import type { ReportItem } from "./report.js";
+import type { RawItem } from "./types.js";
+
+export async function analisarEGravar(
+  sb: SupabaseClient,
+  huntId: number | null,
+  it: RawItem,
+  cache: ResponseCache | null,
+  issuesConhecidas: Set<string>
+): Promise<{ item: ReportItem | null; notas: string[] }> {
+  const notas: string[] = [];
+  if (config.simulateAnalysisFailure()) throw new Error("SIMULACAO: falha de analise provocada (teste Lei 8)");
+  const vec = await embed(it.title + NL + it.rawText);
+  if (await matchFinding(sb, vec, config.dedupThreshold())) return { item: null, notas };
+  const a = await analyze(it, cache);
+  // insertFinding e a FRONTEIRA de sucesso: se gravou, o achado conta.
+  const fid = await insertFinding(sb, {
+    hunt_id: huntId,
+    kind: a.kind,
+    title: it.title,
+    url: it.url,
+    source: it.source,
+    summary_md: a.summary_md,
+    relevance: a.relevance,
+    relevance_why: a.relevance_why,
+    single_source: a.single_source,
+    license: a.license ?? null,
+    embedding: JSON.stringify(vec),
+  });
+  const item: ReportItem = {
+    relevance: a.relevance,
+    kind: a.kind,
+    title: it.title,
+    source: it.source,
+    url: it.url,
+    summary_md: a.summary_md,
+    single_source: a.single_source,
+    license: a.license ?? null,
+  };
+
+  // FASE 3 · peca 3 — AMEACA ABRE ISSUE NA MESMA CACA, sem esperar o
+  // relatorio. Best-effort: falha aqui nao derruba o achado ja salvo.
+  if (a.kind === "threat" && a.relevance >= THREAT_RELEVANCE_MIN) {
+    try {
+      const r = await openThreatIssue(issuesConhecidas, {
+        title: it.title,
+        url: it.url,
+        source: it.source,
+        relevance: a.relevance,
+        relevance_why: a.relevance_why,
+        summary_md: a.summary_md,
+      });
+      console.log("[hunter] ameaca rel=" + a.relevance + " · " + r.reason + (r.issueUrl ? " · " + r.issueUrl : "") + " · " + it.title);
+    } catch (te) {
+      console.error("[hunter] issue de ameaca falhou:", it.url, String(te));
+      notas.push("issue de ameaca NAO ABERTA para: " + it.title.slice(0, 60));
+    }
+  }
+
+  // Arestas e alma sao BEST-EFFORT: sua falha nao derruba o achado ja salvo.
+  try {
+    await insertEdges(sb, fid, a.edges);
+    if (a.kind === "soul" && a.soul) await insertSoul(sb, fid, a.soul);
+  } catch (ee) {
+    console.error("[hunter] arestas/alma falharam (finding salvo):", it.url, String(ee));
+  }
+  return { item, notas };
+}
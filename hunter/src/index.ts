@@ -3,25 +3,29 @@ import {
   getActiveMission,
   createHunt,
   closeHunt,
+  getHunt,
   getQuarantine,
+  queuedUrls,
   enqueueRaw,
-  markProcessed,
-  matchFinding,
-  insertFinding,
-  insertEdges,
-  insertSoul,
+  settleQuarantine,
+  getHuntFinding,
   createIssue,
   getPendingFindings,
   existingHunterIssueTitles,
-  openThreatIssue,
-  THREAT_RELEVANCE_MIN,
+  evictLlmCache,
+  deleteCheckpoints,
 } from "./db.js";
 import { collectAll } from "./sources.js";
-import { triageBatch, analyze, embed, cost } from "./ai.js";
+import { cost } from "./ai.js";
+import { analisarEGravar } from "./finding.js";
+import { itemDaFila } from "./drenagem.js";
+import { triageAll } from "./batcher.js";
+import { tableCache } from "./cache.js";
+import { resumeArg, loadRetomada, checkpoint, type Retomada } from "./checkpoint.js";
 import { writeReport, type ReportItem, type PendingItem } from "./report.js";
 import { config } from "./config.js";
-import { todayUTC, NL } from "./util.js";
-import type { RawItem } from "./types.js";
+import { todayUTC } from "./util.js";
+import type { RawItem, TriageResult } from "./types.js";
 
 // FASE 3 · peca 2: a fila pendente nunca derruba a caca — se a query falhar,
 // o relatorio sai com a secao vazia e a falha vira NAO VERIFICADO (Lei 7).
@@ -84,12 +88,30 @@ async function finalize(sb: any, huntId: number, r: Fin) {
     report_path: reportPath,
     notes: r.failNotes.join(" · ") || null,
   });
-  console.log("Caca " + r.date + " status=" + r.status + " vistos=" + r.itemsSeen + " trazidos=" + r.itemsKept + " quarentena=" + r.itemsQueued + " custo=US$" + costUsd.toFixed(4));
+  console.log("Caca " + r.date + " status=" + r.status + " vistos=" + r.itemsSeen + " trazidos=" + r.itemsKept + " quarentena=" + r.itemsQueued + " custo=US$" + costUsd.toFixed(4) + " economia-cache=US$" + cost.savedUsd().toFixed(4));
+
+  // Caca fechada: os checkpoints ja nao servem para nada.
+  try {
+    await deleteCheckpoints(sb, huntId);
+  } catch (e) {
+    console.error("[hunter] limpeza dos checkpoints falhou:", String(e));
+  }
+
+  // Despejo do cache (TTL + teto de linhas). Best-effort: a caca ja fechou.
+  if (config.cacheEnabled()) {
+    try {
+      const n = await evictLlmCache(sb, config.cacheMaxRows());
+      if (n) console.log("[hunter] cache: " + n + " resposta(s) despejada(s)");
+    } catch (e) {
+      console.error("[hunter] despejo do cache falhou:", String(e));
+    }
+  }
 }
 
 async function main() {
   const date = todayUTC();
   const sb = db();
+  const resumeId = resumeArg();
 
   const mission = await getActiveMission(sb);
   if (!mission) {
@@ -102,8 +124,22 @@ async function main() {
   }
   if (mission.scoring_rules) process.env.HUNTER_SCORING_HINT = JSON.stringify(mission.scoring_rules).slice(0, 1500);
 
-  const huntId = await createHunt(sb, mission.id);
+  // Retomada: a MESMA linha de hunter_hunts. 'running' = o processo morreu;
+  // 'failed' = lancou e fechou. done/partial nao reabre — o relatorio ja saiu.
+  let huntId: number;
+  let ret: Retomada = {};
+  if (resumeId) {
+    const h = await getHunt(sb, resumeId);
+    if (!h) throw new Error("--resume " + resumeId + ": caca nao existe");
+    if (h.status !== "running" && h.status !== "failed") throw new Error("--resume " + resumeId + ": caca ja fechada (status=" + h.status + ") — nada a retomar");
+    huntId = h.id;
+    ret = await loadRetomada(sb, huntId);
+    console.log("[hunter] retomando caca #" + huntId + " · etapas salvas: " + (Object.keys(ret).join(", ") || "nenhuma") + " · " + cost.tokensNote());
+  } else {
+    huntId = await createHunt(sb, mission.id);
+  }
   const failNotes: string[] = [];
+  const cache = config.cacheEnabled() ? tableCache(sb) : null;
 
   // FASE 3 · peca 3: titulos de issues 'hunter' ja abertas, para nao duplicar.
   let issuesConhecidas = new Set<string>();
@@ -119,139 +155,159 @@ async function main() {
   }
 
   try {
-    const quarantine = await getQuarantine(sb);
-    const quarantineItems: RawItem[] = quarantine.map((q: any) => ({
-      source: q.source,
-      url: q.url,
-      title: q.raw_payload?.title ?? q.url,
-      rawText: q.raw_payload?.rawText ?? "",
-    }));
-    const quarantineIds: number[] = quarantine.map((q: any) => q.id);
+    let coleta = ret.collected;
+    if (!coleta) {
+      const quarantine = await getQuarantine(sb);
+      const quarantineItems: RawItem[] = quarantine.map(itemDaFila);
+      const quarantineIds: number[] = quarantine.map((q) => q.id);
 
-    const results = await collectAll();
-    let sourcesOk = 0;
-    let sourcesFail = 0;
-    const fresh: RawItem[] = [];
-    for (const r of results) {
-      if (r.ok) {
-        sourcesOk++;
-        fresh.push(...r.items);
-      } else {
-        sourcesFail++;
-        failNotes.push(r.source + " (" + (r.error ?? "falha") + ")");
+      const results = await collectAll();
+      let sourcesOk = 0;
+      let sourcesFail = 0;
+      const fresh: RawItem[] = [];
+      const notasFonte: string[] = [];
+      for (const r of results) {
+        if (r.ok) {
+          sourcesOk++;
+          fresh.push(...r.items);
+        } else {
+          sourcesFail++;
+          notasFonte.push(r.source + " (" + (r.error ?? "falha") + ")");
+        }
       }
+      coleta = { items: [...quarantineItems, ...fresh], quarantineIds, sourcesOk, sourcesFail, failNotes: notasFonte };
+      await checkpoint(sb, huntId, "collected", coleta);
     }
-
-    const all = [...quarantineItems, ...fresh];
+    failNotes.push(...coleta.failNotes);
+    const { quarantineIds, sourcesOk, sourcesFail } = coleta;
+    const all = coleta.items;
     const itemsSeen = all.length;
 
     const cap = config.triageCap();
     const toTriage = all.slice(0, cap);
     const overflow = all.slice(cap);
-    let itemsQueued = 0;
-    for (const it of overflow) {
-      await enqueueRaw(sb, huntId, it.source, it.url, it, "rate");
-      itemsQueued++;
-    }
 
-    const triage: { idx: number; verdict: string; score: number; has_personal_data: boolean }[] = [];
-    try {
-      for (let i = 0; i < toTriage.length; i += 25) {
-        const batch = toTriage.slice(i, i + 25);
-        const res = await triageBatch(batch);
-        for (const t of res) triage.push({ idx: t.idx + i, verdict: t.verdict, score: t.score, has_personal_data: t.has_personal_data });
+    // Os primeiros itens vieram da quarentena: item -> linha de origem.
+    const origem = new Map<RawItem, number>();
+    quarantineIds.forEach((id, i) => origem.set(all[i], id));
+
+    // Item que JA e da quarentena e falha de novo nao vira linha nova: ganha
+    // +1 tentativa na propria linha (assentado no fim, em settleQuarantine).
+    // Item fresco entra uma vez so — na retomada, o que ja entrou antes da
+    // queda nao entra de novo.
+    const retentados = new Map<number, string>([...(ret.triaged?.retried ?? []), ...(ret.analysis?.retried ?? [])]);
+    const enfileirados = resumeId ? await queuedUrls(sb, huntId) : new Set<string>();
+    const enfileirar = async (it: RawItem, reason: string) => {
+      const qid = origem.get(it);
+      if (qid !== undefined) {
+        retentados.set(qid, reason);
+        return;
       }
-    } catch (e) {
-      for (const it of toTriage) {
-        await enqueueRaw(sb, huntId, it.source, it.url, it, "llm_down");
-        itemsQueued++;
+      if (enfileirados.has(it.url)) return;
+      await enqueueRaw(sb, huntId, it.source, it.url, it, reason);
+      enfileirados.add(it.url);
+    };
+    // O que passou do triageCap: fresco vai para a fila; o da quarentena
+    // simplesmente FICA nela, intocado — nada de reinserir.
+    const intocados = overflow.filter((it) => origem.has(it)).length;
+    for (const it of overflow) if (!origem.has(it)) await enfileirar(it, "rate");
+    const itemsQueued = () => enfileirados.size + retentados.size + intocados;
+
+    // Fecha a conta da quarentena numa ida ao banco por motivo: o que foi
+    // triado sai; o que falhou de novo fica, com +1 tentativa.
+    const assentarQuarentena = async () => {
+      const triados = quarantineIds.slice(0, Math.min(cap, quarantineIds.length));
+      const done = triados.filter((id) => !retentados.has(id));
+      const porMotivo = new Map<string, number[]>();
+      for (const [id, reason] of retentados) porMotivo.set(reason, [...(porMotivo.get(reason) ?? []), id]);
+      let mortos = 0;
+      const max = config.quarantineMaxAttempts();
+      mortos += (await settleQuarantine(sb, done, [], null, max)).dead;
+      for (const [reason, ids] of porMotivo) mortos += (await settleQuarantine(sb, [], ids, reason, max)).dead;
+      if (mortos) failNotes.push("quarentena: " + mortos + " item(ns) descartado(s) apos " + max + " tentativas");
+    };
+
+    let triage: TriageResult[];
+    if (ret.triaged) {
+      triage = ret.triaged.triage;
+      failNotes.push(...ret.triaged.failNotes);
+    } else {
+      try {
+        // Lotes adaptativos: 429/schema bissectam o lote e so o item que falha
+        // sozinho vai para a quarentena (ver src/batcher.ts).
+        const t = await triageAll(toTriage, cache);
+        triage = t.results;
+        for (const f of t.failed) await enfileirar(toTriage[f.idx], f.reason);
+        const notas = t.failed.length ? ["triagem: " + t.failed.length + " item(ns) para a quarentena apos bisseccao (" + t.stats.falhas + " lote(s) falharam)"] : [];
+        failNotes.push(...notas);
+        console.log(
+          "[hunter] triagem: " + t.stats.lotes + " lote(s) · " + t.stats.bisseccoes + " bisseccao(oes) · orcamento final " + t.stats.orcamentoFinal + " tokens · " + t.stats.tpmMedido + " tokens/min" + (t.stats.tpmTeto ? " (teto aprendido " + t.stats.tpmTeto + ")" : "")
+        );
+        await checkpoint(sb, huntId, "triaged", { triage, failNotes: notas, retried: [...retentados] });
+      } catch (e) {
+        for (const it of toTriage) await enfileirar(it, "llm_down");
+        failNotes.push("triagem caiu: " + String(e));
+        console.error("[hunter] triagem caiu:", String(e));
+        await assentarQuarentena();
+        await finalize(sb, huntId, { date, itemsSeen, itemsKept: 0, itemsQueued: itemsQueued(), sourcesOk, sourcesFail, failNotes, status: "partial", findings: [], ...(await pendentesFin(sb, huntId, failNotes)) });
+        return;
       }
-      failNotes.push("triagem caiu: " + String(e));
-      console.error("[hunter] triagem caiu:", String(e));
-      await markProcessed(sb, quarantineIds);
-      await finalize(sb, huntId, { date, itemsSeen, itemsKept: 0, itemsQueued, sourcesOk, sourcesFail, failNotes, status: "partial", findings: [], ...(await pendentesFin(sb, huntId, failNotes)) });
-      return;
     }
 
     const kept = triage.filter((t) => t.verdict !== "lixo" && !t.has_personal_data).sort((a, b) => b.score - a.score);
     const finalists = kept.slice(0, config.finalistsCap());
 
-    const reportItems: ReportItem[] = [];
-    let analysisFailed = false;
-    let itemsKept = 0;
+    const prev = ret.analysis;
+    const done = new Set<number>(prev?.done ?? []);
+    const reportItems: ReportItem[] = prev?.findings ?? [];
+    let analysisFailed = prev?.analysisFailed ?? false;
+    let itemsKept = prev?.itemsKept ?? 0;
+    const notasAnalise: string[] = prev?.failNotes ?? [];
+    if (prev) console.log("[hunter] retomada: " + done.size + "/" + finalists.length + " finalista(s) ja resolvido(s)");
+
     for (const t of finalists) {
       const it = toTriage[t.idx];
-      if (!it) continue;
+      if (!it || done.has(t.idx)) continue;
       try {
-        if (config.simulateAnalysisFailure()) throw new Error("SIMULACAO: falha de analise provocada (teste Lei 8)");
-        const vec = await embed(it.title + NL + it.rawText);
-        if (await matchFinding(sb, vec, config.dedupThreshold())) continue;
-        const a = await analyze(it);
-        // insertFinding e a FRONTEIRA de sucesso: se gravou, o achado conta.
-        const fid = await insertFinding(sb, {
-          hunt_id: huntId,
-          kind: a.kind,
-          title: it.title,
-          url: it.url,
-          source: it.source,
-          summary_md: a.summary_md,
-          relevance: a.relevance,
-          relevance_why: a.relevance_why,
-          single_source: a.single_source,
-          license: a.license ?? null,
-          embedding: JSON.stringify(vec),
-        });
-        itemsKept++;
-        reportItems.push({
-          relevance: a.relevance,
-          kind: a.kind,
-          title: it.title,
-          source: it.source,
-          url: it.url,
-          summary_md: a.summary_md,
-          single_source: a.single_source,
-          license: a.license ?? null,
-        });
-        // FASE 3 · peca 3 — AMEACA ABRE ISSUE NA MESMA CACA, sem esperar o
-        // relatorio. Best-effort: falha aqui nao derruba o achado ja salvo.
-        if (a.kind === "threat" && a.relevance >= THREAT_RELEVANCE_MIN) {
-          try {
-            const r = await openThreatIssue(issuesConhecidas, {
-              title: it.title,
-              url: it.url,
-              source: it.source,
-              relevance: a.relevance,
-              relevance_why: a.relevance_why,
-              summary_md: a.summary_md,
-            });
-            console.log("[hunter] ameaca rel=" + a.relevance + " · " + r.reason + (r.issueUrl ? " · " + r.issueUrl : "") + " · " + it.title);
-          } catch (te) {
-            console.error("[hunter] issue de ameaca falhou:", it.url, String(te));
-            failNotes.push("issue de ameaca NAO ABERTA para: " + it.title.slice(0, 60));
+        // Caiu logo depois de gravar? O achado ja esta no banco: recupera
+        // para o relatorio e nao insere de novo.
+        const gravado = resumeId ? await getHuntFinding(sb, huntId, it.url) : null;
+        if (gravado) {
+          itemsKept++;
+          reportItems.push({
+            relevance: gravado.relevance,
+            kind: gravado.kind,
+            title: gravado.title,
+            source: gravado.source,
+            url: gravado.url,
+            summary_md: gravado.summary_md,
+            single_source: gravado.single_source,
+            license: gravado.license ?? null,
+          });
+        } else {
+          const r = await analisarEGravar(sb, huntId, it, cache, issuesConhecidas);
+          notasAnalise.push(...r.notas);
+          if (r.item) {
+            itemsKept++;
+            reportItems.push(r.item);
           }
         }
-
-        // Arestas e alma sao BEST-EFFORT: sua falha nao derruba o achado ja salvo.
-        try {
-          await insertEdges(sb, fid, a.edges);
-          if (a.kind === "soul" && a.soul) await insertSoul(sb, fid, a.soul);
-        } catch (ee) {
-          console.error("[hunter] arestas/alma falharam (finding salvo):", it.url, String(ee));
-        }
       } catch (e) {
         console.error("[hunter] finding falhou:", it.url, String(e));
-        await enqueueRaw(sb, huntId, it.source, it.url, it, "llm_down");
-        itemsQueued++;
+        await enfileirar(it, "llm_down");
         analysisFailed = true;
       }
+      done.add(t.idx);
+      await checkpoint(sb, huntId, "analysis", { done: [...done], findings: reportItems, itemsKept, analysisFailed, failNotes: notasAnalise, retried: [...retentados] });
     }
+    failNotes.push(...notasAnalise);
 
-    await markProcessed(sb, quarantineIds);
+    await assentarQuarentena();
     await finalize(sb, huntId, {
       date,
       itemsSeen,
       itemsKept,
-      itemsQueued,
+      itemsQueued: itemsQueued(),
       sourcesOk,
       sourcesFail,
       failNotes,
@@ -260,8 +316,9 @@ async function main() {
       ...(await pendentesFin(sb, huntId, failNotes)),
     });
   } catch (e) {
+    // Os checkpoints ficam: `--resume <id>` retoma esta caca de onde parou.
     await closeHunt(sb, huntId, { status: "failed", notes: String(e), cost_usd: Number(cost.usd().toFixed(4)) });
-    console.error("Caca falhou:", e);
+    console.error("Caca falhou (retomar com --resume " + huntId + "):", e);
     process.exit(1);
   }
 }
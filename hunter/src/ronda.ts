@@ -6,11 +6,11 @@
 // (ou o workflow ronda-hunter.yml) roda `npm run ronda` e recebe a prova.
 //
 // Lei da Contra-Prova: cada checagem compara o que o canon PROMETE com o que
-// o mundo vivo ENTREGA. Nada aqui e opiniao — sao tres queries reais.
+// o mundo vivo ENTREGA. Nada aqui e opiniao — sao queries reais.
 //
 // Read-only por lei: detecta e relata. Nao corrige, nao escreve, nao deleta.
 // ============================================================================
-import { db, lastFinishedHunt, quarantineDepth, anonReadsHunterTables, createIssue, recentHunts, streakVazio } from "./db.js";
+import { db, rondaStats, quarantineStats, anonReadsHunterTables, createIssue, type RondaStats } from "./db.js";
 import { config } from "./config.js";
 import { NL } from "./util.js";
 
@@ -24,6 +24,14 @@ function tetoQuarentena(): number {
   return Number.isFinite(n) && n > 0 ? n : 500;
 }
 const QUARENTENA_TETO = tetoQuarentena();
+
+// Mesmo cuidado com string vazia. Idade maxima (h) do item mais antigo da fila.
+function idadeMaxQuarentena(): number {
+  const v = (process.env.HUNTER_QUARANTINE_MAX_AGE_H ?? "").trim();
+  const n = v ? Number(v) : NaN;
+  return Number.isFinite(n) && n > 0 ? n : 72;
+}
+const QUARENTENA_IDADE_MAX_H = idadeMaxQuarentena();
 const CACA_MAX_HORAS = 24;
 
 type Check = {
@@ -33,13 +41,13 @@ type Check = {
   status: "OK" | "FALHA" | "NAO VERIFICADO";
 };
 
-async function checarCacaRecente(sb: any): Promise<Check> {
+async function checarCacaRecente(stats: Promise<RondaStats>): Promise<Check> {
   const promessa = "HUNTER roda todo dia 06:30 BRT — a ultima caca fechada tem menos de " + CACA_MAX_HORAS + "h";
   try {
-    const h = await lastFinishedHunt(sb);
-    if (!h) return { nome: "HUNTER rodou nas ultimas 24h", promessa, prova: "nenhuma caca com status done/partial no banco", status: "FALHA" };
-    const horas = (Date.now() - new Date(h.finished_at).getTime()) / 3600000;
-    const detalhe = "caca #" + h.id + " status=" + h.status + " fechada ha " + horas.toFixed(1) + "h (" + h.finished_at + ")";
+    const h = await stats;
+    if (!h.lastHuntId || !h.lastFinishedAt) return { nome: "HUNTER rodou nas ultimas 24h", promessa, prova: "nenhuma caca com status done/partial no banco", status: "FALHA" };
+    const horas = (Date.now() - new Date(h.lastFinishedAt).getTime()) / 3600000;
+    const detalhe = "caca #" + h.lastHuntId + " status=" + h.lastStatus + " fechada ha " + horas.toFixed(1) + "h (" + h.lastFinishedAt + ")";
     return { nome: "HUNTER rodou nas ultimas 24h", promessa, prova: detalhe, status: horas < CACA_MAX_HORAS ? "OK" : "FALHA" };
   } catch (e) {
     return { nome: "HUNTER rodou nas ultimas 24h", promessa, prova: "query falhou: " + String(e).slice(0, 120), status: "NAO VERIFICADO" };
@@ -54,16 +62,14 @@ async function checarCacaRecente(sb: any): Promise<Check> {
 // Esta checagem pergunta a outra metade: "a caca TROUXE alguma coisa?".
 // Custo zero e a prova de que a analise nem chegou a rodar — uma caca que
 // pensou custa dinheiro. Falha ja no DIA 1, nao no decimo setimo.
-async function checarColheita(sb: any): Promise<Check> {
+async function checarColheita(stats: Promise<RondaStats>): Promise<Check> {
   const promessa = "toda caca fechada traz colheita — items_kept > 0, ou custo > 0 provando que a analise rodou";
   try {
-    const hunts = await recentHunts(sb, 7);
-    if (!hunts.length) return { nome: "HUNTER trouxe colheita", promessa, prova: "nenhuma caca fechada no banco", status: "FALHA" };
-    const ultima = hunts[0];
-    const vazia = ultima.items_kept === 0 && ultima.cost_usd === 0;
-    const streak = streakVazio(hunts);
+    const u = await stats;
+    if (!u.lastHuntId) return { nome: "HUNTER trouxe colheita", promessa, prova: "nenhuma caca fechada no banco", status: "FALHA" };
+    const vazia = u.lastItemsKept === 0 && u.lastCostUsd === 0;
     const detalhe =
-      "caca #" + ultima.id + " status=" + ultima.status + " items_kept=" + ultima.items_kept + " items_queued=" + ultima.items_queued + " custo=US$ " + ultima.cost_usd.toFixed(4) + (streak > 1 ? " · " + streak + " cacas vazias seguidas" : "");
+      "caca #" + u.lastHuntId + " status=" + u.lastStatus + " items_kept=" + u.lastItemsKept + " items_queued=" + u.lastItemsQueued + " custo=US$ " + u.lastCostUsd.toFixed(4) + (u.emptyStreak > 1 ? " · " + u.emptyStreak + " cacas vazias seguidas" : "");
     return { nome: "HUNTER trouxe colheita", promessa, prova: detalhe, status: vazia ? "FALHA" : "OK" };
   } catch (e) {
     return { nome: "HUNTER trouxe colheita", promessa, prova: "query falhou: " + String(e).slice(0, 120), status: "NAO VERIFICADO" };
@@ -89,10 +95,10 @@ async function checarRls(): Promise<Check> {
   }
 }
 
-async function checarQuarentena(sb: any): Promise<Check> {
+async function checarQuarentena(stats: Promise<RondaStats>): Promise<Check> {
   const promessa = "Lei 8: a quarentena e transitoria — a caca seguinte a esvazia. Teto: " + QUARENTENA_TETO + " itens nao processados";
   try {
-    const n = await quarantineDepth(sb);
+    const n = (await stats).quarantineDepth;
     return {
       nome: "quarentena nao cresce sem limite",
       promessa,
@@ -104,9 +110,30 @@ async function checarQuarentena(sb: any): Promise<Check> {
   }
 }
 
+// Profundidade baixa nao prova que a fila anda: 50 itens presos ha um mes
+// passam no teto acima. Esta pergunta a outra metade — o mais antigo esta
+// esperando ha quanto tempo, e quanto a drenagem tirou nas ultimas 24h.
+async function checarDrenagem(sb: any): Promise<Check> {
+  const nome = "quarentena drena (nada fica preso)";
+  const promessa = "npm run drain esvazia a fila por idade — nenhum item espera mais de " + QUARENTENA_IDADE_MAX_H + "h";
+  try {
+    const s = await quarantineStats(sb, 24);
+    const idadeH = s.oldestAt ? (Date.now() - new Date(s.oldestAt).getTime()) / 3600000 : 0;
+    const prova =
+      s.depth + " na fila · mais antigo ha " + idadeH.toFixed(1) + "h · " + s.processedWindow + " drenado(s) em 24h (" + (s.processedWindow / 24).toFixed(1) + "/h)" + (s.deadWindow ? " · " + s.deadWindow + " descartado(s) no teto de tentativas" : "");
+    return { nome, promessa, prova, status: idadeH <= QUARENTENA_IDADE_MAX_H ? "OK" : "FALHA" };
+  } catch (e) {
+    return { nome, promessa, prova: "query falhou: " + String(e).slice(0, 120), status: "NAO VERIFICADO" };
+  }
+}
+
 async function main() {
   const sb = db();
-  const checks: Check[] = [await checarCacaRecente(sb), await checarColheita(sb), await checarRls(), await checarQuarentena(sb)];
+  // As tres primeiras checagens leem a MESMA linha de hunter_ronda_stats
+  // (mantida por trigger): uma query, qualquer que seja o historico.
+  const stats = rondaStats(sb);
+  stats.catch(() => {}); // cada checagem trata a falha como NAO VERIFICADO
+  const checks: Check[] = [await checarCacaRecente(stats), await checarColheita(stats), await checarRls(), await checarQuarentena(stats), await checarDrenagem(sb)];
 
   const L: string[] = [];
   L.push("=== RONDA · CHECAGENS DO HUNTER X.1 ===");
@@ -18,16 +18,18 @@ const intScore = (fallback: number) =>
       return Math.max(0, Math.min(100, Math.round(scaled)));
     });
 
+// Veredito de UM item, sem o indice do lote. E o que o cache guarda: o idx
+// so tem sentido dentro do lote que o produziu.
+export const TriageVerdictSchema = z.object({
+  verdict: z.enum(["lixo", "talvez", "ouro"]),
+  score: intScore(0),
+  has_personal_data: z.boolean().catch(false),
+});
+
 export const TriageSchema = z.object({
-  results: z.array(
-    z.object({
-      idx: z.number().int(),
-      verdict: z.enum(["lixo", "talvez", "ouro"]),
-      score: intScore(0),
-      has_personal_data: z.boolean().catch(false),
-    })
-  ),
+  results: z.array(TriageVerdictSchema.extend({ idx: z.number().int() })),
 });
+export type TriageResult = z.infer<typeof TriageSchema>["results"][number];
 
 export const EdgeSchema = z.object({
   subject: z.string(),
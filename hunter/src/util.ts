@@ -53,6 +53,21 @@ export async function fetchRetry(url: string, init: RequestInit = {}, attempts =
   throw new Error("falha apos " + attempts + " tentativas: " + String(lastErr));
 }
 
+// Roda `fn` sobre `items` com no maximo `n` em voo. `parar` e consultado antes
+// de cada item novo: o que nao comecou fica de fora (undefined no resultado).
+export async function pool<T, R>(items: T[], n: number, fn: (it: T, i: number) => Promise<R>, parar: () => boolean = () => false): Promise<(R | undefined)[]> {
+  const out: (R | undefined)[] = Array.from({ length: items.length }, () => undefined);
+  let prox = 0;
+  const trabalhador = async () => {
+    while (prox < items.length && !parar()) {
+      const i = prox++;
+      out[i] = await fn(items[i], i);
+    }
+  };
+  await Promise.all(Array.from({ length: Math.max(1, Math.min(n, items.length)) }, trabalhador));
+  return out;
+}
+
 export function since24h(): Date {
   return new Date(Date.now() - 24 * 3600 * 1000);
 }
@@ -0,0 +1,83 @@
+// ============================================================================
+// PROVA DOS NOVE — cache de respostas do LLM. Nao toca no banco nem no modelo.
+// O fetch e falso: conta quantas chamadas de chat a triagem/analise fariam.
+// ============================================================================
+import { triageBatch, analyze, cost, TRIAGE_PROMPT_VERSION } from "../src/ai.js";
+import { memoryCache, cacheKey } from "../src/cache.js";
+import type { RawItem } from "../src/types.js";
+
+const NL = String.fromCharCode(10);
+let falhas = 0;
+function ok(c: boolean, m: string) {
+  console.log((c ? "  [OK]   " : "  [FALHA]") + " " + m);
+  if (!c) falhas++;
+}
+
+process.env.HUNTER_AI_BASE_URL = "https://llm.teste";
+process.env.HUNTER_AI_API_KEY = "chave-de-teste";
+process.env.HUNTER_TRIAGE_MODEL = "triagem-teste";
+process.env.HUNTER_ANALYSIS_MODEL = "analise-teste";
+process.env.HUNTER_PRICE_TRIAGE_IN = "1";
+process.env.HUNTER_PRICE_TRIAGE_OUT = "2";
+process.env.HUNTER_PRICE_ANALYSIS_IN = "10";
+process.env.HUNTER_PRICE_ANALYSIS_OUT = "20";
+process.env.HUNTER_SCORING_HINT = '{"piso":72}';
+
+// Modelo falso: responde ao lote pelo numero de indices que recebeu.
+const lotes: number[] = [];
+(globalThis as any).fetch = async (_u: string, init: any) => {
+  const body = JSON.parse(init.body);
+  const user: string = body.messages[1].content;
+  let content: string;
+  if (body.model === "triagem-teste") {
+    const n = (user.match(/^\[\d+\] /gm) ?? []).length;
+    lotes.push(n);
+    content = JSON.stringify({ results: Array.from({ length: n }, (_, idx) => ({ idx, verdict: "ouro", score: 80 + idx, has_personal_data: false })) });
+  } else {
+    content = JSON.stringify({ kind: "tool", summary_md: "Resumo proprio.", relevance: 88, relevance_why: "teste", single_source: true, license: null, edges: [] });
+  }
+  return { ok: true, status: 200, json: async () => ({ choices: [{ message: { content } }], usage: { prompt_tokens: 1000, completion_tokens: 100 } }) } as any;
+};
+
+const item = (i: number, source = "github"): RawItem => ({ source, url: "https://ex.com/" + source + "/" + i, title: "Item " + i, rawText: "texto do item " + i });
+
+console.log(NL + "=== TRIAGEM — repetido nao vai ao modelo ===" + NL);
+const cache = memoryCache();
+const r1 = await triageBatch([item(0), item(1), item(2)], cache);
+ok(lotes.length === 1 && lotes[0] === 3, "1a triagem: 1 chamada com 3 itens");
+ok(cache.size() === 3, "3 vereditos guardados no cache");
+ok(r1.map((t) => t.idx).sort().join(",") === "0,1,2", "idx devolvidos sao os do array recebido");
+
+const antes = cost.triageIn;
+const r2 = await triageBatch([item(9), item(1), item(0)], cache);
+ok(lotes.length === 2 && lotes[1] === 1, "2a triagem: so o item novo foi ao modelo (lote de 1)");
+ok(cost.triageIn - antes === 1000, "tokens pagos so pelo lote do miss");
+const porIdx = new Map(r2.map((t) => [t.idx, t]));
+ok(porIdx.get(1)?.score === r1.find((t) => t.idx === 1)?.score, "hit devolve o mesmo veredito, no idx novo (1)");
+ok(porIdx.get(0)?.score === 80 && porIdx.get(2)?.score === 80, "hit remapeado (idx 2 <- item 0) e miss no idx 0");
+
+await triageBatch([item(0), item(1)], cache);
+ok(lotes.length === 2, "lote 100% em cache: ZERO chamadas ao modelo");
+
+console.log(NL + "=== CHAVE — o que muda a resposta muda a chave ===" + NL);
+const k = cacheKey("triage", "triagem-teste", TRIAGE_PROMPT_VERSION, "dica", item(0));
+ok(k === cacheKey("triage", "triagem-teste", TRIAGE_PROMPT_VERSION, "dica", item(0, "arxiv")), "mesmo conteudo em outra mina = mesma chave");
+ok(k !== cacheKey("triage", "outro-modelo", TRIAGE_PROMPT_VERSION, "dica", item(0)), "outro modelo = outra chave");
+ok(k !== cacheKey("triage", "triagem-teste", "triage-v999", "dica", item(0)), "outra versao de prompt = outra chave");
+ok(k !== cacheKey("triage", "triagem-teste", TRIAGE_PROMPT_VERSION, "outra dica", item(0)), "outra regra de score = outra chave");
+
+console.log(NL + "=== ANALISE — reaparecer em outra mina custa zero ===" + NL);
+const chamadasAntes = cost.analysisIn;
+const a1 = await analyze(item(5, "hacker-news"), cache);
+const a2 = await analyze(item(5, "arxiv"), cache);
+ok(cost.analysisIn - chamadasAntes === 1000, "so a 1a analise pagou token");
+ok(a1.summary_md === a2.summary_md && a2.relevance === 88, "2a analise veio do cache, identica");
+ok(cost.savedAnalysisIn === 1000 && cost.savedAnalysisOut === 100, "economia contada pelos tokens da chamada original");
+
+console.log(NL + "=== CUSTO — a economia aparece em US$ ===" + NL);
+const esperado = (cost.savedTriageIn * 1 + cost.savedTriageOut * 2 + 1000 * 10 + 100 * 20) / 1e6;
+ok(Math.abs(cost.savedUsd() - esperado) < 1e-12, "savedUsd = tokens economizados x preco (US$ " + cost.savedUsd().toFixed(6) + ")");
+ok(cost.tokensNote().includes("economia=US$"), "nota de tokens do relatorio declara a economia: " + cost.tokensNote());
+
+console.log(NL + (falhas ? "=== " + falhas + " FALHA(S) ===" : "=== TODAS AS PROVAS PASSARAM ==="));
+process.exit(falhas ? 1 : 0);
@@ -0,0 +1,204 @@
+// ============================================================================
+// PROVA DOS NOVE — drenagem da quarentena. Sem modelo, sem banco.
+// Uma fila falsa com a MESMA semantica das funcoes SQL (keyset por motivo,
+// idade, mina; settle no lugar) mostra que a fila esvazia, que a linha nunca
+// e duplicada e que o orcamento para a drenagem sem perder item.
+// ============================================================================
+import { drenar, taxaDrenagem, type DrenagemDeps } from "../src/drenagem.js";
+import { pool } from "../src/util.js";
+import type { QuarantineRow, QuarantineCursor } from "../src/db.js";
+
+const NL = String.fromCharCode(10);
+let falhas = 0;
+function ok(c: boolean, m: string) {
+  console.log((c ? "  [OK]   " : "  [FALHA]") + " " + m);
+  if (!c) falhas++;
+}
+
+const RANK: Record<string, number> = { llm_down: 0, timeout: 1, rate: 2, schema: 3 };
+type Linha = QuarantineRow & { processed: boolean };
+const MAX = 3;
+
+function fila(n: number) {
+  const linhas: Linha[] = Array.from({ length: n }, (_, i) => {
+    const reason = ["rate", "llm_down", "schema"][i % 3];
+    return {
+      id: i + 1,
+      hunt_id: 7,
+      source: ["github", "arxiv", "hn"][i % 3],
+      url: "https://ex.com/" + i,
+      raw_payload: { title: "Item " + i, rawText: "texto " + i },
+      queued_reason: reason,
+      reason_rank: RANK[reason],
+      attempts: 0,
+      created_at: new Date(Date.UTC(2026, 9, 1, 0, Math.floor(i / 4))).toISOString(),
+      processed: false,
+    };
+  });
+  const chave = (r: QuarantineCursor) => [String(r.reason_rank).padStart(2, "0"), r.created_at, r.source, String(r.id).padStart(8, "0")].join("|");
+  const page = async (after: QuarantineCursor | null, size: number) =>
+    linhas
+      .filter((r) => !r.processed && (!after || chave(r) > chave(after)))
+      .sort((a, b) => (chave(a) < chave(b) ? -1 : 1))
+      .slice(0, size)
+      .map((r) => ({ ...r }));
+  const settle = async (done: number[], retry: number[], reason: string | null) => {
+    let processed = 0;
+    let retried = 0;
+    let dead = 0;
+    for (const r of linhas) {
+      if (r.processed) continue;
+      if (done.includes(r.id)) {
+        r.processed = true;
+        processed++;
+      } else if (retry.includes(r.id)) {
+        r.attempts++;
+        if (reason) {
+          r.queued_reason = reason;
+          r.reason_rank = RANK[reason] ?? 4;
+        }
+        retried++;
+        if (r.attempts >= MAX) {
+          r.processed = true;
+          dead++;
+        }
+      }
+    }
+    return { processed, retried, dead };
+  };
+  return { linhas, page, settle };
+}
+
+const triagemVerde: DrenagemDeps["triage"] = async (items) => ({
+  results: items.map((it, idx) => ({ idx, verdict: (Number(it.url.split("/").pop()) % 2 ? "talvez" : "lixo") as "talvez" | "lixo", score: 50, has_personal_data: false })),
+  failed: [],
+});
+
+console.log(NL + "=== POOL — concorrencia com teto ===" + NL);
+let emVoo = 0;
+let pico = 0;
+const r = await pool(
+  Array.from({ length: 20 }, (_, i) => i),
+  4,
+  async (i) => {
+    emVoo++;
+    pico = Math.max(pico, emVoo);
+    await new Promise((res) => setTimeout(res, 2));
+    emVoo--;
+    return i * 2;
+  }
+);
+ok(pico === 4, "no maximo 4 em voo (pico " + pico + ")");
+ok(r.every((x, i) => x === i * 2), "resultado na ordem de entrada");
+let parou = 0;
+const parcial = await pool([1, 2, 3, 4, 5], 1, async (x) => x, () => parou++ >= 2);
+ok(parcial.filter((x) => x === undefined).length === 3, "parar() deixa o resto de fora (undefined)");
+
+console.log(NL + "=== FILA ESVAZIA, SEM LINHA NOVA ===" + NL);
+const f = fila(500);
+let analisados = 0;
+const st = await drenar(
+  { page: f.page, triage: triagemVerde, analisar: async () => (analisados++, true), settle: f.settle, tokens: () => 0 },
+  { pageSize: 50, concurrency: 4, maxMs: 60_000, tokenBudget: 0, finalistsCap: 1000 }
+);
+ok(st.parada === "fila vazia", "parou porque a fila acabou");
+ok(f.linhas.length === 500, "500 linhas antes, 500 depois — nada reinserido");
+ok(f.linhas.every((l) => l.processed), "todas processadas");
+ok(st.paginas === 10 && st.lidos === 500, "10 paginas de 50 (keyset, sem reler)");
+ok(analisados === 250 && st.achados === 250, "250 finalistas analisados; o lixo saiu sem analise");
+console.log("     (" + taxaDrenagem(st) + " itens/min · " + st.ms + "ms)");
+
+console.log(NL + "=== ORDEM DE PRIORIDADE ===" + NL);
+const g = fila(12);
+const primeira = await g.page(null, 4);
+ok(primeira.map((r) => r.queued_reason).join(",") === "llm_down,llm_down,llm_down,llm_down", "llm_down de qualquer idade antes de rate e schema");
+ok(primeira.every((r, i) => i === 0 || r.created_at >= primeira[i - 1].created_at), "dentro do motivo, do mais velho ao mais novo");
+const ordem = (await g.page(null, 12)).map((r) => r.reason_rank);
+ok(ordem.every((x, i) => i === 0 || x >= ordem[i - 1]), "fila inteira: " + ordem.join(","));
+
+console.log(NL + "=== RETRY SOBE O RANK — linha nao volta na mesma drenagem ===" + NL);
+const p = fila(30);
+const vezes = new Map<string, number>();
+await drenar(
+  {
+    page: p.page,
+    triage: async (items) => {
+      for (const it of items) vezes.set(it.url, (vezes.get(it.url) ?? 0) + 1);
+      const r = await triagemVerde(items);
+      // o item 1 (llm_down, rank 0) falha por schema: vai para o rank 3, adiante do cursor
+      const envenenado = items.findIndex((it) => it.url.endsWith("/1"));
+      return envenenado < 0 ? r : { results: r.results.filter((x) => x.idx !== envenenado), failed: [{ idx: envenenado, reason: "schema" }] };
+    },
+    analisar: async () => true,
+    settle: p.settle,
+    tokens: () => 0,
+  },
+  { pageSize: 5, concurrency: 2, maxMs: 60_000, tokenBudget: 0, finalistsCap: 1000 }
+);
+const um = p.linhas.find((l) => l.id === 2)!;
+ok(vezes.get("https://ex.com/1") === 1 && um.attempts === 1 && um.queued_reason === "schema", "item 1 triado uma vez so, 1 tentativa, agora 'schema'");
+ok([...vezes.values()].every((n) => n === 1), "nenhum item triado duas vezes na mesma drenagem");
+
+console.log(NL + "=== FALHA NA ANALISE — +1 tentativa NA MESMA LINHA, morta no teto ===" + NL);
+const h = fila(30);
+for (let rodada = 0; rodada < MAX; rodada++) {
+  await drenar(
+    {
+      page: h.page,
+      triage: triagemVerde,
+      analisar: async (row) => {
+        if (row.id === 2) throw new Error("HTTP 500");
+        return true;
+      },
+      settle: h.settle,
+      tokens: () => 0,
+    },
+    { pageSize: 10, concurrency: 2, maxMs: 60_000, tokenBudget: 0, finalistsCap: 1000 }
+  );
+}
+const dois = h.linhas.find((l) => l.id === 2)!;
+ok(dois.attempts === MAX && dois.processed && dois.queued_reason === "llm_down", "linha 2: " + dois.attempts + " tentativas, saiu como morta no teto");
+ok(h.linhas.length === 30, "nenhuma linha nova");
+
+console.log(NL + "=== ORCAMENTO — para no meio sem perder item ===" + NL);
+const k = fila(200);
+let gasto = 0;
+const sk = await drenar(
+  {
+    page: k.page,
+    triage: async (items) => {
+      gasto += items.length * 100;
+      return triagemVerde(items);
+    },
+    analisar: async () => {
+      gasto += 500;
+      return true;
+    },
+    settle: k.settle,
+    tokens: () => gasto,
+  },
+  { pageSize: 50, concurrency: 1, maxMs: 60_000, tokenBudget: 12_000, finalistsCap: 1000 }
+);
+const restantes = k.linhas.filter((l) => !l.processed);
+ok(sk.parada === "tokens", "parou pelo orcamento de tokens");
+ok(restantes.length > 0 && restantes.every((l) => l.attempts === 0), restantes.length + " item(ns) ficaram na fila, intocados (sem gastar tentativa)");
+ok(sk.drenados + restantes.length === 200, "drenados + restantes = 200 — nenhum perdido");
+
+console.log(NL + "=== TRIAGEM CAI — pagina fica como esta ===" + NL);
+const m = fila(20);
+const sm = await drenar(
+  {
+    page: m.page,
+    triage: async () => {
+      throw new Error("chat HTTP 401");
+    },
+    analisar: async () => true,
+    settle: m.settle,
+    tokens: () => 0,
+  },
+  { pageSize: 10, concurrency: 2, maxMs: 60_000, tokenBudget: 0, finalistsCap: 1000 }
+);
+ok(sm.parada === "triagem caiu" && m.linhas.every((l) => !l.processed && l.attempts === 0), "provedor fora nao conta tentativa nem tira da fila");
+
+console.log(NL + (falhas ? "=== " + falhas + " FALHA(S) ===" : "=== TODAS AS PROVAS PASSARAM ==="));
+process.exit(falhas ? 1 : 0);
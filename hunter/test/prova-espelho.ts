@@ -3,7 +3,7 @@
 // O teste central: provar que o Espelho NAO CONSEGUE gravar status='active'.
 // ============================================================================
 import { assertPropostaLegal, insertMissionProposal, ESPELHO_STATUS_UNICO, ESPELHO_AUTOR, type FindingJulgado } from "../src/db.js";
-import { medirPorFonte, medirCalibracao, decidir, MIN_VEREDITOS_TOTAL } from "../src/espelho.js";
+import { medirPorFonte, medirCalibracao, decidir, MIN_VEREDITOS_TOTAL, rolarFontes, rolarCalibracao, porFonteDoRollup, calibracaoDoRollup } from "../src/espelho.js";
 import { writeEspelho } from "../src/espelho-report.js";
 import { readFileSync, mkdtempSync } from "node:fs";
 import { tmpdir } from "node:os";
@@ -90,6 +90,25 @@ ok(cal.subestimou.length === 3, "3 subestimados (rel<41 e adotados)");
 ok(cal.fonteUnicaAcimaDoTeto === 7, "7 de fonte unica passaram do teto (rel>=71)");
 ok(cal.fonteUnicaAdotada === 4, "4 desses foram ADOTADOS — a regra v2 nao segurou");
 
+// Os contadores do banco somam por (dia, mina) e (dia, faixa, fonte unica,
+// veredito). Somados, tem de dar a MESMA medicao que os achados um a um.
+console.log(NL + "--- contadores somados = achados um a um:");
+const somar = <T extends Record<string, unknown>>(rows: T[], chave: (r: T) => string, campos: (keyof T)[]): T[] => {
+  const m = new Map<string, T>();
+  for (const r of rows) {
+    const cur = m.get(chave(r));
+    if (!cur) m.set(chave(r), { ...r });
+    else for (const c of campos) (cur as any)[c] = Number(cur[c]) + Number(r[c]);
+  }
+  return [...m.values()];
+};
+const fontesDia = somar(rolarFontes(amostra), (r) => r.source, ["trazidos", "adopt", "watch", "discard", "pending"]);
+const calDia = somar(rolarCalibracao(amostra), (r) => r.band + "|" + r.single_source + "|" + r.verdict, ["n"]);
+ok(fontesDia.length === 3 && calDia.length < amostra.length, fontesDia.length + " linhas por mina, " + calDia.length + " de calibracao (vs " + amostra.length + " achados)");
+ok(JSON.stringify(porFonteDoRollup(fontesDia)) === JSON.stringify(pf), "por mina: contadores == achados");
+const divergentes = amostra.filter((x) => (x.verdict === "discard" && x.relevance >= 71) || (x.verdict === "adopt" && x.relevance < 41));
+ok(JSON.stringify(calibracaoDoRollup(calDia, divergentes)) === JSON.stringify(cal), "calibracao: contadores + divergentes == achados");
+
 // ── Decisao ────────────────────────────────────────────────────────────────
 console.log(NL + "=== DECISAO — amostra insuficiente NAO propoe ===" + NL);
 const poucos = amostra.slice(0, 4);
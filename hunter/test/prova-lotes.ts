@@ -0,0 +1,119 @@
+// ============================================================================
+// PROVA DOS NOVE — lotes adaptativos da triagem. Sem modelo, sem banco.
+// O provedor falso tem um limite por minuto REAL; a prova mostra que um 429
+// encolhe e bissecta o lote em vez de mandar 300 itens para a quarentena.
+// ============================================================================
+import { triageAdaptive, empacotar, classificarFalha, tokenMeter, pausaAposRate, type TriageRun } from "../src/batcher.js";
+import type { RawItem } from "../src/types.js";
+
+const NL = String.fromCharCode(10);
+let falhas = 0;
+function ok(c: boolean, m: string) {
+  console.log((c ? "  [OK]   " : "  [FALHA]") + " " + m);
+  if (!c) falhas++;
+}
+
+const item = (i: number): RawItem => ({ source: "github", url: "https://ex.com/" + i, title: "Item " + i, rawText: "x".repeat(400) });
+const itens = Array.from({ length: 300 }, (_, i) => item(i));
+const estimate = () => 100;
+
+// Relogio falso: `wait` avanca o tempo em vez de dormir.
+let agora = 0;
+const now = () => agora;
+const wait = async (ms: number) => {
+  agora += ms;
+};
+const base = { budgetTokens: 6000, minTokens: 200, maxTokens: 24000, maxItems: 50, tpm: 0, maxFailures: 40, overhead: 0, estimate, now, wait };
+const verde: TriageRun = async (b) => ({ results: b.map((_, idx) => ({ idx, verdict: "talvez" as const, score: 50, has_personal_data: false })), tokens: b.length * 100 });
+
+console.log(NL + "=== EMPACOTAMENTO POR TOKENS ===" + NL);
+ok(empacotar(itens, 0, 1000, 50, 0, estimate).length === 10, "orcamento 1000 / 100 por item = lote de 10");
+ok(empacotar(itens, 0, 50, 50, 0, estimate).length === 1, "item maior que o orcamento ainda sai sozinho (nunca lote vazio)");
+ok(empacotar(itens, 295, 100000, 50, 0, estimate).length === 5, "fim da lista: lote com o que sobrou");
+ok(empacotar(itens, 0, 100000, 50, 0, estimate).length === 50, "teto de itens por lote respeitado");
+
+console.log(NL + "=== CLASSIFICACAO DA FALHA ===" + NL);
+ok(classificarFalha(new Error("falha apos 5 tentativas: Error: HTTP 429: quota")) === "rate", "HTTP 429 = rate");
+ok(classificarFalha(new SyntaxError("Unexpected token")) === "schema", "JSON quebrado = schema");
+ok(classificarFalha(Object.assign(new Error("x"), { name: "ZodError" })) === "schema", "ZodError = schema");
+ok(classificarFalha(new Error("chat HTTP 401: chave invalida")) === null, "401 NAO e bissectado");
+
+console.log(NL + "=== 429 — bissecta em vez de derrubar tudo ===" + NL);
+// Provedor com limite de 3000 tokens/min: lote que estoura o minuto leva 429.
+const LIMITE = 3000;
+const meterProvedor = tokenMeter(LIMITE, now);
+let chamadas = 0;
+const limitado: TriageRun = async (b) => {
+  chamadas++;
+  const t = b.length * 100;
+  if (meterProvedor.usado() + t > LIMITE) throw new Error("falha apos 5 tentativas: Error: HTTP 429: rate limit");
+  meterProvedor.registrar(t);
+  return verde(b);
+};
+agora = 0;
+const r = await triageAdaptive(itens, limitado, base);
+ok(r.results.length === 300, "300 de 300 itens triados (antes: 0, tudo na quarentena)");
+ok(r.failed.length === 0, "nenhum item para a quarentena");
+ok(new Set(r.results.map((t) => t.idx)).size === 300, "cada idx aparece uma vez, no indice original");
+ok(r.stats.bisseccoes > 0, r.stats.bisseccoes + " bisseccao(oes) no caminho");
+ok(r.stats.tpmTeto >= LIMITE * 0.5 && r.stats.tpmTeto <= LIMITE * 1.5, "teto aprendido (" + r.stats.tpmTeto + ") perto do limite real (" + LIMITE + ")");
+ok(r.stats.tpmMedido <= LIMITE * 1.1, "vazao medida (" + r.stats.tpmMedido + " tokens/min) nao passa do limite do provedor");
+console.log("     (" + chamadas + " chamadas · " + r.stats.lotes + " lotes · orcamento final " + r.stats.orcamentoFinal + ")");
+
+console.log(NL + "=== 429 COM A JANELA VAZIA — pausa antes de reenviar as metades ===" + NL);
+ok(pausaAposRate(new Error("HTTP 429: slow down [retry-after 7000ms]"), 1) === 7000, "retry-after do provedor manda (7000ms)");
+ok(pausaAposRate(new Error("HTTP 429 [retry-after 900000ms]"), 1) === 60000, "retry-after absurdo fica no teto de 60s");
+ok(pausaAposRate(new Error("HTTP 429"), 1, () => 0) === 500 && pausaAposRate(new Error("HTTP 429"), 1, () => 1) === 1000, "sem retry-after: 1o 429 espera entre 0,5s e 1s");
+ok(pausaAposRate(new Error("HTTP 429"), 4, () => 1) === 8000, "4o 429 seguido: ate 8s");
+ok(pausaAposRate(new Error("HTTP 429"), 12, () => 1) === 60000, "backoff nunca passa de 60s");
+// Provedor que so aceita de novo 5s depois do 429 — com o medidor vazio (tpm
+// desconhecido), so a pausa separa o 429 do reenvio.
+let bloqueadoAte = -1;
+const esperas: number[] = [];
+const rajada: TriageRun = async (b) => {
+  if (agora < bloqueadoAte) throw new Error("falha apos 5 tentativas: Error: HTTP 429 [retry-after 5000ms]");
+  if (bloqueadoAte < 0) {
+    bloqueadoAte = agora + 5000;
+    throw new Error("falha apos 5 tentativas: Error: HTTP 429 [retry-after 5000ms]");
+  }
+  return verde(b);
+};
+agora = 0;
+const pr = await triageAdaptive(itens.slice(0, 40), rajada, { ...base, wait: async (ms) => { esperas.push(ms); agora += ms; } });
+ok(pr.results.length === 40 && pr.failed.length === 0, "40 de 40 triados");
+ok(pr.stats.falhas === 1, "so o 1o envio levou 429 (as metades esperaram o retry-after)");
+ok(esperas[0] === 5000, "esperou " + esperas[0] + "ms antes das metades");
+
+console.log(NL + "=== SCHEMA — so o item envenenado vai para a quarentena ===" + NL);
+const veneno = 137;
+const comVeneno: TriageRun = async (b) => {
+  if (b.some((it) => it.url.endsWith("/" + veneno))) throw new SyntaxError("Unexpected token < in JSON");
+  return verde(b);
+};
+agora = 0;
+const s = await triageAdaptive(itens, comVeneno, base);
+ok(s.failed.length === 1 && s.failed[0].idx === veneno && s.failed[0].reason === "schema", "apenas o item " + veneno + " falhou (schema)");
+ok(s.results.length === 299, "os outros 299 foram triados");
+
+console.log(NL + "=== ERRO QUE NAO E DE TAXA — sobe, sem 300 chamadas ===" + NL);
+let tentativas = 0;
+const chaveRuim: TriageRun = async () => {
+  tentativas++;
+  throw new Error("chat HTTP 401: chave invalida");
+};
+await triageAdaptive(itens, chaveRuim, base).then(
+  () => ok(false, "401 deveria subir"),
+  (e) => ok(String(e).includes("401") && tentativas === 1, "401 subiu na 1a chamada")
+);
+
+console.log(NL + "=== TETO DE FALHAS — provedor fora nao vira loop ===" + NL);
+const sempre429: TriageRun = async () => {
+  throw new Error("HTTP 429: quota esgotada");
+};
+agora = 0;
+const q = await triageAdaptive(itens, sempre429, { ...base, maxFailures: 5 });
+ok(q.stats.lotes === 5, "parou apos 5 lotes falhos");
+ok(q.failed.length === 300 && q.failed.every((f) => f.reason === "rate"), "o resto foi para a quarentena como 'rate'");
+
+console.log(NL + (falhas ? "=== " + falhas + " FALHA(S) ===" : "=== TODAS AS PROVAS PASSARAM ==="));
+process.exit(falhas ? 1 : 0);
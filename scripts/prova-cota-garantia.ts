@@ -4,11 +4,17 @@
  * ═══════════════════════════════════════════════════════════════════════════
  * Exercita a lógica pura de quota.ts em cenários-chave e imprime o custo
  * máximo de token de honrar um reembolso. Não chama IA, não toca no banco.
+ * O trecho do cache de respostas roda o withResponseCache de verdade
+ * (quantum-brain/response-cache.ts) e conta as linhas que ele deixa gravar;
+ * o do ORION roda o runOrionTurn (quantum-brain/orion-history.ts) com um
+ * banco de mentira que só conta as trocas gravadas.
  *
  *   npx tsx scripts/prova-cota-garantia.ts
  * ═══════════════════════════════════════════════════════════════════════════
  */
 import { evaluateUsage, EXPERIMENTATION_QUOTA, type PlanId } from '../frontend/src/lib/quota';
+import { withResponseCache, type ResponseSource } from '../frontend/src/lib/quantum-brain/response-cache';
+import { runOrionTurn } from '../frontend/src/lib/quantum-brain/orion-history';
 
 const DAY = 24 * 60 * 60 * 1000;
 const START = Date.parse('2026-07-01T00:00:00Z');
@@ -42,15 +48,117 @@ show('dia 10, 99999 usos', { ...base, founderAccess: true, usageInWindow: 99999,
 console.log('\nConta sem janela (legada):');
 show('sem guarantee_started_at', { ...base, guaranteeStartedAt: null, usageInWindow: 99999, nowMs: at(10) });
 
+// ── Cache de respostas: a cota conta linhas de `requests`, e só a execução
+//    de fato (runTask, o `compute`) grava linha. Aqui o compute só conta. ──
+async function cacheDeRespostas() {
+  console.log('\nCache de respostas (PRO, dia 3): 400 envios, 150 repetidos');
+  let linhasEmRequests = 0;
+  const fontes: ResponseSource[] = [];
+  const enviar = async (n: number) => {
+    const { source } = await withResponseCache({
+      key: `prova-cota:pergunta-${n}`,
+      agentId: 'prova',
+      compute: async () => {
+        linhasEmRequests++;
+        await new Promise(r => setTimeout(r, 5));
+        return { status: 'completed' };
+      },
+      cacheable: () => true,
+      cost: () => ({ usd: 0.00135, tokens: 3000 }),
+    });
+    fontes.push(source);
+  };
+
+  // 250 perguntas distintas; 30 delas chegam em dobro ao mesmo tempo
+  await Promise.all(Array.from({ length: 250 }, (_, n) => Promise.all(n < 30 ? [enviar(n), enviar(n)] : [enviar(n)])));
+  // 120 repetições depois
+  for (let n = 0; n < 120; n++) await enviar(n % 250);
+
+  const por = (f: ResponseSource) => fontes.filter(x => x === f).length;
+  console.log(`  ${fontes.length} envios: llm=${por('llm')} cache=${por('cache')} coalescidos=${por('coalesced')} · linhas gravadas=${linhasEmRequests}`);
+  show(`400 envios → ${linhasEmRequests} linhas em requests`, { ...base, usageInWindow: linhasEmRequests, nowMs: at(3) });
+  if (linhasEmRequests !== por('llm')) {
+    console.log('  FALHOU — resposta reaproveitada gravou linha (contaria na cota).');
+    process.exitCode = 1;
+  }
+}
+
+// ── ORION logado: abertura de conversa repetida sai do cache, mas a troca
+//    é gravada (orion_turns) sem token e sem linha em `requests`; conversa
+//    em andamento vai sempre ao modelo. ──
+async function orionConversaNova() {
+  console.log('\nORION logado (PRO, dia 3): 5 conversas novas abrindo com "oi" + 1 continuação');
+  let linhasEmRequests = 0;
+  let chamadasAoModelo = 0;
+  const trocas: Array<{ conversa: string; tokens: number }> = [];
+  // Qualquer escrita fora do RPC da conversa passaria por `from(...)`
+  const admin = {
+    from: (tabela: string) => {
+      if (tabela === 'requests') linhasEmRequests++;
+      return { insert: async () => ({ error: null }) };
+    },
+    rpc: async (_fn: string, p: { p_conversation_id: string | null; p_tokens: number }) => {
+      const conversa = p.p_conversation_id ?? `conversa-${trocas.length + 1}`;
+      trocas.push({ conversa, tokens: p.p_tokens });
+      return { data: [{ conversation_id: conversa, turn_count: 2 }], error: null };
+    },
+  } as any;
+  const turno = (conversationId: string | null, userText: string) =>
+    runOrionTurn({
+      admin,
+      userId: 'prova-usuario',
+      conversationId,
+      userText,
+      cacheKey: `prova-orion:${userText}`,
+      call: async () => {
+        chamadasAoModelo++;
+        return { result: 'Olá! Sou o ORION.', tokensUsed: 1400, costUsd: 0.015 };
+      },
+    });
+
+  const fontes: ResponseSource[] = [];
+  const conversas: Array<string | null> = [];
+  for (let n = 0; n < 5; n++) {
+    const r = await turno(null, 'oi');
+    fontes.push(r.source);
+    conversas.push(r.conversationId);
+  }
+  const seguinte = await turno(conversas[0], 'oi');
+  fontes.push(seguinte.source);
+
+  const por = (f: ResponseSource) => fontes.filter(x => x === f).length;
+  const tokensGravados = trocas.reduce((t, x) => t + x.tokens, 0);
+  console.log(
+    `  ${fontes.length} turnos: llm=${por('llm')} cache=${por('cache')} · trocas gravadas=${trocas.length} ` +
+    `conversas=${new Set(conversas).size} tokens gravados=${tokensGravados} linhas em requests=${linhasEmRequests}`,
+  );
+  show(`6 turnos ORION → ${linhasEmRequests} linhas em requests`, { ...base, usageInWindow: linhasEmRequests, nowMs: at(3) });
+  const ok =
+    por('cache') === 4 &&
+    seguinte.source === 'llm' &&
+    trocas.length === fontes.length &&
+    conversas.every(c => c !== null) &&
+    tokensGravados === chamadasAoModelo * 1400 &&
+    linhasEmRequests === 0;
+  if (!ok) {
+    console.log('  FALHOU — turno do cache pulou a gravação, gastou token ou contou na cota.');
+    process.exitCode = 1;
+  }
+}
+
 // ── Custo máximo de honrar um reembolso: no máximo Q execuções ──
-console.log('\n=== CUSTO MÁXIMO DE UM REEMBOLSO (o teto é a cota Q) ===');
-const BRL = 5.5; // câmbio de referência USD→BRL
-const CUSTO_AGENTE_USD = 0.00135; // gpt-4o-mini, chamada cheia (~1k in + 2k out)
-const CUSTO_ORION_USD = 0.015;    // chat ORION (Claude), ~500 in + 900 out
-for (const plan of ['starter', 'pro', 'enterprise'] as PlanId[]) {
-  const q = EXPERIMENTATION_QUOTA[plan];
-  const agente = (q * CUSTO_AGENTE_USD * BRL).toFixed(2);
-  const orion = (q * CUSTO_ORION_USD * BRL).toFixed(2);
-  console.log(`  ${plan.padEnd(11)} Q=${String(q).padStart(3)} → tokens no pior caso: R$ ${agente} (agentes) a R$ ${orion} (tudo ORION)`);
+function custoDoReembolso() {
+  console.log('\n=== CUSTO MÁXIMO DE UM REEMBOLSO (o teto é a cota Q) ===');
+  const BRL = 5.5; // câmbio de referência USD→BRL
+  const CUSTO_AGENTE_USD = 0.00135; // gpt-4o-mini, chamada cheia (~1k in + 2k out)
+  const CUSTO_ORION_USD = 0.015;    // chat ORION (Claude), ~500 in + 900 out
+  for (const plan of ['starter', 'pro', 'enterprise'] as PlanId[]) {
+    const q = EXPERIMENTATION_QUOTA[plan];
+    const agente = (q * CUSTO_AGENTE_USD * BRL).toFixed(2);
+    const orion = (q * CUSTO_ORION_USD * BRL).toFixed(2);
+    console.log(`  ${plan.padEnd(11)} Q=${String(q).padStart(3)} → tokens no pior caso: R$ ${agente} (agentes) a R$ ${orion} (tudo ORION)`);
+  }
+  console.log('\nComparado aos planos (R$ 990 / 4.900 / 9.900), o token de um reembolso é < 1% a ~4%. Não sangra.');
 }
-console.log('\nComparado aos planos (R$ 990 / 4.900 / 9.900), o token de um reembolso é < 1% a ~4%. Não sangra.');
+
+cacheDeRespostas().then(orionConversaNova).then(custoDoReembolso);
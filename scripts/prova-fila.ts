@@ -0,0 +1,134 @@
+/**
+ * ═══════════════════════════════════════════════════════════════════════════
+ * PROVA — A FILA DURÁVEL SOB CARGA. Zero token; banco LOCAL.
+ * ═══════════════════════════════════════════════════════════════════════════
+ * Enfileira N requests num Supabase local (`supabase start` + migrations),
+ * solta W pools de workers CONCORRENTES (como crons sobrepostos) sobre a
+ * mesma fila com um handler simulado, e mede:
+ *   · vazão (requests/s) e latência de fila (criação → reserva), p50/p95
+ *   · exatidão: cada request concluída UMA vez só (SKIP LOCKED + claim_token)
+ *   · retry: uma fração falha de propósito e tem de voltar e concluir
+ * Apaga o que criou no fim.
+ *
+ *   SUPABASE_SERVICE_ROLE_KEY=<chave local> npx tsx scripts/prova-fila.ts
+ *   (opcionais: SUPABASE_URL, N=500 WORKERS=3 CONCURRENCY=10 LATENCY_MS=50 FAIL_RATE=0.05)
+ * ═══════════════════════════════════════════════════════════════════════════
+ */
+import { createClient } from '@supabase/supabase-js';
+import { runWorkerPool, type WorkerPoolStats } from '../frontend/src/lib/task-queue';
+
+const URL = process.env.SUPABASE_URL || 'http://127.0.0.1:54321';
+const KEY = process.env.SUPABASE_SERVICE_ROLE_KEY;
+const N = Number(process.env.N || 500);
+const WORKERS = Number(process.env.WORKERS || 3);
+const CONCURRENCY = Number(process.env.CONCURRENCY || 10);
+const LATENCY_MS = Number(process.env.LATENCY_MS || 50);
+const FAIL_RATE = Number(process.env.FAIL_RATE || 0.05);
+
+if (!KEY) {
+  console.error('SUPABASE_SERVICE_ROLE_KEY é obrigatório (a chave do `supabase status`).');
+  process.exit(1);
+}
+if (!/127\.0\.0\.1|localhost/.test(URL)) {
+  console.error(`Recusado: ${URL} não é local. Esta prova enfileira e apaga linhas.`);
+  process.exit(1);
+}
+
+const sb = createClient(URL, KEY, { auth: { autoRefreshToken: false, persistSession: false } });
+const sleep = (ms: number) => new Promise(r => setTimeout(r, ms));
+
+async function main() {
+  console.log(`=== PROVA DA FILA: N=${N} workers=${WORKERS}×${CONCURRENCY} latência=${LATENCY_MS}ms falha=${FAIL_RATE} ===\n`);
+
+  const { data: u, error: eu } = await sb.auth.admin.createUser({
+    email: `prova-fila-${Date.now()}@example.invalid`,
+    email_confirm: true,
+  });
+  if (eu || !u.user) throw new Error(`createUser: ${eu?.message}`);
+  const userId = u.user.id;
+
+  try {
+    const prios = ['high', 'normal', 'normal', 'low'];
+    const rows = Array.from({ length: N }, (_, i) => ({
+      user_id: userId,
+      title: `prova-fila #${i}`,
+      priority: prios[i % prios.length],
+      status: 'queued',
+    }));
+    for (let i = 0; i < rows.length; i += 500) {
+      const { error } = await sb.from('requests').insert(rows.slice(i, i + 500));
+      if (error) throw new Error(`insert: ${error.message}`);
+    }
+
+    const concluidas = new Map<string, number>();
+    const falhouUmaVez = new Set<string>();
+    const handler = async (row: { id: string }) => {
+      await sleep(LATENCY_MS * (0.5 + Math.random()));
+      if (!falhouUmaVez.has(row.id) && Math.random() < FAIL_RATE) {
+        falhouUmaVez.add(row.id);
+        throw new Error('falha simulada');
+      }
+      concluidas.set(row.id, (concluidas.get(row.id) ?? 0) + 1);
+      return { outcome: 'completed' as const };
+    };
+
+    // Rodadas: W pools concorrentes drenam até a fila esvaziar; o que voltou
+    // por retry depois que um pool parou é pego na rodada seguinte.
+    const t0 = Date.now();
+    const stats: WorkerPoolStats[] = [];
+    for (let rodada = 0; rodada < 10; rodada++) {
+      const rodadaStats = await Promise.all(
+        Array.from({ length: WORKERS }, (_, w) =>
+          runWorkerPool(sb, handler, {
+            worker: `prova-${rodada}-${w}`,
+            concurrency: CONCURRENCY,
+            maxMs: 10 * 60_000,
+            pollMs: 0,
+            retryBaseSecs: 0,
+            visibilitySecs: 30,
+          }),
+        ),
+      );
+      stats.push(...rodadaStats);
+      const { count } = await sb
+        .from('requests')
+        .select('id', { count: 'exact', head: true })
+        .eq('user_id', userId)
+        .in('status', ['queued', 'processing']);
+      if (!count) break;
+    }
+    const wall = Date.now() - t0;
+
+    const { data: finais } = await sb.from('requests').select('status').eq('user_id', userId);
+    const porStatus = (finais || []).reduce<Record<string, number>>((m, r) => {
+      m[r.status] = (m[r.status] ?? 0) + 1;
+      return m;
+    }, {});
+    const duplicadas = [...concluidas.values()].filter(n => n > 1).length;
+
+    stats.forEach((s, w) =>
+      console.log(
+        `  pool ${w}: reservou ${s.claimed}, concluiu ${s.completed}, retry ${s.retried}, ` +
+        `${s.claim_calls} claims, ${s.settle_batches} lotes, espera p50=${s.queue_wait_ms.p50}ms p95=${s.queue_wait_ms.p95}ms`,
+      ),
+    );
+    const total = stats.reduce((a, s) => a + s.completed, 0);
+    const waits = stats.map(s => s.queue_wait_ms.p95);
+    console.log(`\n  vazão: ${(total / (wall / 1000)).toFixed(1)} req/s (${total} em ${(wall / 1000).toFixed(2)}s)`);
+    console.log(`  espera na fila p95 (pior pool): ${Math.max(...waits)}ms`);
+    console.log(`  status finais: ${JSON.stringify(porStatus)}`);
+    console.log(`  concluídas em dobro: ${duplicadas}  ·  falhas simuladas que voltaram: ${falhouUmaVez.size}`);
+
+    const ok = duplicadas === 0 && (porStatus.completed ?? 0) === N && concluidas.size === N;
+    console.log(ok ? '\nOK — cada request concluída exatamente uma vez.' : '\nFALHOU — ver contagens acima.');
+    if (!ok) process.exitCode = 1;
+  } finally {
+    await sb.from('requests').delete().eq('user_id', userId);
+    await sb.auth.admin.deleteUser(userId);
+  }
+}
+
+main().catch(e => {
+  console.error(e);
+  process.exit(1);
+});
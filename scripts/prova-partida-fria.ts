@@ -0,0 +1,160 @@
+/**
+ * ═══════════════════════════════════════════════════════════════════════════
+ * PROVA — PARTIDA A FRIO DAS ROTAS DA API. Zero token, zero banco, sem rede.
+ * ═══════════════════════════════════════════════════════════════════════════
+ * Uma instância serverless fria paga o import do módulo da rota (e de tudo
+ * que ele importa no topo) antes de atender o primeiro request. Esta prova
+ * sobe RUNS processos Node novos por rota, importa só o módulo e mede:
+ *   · init: tempo do import, p50/p95
+ *   · rss: memória do processo depois do import
+ * Roda na árvore atual ("depois") e, com BASE=<ref git>, numa cópia desse
+ * ref (git worktree temporário, mesmo node_modules) — o "antes". No fim,
+ * o import() isolado de cada SDK: o que agora só se paga na primeira
+ * chamada que usa o cliente (frontend/src/lib/lazy-clients.ts).
+ *
+ *   npx tsx scripts/prova-partida-fria.ts
+ *   (opcionais: BASE=HEAD~1 RUNS=7 ROUTES=app/api/process-request/route.ts,...)
+ *   requer `npm ci` em frontend/
+ * ═══════════════════════════════════════════════════════════════════════════
+ */
+import { spawnSync, execFileSync } from 'node:child_process';
+import { existsSync, mkdtempSync, rmSync, symlinkSync, writeFileSync } from 'node:fs';
+import { tmpdir } from 'node:os';
+import path from 'node:path';
+
+const ROOT = path.resolve(__dirname, '..');
+const BASE = process.env.BASE;
+const RUNS = Number(process.env.RUNS || 7);
+const ROUTES = (
+  process.env.ROUTES ||
+  [
+    'app/api/process-request/route.ts',
+    'app/api/quantum/brain/execute/route.ts',
+    'app/api/stripe/checkout/route.ts',
+    'app/api/stripe/webhook/route.ts',
+  ].join(',')
+)
+  .split(',')
+  .map(r => r.trim())
+  .filter(Boolean);
+const SDKS = ['@supabase/supabase-js', 'openai', '@anthropic-ai/sdk', '@octokit/rest', 'stripe'];
+
+if (!existsSync(path.join(ROOT, 'frontend/node_modules'))) {
+  console.error('frontend/node_modules não existe — rode `npm ci` em frontend/ antes.');
+  process.exit(1);
+}
+
+// Processo filho: importa UM alvo e devolve tempo e memória. O alvo é um
+// arquivo (rota) ou um pacote resolvido a partir do frontend da árvore.
+const tmp = mkdtempSync(path.join(tmpdir(), 'prova-partida-fria-'));
+const CHILD = path.join(tmp, 'child.mts');
+writeFileSync(
+  CHILD,
+  `import { createRequire } from 'node:module';
+import { pathToFileURL } from 'node:url';
+const [kind, target] = process.argv.slice(2);
+const file = kind === 'pkg' ? createRequire(process.cwd() + '/package.json').resolve(target) : target;
+const t0 = performance.now();
+try {
+  await import(pathToFileURL(file).href);
+  process.stdout.write(JSON.stringify({ ms: performance.now() - t0, rss: process.memoryUsage().rss }));
+} catch (e) {
+  process.stdout.write(JSON.stringify({ error: String(e) }));
+}
+`
+);
+
+interface Sample {
+  ms?: number;
+  rss?: number;
+  error?: string;
+}
+
+// Herda o loader do tsx do processo pai (process.execArgv): o filho entende
+// TypeScript e o alias @/ do tsconfig da árvore medida.
+function coldImport(frontend: string, kind: 'file' | 'pkg', target: string): Sample {
+  const out = spawnSync(process.execPath, [...process.execArgv, CHILD, kind, target], {
+    cwd: frontend,
+    env: { ...process.env, TSX_TSCONFIG_PATH: path.join(frontend, 'tsconfig.json'), NODE_ENV: 'production' },
+    encoding: 'utf8',
+  });
+  try {
+    return JSON.parse(out.stdout.trim().split('\n').pop() || '{}');
+  } catch {
+    return { error: (out.stderr || out.stdout).trim().split('\n')[0] };
+  }
+}
+
+function pct(values: number[], p: number) {
+  const sorted = [...values].sort((a, b) => a - b);
+  return sorted[Math.min(sorted.length - 1, Math.floor((p / 100) * sorted.length))];
+}
+
+interface Measure {
+  p50: number;
+  p95: number;
+  rssMb: number;
+  error?: string;
+}
+
+function measure(frontend: string, kind: 'file' | 'pkg', target: string): Measure {
+  const samples = Array.from({ length: RUNS }, () => coldImport(frontend, kind, target));
+  const failed = samples.find(s => s.error || s.ms === undefined);
+  if (failed) return { p50: NaN, p95: NaN, rssMb: NaN, error: failed.error || 'sem saída' };
+  const ms = samples.map(s => s.ms!);
+  return {
+    p50: Math.round(pct(ms, 50)),
+    p95: Math.round(pct(ms, 95)),
+    rssMb: Math.round(pct(samples.map(s => s.rss!), 50) / 1024 / 1024),
+  };
+}
+
+const fmt = (m: Measure) =>
+  m.error ? `ERRO: ${m.error.slice(0, 70)}` : `init p50=${m.p50}ms p95=${m.p95}ms  rss=${m.rssMb}MB`;
+
+// Cópia do ref BASE com o node_modules da árvore atual
+function checkoutBase(ref: string): string {
+  const dir = path.join(tmp, 'base');
+  execFileSync('git', ['-C', ROOT, 'worktree', 'add', '--detach', dir, ref], { stdio: 'ignore' });
+  symlinkSync(path.join(ROOT, 'frontend/node_modules'), path.join(dir, 'frontend/node_modules'), 'dir');
+  return dir;
+}
+
+function main() {
+  console.log(`=== PROVA DA PARTIDA A FRIO: ${RUNS} processos por alvo${BASE ? `, antes = ${BASE}` : ''} ===\n`);
+
+  const depois = path.join(ROOT, 'frontend');
+  const antes = BASE ? path.join(checkoutBase(BASE), 'frontend') : null;
+  try {
+    let totalAntes = 0;
+    let totalDepois = 0;
+    for (const route of ROUTES) {
+      console.log(route);
+      const target = (tree: string) => path.join(tree, 'src', route);
+      let a: Measure | null = null;
+      if (antes) {
+        a = existsSync(target(antes)) ? measure(antes, 'file', target(antes)) : null;
+        console.log(`  antes : ${a ? fmt(a) : '(rota não existe no BASE)'}`);
+      }
+      const d = measure(depois, 'file', target(depois));
+      console.log(`  depois: ${fmt(d)}`);
+      if (a && !a.error && !d.error) {
+        totalAntes += a.p50;
+        totalDepois += d.p50;
+        console.log(`  Δ p50 : ${d.p50 - a.p50 >= 0 ? '+' : ''}${d.p50 - a.p50}ms  Δ rss: ${d.rssMb - a.rssMb}MB`);
+      }
+    }
+    if (antes && totalAntes > 0) {
+      const ganho = Math.round((1 - totalDepois / totalAntes) * 100);
+      console.log(`\n  soma dos p50: antes ${totalAntes}ms → depois ${totalDepois}ms (${ganho}% a menos)`);
+    }
+
+    console.log('\nimport() isolado de cada SDK (pago só na 1ª chamada que usa o cliente):');
+    for (const sdk of SDKS) console.log(`  ${sdk.padEnd(24)} ${fmt(measure(depois, 'pkg', sdk))}`);
+  } finally {
+    if (antes) execFileSync('git', ['-C', ROOT, 'worktree', 'remove', '--force', path.dirname(antes)], { stdio: 'ignore' });
+    rmSync(tmp, { recursive: true, force: true });
+  }
+}
+
+main();
@@ -0,0 +1,275 @@
+/**
+ * ═══════════════════════════════════════════════════════════════════════════
+ * PROVA — WEBHOOK DO STRIPE: LIVRO-RAZÃO + APLICADOR. Zero Stripe; banco LOCAL.
+ * ═══════════════════════════════════════════════════════════════════════════
+ * Reproduz uma rajada de webhooks num Supabase local (`supabase start` +
+ * migrations) pelo mesmo caminho da rota /api/stripe/webhook, sem a
+ * verificação de assinatura:
+ *   1. ack — recordStripeEvent() com ACKS chamadas simultâneas (como o
+ *      Stripe entregando em paralelo): latência p50/p95 e acks/s
+ *   2. aplicação — applyStripeEvents() com WORKERS laços: eventos/s e
+ *      quantas escritas em profiles (contra quantas o caminho antigo,
+ *      evento a evento, faria)
+ *   3. exatidão — reentregas viram 'duplicate'; cada profile termina no
+ *      estado do seu último evento
+ *
+ * Eventos: FIXTURES=<arquivo .json (array) ou .jsonl> com eventos gravados
+ * (ex.: `stripe events list`, `stripe listen --print-json`); sem FIXTURES,
+ * uma rajada sintética de renovações de início de mês. Cada client_reference_id
+ * do arquivo vira um usuário local novo; ids ganham um sufixo da rodada.
+ * Apaga o que criou no fim.
+ *
+ *   SUPABASE_SERVICE_ROLE_KEY=<chave local> npx tsx scripts/prova-stripe-webhook.ts
+ *   (opcionais: SUPABASE_URL, FIXTURES=scripts/fixtures/stripe-webhook-eventos.json,
+ *    CUSTOMERS=200 RENEWALS=3 DUP_RATE=0.2 ACKS=20 WORKERS=2)
+ * ═══════════════════════════════════════════════════════════════════════════
+ */
+import { readFileSync } from 'node:fs';
+import { createClient } from '@supabase/supabase-js';
+import {
+  applyStripeEvents,
+  recordStripeEvent,
+  reduceCustomerEvents,
+  customerKeyOf,
+  HANDLED_STRIPE_EVENTS,
+  type LedgerEvent,
+} from '../frontend/src/lib/stripe-ledger';
+
+const URL = process.env.SUPABASE_URL || 'http://127.0.0.1:54321';
+const KEY = process.env.SUPABASE_SERVICE_ROLE_KEY;
+const FIXTURES = process.env.FIXTURES;
+const CUSTOMERS = Number(process.env.CUSTOMERS || 200);
+const RENEWALS = Number(process.env.RENEWALS || 3);
+const DUP_RATE = Number(process.env.DUP_RATE || 0.2);
+const ACKS = Number(process.env.ACKS || 20);
+const WORKERS = Number(process.env.WORKERS || 2);
+const RUN = Date.now().toString(36);
+
+if (!KEY) {
+  console.error('SUPABASE_SERVICE_ROLE_KEY é obrigatório (a chave do `supabase status`).');
+  process.exit(1);
+}
+if (!/127\.0\.0\.1|localhost/.test(URL)) {
+  console.error(`Recusado: ${URL} não é local. Esta prova cria usuários e escreve em profiles.`);
+  process.exit(1);
+}
+
+const sb = createClient(URL, KEY, { auth: { autoRefreshToken: false, persistSession: false } });
+
+interface WebhookEvent {
+  id: string;
+  type: string;
+  created: number;
+  data: { object: any };
+}
+
+function pct(values: number[], p: number) {
+  if (values.length === 0) return 0;
+  const s = [...values].sort((a, b) => a - b);
+  return Math.round(s[Math.min(s.length - 1, Math.floor(p * s.length))]);
+}
+
+function shuffle<T>(list: T[]): T[] {
+  for (let i = list.length - 1; i > 0; i--) {
+    const j = Math.floor(Math.random() * (i + 1));
+    [list[i], list[j]] = [list[j], list[i]];
+  }
+  return list;
+}
+
+// Rajada de início de mês: checkout de cada cliente + RENEWALS renovações,
+// às vezes um cancelamento, tudo entregue fora de ordem e com reentregas.
+function syntheticEvents(): WebhookEvent[] {
+  const base = Math.floor(Date.now() / 1000) - 3600;
+  const statuses = ['active', 'active', 'active', 'past_due'];
+  const events: WebhookEvent[] = [];
+  for (let c = 0; c < CUSTOMERS; c++) {
+    const customer = `cus_prova_${c}`;
+    const subscription = `sub_prova_${c}`;
+    events.push({
+      id: `evt_prova_${c}_checkout`,
+      type: 'checkout.session.completed',
+      created: base + c,
+      data: {
+        object: {
+          id: `cs_prova_${c}`,
+          client_reference_id: `usuario-${c}`,
+          customer,
+          subscription,
+          metadata: { planId: c % 3 === 0 ? 'starter' : 'pro', billingCycle: c % 4 === 0 ? 'yearly' : 'monthly' },
+        },
+      },
+    });
+    for (let r = 1; r <= RENEWALS; r++) {
+      events.push({
+        id: `evt_prova_${c}_renova_${r}`,
+        type: 'customer.subscription.updated',
+        created: base + c + r * 60,
+        data: {
+          object: { id: subscription, customer, status: statuses[(c + r) % statuses.length], cancel_at: null, items: { data: [] } },
+        },
+      });
+    }
+    events.push({
+      id: `evt_prova_${c}_fatura`,
+      type: 'invoice.paid',
+      created: base + c + 30,
+      data: { object: { id: `in_prova_${c}`, customer, subscription } },
+    });
+    if (c % 10 === 0) {
+      events.push({
+        id: `evt_prova_${c}_cancela`,
+        type: 'customer.subscription.deleted',
+        created: base + c + (RENEWALS + 1) * 60,
+        data: { object: { id: subscription, customer, status: 'canceled', cancel_at: null, items: { data: [] } } },
+      });
+    }
+  }
+  const dups = events.filter(() => Math.random() < DUP_RATE).map(e => structuredClone(e));
+  return shuffle([...events, ...dups]);
+}
+
+function loadFixtures(file: string): WebhookEvent[] {
+  const text = readFileSync(file, 'utf8').trim();
+  const raw = text.startsWith('[') ? JSON.parse(text) : text.split('\n').filter(Boolean).map(l => JSON.parse(l));
+  return raw as WebhookEvent[];
+}
+
+// Ids da rodada (reexecutar não colide) e usuários locais no lugar dos reais.
+async function localize(events: WebhookEvent[], userIds: string[]) {
+  const users = new Map<string, string>();
+  for (const e of events) {
+    const ref = e.data.object?.client_reference_id;
+    if (ref && !users.has(ref)) {
+      const { data, error } = await sb.auth.admin.createUser({
+        email: `prova-stripe-${RUN}-${users.size}@example.invalid`,
+        email_confirm: true,
+      });
+      if (error || !data.user) throw new Error(`createUser: ${error?.message}`);
+      users.set(ref, data.user.id);
+      userIds.push(data.user.id);
+    }
+  }
+  return events.map(e => {
+    const obj = { ...e.data.object };
+    if (typeof obj.customer === 'string') obj.customer = `${obj.customer}_${RUN}`;
+    if (obj.client_reference_id) obj.client_reference_id = users.get(obj.client_reference_id);
+    return { ...e, id: `${e.id}_${RUN}`, data: { object: obj } };
+  });
+}
+
+// Escritas em profiles que a rota antiga fazia por entrega (reentrega inclusa).
+function inlineWrites(events: WebhookEvent[]) {
+  return events.reduce((n, e) => {
+    if (e.type === 'checkout.session.completed') return n + (e.data.object?.client_reference_id ? 2 : 0);
+    return n + (HANDLED_STRIPE_EVENTS.has(e.type) ? 1 : 0);
+  }, 0);
+}
+
+async function main() {
+  const userIds: string[] = [];
+  try {
+    const source = FIXTURES ? loadFixtures(FIXTURES) : syntheticEvents();
+    const events = await localize(source, userIds);
+    const unique = new Map(events.map(e => [e.id, e]));
+    console.log(
+      `=== PROVA DO WEBHOOK STRIPE: ${events.length} entregas (${unique.size} eventos, ` +
+        `${events.length - unique.size} reentregas), ${userIds.length} clientes, acks=${ACKS} workers=${WORKERS} ===\n`,
+    );
+
+    // 1. ack: o que o Stripe espera por entrega
+    const latencies: number[] = [];
+    const recorded = { new: 0, duplicate: 0 };
+    let next = 0;
+    const t0 = Date.now();
+    await Promise.all(
+      Array.from({ length: ACKS }, async () => {
+        while (next < events.length) {
+          const e = events[next++];
+          const t = performance.now();
+          recorded[await recordStripeEvent(sb, e)]++;
+          latencies.push(performance.now() - t);
+        }
+      }),
+    );
+    const ackWall = Date.now() - t0;
+    console.log(`  ack: ${(events.length / (ackWall / 1000)).toFixed(1)} entregas/s · p50=${pct(latencies, 0.5)}ms p95=${pct(latencies, 0.95)}ms`);
+    console.log(`       novos=${recorded.new} reentregas reconhecidas=${recorded.duplicate}`);
+
+    // 2. aplicação
+    const stats = await applyStripeEvents(sb, {
+      worker: `prova-${RUN}`,
+      concurrency: WORKERS,
+      maxMs: 5 * 60_000,
+      unmatchedRetrySecs: 0,
+    });
+    console.log(
+      `  aplicação: ${stats.events_per_s} eventos/s (${stats.events} em ${stats.wall_ms}ms, ${stats.batches} lotes, ${stats.customers} clientes)`,
+    );
+    console.log(
+      `       escritas em profiles: ${stats.profile_writes} (a rota antiga faria ${inlineWrites(events)}) · ` +
+        `aplicados=${stats.applied} ignorados=${stats.ignored} falhos=${stats.failed} retry=${stats.retried} velhos=${stats.stale}`,
+    );
+
+    // 3. exatidão: o profile de cada usuário = a soma dos eventos dele
+    const byKey = new Map<string, LedgerEvent[]>();
+    for (const e of unique.values()) {
+      if (!HANDLED_STRIPE_EVENTS.has(e.type)) continue;
+      const key = customerKeyOf(e);
+      const list = byKey.get(key) ?? [];
+      list.push({
+        id: e.id,
+        type: e.type,
+        customer_key: key,
+        stripe_created: new Date(e.created * 1000).toISOString(),
+        payload: e.data.object,
+        attempts: 1,
+        max_attempts: 5,
+        claim_token: '',
+      });
+      byKey.set(key, list);
+    }
+    const { data: profiles, error } = await sb
+      .from('profiles')
+      .select('id, subscription_plan, subscription_status, stripe_customer_id, guarantee_started_at')
+      .in('id', userIds);
+    if (error) throw new Error(`profiles: ${error.message}`);
+    const byUser = new Map((profiles || []).map(p => [p.id, p]));
+
+    let divergentes = 0;
+    for (const list of byKey.values()) {
+      const { patch } = reduceCustomerEvents(list);
+      if (!patch?.user_id) continue;
+      const p = byUser.get(patch.user_id);
+      const ok =
+        p &&
+        p.subscription_status === patch.fields.subscription_status &&
+        p.subscription_plan === patch.fields.subscription_plan &&
+        p.stripe_customer_id === patch.customer_id &&
+        p.guarantee_started_at;
+      if (!ok) {
+        divergentes++;
+        if (divergentes <= 5) console.log(`  ✗ ${patch.user_id}: esperado ${JSON.stringify(patch.fields)}, banco ${JSON.stringify(p)}`);
+      }
+    }
+
+    const { count: pendentes } = await sb
+      .from('stripe_events')
+      .select('id', { count: 'exact', head: true })
+      .like('id', `%_${RUN}`)
+      .in('status', ['pending', 'processing']);
+
+    console.log(`  profiles divergentes: ${divergentes} · eventos ainda pendentes: ${pendentes ?? 0}`);
+    const ok = divergentes === 0 && !pendentes && recorded.new === unique.size;
+    console.log(ok ? '\nOK — cada evento aplicado uma vez, cada profile no estado final.' : '\nFALHOU — ver contagens acima.');
+    if (!ok) process.exitCode = 1;
+  } finally {
+    await sb.from('stripe_events').delete().like('id', `%_${RUN}`);
+    for (const id of userIds) await sb.auth.admin.deleteUser(id);
+  }
+}
+
+main().catch(e => {
+  console.error(e);
+  process.exit(1);
+});
@@ -82,22 +82,24 @@ SELECT cron.schedule(
 );
 
 -- ============================================
--- CRON JOB 4: Cleanup Old Logs (Daily at 2 AM)
+-- CRON JOB 4: Logs Maintenance (Hourly)
 -- ============================================
+-- agent_logs / system_logs are time-partitioned
+-- (migration 20261018_logs_partitioning): this creates the partitions
+-- ahead, rolls closed hours into agent_logs_rollup / system_logs_rollup
+-- and drops whole partitions past the retention in logs_particoes.
+-- Replaces the old daily DELETE job.
 
--- Remove existing job if it exists
-SELECT cron.unschedule('alsham-cleanup-logs');
+-- Remove existing jobs if they exist (by lookup: first run has neither)
+SELECT cron.unschedule(jobid) FROM cron.job
+WHERE jobname IN ('alsham-cleanup-logs', 'alsham-logs-maintenance');
 
--- Schedule cleanup of old logs daily at 2 AM
+-- Schedule logs maintenance every hour (minute 7, off the */5 heartbeat)
 SELECT cron.schedule(
-  'alsham-cleanup-logs',
-  '0 2 * * *',  -- Daily at 2 AM
+  'alsham-logs-maintenance',
+  '7 * * * *',  -- Every hour
   $$
-  DELETE FROM public.system_logs
-  WHERE timestamp < NOW() - INTERVAL '30 days';
-
-  DELETE FROM public.agent_logs
-  WHERE created_at < NOW() - INTERVAL '30 days';
+  SELECT public.logs_manutencao();
   $$
 );
 
@@ -148,7 +150,8 @@ SUMMARY OF SCHEDULED JOBS:
    - Frequency: Every 3 minutes
    - Purpose: Process agent tasks and interactions
 
-4. alsham-cleanup-logs
-   - Frequency: Daily at 2 AM
-   - Purpose: Remove logs older than 30 days
+4. alsham-logs-maintenance
+   - Frequency: Every hour
+   - Purpose: Create log partitions ahead, update hourly rollups,
+     drop partitions older than the retention window
 */
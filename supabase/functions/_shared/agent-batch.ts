@@ -0,0 +1,58 @@
+// ALSHAM QUANTUM - Bulk agent writes shared by the cron workers
+// One RPC per tick instead of one UPDATE per agent (see
+// supabase/migrations/20261018_agents_batch_apply.sql).
+
+import type { SupabaseClient } from 'https://esm.sh/@supabase/supabase-js@2';
+
+export interface AgentChange {
+  id: string;
+  status?: string;
+  efficiency?: number;
+  current_task?: string;
+  touch?: boolean; // last_active = now()
+}
+
+export interface BatchResult {
+  updated: number;
+  db_ms: number;
+  rpc_ms: number;
+}
+
+export async function applyAgentChanges(
+  supabase: SupabaseClient,
+  changes: AgentChange[],
+): Promise<BatchResult> {
+  if (changes.length === 0) return { updated: 0, db_ms: 0, rpc_ms: 0 };
+
+  const started = performance.now();
+  const { data, error } = await supabase.rpc('agents_apply_batch', { changes });
+  const rpc_ms = Math.round(performance.now() - started);
+
+  if (error) {
+    throw new Error(`agents_apply_batch failed: ${error.message}`);
+  }
+
+  const row = Array.isArray(data) ? data[0] : data;
+  return {
+    updated: Number(row?.updated ?? 0),
+    db_ms: Number(row?.db_ms ?? 0),
+    rpc_ms,
+  };
+}
+
+// Wall-clock phases for the response body: { fetch_ms, compute_ms, ... }.
+export function phaseTimer() {
+  const t0 = performance.now();
+  let last = t0;
+  const phases: Record<string, number> = {};
+  return {
+    mark(name: string) {
+      const now = performance.now();
+      phases[`${name}_ms`] = Math.round(now - last);
+      last = now;
+    },
+    done(): Record<string, number> {
+      return { ...phases, total_ms: Math.round(performance.now() - t0) };
+    },
+  };
+}
@@ -3,6 +3,7 @@
 
 import { serve } from 'https://deno.land/std@0.168.0/http/server.ts';
 import { createClient } from 'https://esm.sh/@supabase/supabase-js@2';
+import { applyAgentChanges, phaseTimer, type AgentChange } from '../_shared/agent-batch.ts';
 
 const corsHeaders = {
   'Access-Control-Allow-Origin': '*',
@@ -22,19 +23,21 @@ serve(async (req) => {
     const supabase = createClient(supabaseUrl, supabaseServiceRoleKey);
 
     console.log('🔄 Agent Heartbeat Worker Started...');
+    const timer = phaseTimer();
 
-    // Get all agents
+    // Get all agents (only the columns the heartbeat reads)
     const { data: agents, error: agentsError } = await supabase
       .from('agents')
-      .select('*');
+      .select('id, status, efficiency');
 
     if (agentsError) {
       throw new Error(`Failed to fetch agents: ${agentsError.message}`);
     }
 
+    timer.mark('fetch');
     console.log(`📊 Processing ${agents.length} agents...`);
 
-    const updates = [];
+    const updates: AgentChange[] = [];
     const logs = [];
 
     // Update each agent
@@ -69,8 +72,7 @@ serve(async (req) => {
         id: agent.id,
         efficiency: parseFloat(newEfficiency.toFixed(2)),
         status: newStatus,
-        last_active: newStatus === 'ACTIVE' || newStatus === 'PROCESSING' ? 'Now' : agent.last_active,
-        updated_at: new Date().toISOString(),
+        touch: newStatus === 'ACTIVE' || newStatus === 'PROCESSING',
       };
 
       updates.push(update);
@@ -89,32 +91,31 @@ serve(async (req) => {
       });
     }
 
-    // Batch update agents
-    for (const update of updates) {
-      const { error: updateError } = await supabase
-        .from('agents')
-        .update(update)
-        .eq('id', update.id);
+    timer.mark('compute');
 
-      if (updateError) {
-        console.error(`Failed to update agent ${update.id}:`, updateError);
-      }
-    }
+    // Apply every change in a single statement
+    const batch = await applyAgentChanges(supabase, updates);
+    timer.mark('update');
 
     // Batch insert logs
-    const { error: logsError } = await supabase
-      .from('agent_logs')
-      .insert(logs);
+    if (logs.length > 0) {
+      const { error: logsError } = await supabase
+        .from('agent_logs')
+        .insert(logs);
 
-    if (logsError) {
-      console.error('Failed to insert logs:', logsError);
+      if (logsError) {
+        console.error('Failed to insert logs:', logsError);
+      }
     }
+    timer.mark('logs');
 
     const response = {
       success: true,
       message: 'Agent heartbeat completed',
-      agents_updated: updates.length,
+      agents_seen: agents.length,
+      agents_updated: batch.updated,
       logs_created: logs.length,
+      timings: { ...timer.done(), update_db_ms: batch.db_ms },
       timestamp: new Date().toISOString(),
     };
 
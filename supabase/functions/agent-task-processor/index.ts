@@ -3,6 +3,7 @@
 
 import { serve } from 'https://deno.land/std@0.168.0/http/server.ts';
 import { createClient } from 'https://esm.sh/@supabase/supabase-js@2';
+import { applyAgentChanges, phaseTimer, type AgentChange } from '../_shared/agent-batch.ts';
 
 const corsHeaders = {
   'Access-Control-Allow-Origin': '*',
@@ -54,21 +55,26 @@ serve(async (req) => {
     const supabase = createClient(supabaseUrl, supabaseServiceRoleKey);
 
     console.log('⚙️ Agent Task Processor Started...');
+    const timer = phaseTimer();
 
-    // Get all agents
+    // Get all agents (only the columns the processor reads)
     const { data: agents, error: agentsError } = await supabase
       .from('agents')
-      .select('*');
+      .select('id, role, status, current_task');
 
     if (agentsError) {
       throw new Error(`Failed to fetch agents: ${agentsError.message}`);
     }
 
+    timer.mark('fetch');
     console.log(`🤖 Processing tasks for ${agents.length} agents...`);
 
     const taskLogs = [];
     const interactions = [];
-    const agentUpdates = [];
+    const agentUpdates: AgentChange[] = [];
+
+    // Interaction targets, computed once instead of filtering per agent
+    const reachable = agents.filter(a => a.status === 'ACTIVE' || a.status === 'PROCESSING');
 
     // Process each agent
     for (const agent of agents) {
@@ -86,7 +92,7 @@ serve(async (req) => {
           id: agent.id,
           status: 'PROCESSING',
           current_task: newTask,
-          last_active: 'Now',
+          touch: true,
         });
 
         taskLogs.push({
@@ -106,7 +112,7 @@ serve(async (req) => {
           id: agent.id,
           status: 'ACTIVE',
           current_task: 'Ready for next assignment',
-          last_active: 'Now',
+          touch: true,
         });
 
         taskLogs.push({
@@ -122,13 +128,12 @@ serve(async (req) => {
 
       // Generate agent interactions (agent-to-agent communication)
       if (agent.status === 'ACTIVE' && Math.random() > 0.8) {
-        // Find another active agent
-        const otherAgents = agents.filter(a =>
-          a.id !== agent.id && (a.status === 'ACTIVE' || a.status === 'PROCESSING')
-        );
-
-        if (otherAgents.length > 0) {
-          const targetAgent = otherAgents[Math.floor(Math.random() * otherAgents.length)];
+        // Find another active agent (the agent itself is in `reachable`)
+        if (reachable.length > 1) {
+          let targetAgent = reachable[Math.floor(Math.random() * reachable.length)];
+          if (targetAgent.id === agent.id) {
+            targetAgent = reachable[(reachable.indexOf(targetAgent) + 1) % reachable.length];
+          }
 
           const interactionMessages = [
             'Data sync request',
@@ -155,17 +160,11 @@ serve(async (req) => {
       }
     }
 
-    // Apply agent updates
-    for (const update of agentUpdates) {
-      const { error: updateError } = await supabase
-        .from('agents')
-        .update(update)
-        .eq('id', update.id);
+    timer.mark('compute');
 
-      if (updateError) {
-        console.error(`Failed to update agent ${update.id}:`, updateError);
-      }
-    }
+    // Apply every agent update in a single statement
+    const batch = await applyAgentChanges(supabase, agentUpdates);
+    timer.mark('update');
 
     // Insert task logs
     if (taskLogs.length > 0) {
@@ -189,12 +188,16 @@ serve(async (req) => {
       }
     }
 
+    timer.mark('inserts');
+
     const response = {
       success: true,
       message: 'Agent task processing completed',
-      agents_updated: agentUpdates.length,
+      agents_seen: agents.length,
+      agents_updated: batch.updated,
       logs_created: taskLogs.length,
       interactions_created: interactions.length,
+      timings: { ...timer.done(), update_db_ms: batch.db_ms },
       timestamp: new Date().toISOString(),
     };
 
@@ -27,29 +27,30 @@ serve(async (req) => {
     const timestamp = new Date().toISOString();
     const metrics = [];
 
-    // Get agent statistics
-    const { data: agents, error: agentsError } = await supabase
-      .from('agents')
-      .select('status, efficiency');
+    // Agent statistics come pre-aggregated from one SQL call
+    // (quantum_metrics_snapshot) instead of every agent row.
+    const { data: snapshot, error: snapshotError } = await supabase
+      .rpc('quantum_metrics_snapshot', { latency_window: 100, error_window: 100 });
 
-    if (agentsError) {
-      throw new Error(`Failed to fetch agents: ${agentsError.message}`);
+    if (snapshotError || !snapshot) {
+      throw new Error(`Failed to fetch metrics snapshot: ${snapshotError?.message ?? 'empty response'}`);
     }
 
     // Calculate system health metrics
-    const totalAgents = agents.length;
-    const activeAgents = agents.filter(a => a.status === 'ACTIVE').length;
-    const warningAgents = agents.filter(a => a.status === 'WARNING').length;
-    const processingAgents = agents.filter(a => a.status === 'PROCESSING').length;
+    const byStatus: Record<string, number> = snapshot.agents.by_status ?? {};
+    const totalAgents = Number(snapshot.agents.total) || 0;
+    const activeAgents = Number(byStatus.ACTIVE ?? 0);
+    const warningAgents = Number(byStatus.WARNING ?? 0);
+    const processingAgents = Number(byStatus.PROCESSING ?? 0);
 
-    const avgEfficiency = agents.reduce((sum, a) => sum + a.efficiency, 0) / totalAgents;
+    const avgEfficiency = Number(snapshot.agents.avg_efficiency) || 0;
 
     // Calculate overall health score (0-100)
-    const healthScore = (
+    const healthScore = totalAgents > 0 ? (
       (activeAgents / totalAgents) * 40 +  // 40% weight for active agents
       (avgEfficiency / 100) * 40 +          // 40% weight for average efficiency
       (1 - warningAgents / totalAgents) * 20 // 20% weight for lack of warnings
-    );
+    ) : 0;
 
     // Simulate CPU usage (would be real in production)
     const cpuUsage = 20 + Math.random() * 30; // 20-50%
@@ -112,6 +113,8 @@ serve(async (req) => {
           warning_agents: warningAgents,
           processing_agents: processingAgents,
           avg_efficiency: parseFloat(avgEfficiency.toFixed(2)),
+          queue_size: Number(snapshot.queue_size) || 0,
+          tasks_last_minute: Number(snapshot.tasks.last_minute) || 0,
           source: 'system_metrics_worker'
         }
       }
@@ -0,0 +1,41 @@
+-- ============================================================================
+-- SUNA-CORE — neural_load ATÔMICO
+-- Migration: 20261018_agent_load_atomic
+-- ============================================================================
+-- `incrementNeuralLoad`/`decrementNeuralLoad` (quantum-brain/agent-router.ts)
+-- liam neural_load e escreviam de volta numa segunda query. Duas tarefas
+-- concorrentes no mesmo agente liam o mesmo valor e uma escrita se perdia —
+-- a carga derivava. E cada tarefa pagava 6 idas ao banco só de contabilidade
+-- (2× status + 2× leitura + 2× escrita de carga).
+--
+-- agent_load_transition() faz tudo num UPDATE só, sob o lock da linha:
+--   · neural_load += delta, grampeado em [0, 100]
+--   · status / current_task opcionais (null = mantém)
+--   · last_active = now() quando o status muda (now(), não o literal 'Now',
+--     que viraria constante no plano guardado — mesmo cuidado do heartbeat)
+-- Início da tarefa = 1 chamada; fim = 1 chamada. Devolve a carga resultante.
+-- ============================================================================
+
+create or replace function public.agent_load_transition(
+  p_agent_id     text,
+  p_delta        numeric,
+  p_status       text default null,
+  p_current_task text default null
+)
+returns numeric
+language sql
+security invoker
+set search_path = public
+as $$
+  update public.agents set
+    neural_load  = least(100, greatest(0, neural_load + coalesce(p_delta, 0))),
+    status       = coalesce(p_status, status),
+    current_task = coalesce(p_current_task, current_task),
+    last_active  = case when p_status is null then last_active else now() end,
+    updated_at   = now()
+  where id = p_agent_id
+  returning neural_load;
+$$;
+
+revoke all on function public.agent_load_transition(text, numeric, text, text) from public, anon, authenticated;
+grant execute on function public.agent_load_transition(text, numeric, text, text) to service_role;
@@ -0,0 +1,105 @@
+-- ============================================================================
+-- O COFRE DA ALMA — VERSÃO POR AGENTE
+-- Migration: 20261018_agent_prompts_versao
+-- ============================================================================
+-- `executeTask` (quantum-brain/task-executor.ts) abria o cofre a CADA tarefa
+-- para ler um prompt que só muda quando a carga de almas roda
+-- (scripts/carregar-almas.ts). O executor passa a guardar os prompts num
+-- cache em memória (quantum-brain/prompt-cache.ts) — e precisa saber, sem
+-- reler tudo, QUAIS prompts mudaram.
+--
+--   · agent_prompts.versao — carimbo por agente, tirado de uma sequence
+--     global. Só avança quando system_prompt muda de fato: o upsert
+--     idempotente da carga de almas não invalida nada.
+--   · agent_prompts.versao_xact — a transação que gravou o carimbo. A marca
+--     d'água da leitura incremental é por transação, não pela sequence:
+--     quem tirou um nextval menor mas comitou depois de uma leitura com
+--     carimbo maior seria pulado para sempre.
+--   · agent_prompts_cofre_estado.ultima_remocao — transação da última
+--     remoção (ou cascade de agents); o cache inteiro é descartado.
+--   · agent_prompts_mudancas(p_desde) — uma ida só: a marca d'água nova (o
+--     xmin do snapshot: toda transação ainda aberta fica acima dela), a
+--     última remoção, e os agentes gravados por transações >= p_desde, com
+--     o carimbo. A janela repete o que ficou perto da marca; o cliente
+--     descarta quem já tem aquele carimbo.
+--
+-- O cofre continua sem grant para anon/authenticated (20260727).
+-- ============================================================================
+
+create sequence if not exists public.agent_prompts_versao_seq;
+
+alter table public.agent_prompts
+  add column if not exists versao bigint not null default nextval('public.agent_prompts_versao_seq');
+
+alter table public.agent_prompts
+  add column if not exists versao_xact xid8 not null default pg_current_xact_id();
+
+create index if not exists idx_agent_prompts_versao_xact on public.agent_prompts (versao_xact);
+
+create or replace function public.agent_prompts_versao_trg()
+returns trigger
+language plpgsql
+as $$
+begin
+  if new.system_prompt is distinct from old.system_prompt then
+    new.versao := nextval('public.agent_prompts_versao_seq');
+    new.versao_xact := pg_current_xact_id();
+  else
+    new.versao := old.versao;
+    new.versao_xact := old.versao_xact;
+  end if;
+  return new;
+end;
+$$;
+
+drop trigger if exists trg_agent_prompts_versao on public.agent_prompts;
+create trigger trg_agent_prompts_versao before update on public.agent_prompts
+  for each row execute function public.agent_prompts_versao_trg();
+
+create table if not exists public.agent_prompts_cofre_estado (
+  id             boolean primary key default true check (id),
+  ultima_remocao xid8
+);
+insert into public.agent_prompts_cofre_estado (id) values (true) on conflict do nothing;
+
+create or replace function public.agent_prompts_remocao_trg()
+returns trigger
+language plpgsql
+as $$
+begin
+  update public.agent_prompts_cofre_estado
+     set ultima_remocao = pg_current_xact_id()
+   where id;
+  return null;
+end;
+$$;
+
+drop trigger if exists trg_agent_prompts_remocao on public.agent_prompts;
+create trigger trg_agent_prompts_remocao after delete on public.agent_prompts
+  for each statement execute function public.agent_prompts_remocao_trg();
+
+create or replace function public.agent_prompts_mudancas(p_desde bigint default null)
+returns jsonb
+language sql
+stable
+security invoker
+set search_path = public
+as $$
+  select jsonb_build_object(
+    'versao', pg_snapshot_xmin(pg_current_snapshot())::text::bigint,
+    'remocao', (select ultima_remocao::text::bigint from public.agent_prompts_cofre_estado where id),
+    'mudaram', coalesce((
+      select jsonb_agg(jsonb_build_object('agent_id', agent_id, 'versao', versao))
+      from public.agent_prompts
+      where p_desde is not null and versao_xact >= p_desde::text::xid8
+    ), '[]'::jsonb)
+  );
+$$;
+
+alter table public.agent_prompts_cofre_estado enable row level security;
+revoke all on public.agent_prompts_cofre_estado from public, anon, authenticated;
+grant all on public.agent_prompts_cofre_estado to service_role;
+revoke all on sequence public.agent_prompts_versao_seq from public, anon, authenticated;
+grant usage, select on sequence public.agent_prompts_versao_seq to service_role;
+revoke all on function public.agent_prompts_mudancas(bigint) from public, anon, authenticated;
+grant execute on function public.agent_prompts_mudancas(bigint) to service_role;
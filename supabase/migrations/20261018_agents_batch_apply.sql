@@ -0,0 +1,50 @@
+-- ============================================================================
+-- SUNA-CORE — ESCRITA EM LOTE NOS AGENTES
+-- Migration: 20261018_agents_batch_apply
+-- ============================================================================
+-- `agent-heartbeat` (a cada 5 min) e `agent-task-processor` (a cada 3 min)
+-- faziam um `.update().eq('id', …)` POR AGENTE, em série. Com as 139 linhas
+-- fantasma + uma `alma-<slug>` por alma polida, eram centenas de idas HTTP
+-- por tick — e o custo crescia linearmente com o número de agentes.
+--
+-- Agora cada tick manda UM array jsonb e o banco aplica tudo num único
+-- UPDATE … FROM jsonb_to_recordset:
+--   · campo ausente/null no item = coluna mantida (coalesce)
+--   · `touch: true` = last_active vira now() — avaliado a cada chamada; um
+--     literal 'Now' viraria constante no plano guardado da função
+--   · linha que não muda nada não é escrita (nem dispara trigger/realtime)
+-- Devolve quantas linhas mudaram e quanto tempo o UPDATE levou no banco.
+--
+-- Só service_role executa: as edge functions já usam a service key.
+-- ============================================================================
+
+create or replace function public.agents_apply_batch(changes jsonb)
+returns table (updated int, db_ms numeric)
+language plpgsql
+security invoker
+set search_path = public
+as $$
+declare
+  t0 timestamptz := clock_timestamp();
+  n  int;
+begin
+  update public.agents a set
+    status       = coalesce(c.status, a.status),
+    efficiency   = coalesce(c.efficiency, a.efficiency),
+    current_task = coalesce(c.current_task, a.current_task),
+    last_active  = case when coalesce(c.touch, false) then now() else a.last_active end,
+    updated_at   = now()
+  from jsonb_to_recordset(coalesce(changes, '[]'::jsonb))
+       as c(id text, status text, efficiency numeric, current_task text, touch boolean)
+  where a.id = c.id
+    and (coalesce(c.touch, false)
+         or (a.status, a.efficiency, a.current_task)
+            is distinct from (coalesce(c.status, a.status), coalesce(c.efficiency, a.efficiency), coalesce(c.current_task, a.current_task)));
+  get diagnostics n = row_count;
+
+  return query select n, round(extract(epoch from clock_timestamp() - t0)::numeric * 1000, 2);
+end;
+$$;
+
+revoke all on function public.agents_apply_batch(jsonb) from public, anon, authenticated;
+grant execute on function public.agents_apply_batch(jsonb) to service_role;
@@ -0,0 +1,85 @@
+-- ============================================================================
+-- SUNA-CORE — ESTATÍSTICAS DO DASHBOARD NUMA IDA SÓ
+-- Migration: 20261018_dashboard_stats
+-- ============================================================================
+-- `useDashboardStats` disparava seis requests do navegador a cada montagem
+-- (select de agents + dois count exatos de agents + deals, support_tickets
+-- e social_posts); `useAnalytics` baixava TODAS as linhas de agents e
+-- TODOS os `requests.status` só para agrupar em JS. N pessoas com o
+-- dashboard aberto = N vezes isso.
+--
+-- Agora a rota /api/dashboard/stats (lib/dashboard-stats.ts) chama esta
+-- função e guarda o resultado num cache do servidor (stale-while-
+-- revalidate): N dashboards abertos = uma leitura por intervalo.
+--
+--   dashboard_stats(p_global, p_requests_user) → jsonb
+--     · global (p_global) — igual para todo mundo:
+--         agents: total, operacionais, eficiência média, por role
+--         (contagem + média), por status, as 40 eficiências do gráfico;
+--         contagens de deals, support_tickets e social_posts
+--         (deals e support_tickets não têm leitura para `authenticated`
+--         desde 20260727_rls_lockdown_suna_core: a rota só repassa essas
+--         duas contagens a fundador)
+--     · requests (p_requests_user) — por dono, como a RLS de `requests`:
+--         total e por status do usuário; fundador (profiles.founder_access,
+--         o mesmo critério de is_founder()) vê todos
+--
+-- requests já tem índice por (user_id, created_at) (cota/garantia). Só
+-- service_role executa.
+-- ============================================================================
+
+create or replace function public.dashboard_stats(
+  p_global        boolean default true,
+  p_requests_user uuid default null
+)
+returns jsonb
+language sql
+stable
+security invoker
+set search_path = public
+as $$
+  select jsonb_build_object(
+    'generated_at', now(),
+    'global', case when not p_global then null else jsonb_build_object(
+      'agents', (
+        select jsonb_build_object(
+          'total',          count(*),
+          'operational',    count(*) filter (where upper(status) in ('IDLE', 'PROCESSING', 'LEARNING')),
+          'avg_efficiency', coalesce(round(avg(coalesce(efficiency, 0)), 2), 0))
+          from public.agents),
+      'by_role', coalesce((
+        select jsonb_agg(jsonb_build_object('role', role, 'count', n, 'avg_efficiency', media) order by role)
+          from (select coalesce(role, 'UNKNOWN') as role, count(*) as n, round(avg(coalesce(efficiency, 0)), 2) as media
+                  from public.agents group by 1) r), '[]'::jsonb),
+      'by_status', coalesce((
+        select jsonb_object_agg(status, n)
+          from (select coalesce(status, 'UNKNOWN') as status, count(*) as n
+                  from public.agents group by 1) s), '{}'::jsonb),
+      'efficiencies', coalesce((
+        select jsonb_agg(coalesce(efficiency, 0) order by id)
+          from (select id, efficiency from public.agents order by id limit 40) e), '[]'::jsonb),
+      'deals',   (select count(*) from public.deals),
+      'tickets', (select count(*) from public.support_tickets),
+      'posts',   (select count(*) from public.social_posts)
+    ) end,
+    'requests', case when p_requests_user is null then null else (
+      select jsonb_build_object(
+        'total',     coalesce(sum(n), 0),
+        'by_status', coalesce(jsonb_object_agg(status, n), '{}'::jsonb))
+        from (select coalesce(r.status, 'unknown') as status, count(*) as n
+                from (
+                  -- dois ramos em vez de OR: o do usuário usa o índice por user_id
+                  select status from public.requests
+                   where user_id = p_requests_user
+                     and not coalesce((select founder_access from public.profiles where id = p_requests_user), false)
+                  union all
+                  select status from public.requests
+                   where coalesce((select founder_access from public.profiles where id = p_requests_user), false)
+                ) r
+               group by 1) q
+    ) end
+  );
+$$;
+
+revoke all on function public.dashboard_stats(boolean, uuid) from public, anon, authenticated;
+grant execute on function public.dashboard_stats(boolean, uuid) to service_role;
@@ -0,0 +1,128 @@
+-- ============================================================================
+-- SUNA-CORE — CICLOS DE EVOLUÇÃO EM LOTE
+-- Migration: 20261018_evolution_bulk
+-- ============================================================================
+-- `runEvolutionCycle` (quantum-brain/evolution-engine.ts) lia TODOS os
+-- agentes com select('*') para tirar uma média, atualizava os candidatos
+-- um `await` por vez e relia a tabela inteira para a média nova. As rotas
+-- /api/evolution/daily e /micro faziam o mesmo em volta das chamadas ao
+-- Claude — uma por agente, em série, cada uma seguida do seu UPDATE.
+--
+-- Agora (quantum-brain/evolution-executor.ts):
+--   · agents_evolution_stats(p_limiar, p_desde) — o retrato do sistema em
+--     agregados: total, média, quantos abaixo do limiar, ativos, agentes
+--     por role e, se p_desde vier, requests desde então por status
+--   · agents_evolve_batch(changes) — UM UPDATE … FROM jsonb_to_recordset
+--     com todas as mudanças do ciclo; a média antes/depois sai da mesma
+--     transação, sem reler a tabela
+--       · efficiency absoluta ou `delta` (somado; preso a [0, 100])
+--       · capabilities: null = coluna mantida
+--       · prompt NÃO: agents.system_prompt é legível por usuário logado
+--         (20260727_agent_prompts_cofre); o prompt evoluído vai para o
+--         cofre, public.agent_prompts, que é o que executeTask lê
+--       · `evolved: true` = evolution_count + 1 e last_evolved_at = now()
+--   · agents_top_by_role(p_roles, p_min, p_por_role) — os melhores de cada
+--     role numa query só; row_number() por role, então um squad grande não
+--     come a cota dos outros
+--
+-- As colunas de evolução já existem (20241205, 20251204). Só service_role
+-- executa: o motor e as rotas de evolução usam a service key.
+-- ============================================================================
+
+create or replace function public.agents_evolution_stats(
+  p_limiar numeric default 80,
+  p_desde  timestamptz default null
+)
+returns jsonb
+language sql
+stable
+security invoker
+set search_path = public
+as $$
+  select jsonb_build_object(
+    'total',          a.total,
+    'avg_efficiency', a.media,
+    'below',          a.abaixo,
+    'active',         a.ativos,
+    'by_role',        coalesce((select jsonb_object_agg(role, n)
+                                  from (select role, count(*) as n from public.agents group by role) r), '{}'::jsonb),
+    'requests',       case when p_desde is null then null else (
+                        select jsonb_build_object(
+                          'total',     count(*),
+                          'completed', count(*) filter (where status = 'completed'),
+                          'failed',    count(*) filter (where status = 'failed'))
+                          from public.requests
+                         where created_at >= p_desde) end
+  )
+  from (
+    select count(*)                                                          as total,
+           coalesce(round(avg(efficiency), 2), 0)                            as media,
+           count(*) filter (where efficiency < p_limiar)                     as abaixo,
+           count(*) filter (where upper(status) in ('ACTIVE', 'PROCESSING')) as ativos
+      from public.agents
+  ) a;
+$$;
+
+create or replace function public.agents_evolve_batch(changes jsonb)
+returns table (updated int, avg_before numeric, avg_after numeric, db_ms numeric)
+language plpgsql
+security invoker
+set search_path = public
+as $$
+declare
+  t0     timestamptz := clock_timestamp();
+  n      int;
+  antes  numeric;
+  depois numeric;
+begin
+  select coalesce(round(avg(efficiency), 2), 0) into antes from public.agents;
+
+  update public.agents a set
+    efficiency      = greatest(0, least(100, coalesce(c.efficiency, a.efficiency + coalesce(c.delta, 0)))),
+    capabilities    = coalesce(c.capabilities, a.capabilities),
+    evolution_count = case when coalesce(c.evolved, false) then coalesce(a.evolution_count, 0) + 1 else a.evolution_count end,
+    last_evolved_at = case when coalesce(c.evolved, false) then now() else a.last_evolved_at end,
+    updated_at      = now()
+  from jsonb_to_recordset(coalesce(changes, '[]'::jsonb))
+       as c(id text, efficiency numeric, delta numeric, capabilities text[], evolved boolean)
+  where a.id = c.id;
+  get diagnostics n = row_count;
+
+  select coalesce(round(avg(efficiency), 2), 0) into depois from public.agents;
+
+  return query select n, antes, depois, round(extract(epoch from clock_timestamp() - t0)::numeric * 1000, 2);
+end;
+$$;
+
+create or replace function public.agents_top_by_role(
+  p_roles    text[],
+  p_min      numeric default 0,
+  p_por_role int default 3
+)
+returns table (id text, name text, role text, efficiency numeric)
+language sql
+stable
+security invoker
+set search_path = public
+as $$
+  select t.id, t.name, t.role, t.efficiency
+    from (
+      select a.id, a.name, a.role, a.efficiency,
+             row_number() over (partition by a.role order by a.efficiency desc, a.id) as n
+        from public.agents a
+       where a.role = any(coalesce(p_roles, '{}'))
+         and a.efficiency >= p_min
+    ) t
+   where t.n <= greatest(p_por_role, 0)
+   order by t.role, t.efficiency desc, t.id;
+$$;
+
+-- Candidatos (os piores primeiro) já saem de idx_agents_efficiency
+-- (20251223), lido de trás para frente.
+
+revoke all on function public.agents_evolution_stats(numeric, timestamptz) from public, anon, authenticated;
+revoke all on function public.agents_evolve_batch(jsonb) from public, anon, authenticated;
+revoke all on function public.agents_top_by_role(text[], numeric, int) from public, anon, authenticated;
+grant execute on function public.agents_evolution_stats(numeric, timestamptz) to service_role;
+grant execute on function public.agents_evolve_batch(jsonb) to service_role;
+grant execute on function public.agents_top_by_role(text[], numeric, int) to service_role;
@@ -0,0 +1,37 @@
+-- ============================================
+-- ALSHAM QUANTUM · HUNTER X.1 — checkpoints da caca
+-- Migration: 20261018_hunter_checkpoints
+-- ============================================
+-- Se o processo morre no meio da caca (timeout do Actions, OOM, provedor
+-- fora), o que estava em memoria — itens coletados, vereditos da triagem,
+-- analises feitas — se perdia, e a linha em hunter_hunts ficava 'running'.
+--
+-- Uma linha por (caca, etapa), sobrescrita a cada avanco:
+--   collected .. itens coletados (quarentena + minas) e placar das fontes
+--   triaged .... vereditos da triagem
+--   analysis ... finalistas ja resolvidos + achados gravados
+-- `cost` guarda os contadores de token no momento do checkpoint: a retomada
+-- continua a conta de onde parou, sem cobrar duas vezes.
+--
+-- `npx tsx src/index.ts --resume <hunt_id>` le isto e pula o que ja foi feito.
+-- Mesma lei da memoria: anon NEGADO, service_role escreve.
+-- ============================================
+
+create table if not exists public.hunter_checkpoints (
+  hunt_id    bigint not null references public.hunter_hunts(id) on delete cascade,
+  stage      text not null check (stage in ('collected','triaged','analysis')),
+  payload    jsonb not null,
+  cost       jsonb not null default '{}'::jsonb,
+  updated_at timestamptz default now(),
+  primary key (hunt_id, stage)
+);
+
+-- A retomada confere "este achado ja foi gravado nesta caca?" por url.
+create index if not exists idx_hunter_findings_hunt_url
+  on public.hunter_findings (hunt_id, url);
+create index if not exists idx_hunter_raw_queue_hunt_url
+  on public.hunter_raw_queue (hunt_id, url);
+
+alter table public.hunter_checkpoints enable row level security;
+revoke all on public.hunter_checkpoints from anon;
+grant all on public.hunter_checkpoints to service_role;
@@ -0,0 +1,64 @@
+-- ============================================
+-- ALSHAM QUANTUM · HUNTER X.1 — cache de respostas do LLM
+-- Migration: 20261018_hunter_llm_cache
+-- ============================================
+-- A triagem e a analise rodam com temperature 0: o mesmo item, com o mesmo
+-- modelo, o mesmo prompt e a mesma regra de score da missao, devolve a mesma
+-- resposta. Antes, essa resposta era jogada fora — e o item que voltava da
+-- quarentena (ou reaparecia em outra mina) pagava token de novo.
+--
+-- Chave = sha256(tipo | modelo | versao do prompt | hash da dica | hash do
+-- conteudo), calculada no runtime (hunter/src/cache.ts). A linha guarda os
+-- tokens da chamada ORIGINAL, para o relatorio declarar a economia em US$.
+--
+-- Mesma lei da memoria: anon NEGADO, service_role escreve.
+-- ============================================
+
+create table if not exists public.hunter_llm_cache (
+  key            text primary key,
+  kind           text not null check (kind in ('triage','analysis')),
+  model          text not null,
+  prompt_version text not null,
+  response       jsonb not null,
+  tokens_in      int not null default 0,
+  tokens_out     int not null default 0,
+  created_at     timestamptz default now(),
+  last_hit_at    timestamptz default now(),
+  expires_at     timestamptz not null
+);
+create index if not exists idx_hunter_llm_cache_expires
+  on public.hunter_llm_cache (expires_at);
+create index if not exists idx_hunter_llm_cache_last_hit
+  on public.hunter_llm_cache (last_hit_at);
+
+alter table public.hunter_llm_cache enable row level security;
+revoke all on public.hunter_llm_cache from anon;
+grant all on public.hunter_llm_cache to service_role;
+
+-- Despejo: primeiro o que venceu (TTL), depois o menos usado recentemente
+-- ate caber no teto de linhas. Chamado pelo runtime ao fim de cada caca.
+create or replace function public.hunter_llm_cache_evict(max_rows int)
+returns int
+language plpgsql
+as $$
+declare
+  vencidos int;
+  excesso int;
+begin
+  delete from public.hunter_llm_cache where expires_at < now();
+  get diagnostics vencidos = row_count;
+
+  delete from public.hunter_llm_cache
+  where key in (
+    select key from public.hunter_llm_cache
+    order by last_hit_at desc
+    offset greatest(max_rows, 0)
+  );
+  get diagnostics excesso = row_count;
+
+  return vencidos + excesso;
+end;
+$$;
+
+revoke all on function public.hunter_llm_cache_evict(int) from anon;
+grant execute on function public.hunter_llm_cache_evict(int) to service_role;
@@ -0,0 +1,130 @@
+-- ============================================
+-- ALSHAM QUANTUM · HUNTER X.1 — drenagem da quarentena
+-- Migration: 20261018_hunter_quarantine_drain
+-- ============================================
+-- A quarentena girava sem fim: a caca lia ate 500 linhas com select *,
+-- marcava todas como processadas e o que passava do triageCap voltava como
+-- linha NOVA. Item que falhava de novo, idem. A fila nunca esvaziava — so
+-- trocava de id.
+--
+-- Agora a linha e atualizada NO LUGAR:
+--   attempts ........ quantas vezes ja tentamos reprocessar
+--   last_attempt_at . quando
+--   processed_at .... quando saiu da fila (a taxa de drenagem mede por aqui)
+-- e, passado o teto de tentativas, sai da fila como morta (processed com
+-- attempts >= teto) em vez de voltar para sempre.
+--
+-- Ordem de prioridade: motivo, idade, mina — falha transitoria de qualquer
+-- idade sai antes de resposta envenenada. Paginacao por keyset sobre essa
+-- mesma tupla — sem OFFSET, custo constante por pagina.
+-- ============================================
+
+update public.hunter_raw_queue set created_at = now() where created_at is null;
+alter table public.hunter_raw_queue alter column created_at set not null;
+
+alter table public.hunter_raw_queue
+  add column if not exists attempts        int not null default 0,
+  add column if not exists last_attempt_at timestamptz,
+  add column if not exists processed_at    timestamptz,
+  -- llm_down/timeout sao transitorios e voltam primeiro; schema (resposta
+  -- envenenada) por ultimo.
+  add column if not exists reason_rank     smallint generated always as (
+    case queued_reason
+      when 'llm_down' then 0
+      when 'timeout'  then 1
+      when 'rate'     then 2
+      when 'schema'   then 3
+      else 4
+    end
+  ) stored;
+
+create index if not exists idx_hunter_raw_queue_drain
+  on public.hunter_raw_queue (reason_rank, created_at, source, id) where processed = false;
+create index if not exists idx_hunter_raw_queue_processed_at
+  on public.hunter_raw_queue (processed_at) where processed_at is not null;
+
+-- Uma pagina da fila, a partir do cursor (ultima linha da pagina anterior).
+create or replace function public.hunter_quarantine_page(
+  after_created timestamptz default null,
+  after_rank    smallint default null,
+  after_source  text default null,
+  after_id      bigint default null,
+  page_size     int default 200
+)
+returns table (
+  id bigint, hunt_id bigint, source text, url text, raw_payload jsonb,
+  queued_reason text, reason_rank smallint, attempts int, created_at timestamptz
+)
+language sql stable
+as $$
+  select q.id, q.hunt_id, q.source, q.url, q.raw_payload,
+         q.queued_reason, q.reason_rank, q.attempts, q.created_at
+  from public.hunter_raw_queue q
+  where q.processed = false
+    and (after_id is null
+         or (q.reason_rank, q.created_at, q.source, q.id)
+            > (after_rank, after_created, after_source, after_id))
+  order by q.reason_rank, q.created_at, q.source, q.id
+  limit greatest(page_size, 1);
+$$;
+
+-- Assenta o resultado de um lote numa unica ida ao banco: done_ids saem da
+-- fila; retry_ids ganham +1 tentativa (e saem como mortos no teto).
+create or replace function public.hunter_quarantine_settle(
+  done_ids     bigint[],
+  retry_ids    bigint[],
+  retry_reason text,
+  max_attempts int
+)
+returns table (processed int, retried int, dead int)
+language plpgsql
+as $$
+#variable_conflict use_column
+declare
+  n_done int;
+  n_retry int;
+  n_dead int;
+begin
+  update public.hunter_raw_queue
+     set processed = true, processed_at = now()
+   where id = any(coalesce(done_ids, '{}')) and processed = false;
+  get diagnostics n_done = row_count;
+
+  with t as (
+    update public.hunter_raw_queue
+       set attempts        = attempts + 1,
+           last_attempt_at = now(),
+           queued_reason   = coalesce(retry_reason, queued_reason),
+           processed       = attempts + 1 >= max_attempts,
+           processed_at    = case when attempts + 1 >= max_attempts then now() end
+     where id = any(coalesce(retry_ids, '{}')) and processed = false
+    returning processed
+  )
+  select count(*)::int, count(*) filter (where t.processed)::int into n_retry, n_dead from t;
+
+  return query select n_done, n_retry, n_dead;
+end;
+$$;
+
+-- As metricas da Ronda numa linha: profundidade, idade do mais antigo e
+-- quanto saiu da fila na janela.
+create or replace function public.hunter_quarantine_stats(window_hours int default 24)
+returns table (depth bigint, oldest_at timestamptz, processed_window bigint, dead_window bigint)
+language sql stable
+as $$
+  select
+    (select count(*) from public.hunter_raw_queue where processed = false),
+    (select min(created_at) from public.hunter_raw_queue where processed = false),
+    (select count(*) from public.hunter_raw_queue
+      where processed_at > now() - make_interval(hours => window_hours)),
+    (select count(*) from public.hunter_raw_queue
+      where processed_at > now() - make_interval(hours => window_hours) and attempts > 0
+        and last_attempt_at = processed_at);
+$$;
+
+revoke all on function public.hunter_quarantine_page(timestamptz, smallint, text, bigint, int) from anon;
+revoke all on function public.hunter_quarantine_settle(bigint[], bigint[], text, int) from anon;
+revoke all on function public.hunter_quarantine_stats(int) from anon;
+grant execute on function public.hunter_quarantine_page(timestamptz, smallint, text, bigint, int) to service_role;
+grant execute on function public.hunter_quarantine_settle(bigint[], bigint[], text, int) to service_role;
+grant execute on function public.hunter_quarantine_stats(int) to service_role;
@@ -0,0 +1,260 @@
+-- ============================================
+-- ALSHAM QUANTUM · HUNTER X.1 — contadores da Ronda e do Espelho
+-- Migration: 20261018_hunter_yield_rollups
+-- ============================================
+-- A Ronda fazia uma query por checagem (ultima caca, ultimas 7 cacas, count
+-- da quarentena) e o Espelho puxava TODO achado julgado da janela para contar
+-- em memoria. Com o historico crescendo, cada leitura crescia junto.
+--
+-- Agora os numeros sao mantidos na escrita, por trigger:
+--   hunter_ronda_stats ........ uma linha: ultima caca fechada (colheita),
+--                               cacas vazias seguidas, profundidade da fila
+--   hunter_source_daily ....... por (dia, mina): trazidos e vereditos
+--   hunter_calibration_daily .. por (dia, faixa de relevance, fonte unica,
+--                               veredito): a calibracao do Espelho
+-- A Ronda le 1 linha; o Espelho le (dias da janela x minas) linhas — nunca o
+-- historico.
+--
+-- Faixas historicas (ver medirCalibracao): alto >= 71 · medio 41-70 · baixo < 41.
+-- hunter_rollup_rebuild() recalcula tudo do zero (backfill e reparo).
+-- ============================================
+
+create table if not exists public.hunter_ronda_stats (
+  id                boolean primary key default true check (id),
+  last_hunt_id      bigint,
+  last_status       text,
+  last_finished_at  timestamptz,
+  last_items_kept   int not null default 0,
+  last_items_queued int not null default 0,
+  last_cost_usd     numeric(8,4) not null default 0,
+  empty_streak      int not null default 0,
+  quarantine_depth  bigint not null default 0,
+  updated_at        timestamptz default now()
+);
+insert into public.hunter_ronda_stats (id) values (true) on conflict do nothing;
+
+create table if not exists public.hunter_source_daily (
+  day      date not null,
+  source   text not null,
+  trazidos int not null default 0,
+  adopt    int not null default 0,
+  watch    int not null default 0,
+  discard  int not null default 0,
+  pending  int not null default 0,
+  primary key (day, source)
+);
+
+create table if not exists public.hunter_calibration_daily (
+  day           date not null,
+  band          text not null check (band in ('alto','medio','baixo')),
+  single_source boolean not null,
+  verdict       text not null,
+  n             int not null default 0,
+  primary key (day, band, single_source, verdict)
+);
+
+-- O Espelho lista os divergentes por titulo; so eles, nunca a janela inteira.
+create index if not exists idx_hunter_findings_divergentes
+  on public.hunter_findings (created_at)
+  where (verdict = 'discard' and relevance >= 71) or (verdict = 'adopt' and relevance < 41);
+
+create or replace function public.hunter_relevance_band(r int)
+returns text language sql immutable as $$
+  select case when r >= 71 then 'alto' when r >= 41 then 'medio' else 'baixo' end;
+$$;
+
+-- Soma (sinal +1) ou desfaz (sinal -1) um achado nos contadores diarios.
+create or replace function public.hunter_rollup_finding(f public.hunter_findings, sinal int)
+returns void
+language plpgsql
+as $$
+declare
+  d date := coalesce(f.created_at, now())::date;
+  v text := coalesce(f.verdict, 'pending');
+begin
+  insert into public.hunter_source_daily as s (day, source, trazidos, adopt, watch, discard, pending)
+  values (d, f.source, sinal,
+          case when v = 'adopt' then sinal else 0 end,
+          case when v = 'watch' then sinal else 0 end,
+          case when v = 'discard' then sinal else 0 end,
+          case when v = 'pending' then sinal else 0 end)
+  on conflict (day, source) do update set
+    trazidos = s.trazidos + excluded.trazidos,
+    adopt    = s.adopt + excluded.adopt,
+    watch    = s.watch + excluded.watch,
+    discard  = s.discard + excluded.discard,
+    pending  = s.pending + excluded.pending;
+
+  insert into public.hunter_calibration_daily as c (day, band, single_source, verdict, n)
+  values (d, public.hunter_relevance_band(f.relevance), coalesce(f.single_source, true), v, sinal)
+  on conflict (day, band, single_source, verdict) do update set n = c.n + excluded.n;
+end;
+$$;
+
+create or replace function public.hunter_findings_rollup_trg()
+returns trigger
+language plpgsql
+as $$
+begin
+  if tg_op in ('UPDATE', 'DELETE') then
+    perform public.hunter_rollup_finding(old, -1);
+  end if;
+  if tg_op in ('INSERT', 'UPDATE') then
+    perform public.hunter_rollup_finding(new, 1);
+  end if;
+  return null;
+end;
+$$;
+
+drop trigger if exists trg_hunter_findings_rollup on public.hunter_findings;
+create trigger trg_hunter_findings_rollup
+  after insert or delete or update of verdict, source, relevance, single_source, created_at
+  on public.hunter_findings
+  for each row execute function public.hunter_findings_rollup_trg();
+
+-- Caca fechada (done/partial) vira a "ultima caca" se for a mais recente.
+-- Vazia = nada mantido E custo zero — mesma regra da Ronda e do Espelho.
+create or replace function public.hunter_hunts_rollup_trg()
+returns trigger
+language plpgsql
+as $$
+begin
+  if new.status not in ('done', 'partial') or new.finished_at is null then
+    return null;
+  end if;
+  if tg_op = 'UPDATE' and old.status is not distinct from new.status
+     and old.finished_at is not distinct from new.finished_at then
+    return null;
+  end if;
+  update public.hunter_ronda_stats r set
+    empty_streak      = case
+                          when coalesce(new.items_kept, 0) = 0 and coalesce(new.cost_usd, 0) = 0
+                          then case when r.last_hunt_id = new.id then r.empty_streak else r.empty_streak + 1 end
+                          else 0
+                        end,
+    last_hunt_id      = new.id,
+    last_status       = new.status,
+    last_finished_at  = new.finished_at,
+    last_items_kept   = coalesce(new.items_kept, 0),
+    last_items_queued = coalesce(new.items_queued, 0),
+    last_cost_usd     = coalesce(new.cost_usd, 0),
+    updated_at        = now()
+  where r.id and (r.last_finished_at is null or new.finished_at >= r.last_finished_at);
+  return null;
+end;
+$$;
+
+drop trigger if exists trg_hunter_hunts_rollup on public.hunter_hunts;
+create trigger trg_hunter_hunts_rollup
+  after insert or update of status, finished_at
+  on public.hunter_hunts
+  for each row execute function public.hunter_hunts_rollup_trg();
+
+-- Profundidade da fila por COMANDO, nao por linha: o settle da drenagem mexe
+-- em centenas de linhas num update so — um ajuste so.
+create or replace function public.hunter_raw_queue_depth_trg()
+returns trigger
+language plpgsql
+as $$
+declare
+  delta bigint := 0;
+begin
+  if tg_op in ('INSERT', 'UPDATE') then
+    delta := delta + (select count(*) from novas where processed is not true);
+  end if;
+  if tg_op in ('UPDATE', 'DELETE') then
+    delta := delta - (select count(*) from velhas where processed is not true);
+  end if;
+  if delta <> 0 then
+    update public.hunter_ronda_stats
+       set quarantine_depth = greatest(quarantine_depth + delta, 0), updated_at = now()
+     where id;
+  end if;
+  return null;
+end;
+$$;
+
+drop trigger if exists trg_hunter_raw_queue_depth_ins on public.hunter_raw_queue;
+drop trigger if exists trg_hunter_raw_queue_depth_upd on public.hunter_raw_queue;
+drop trigger if exists trg_hunter_raw_queue_depth_del on public.hunter_raw_queue;
+create trigger trg_hunter_raw_queue_depth_ins after insert on public.hunter_raw_queue
+  referencing new table as novas
+  for each statement execute function public.hunter_raw_queue_depth_trg();
+create trigger trg_hunter_raw_queue_depth_upd after update on public.hunter_raw_queue
+  referencing old table as velhas new table as novas
+  for each statement execute function public.hunter_raw_queue_depth_trg();
+create trigger trg_hunter_raw_queue_depth_del after delete on public.hunter_raw_queue
+  referencing old table as velhas
+  for each statement execute function public.hunter_raw_queue_depth_trg();
+
+-- Recalcula tudo a partir das tabelas-fonte. Roda uma vez aqui (backfill) e
+-- serve de reparo se alguem mexer no banco com os triggers desligados.
+create or replace function public.hunter_rollup_rebuild()
+returns void
+language plpgsql
+as $$
+declare
+  h record;
+  streak int := 0;
+  ultima record;
+begin
+  lock table public.hunter_findings, public.hunter_hunts, public.hunter_raw_queue in share mode;
+
+  delete from public.hunter_source_daily;
+  insert into public.hunter_source_daily (day, source, trazidos, adopt, watch, discard, pending)
+  select created_at::date, source, count(*),
+         count(*) filter (where verdict = 'adopt'),
+         count(*) filter (where verdict = 'watch'),
+         count(*) filter (where verdict = 'discard'),
+         count(*) filter (where coalesce(verdict, 'pending') = 'pending')
+  from public.hunter_findings
+  group by 1, 2;
+
+  delete from public.hunter_calibration_daily;
+  insert into public.hunter_calibration_daily (day, band, single_source, verdict, n)
+  select created_at::date, public.hunter_relevance_band(relevance), coalesce(single_source, true),
+         coalesce(verdict, 'pending'), count(*)
+  from public.hunter_findings
+  group by 1, 2, 3, 4;
+
+  for h in
+    select items_kept, cost_usd from public.hunter_hunts
+    where status in ('done', 'partial') and finished_at is not null
+    order by finished_at desc
+  loop
+    exit when coalesce(h.items_kept, 0) <> 0 or coalesce(h.cost_usd, 0) <> 0;
+    streak := streak + 1;
+  end loop;
+
+  select id, status, finished_at, items_kept, items_queued, cost_usd into ultima
+  from public.hunter_hunts
+  where status in ('done', 'partial') and finished_at is not null
+  order by finished_at desc limit 1;
+
+  update public.hunter_ronda_stats set
+    last_hunt_id      = ultima.id,
+    last_status       = ultima.status,
+    last_finished_at  = ultima.finished_at,
+    last_items_kept   = coalesce(ultima.items_kept, 0),
+    last_items_queued = coalesce(ultima.items_queued, 0),
+    last_cost_usd     = coalesce(ultima.cost_usd, 0),
+    empty_streak      = streak,
+    quarantine_depth  = (select count(*) from public.hunter_raw_queue where processed is not true),
+    updated_at        = now()
+  where id;
+end;
+$$;
+
+select public.hunter_rollup_rebuild();
+
+alter table public.hunter_ronda_stats enable row level security;
+alter table public.hunter_source_daily enable row level security;
+alter table public.hunter_calibration_daily enable row level security;
+revoke all on public.hunter_ronda_stats from anon;
+revoke all on public.hunter_source_daily from anon;
+revoke all on public.hunter_calibration_daily from anon;
+grant all on public.hunter_ronda_stats to service_role;
+grant all on public.hunter_source_daily to service_role;
+grant all on public.hunter_calibration_daily to service_role;
+revoke all on function public.hunter_rollup_rebuild() from anon;
+grant execute on function public.hunter_rollup_rebuild() to service_role;
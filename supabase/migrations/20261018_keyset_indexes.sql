@@ -0,0 +1,49 @@
+-- ============================================================================
+-- SUNA-CORE — PAGINAÇÃO POR CURSOR (KEYSET): ÍNDICES COMPOSTOS
+-- Migration: 20261018_keyset_indexes
+-- ============================================================================
+-- As telas de agentes, logs e tarefas carregavam a tabela inteira
+-- (`select *` ordenado por name/created_at) e renderizavam tudo. Agora elas
+-- pedem páginas por cursor (frontend/src/lib/keyset.ts):
+--
+--   where (col > :v) or (col = :v and id > :id)   order by col, id  limit n
+--
+-- O custo de cada página não depende de quão fundo se está na lista (ao
+-- contrário de OFFSET), desde que exista um índice na MESMA ordem
+-- (col, id) — com o filtro de igualdade na frente quando a tela filtra.
+-- `id` entra como desempate: sem ele, linhas com o mesmo valor de `col`
+-- seriam puladas ou repetidas na virada da página.
+-- ============================================================================
+
+-- ----------------------------------------------------------------------------
+-- agents — lista por nome, opcionalmente filtrada por role (squad)
+-- ----------------------------------------------------------------------------
+create index if not exists idx_agents_name_id
+  on public.agents (name, id);
+
+create index if not exists idx_agents_role_name_id
+  on public.agents (role, name, id);
+
+-- ----------------------------------------------------------------------------
+-- agent_logs — mais recentes primeiro, geral ou de um agente
+-- (o composto por agente também cobre o antigo idx_agent_logs_agent_id)
+-- ----------------------------------------------------------------------------
+create index if not exists idx_agent_logs_created_id
+  on public.agent_logs (created_at desc, id desc);
+
+create index if not exists idx_agent_logs_agent_created_id
+  on public.agent_logs (agent_id, created_at desc, id desc);
+
+drop index if exists public.idx_agent_logs_agent_id;
+
+-- ----------------------------------------------------------------------------
+-- quantum_tasks — mais recentes primeiro, geral ou de um agente
+-- (substitui idx_quantum_tasks_created_at: mesma ordem, com desempate)
+-- ----------------------------------------------------------------------------
+create index if not exists idx_quantum_tasks_created_id
+  on public.quantum_tasks (created_at desc, id desc);
+
+create index if not exists idx_quantum_tasks_agent_created_id
+  on public.quantum_tasks (agent_id, created_at desc, id desc);
+
+drop index if exists public.idx_quantum_tasks_created_at;
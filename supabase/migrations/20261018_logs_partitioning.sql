@@ -0,0 +1,456 @@
+-- ============================================================================
+-- SUNA-CORE — LOGS PARTICIONADOS POR TEMPO, RETENÇÃO E ROLLUP
+-- Migration: 20261018_logs_partitioning
+-- ============================================================================
+-- O heartbeat grava um `metric_update` em agent_logs por agente a cada 5
+-- minutos; agent-task-processor, executeTask e a evolução gravam mais. São
+-- dezenas de milhares de linhas por dia, e a única limpeza era um DELETE
+-- diário de 30 dias (supabase/cron-jobs.sql) — caro, e que deixa a tabela e
+-- os índices inchados.
+--
+-- Agora:
+--   · agent_logs é particionada por DIA em created_at; system_logs por MÊS
+--     em timestamp. Consultas por período só tocam as partições do período.
+--   · logs_garantir_particoes() cria as partições à frente; as vencidas são
+--     removidas INTEIRAS (drop table) por logs_expirar_particoes() — sem
+--     DELETE, sem vacuum. Uma partição DEFAULT recebe o que cair fora das
+--     criadas (cron atrasado, relógio torto) e é reabsorvida quando a
+--     partição certa nasce.
+--   · agent_logs_rollup / system_logs_rollup guardam contagens por hora
+--     (e eficiência média dos heartbeats) para os gráficos de longo prazo;
+--     sobrevivem à retenção. agent_logs_serie() lê a série já agregada.
+--   · logs_manutencao() faz as três coisas; o pg_cron chama de hora em hora
+--     (supabase/cron-jobs.sql).
+--
+-- O armazenamento passa a crescer com a janela de retenção (config em
+-- logs_particoes), não para sempre.
+-- ============================================================================
+
+-- ----------------------------------------------------------------------------
+-- 1. CONFIGURAÇÃO — uma linha por tabela particionada
+-- ----------------------------------------------------------------------------
+create table if not exists public.logs_particoes (
+  tabela        text primary key,
+  coluna        text not null,                       -- chave de partição
+  granularidade text not null check (granularidade in ('day', 'month')),
+  retencao      interval not null,                   -- partição sai quando termina antes de now() - retencao
+  a_frente      int not null default 7,              -- partições criadas à frente (em granularidades)
+  rollup_ate    timestamptz                          -- horas fechadas já consolidadas no rollup
+);
+
+insert into public.logs_particoes (tabela, coluna, granularidade, retencao, a_frente) values
+  ('agent_logs',  'created_at', 'day',   interval '30 days', 7),
+  ('system_logs', 'timestamp',  'month', interval '30 days', 2)
+on conflict (tabela) do nothing;
+
+alter table public.logs_particoes enable row level security;
+revoke all on public.logs_particoes from anon, authenticated;
+
+-- ----------------------------------------------------------------------------
+-- 2. ROLLUPS POR HORA
+-- ----------------------------------------------------------------------------
+create table if not exists public.agent_logs_rollup (
+  hora           timestamptz not null,
+  agent_id       text not null,
+  event_type     text not null,
+  n              int not null default 0,
+  efficiency_avg numeric(5,2),                       -- média de new_efficiency dos metric_update
+  primary key (hora, agent_id, event_type)
+);
+
+create index if not exists idx_agent_logs_rollup_agent_hora
+  on public.agent_logs_rollup (agent_id, hora);
+
+create table if not exists public.system_logs_rollup (
+  hora   timestamptz not null,
+  level  text not null,
+  source text not null,
+  n      int not null default 0,
+  primary key (hora, level, source)
+);
+
+-- Mesmo regime de leitura das tabelas de sistema (20260727_rls_lockdown):
+-- logado lê, só o service_role escreve.
+do $$
+declare t text;
+begin
+  foreach t in array array['agent_logs_rollup', 'system_logs_rollup'] loop
+    execute format('alter table public.%I enable row level security', t);
+    execute format('drop policy if exists %I on public.%I', t || '_leitura_auth', t);
+    execute format($f$
+      create policy %I on public.%I
+      as permissive for select to authenticated
+      using (true)
+    $f$, t || '_leitura_auth', t);
+    execute format('grant select on public.%I to authenticated', t);
+    execute format('revoke insert, update, delete on public.%I from authenticated', t);
+    execute format('revoke all on public.%I from anon', t);
+  end loop;
+end $$;
+
+-- Recalcula as horas de [p_desde, p_ate) a partir de p_origem (a tabela ou,
+-- na conversão, a cópia legada). Sobrescreve: rodar de novo é seguro.
+create or replace function public.logs_rollup_calcular(
+  p_tabela text,
+  p_origem text,
+  p_desde  timestamptz,
+  p_ate    timestamptz
+)
+returns void
+language plpgsql
+set search_path = public
+as $$
+begin
+  if p_tabela = 'agent_logs' then
+    execute format($f$
+      insert into public.agent_logs_rollup as r (hora, agent_id, event_type, n, efficiency_avg)
+      select date_trunc('hour', created_at), agent_id, event_type, count(*),
+             avg((metadata->>'new_efficiency')::numeric)
+               filter (where metadata->>'new_efficiency' ~ '^-?[0-9]+(\.[0-9]+)?$')
+        from public.%I
+       where created_at >= $1 and created_at < $2 and agent_id is not null
+       group by 1, 2, 3
+      on conflict (hora, agent_id, event_type) do update
+        set n = excluded.n, efficiency_avg = excluded.efficiency_avg
+    $f$, p_origem) using p_desde, p_ate;
+  elsif p_tabela = 'system_logs' then
+    execute format($f$
+      insert into public.system_logs_rollup as r (hora, level, source, n)
+      select date_trunc('hour', "timestamp"), level, source, count(*)
+        from public.%I
+       where "timestamp" >= $1 and "timestamp" < $2
+       group by 1, 2, 3
+      on conflict (hora, level, source) do update set n = excluded.n
+    $f$, p_origem) using p_desde, p_ate;
+  else
+    raise exception 'logs_rollup_calcular: tabela sem rollup: %', p_tabela;
+  end if;
+end;
+$$;
+
+-- ----------------------------------------------------------------------------
+-- 3. PARTIÇÕES — criar à frente
+-- ----------------------------------------------------------------------------
+-- Cobre de (now() - retencao) até a_frente granularidades adiante. Cada
+-- partição nasce solta, recebe o que a DEFAULT tinha no intervalo dela e só
+-- então é anexada — anexar direto falharia se a DEFAULT tivesse linhas ali.
+create or replace function public.logs_garantir_particoes()
+returns int
+language plpgsql
+set search_path = public
+as $$
+declare
+  cfg     public.logs_particoes;
+  passo   interval;
+  inicio  timestamptz;
+  fim     timestamptz;
+  nome    text;
+  padrao  text;
+  criadas int := 0;
+begin
+  for cfg in select * from public.logs_particoes loop
+    if not exists (
+      select 1 from pg_class
+       where relnamespace = 'public'::regnamespace and relname = cfg.tabela and relkind = 'p'
+    ) then
+      continue;
+    end if;
+
+    passo  := ('1 ' || cfg.granularidade)::interval;
+    inicio := date_trunc(cfg.granularidade, now() - cfg.retencao);
+    fim    := date_trunc(cfg.granularidade, now()) + passo * (cfg.a_frente + 1);
+    padrao := cfg.tabela || '_default';
+
+    while inicio < fim loop
+      nome := cfg.tabela || '_p'
+              || to_char(inicio, case cfg.granularidade when 'day' then 'YYYYMMDD' else 'YYYYMM' end);
+
+      if to_regclass(format('public.%I', nome)) is null then
+        execute format('create table public.%I (like public.%I including defaults including constraints)',
+                       nome, cfg.tabela);
+        if to_regclass(format('public.%I', padrao)) is not null then
+          execute format($f$
+            with movidas as (
+              delete from public.%I where %I >= %L and %I < %L returning *
+            )
+            insert into public.%I select * from movidas
+          $f$, padrao, cfg.coluna, inicio, cfg.coluna, inicio + passo, nome);
+        end if;
+        execute format('alter table public.%I attach partition public.%I for values from (%L) to (%L)',
+                       cfg.tabela, nome, inicio, inicio + passo);
+        -- Acesso só pela tabela-mãe (onde estão as policies)
+        execute format('alter table public.%I enable row level security', nome);
+        execute format('revoke all on public.%I from anon, authenticated', nome);
+        criadas := criadas + 1;
+      end if;
+
+      inicio := inicio + passo;
+    end loop;
+
+    if to_regclass(format('public.%I', padrao)) is null then
+      execute format('create table public.%I partition of public.%I default', padrao, cfg.tabela);
+      execute format('alter table public.%I enable row level security', padrao);
+      execute format('revoke all on public.%I from anon, authenticated', padrao);
+    end if;
+  end loop;
+
+  return criadas;
+end;
+$$;
+
+-- ----------------------------------------------------------------------------
+-- 4. ROLLUP INCREMENTAL — horas fechadas desde a última rodada
+-- ----------------------------------------------------------------------------
+-- Refaz também a hora anterior à marca: pega linhas que chegaram atrasadas.
+create or replace function public.logs_rollup_atualizar()
+returns int
+language plpgsql
+set search_path = public
+as $$
+declare
+  cfg   public.logs_particoes;
+  desde timestamptz;
+  ate   timestamptz := date_trunc('hour', now());
+  horas int := 0;
+begin
+  for cfg in select * from public.logs_particoes loop
+    if to_regclass(format('public.%I', cfg.tabela)) is null then
+      continue;
+    end if;
+
+    desde := coalesce(cfg.rollup_ate - interval '1 hour', date_trunc('hour', now() - cfg.retencao));
+    if desde >= ate then
+      continue;
+    end if;
+
+    perform public.logs_rollup_calcular(cfg.tabela, cfg.tabela, desde, ate);
+    update public.logs_particoes set rollup_ate = ate where tabela = cfg.tabela;
+    horas := horas + (extract(epoch from ate - desde) / 3600)::int;
+  end loop;
+
+  return horas;
+end;
+$$;
+
+-- ----------------------------------------------------------------------------
+-- 5. RETENÇÃO — partições vencidas saem inteiras
+-- ----------------------------------------------------------------------------
+-- Só remove o que já terminou antes de now() - retencao E já está no rollup.
+-- Na DEFAULT, que não tem limite, apaga as linhas vencidas.
+create or replace function public.logs_expirar_particoes()
+returns int
+language plpgsql
+set search_path = public
+as $$
+declare
+  cfg       public.logs_particoes;
+  p         record;
+  limite    timestamptz;
+  ate       timestamptz;
+  removidas int := 0;
+begin
+  for cfg in select * from public.logs_particoes loop
+    if to_regclass(format('public.%I', cfg.tabela)) is null then
+      continue;
+    end if;
+    limite := least(now() - cfg.retencao, coalesce(cfg.rollup_ate, '-infinity'));
+
+    for p in
+      select c.relname, pg_get_expr(c.relpartbound, c.oid) as limites
+        from pg_inherits i
+        join pg_class c on c.oid = i.inhrelid
+       where i.inhparent = format('public.%I', cfg.tabela)::regclass
+    loop
+      if p.limites = 'DEFAULT' then
+        execute format('delete from public.%I where %I < %L', p.relname, cfg.coluna, limite);
+        continue;
+      end if;
+
+      ate := substring(p.limites from 'TO \(''([^'']+)''\)')::timestamptz;
+      if ate is not null and ate <= limite then
+        execute format('drop table public.%I', p.relname);
+        removidas := removidas + 1;
+      end if;
+    end loop;
+  end loop;
+
+  return removidas;
+end;
+$$;
+
+-- ----------------------------------------------------------------------------
+-- 6. MANUTENÇÃO — o que o pg_cron chama (de hora em hora)
+-- ----------------------------------------------------------------------------
+create or replace function public.logs_manutencao()
+returns jsonb
+language plpgsql
+set search_path = public
+as $$
+declare
+  criadas   int;
+  horas     int;
+  removidas int;
+begin
+  criadas   := public.logs_garantir_particoes();
+  horas     := public.logs_rollup_atualizar();
+  removidas := public.logs_expirar_particoes();
+  return jsonb_build_object(
+    'particoes_criadas',   criadas,
+    'horas_consolidadas',  horas,
+    'particoes_removidas', removidas,
+    'em',                  now()
+  );
+end;
+$$;
+
+-- ----------------------------------------------------------------------------
+-- 7. CONVERSÃO — tabela comum → particionada (uma vez; idempotente)
+-- ----------------------------------------------------------------------------
+-- A tabela atual vira <tabela>_legado; a nova herda colunas, defaults e
+-- checks (LIKE) e as FKs (copiadas do catálogo), com PK (id, coluna) — em
+-- tabela particionada a PK precisa conter a chave de partição. As linhas
+-- dentro da retenção são copiadas; TODO o legado entra no rollup antes de
+-- ser descartado, então o histórico longo continua nos gráficos.
+create or replace function public.logs_particionar(p_tabela text)
+returns text
+language plpgsql
+set search_path = public
+as $$
+declare
+  cfg    public.logs_particoes;
+  legado text := p_tabela || '_legado';
+  pk     text;
+  fk     record;
+  copiadas bigint;
+begin
+  select * into cfg from public.logs_particoes where tabela = p_tabela;
+  if not found then
+    raise exception 'logs_particionar: % não está em logs_particoes', p_tabela;
+  end if;
+
+  if to_regclass(format('public.%I', p_tabela)) is null then
+    return 'ausente';
+  end if;
+  if exists (
+    select 1 from pg_class
+     where relnamespace = 'public'::regnamespace and relname = p_tabela and relkind = 'p'
+  ) then
+    return 'ja_particionada';
+  end if;
+
+  execute format('alter table public.%I rename to %I', p_tabela, legado);
+  select conname into pk
+    from pg_constraint
+   where conrelid = format('public.%I', legado)::regclass and contype = 'p';
+  if pk is not null then
+    execute format('alter table public.%I rename constraint %I to %I', legado, pk, legado || '_pkey');
+  end if;
+
+  execute format('update public.%I set %I = now() where %I is null', legado, cfg.coluna, cfg.coluna);
+
+  execute format(
+    'create table public.%I (like public.%I including defaults including constraints including comments) partition by range (%I)',
+    p_tabela, legado, cfg.coluna);
+  execute format('alter table public.%I alter column %I set not null', p_tabela, cfg.coluna);
+  execute format('alter table public.%I alter column %I set default now()', p_tabela, cfg.coluna);
+  execute format('alter table public.%I add primary key (id, %I)', p_tabela, cfg.coluna);
+
+  for fk in
+    select conname, pg_get_constraintdef(oid) as def
+      from pg_constraint
+     where conrelid = format('public.%I', legado)::regclass and contype = 'f'
+  loop
+    execute format('alter table public.%I add constraint %I %s', p_tabela, fk.conname, fk.def);
+  end loop;
+
+  -- Mesmo regime do lockdown: logado lê, só o service_role escreve.
+  execute format('alter table public.%I enable row level security', p_tabela);
+  execute format($f$
+    create policy %I on public.%I
+    as permissive for select to authenticated
+    using (true)
+  $f$, p_tabela || '_leitura_auth', p_tabela);
+  execute format('grant select on public.%I to authenticated', p_tabela);
+  execute format('revoke insert, update, delete on public.%I from authenticated', p_tabela);
+  execute format('revoke all on public.%I from anon', p_tabela);
+  execute format('grant all on public.%I to service_role', p_tabela);
+
+  perform public.logs_garantir_particoes();
+
+  execute format('insert into public.%I select * from public.%I where %I >= %L',
+                 p_tabela, legado, cfg.coluna, date_trunc(cfg.granularidade, now() - cfg.retencao));
+  get diagnostics copiadas = row_count;
+
+  perform public.logs_rollup_calcular(p_tabela, legado, '-infinity', date_trunc('hour', now()));
+  update public.logs_particoes set rollup_ate = date_trunc('hour', now()) where tabela = p_tabela;
+
+  execute format('drop table public.%I', legado);
+  return format('particionada: %s linhas na retenção', copiadas);
+end;
+$$;
+
+select public.logs_particionar('agent_logs');
+select public.logs_particionar('system_logs');
+
+-- ----------------------------------------------------------------------------
+-- 8. ÍNDICES — criados na mãe, propagados para cada partição
+-- (os da tabela antiga, inclusive os de 20261018_keyset_indexes, foram
+-- embora com o legado)
+-- ----------------------------------------------------------------------------
+create index if not exists idx_agent_logs_created_id
+  on public.agent_logs (created_at desc, id desc);
+
+create index if not exists idx_agent_logs_agent_created_id
+  on public.agent_logs (agent_id, created_at desc, id desc);
+
+do $$
+begin
+  if to_regclass('public.system_logs') is not null then
+    create index if not exists idx_system_logs_timestamp_id
+      on public.system_logs ("timestamp" desc, id desc);
+  end if;
+end $$;
+
+-- ----------------------------------------------------------------------------
+-- 9. SÉRIE PARA GRÁFICOS — do rollup, nunca do log cru
+-- ----------------------------------------------------------------------------
+create or replace function public.agent_logs_serie(
+  p_desde    timestamptz,
+  p_bucket   text default 'day',
+  p_agent_id text default null
+)
+returns table (bucket timestamptz, event_type text, n bigint, efficiency_avg numeric)
+language sql
+stable
+security invoker
+set search_path = public
+as $$
+  select date_trunc(case when p_bucket = 'hour' then 'hour' else 'day' end, r.hora) as bucket,
+         r.event_type,
+         sum(r.n)::bigint,
+         round(avg(r.efficiency_avg), 2)
+    from public.agent_logs_rollup r
+   where r.hora >= p_desde
+     and (p_agent_id is null or r.agent_id = p_agent_id)
+   group by 1, 2
+   order by 1, 2;
+$$;
+
+-- ----------------------------------------------------------------------------
+-- 10. PERMISSÕES — manutenção é do motor; a série é leitura comum
+-- ----------------------------------------------------------------------------
+revoke all on function public.logs_rollup_calcular(text, text, timestamptz, timestamptz) from public, anon, authenticated;
+revoke all on function public.logs_garantir_particoes() from public, anon, authenticated;
+revoke all on function public.logs_rollup_atualizar() from public, anon, authenticated;
+revoke all on function public.logs_expirar_particoes() from public, anon, authenticated;
+revoke all on function public.logs_manutencao() from public, anon, authenticated;
+revoke all on function public.logs_particionar(text) from public, anon, authenticated;
+grant execute on function public.logs_rollup_calcular(text, text, timestamptz, timestamptz) to service_role;
+grant execute on function public.logs_garantir_particoes() to service_role;
+grant execute on function public.logs_rollup_atualizar() to service_role;
+grant execute on function public.logs_expirar_particoes() to service_role;
+grant execute on function public.logs_manutencao() to service_role;
+grant execute on function public.logs_particionar(text) to service_role;
+
+revoke all on function public.agent_logs_serie(timestamptz, text, text) from public, anon;
+grant execute on function public.agent_logs_serie(timestamptz, text, text) to authenticated, service_role;
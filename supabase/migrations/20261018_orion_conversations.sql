@@ -0,0 +1,167 @@
+-- ============================================================================
+-- SUNA-CORE — CONVERSAS DO ORION: TURNOS PAGINADOS + RESUMO INCREMENTAL
+-- Migration: 20261018_orion_conversations
+-- ============================================================================
+-- O chat do ORION (hooks/useOrionChat.ts) vivia só na memória do cliente:
+-- o array inteiro de mensagens era recriado a cada turno e renderizado
+-- por completo, e o modelo só via a última frase. Conversa longa = tela
+-- cada vez mais lenta, e nenhum contexto do que já foi dito.
+--
+-- Agora a conversa mora aqui:
+--   · orion_turns — um registro por fala (user/orion), lido pelo cliente em
+--     páginas por cursor (created_at desc, id desc — lib/keyset.ts)
+--   · orion_conversations — o resumo corrido de tudo que já saiu da janela
+--     (`summary`) e até onde ele vai (`summary_through`)
+--
+-- O modelo recebe uma janela de tamanho fixo: resumo + turnos recentes que
+-- cabem no orçamento de tokens (quantum-brain/orion-history.ts). O resumo
+-- cresce por dobras: resumo anterior + os poucos turnos que saíram da
+-- janela, nunca a conversa inteira. Custo e latência por turno não
+-- dependem do tamanho da conversa.
+--
+-- Escrita só pelo service_role (rota /api/quantum/brain/execute); o dono
+-- lê as próprias conversas.
+-- ============================================================================
+
+create table if not exists public.orion_conversations (
+  id              uuid primary key default gen_random_uuid(),
+  user_id         uuid not null references auth.users(id) on delete cascade,
+  summary         text not null default '',
+  summary_through timestamptz,
+  summary_turns   int not null default 0,
+  turn_count      int not null default 0,
+  created_at      timestamptz not null default now(),
+  updated_at      timestamptz not null default now()
+);
+
+create table if not exists public.orion_turns (
+  id              uuid primary key default gen_random_uuid(),
+  conversation_id uuid not null references public.orion_conversations(id) on delete cascade,
+  user_id         uuid not null references auth.users(id) on delete cascade,
+  role            text not null check (role in ('user', 'orion')),
+  content         text not null,
+  tokens          int not null default 0,
+  created_at      timestamptz not null default clock_timestamp()
+);
+
+-- Páginas da conversa e a janela do modelo: sempre "os N mais recentes
+-- desta conversa", na ordem do índice.
+create index if not exists idx_orion_turns_conversation_created_id
+  on public.orion_turns (conversation_id, created_at desc, id desc);
+
+create index if not exists idx_orion_conversations_user_updated
+  on public.orion_conversations (user_id, updated_at desc);
+
+-- ----------------------------------------------------------------------------
+-- orion_append_exchange — grava pergunta + resposta de uma vez. Sem
+-- conversa (ou com id de outro usuário), abre uma nova. Devolve o id da
+-- conversa e id + created_at dos dois turnos: o cliente monta com eles o
+-- cursor das páginas anteriores.
+-- ----------------------------------------------------------------------------
+create or replace function public.orion_append_exchange(
+  p_user_id         uuid,
+  p_conversation_id uuid,
+  p_user_text       text,
+  p_orion_text      text,
+  p_tokens          int default 0
+)
+returns table (
+  conversation_id uuid,
+  turn_count      int,
+  user_turn_id    uuid,
+  user_turn_at    timestamptz,
+  orion_turn_id   uuid,
+  orion_turn_at   timestamptz
+)
+language plpgsql
+security invoker
+set search_path = public
+as $$
+declare
+  conv uuid;
+  n    int;
+  u_id uuid;
+  u_at timestamptz;
+  o_id uuid;
+  o_at timestamptz;
+begin
+  select c.id into conv
+    from public.orion_conversations c
+   where c.id = p_conversation_id
+     and c.user_id = p_user_id;
+
+  if conv is null then
+    insert into public.orion_conversations (user_id) values (p_user_id) returning id into conv;
+  end if;
+
+  -- clock_timestamp(): a resposta fica sempre depois da pergunta
+  insert into public.orion_turns as t (conversation_id, user_id, role, content, tokens)
+  values (conv, p_user_id, 'user', p_user_text, 0)
+  returning t.id, t.created_at into u_id, u_at;
+  insert into public.orion_turns as t (conversation_id, user_id, role, content, tokens)
+  values (conv, p_user_id, 'orion', p_orion_text, greatest(0, coalesce(p_tokens, 0)))
+  returning t.id, t.created_at into o_id, o_at;
+
+  update public.orion_conversations c
+     set turn_count = c.turn_count + 2,
+         updated_at = now()
+   where c.id = conv
+  returning c.turn_count into n;
+
+  return query select conv, n, u_id, u_at, o_id, o_at;
+end;
+$$;
+
+-- ----------------------------------------------------------------------------
+-- orion_fold_summary — troca o resumo só se ninguém dobrou antes
+-- (compare-and-set em summary_through): duas dobras concorrentes não
+-- perdem nem repetem turnos.
+-- ----------------------------------------------------------------------------
+create or replace function public.orion_fold_summary(
+  p_conversation_id uuid,
+  p_expected        timestamptz,
+  p_through         timestamptz,
+  p_summary         text,
+  p_folded          int
+)
+returns boolean
+language plpgsql
+security invoker
+set search_path = public
+as $$
+begin
+  update public.orion_conversations
+     set summary         = p_summary,
+         summary_through = p_through,
+         summary_turns   = summary_turns + greatest(0, p_folded),
+         updated_at      = now()
+   where id = p_conversation_id
+     and summary_through is not distinct from p_expected;
+  return found;
+end;
+$$;
+
+-- ----------------------------------------------------------------------------
+-- RLS: o dono (ou o fundador) lê; ninguém logado escreve
+-- ----------------------------------------------------------------------------
+alter table public.orion_conversations enable row level security;
+alter table public.orion_turns enable row level security;
+
+drop policy if exists orion_conversations_dono_leitura on public.orion_conversations;
+create policy orion_conversations_dono_leitura on public.orion_conversations
+  as permissive for select to authenticated
+  using (user_id = (select auth.uid()) or public.is_founder());
+
+drop policy if exists orion_turns_dono_leitura on public.orion_turns;
+create policy orion_turns_dono_leitura on public.orion_turns
+  as permissive for select to authenticated
+  using (user_id = (select auth.uid()) or public.is_founder());
+
+revoke all on public.orion_conversations, public.orion_turns from anon;
+grant select on public.orion_conversations, public.orion_turns to authenticated;
+revoke insert, update, delete on public.orion_conversations, public.orion_turns from authenticated;
+
+revoke all on function public.orion_append_exchange(uuid, uuid, text, text, int) from public, anon, authenticated;
+revoke all on function public.orion_fold_summary(uuid, timestamptz, timestamptz, text, int) from public, anon, authenticated;
+grant execute on function public.orion_append_exchange(uuid, uuid, text, text, int) to service_role;
+grant execute on function public.orion_fold_summary(uuid, timestamptz, timestamptz, text, int) to service_role;
@@ -0,0 +1,175 @@
+-- ============================================================================
+-- SUNA-CORE — SNAPSHOT DE MÉTRICAS NUMA IDA SÓ
+-- Migration: 20261018_quantum_metrics_snapshot
+-- ============================================================================
+-- `system-metrics` puxava status+efficiency de TODOS os agentes para contar
+-- em JS; `getBrainState` e `getRealTimeMetrics` (quantum-brain/
+-- metrics-collector.ts) disparavam 5–6 queries cada — entre elas dois
+-- count(*) sobre o histórico inteiro de quantum_tasks. Cada poll do
+-- dashboard ficava mais caro à medida que o histórico crescia.
+--
+-- Agora:
+--   · quantum_task_counters — total/completed/failed de quantum_tasks,
+--     mantidos por trigger (por comando, não por linha)
+--   · quantum_metrics_snapshot() — o snapshot inteiro num jsonb:
+--       agentes por status + eficiência média, fila, contadores,
+--       tarefas no último minuto, latência média e taxa de erro das
+--       últimas N tarefas, top 5 agentes, linha de quantum_brain_state
+--     tudo por índice: nada varre o histórico de tarefas ou logs.
+-- ============================================================================
+
+create table if not exists public.quantum_task_counters (
+  id         boolean primary key default true check (id),
+  total      bigint not null default 0,
+  completed  bigint not null default 0,
+  failed     bigint not null default 0,
+  updated_at timestamptz not null default now()
+);
+insert into public.quantum_task_counters (id) values (true) on conflict do nothing;
+
+create or replace function public.quantum_task_counters_trg()
+returns trigger
+language plpgsql
+as $$
+declare
+  d_total bigint := 0;
+  d_done  bigint := 0;
+  d_fail  bigint := 0;
+begin
+  if tg_op in ('INSERT', 'UPDATE') then
+    select d_total + count(*),
+           d_done + count(*) filter (where status = 'completed'),
+           d_fail + count(*) filter (where status = 'failed')
+      into d_total, d_done, d_fail
+      from novas;
+  end if;
+  if tg_op in ('UPDATE', 'DELETE') then
+    select d_total - count(*),
+           d_done - count(*) filter (where status = 'completed'),
+           d_fail - count(*) filter (where status = 'failed')
+      into d_total, d_done, d_fail
+      from velhas;
+  end if;
+  if d_total <> 0 or d_done <> 0 or d_fail <> 0 then
+    update public.quantum_task_counters
+       set total     = total + d_total,
+           completed = completed + d_done,
+           failed    = failed + d_fail,
+           updated_at = now()
+     where id;
+  end if;
+  return null;
+end;
+$$;
+
+drop trigger if exists trg_quantum_task_counters_ins on public.quantum_tasks;
+drop trigger if exists trg_quantum_task_counters_upd on public.quantum_tasks;
+drop trigger if exists trg_quantum_task_counters_del on public.quantum_tasks;
+create trigger trg_quantum_task_counters_ins after insert on public.quantum_tasks
+  referencing new table as novas
+  for each statement execute function public.quantum_task_counters_trg();
+create trigger trg_quantum_task_counters_upd after update on public.quantum_tasks
+  referencing old table as velhas new table as novas
+  for each statement execute function public.quantum_task_counters_trg();
+create trigger trg_quantum_task_counters_del after delete on public.quantum_tasks
+  referencing old table as velhas
+  for each statement execute function public.quantum_task_counters_trg();
+
+-- Backfill (e reparo, se alguém mexer com os triggers desligados).
+update public.quantum_task_counters c set
+  total     = s.total,
+  completed = s.completed,
+  failed    = s.failed,
+  updated_at = now()
+from (
+  select count(*) as total,
+         count(*) filter (where status = 'completed') as completed,
+         count(*) filter (where status = 'failed') as failed
+  from public.quantum_tasks
+) s
+where c.id;
+
+-- Latência média das últimas N concluídas: índice parcial em completed_at.
+create index if not exists idx_quantum_tasks_completed_recent
+  on public.quantum_tasks (completed_at desc) where status = 'completed';
+-- Tamanho da fila: só as linhas 'queued' entram no índice.
+create index if not exists idx_requests_queued
+  on public.requests (created_at) where status = 'queued';
+
+create or replace function public.quantum_metrics_snapshot(
+  latency_window int default 100,
+  error_window   int default 100
+)
+returns jsonb
+language plpgsql
+stable
+security invoker
+set search_path = public
+as $$
+declare
+  brain  jsonb;
+  agents jsonb;
+  result jsonb;
+begin
+  -- quantum_brain_state é criada pelo SQL de inicialização do cérebro; se não
+  -- existir, o snapshot sai com brain = null em vez de falhar.
+  begin
+    select to_jsonb(s) into brain from public.quantum_brain_state s limit 1;
+  exception when undefined_table then
+    brain := null;
+  end;
+
+  select jsonb_build_object(
+           'total', count(*),
+           'operational', count(*) filter (where status in ('IDLE', 'PROCESSING', 'LEARNING')),
+           'avg_efficiency', coalesce(round(avg(efficiency), 2), 0),
+           'by_status', coalesce((
+             select jsonb_object_agg(status, n)
+             from (select status, count(*) as n from public.agents group by status) g
+           ), '{}'::jsonb)
+         )
+    into agents
+    from public.agents;
+
+  select jsonb_build_object(
+    'generated_at', now(),
+    'brain', brain,
+    'agents', agents,
+    'queue_size', (select count(*) from public.requests where status = 'queued'),
+    'tasks', jsonb_build_object(
+      'total',     c.total,
+      'completed', c.completed,
+      'failed',    c.failed,
+      'last_minute', (select count(*) from public.quantum_tasks
+                       where created_at >= now() - interval '1 minute'),
+      'avg_latency_ms', (select coalesce(avg(coalesce(execution_time_ms, 0)), 0)
+                           from (select execution_time_ms from public.quantum_tasks
+                                  where status = 'completed'
+                                  order by completed_at desc
+                                  limit greatest(latency_window, 1)) l),
+      'error_rate', (select coalesce(avg(case when status = 'failed' then 1.0 else 0.0 end), 0)
+                       from (select status from public.quantum_tasks
+                              order by created_at desc
+                              limit greatest(error_window, 1)) e)
+    ),
+    'top_agents', coalesce((
+      select jsonb_agg(jsonb_build_object('id', id, 'name', name, 'efficiency', efficiency) order by efficiency desc)
+      from (select id, name, efficiency from public.agents
+             where status in ('IDLE', 'PROCESSING', 'LEARNING')
+             order by efficiency desc
+             limit 5) t
+    ), '[]'::jsonb)
+  )
+    into result
+    from public.quantum_task_counters c
+   where c.id;
+
+  return result;
+end;
+$$;
+
+alter table public.quantum_task_counters enable row level security;
+revoke all on public.quantum_task_counters from anon, authenticated;
+grant all on public.quantum_task_counters to service_role;
+revoke all on function public.quantum_metrics_snapshot(int, int) from public, anon, authenticated;
+grant execute on function public.quantum_metrics_snapshot(int, int) to service_role;
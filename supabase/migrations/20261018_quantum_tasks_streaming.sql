@@ -0,0 +1,46 @@
+-- ============================================================================
+-- SUNA-CORE — EXECUÇÃO EM STREAMING: SAÍDA PARCIAL EM PEDAÇOS
+-- Migration: 20261018_quantum_tasks_streaming
+-- ============================================================================
+-- `executeTask` (quantum-brain/task-executor.ts) esperava a completion
+-- inteira do gpt-4o-mini (até 2000 tokens) para gravar qualquer coisa: o
+-- usuário via uma tela parada por segundos e, se o processo caísse no meio,
+-- nada do que já tinha sido gerado sobrava.
+--
+-- No modo streaming os tokens vão para o cliente (SSE) e, em paralelo, o
+-- texto parcial é anexado aqui em pedaços:
+--   · partial_output — texto acumulado; zerado quando a tarefa fecha (o
+--     resultado final, já parseado, vai para `output` como antes)
+--   · partial_seq — número do último pedaço: quantum_task_append() só aceita
+--     o pedaço seguinte, então repetição ou fora de ordem não corrompe o texto
+--   · first_token_ms — tempo até o primeiro token (o número que o streaming
+--     existe para baixar)
+-- ============================================================================
+
+alter table public.quantum_tasks add column if not exists partial_output text;
+alter table public.quantum_tasks add column if not exists partial_seq    int not null default 0;
+alter table public.quantum_tasks add column if not exists first_token_ms int;
+
+create or replace function public.quantum_task_append(
+  p_task_id uuid,
+  p_seq     int,
+  p_chunk   text
+)
+returns boolean
+language plpgsql
+security invoker
+set search_path = public
+as $$
+begin
+  update public.quantum_tasks
+     set partial_output = coalesce(partial_output, '') || p_chunk,
+         partial_seq    = p_seq
+   where id = p_task_id
+     and status = 'processing'
+     and partial_seq = p_seq - 1;
+  return found;
+end;
+$$;
+
+revoke all on function public.quantum_task_append(uuid, int, text) from public, anon, authenticated;
+grant execute on function public.quantum_task_append(uuid, int, text) to service_role;
@@ -0,0 +1,145 @@
+-- ============================================================================
+-- SUNA-CORE — FILA DURÁVEL DE REQUESTS
+-- Migration: 20261018_requests_queue
+-- ============================================================================
+-- `/api/queue/process` lia 5 requests 'queued' com um SELECT comum e chamava
+-- processRequest() em cada uma — duas execuções simultâneas do cron pegavam
+-- as MESMAS linhas; request que travasse no meio ficava 'processing' para
+-- sempre; cada request pagava 4 escritas de status em série.
+--
+-- Agora a fila vive no próprio `requests`:
+--   · requests_claim() — reserva N linhas com FOR UPDATE SKIP LOCKED, em
+--     ordem de prioridade e chegada. Cada reserva ganha um claim_token e um
+--     prazo de visibilidade (visible_at): se o worker morrer, a linha volta
+--     para a fila quando o prazo vence — até max_attempts; depois, 'failed'.
+--   · requests_settle() — fecha um LOTE de reservas num UPDATE só
+--     (completed / failed / retry com atraso). Só vale com o claim_token da
+--     reserva: um worker atrasado não sobrescreve quem reassumiu a linha.
+-- O pool de workers (frontend/src/lib/task-queue.ts) controla concorrência
+-- total, por prioridade e por agente.
+-- ============================================================================
+
+-- 'urgent' já sai do painel e de /api/requests/create, mas o CHECK de
+-- 009_create_requests_table só aceitava low/normal/high: o INSERT falhava.
+alter table public.requests drop constraint if exists requests_priority_check;
+alter table public.requests add constraint requests_priority_check
+  check (priority in ('low', 'normal', 'high', 'urgent'));
+
+alter table public.requests add column if not exists attempts     int not null default 0;
+alter table public.requests add column if not exists max_attempts int not null default 3;
+alter table public.requests add column if not exists visible_at   timestamptz;
+alter table public.requests add column if not exists claim_token  uuid;
+alter table public.requests add column if not exists claimed_at   timestamptz;
+alter table public.requests add column if not exists claimed_by   text;
+alter table public.requests add column if not exists priority_rank smallint
+  generated always as (
+    case priority when 'urgent' then 0 when 'high' then 1 when 'low' then 3 else 2 end
+  ) stored;
+
+-- Ordem de retirada da fila + varredura de reservas vencidas, ambas por índice.
+create index if not exists idx_requests_claim
+  on public.requests (priority_rank, created_at) where status = 'queued';
+create index if not exists idx_requests_claim_expiry
+  on public.requests (visible_at) where status = 'processing';
+
+create or replace function public.requests_claim(
+  p_worker          text,
+  p_limit           int,
+  p_visibility_secs int default 120,
+  p_priorities      text[] default null
+)
+returns table (
+  id          uuid,
+  user_id     uuid,
+  title       text,
+  description text,
+  priority    text,
+  agent_id    text,
+  attempts    int,
+  claim_token uuid,
+  created_at  timestamptz,
+  claimed_at  timestamptz
+)
+language plpgsql
+security invoker
+set search_path = public
+as $$
+#variable_conflict use_column
+begin
+  -- Reservas vencidas: voltam para a fila, ou morrem se esgotaram tentativas.
+  update public.requests r set
+    status        = case when r.attempts >= r.max_attempts then 'failed' else 'queued' end,
+    error_message = case when r.attempts >= r.max_attempts
+                         then coalesce(r.error_message, 'prazo de visibilidade vencido')
+                         else r.error_message end,
+    claim_token   = null,
+    visible_at    = null
+  where r.id in (
+    select v.id from public.requests v
+     where v.status = 'processing' and v.visible_at < now()
+     for update skip locked
+  );
+
+  return query
+  with alvo as (
+    select q.id from public.requests q
+     where q.status = 'queued'
+       and (q.visible_at is null or q.visible_at <= now())
+       and (p_priorities is null or q.priority = any (p_priorities))
+     order by q.priority_rank, q.created_at
+     limit greatest(p_limit, 0)
+     for update skip locked
+  )
+  update public.requests r set
+    status      = 'processing',
+    attempts    = r.attempts + 1,
+    claim_token = gen_random_uuid(),
+    claimed_at  = now(),
+    claimed_by  = p_worker,
+    visible_at  = now() + make_interval(secs => greatest(p_visibility_secs, 1))
+  from alvo
+  where r.id = alvo.id
+  returning r.id, r.user_id, r.title, r.description, r.priority, r.agent_id,
+            r.attempts, r.claim_token, r.created_at, r.claimed_at;
+end;
+$$;
+
+create or replace function public.requests_settle(p_results jsonb)
+returns int
+language plpgsql
+security invoker
+set search_path = public
+as $$
+declare
+  n int;
+begin
+  update public.requests r set
+    status = case
+      when c.outcome = 'retry' and r.attempts >= r.max_attempts then 'failed'
+      when c.outcome = 'retry' then 'queued'
+      else c.outcome
+    end,
+    visible_at = case when c.outcome = 'retry'
+                      then now() + make_interval(secs => greatest(coalesce(c.retry_in_secs, 0), 0))
+                      else null end,
+    claim_token        = null,
+    agent_id           = coalesce(c.agent_id, r.agent_id),
+    processing_time_ms = coalesce(c.processing_time_ms, r.processing_time_ms),
+    error_message      = case when c.outcome = 'completed' then null
+                              else coalesce(c.error, r.error_message) end
+  from jsonb_to_recordset(coalesce(p_results, '[]'::jsonb))
+       as c(id uuid, claim_token uuid, outcome text, agent_id text,
+            processing_time_ms int, error text, retry_in_secs int)
+  where r.id = c.id
+    and r.claim_token = c.claim_token
+    and r.status = 'processing'
+    and c.outcome in ('completed', 'failed', 'retry');
+  get diagnostics n = row_count;
+  return n;
+end;
+$$;
+
+revoke all on function public.requests_claim(text, int, int, text[]) from public, anon, authenticated;
+grant execute on function public.requests_claim(text, int, int, text[]) to service_role;
+revoke all on function public.requests_settle(jsonb) from public, anon, authenticated;
+grant execute on function public.requests_settle(jsonb) to service_role;
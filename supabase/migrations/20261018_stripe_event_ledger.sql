@@ -0,0 +1,285 @@
+-- ============================================================================
+-- SUNA-CORE — LIVRO-RAZÃO DE EVENTOS DO STRIPE
+-- Migration: 20261018_stripe_event_ledger
+-- ============================================================================
+-- O webhook (/api/stripe/webhook) fazia todo o caminho dentro do request
+-- do Stripe: 1 a 3 leituras/escritas em profiles por evento, em série.
+-- Reentrega do Stripe = tudo de novo; rajada de renovações no início do
+-- mês = N eventos × o caminho inteiro, com o Stripe esperando cada um.
+-- E `customer.subscription.updated` que chegasse antes do
+-- `checkout.session.completed` do mesmo cliente não achava o profile e
+-- se perdia.
+--
+-- Agora:
+--   · stripe_events — uma linha por event.id (chave primária = dedup). O
+--     webhook valida a assinatura, grava a linha e responde 200; nada mais.
+--   · stripe_events_claim() — o aplicador (lib/stripe-ledger.ts) reserva
+--     CLIENTES, não eventos: todos os pendentes de até N clientes de uma
+--     vez, com claim_token e prazo de visibilidade (como requests_claim).
+--     Um advisory lock por cliente na reserva + "não reserva cliente com
+--     evento em andamento": dois aplicadores nunca pegam o mesmo cliente.
+--   · stripe_apply_profiles() — recebe um patch por cliente (os eventos já
+--     somados, do mais antigo ao mais novo) e faz UMA escrita em profiles
+--     por cliente, tudo numa ida ao banco. profiles.stripe_event_at guarda
+--     o created do último evento aplicado: evento velho que chega atrasado
+--     não desfaz um mais novo.
+--   · stripe_events_settle() — fecha o lote (applied / ignored / failed /
+--     retry).
+--   · stripe_events_replay() — devolve à fila os 'failed' (de um cliente ou
+--     todos), com tentativas zeradas: customer sem profile esgota as
+--     tentativas e fica 'failed' até o mapeamento ser corrigido.
+--
+-- Só service_role lê e escreve.
+-- ============================================================================
+
+create table if not exists public.stripe_events (
+  id             text primary key,            -- evt_… do Stripe
+  type           text not null,
+  -- Agrupamento do aplicador: customer do Stripe; sem customer, o usuário
+  -- do checkout (user:<uuid>); sem nenhum dos dois, o próprio evento.
+  customer_key   text not null,
+  stripe_created timestamptz not null,
+  payload        jsonb not null,              -- event.data.object
+  status         text not null default 'pending'
+                 check (status in ('pending', 'processing', 'applied', 'ignored', 'failed')),
+  attempts       int not null default 0,
+  max_attempts   int not null default 5,
+  visible_at     timestamptz,
+  claim_token    uuid,
+  claimed_by     text,
+  received_at    timestamptz not null default now(),
+  applied_at     timestamptz,
+  error          text
+);
+
+create index if not exists idx_stripe_events_pending
+  on public.stripe_events (received_at) where status = 'pending';
+create index if not exists idx_stripe_events_customer_open
+  on public.stripe_events (customer_key, stripe_created) where status in ('pending', 'processing');
+create index if not exists idx_stripe_events_claim_expiry
+  on public.stripe_events (visible_at) where status = 'processing';
+
+alter table public.profiles add column if not exists stripe_event_at timestamptz;
+
+comment on column public.profiles.stripe_event_at is
+  'created do último evento do Stripe aplicado a este profile (ordem dos eventos).';
+
+-- ----------------------------------------------------------------------------
+-- stripe_events_claim — até p_customers clientes, com todos os eventos
+-- pendentes de cada um, em ordem de chegada ao Stripe.
+-- ----------------------------------------------------------------------------
+create or replace function public.stripe_events_claim(
+  p_worker          text,
+  p_customers       int,
+  p_visibility_secs int default 60
+)
+returns table (
+  id             text,
+  type           text,
+  customer_key   text,
+  stripe_created timestamptz,
+  payload        jsonb,
+  attempts       int,
+  max_attempts   int,
+  claim_token    uuid
+)
+language plpgsql
+security invoker
+set search_path = public
+as $$
+#variable_conflict use_column
+declare
+  token uuid := gen_random_uuid();
+  cliente text;
+  n int := 0;
+begin
+  -- Reservas vencidas voltam para a fila, ou morrem se esgotaram tentativas.
+  update public.stripe_events e set
+    status      = case when e.attempts >= e.max_attempts then 'failed' else 'pending' end,
+    error       = case when e.attempts >= e.max_attempts
+                       then coalesce(e.error, 'prazo de visibilidade vencido') else e.error end,
+    claim_token = null,
+    visible_at  = null
+  where e.id in (
+    select v.id from public.stripe_events v
+     where v.status = 'processing' and v.visible_at < now()
+     for update skip locked
+  );
+
+  for cliente in
+    select q.customer_key
+      from public.stripe_events q
+     where q.status = 'pending'
+       and (q.visible_at is null or q.visible_at <= now())
+     group by q.customer_key
+     order by min(q.received_at)
+  loop
+    exit when n >= greatest(p_customers, 0);
+    -- Outro aplicador reservando o mesmo cliente agora: pula
+    continue when not pg_try_advisory_xact_lock(hashtext('stripe_events:' || cliente));
+    -- ...ou já aplicando um lote dele: pula também (a ordem importa)
+    continue when exists (
+      select 1 from public.stripe_events p
+       where p.customer_key = cliente and p.status = 'processing'
+    );
+
+    update public.stripe_events e set
+      status      = 'processing',
+      attempts    = e.attempts + 1,
+      claim_token = token,
+      claimed_by  = p_worker,
+      visible_at  = now() + make_interval(secs => greatest(p_visibility_secs, 1))
+    where e.customer_key = cliente
+      and e.status = 'pending'
+      and (e.visible_at is null or e.visible_at <= now());
+    n := n + 1;
+  end loop;
+
+  return query
+  select e.id, e.type, e.customer_key, e.stripe_created, e.payload,
+         e.attempts, e.max_attempts, e.claim_token
+    from public.stripe_events e
+   where e.claim_token = token
+   order by e.customer_key, e.stripe_created, e.received_at;
+end;
+$$;
+
+-- ----------------------------------------------------------------------------
+-- stripe_apply_profiles — um patch por cliente:
+--   [{ key, user_id, customer_id, fields, start_guarantee, event_at }]
+-- Com user_id, escreve nesse profile; sem, nos profiles do customer. Só
+-- as colunas presentes em `fields` mudam. Devolve, por key:
+--   applied   — escrito
+--   stale     — o profile já tem evento mais novo (nada a fazer)
+--   unmatched — nenhum profile (o checkout do cliente ainda não chegou?)
+-- ----------------------------------------------------------------------------
+create or replace function public.stripe_apply_profiles(p_patches jsonb)
+returns table (key text, outcome text)
+language plpgsql
+security invoker
+set search_path = public
+as $$
+#variable_conflict use_column
+declare
+  c   record;
+  ids uuid[];
+  n   int;
+begin
+  for c in
+    select * from jsonb_to_recordset(coalesce(p_patches, '[]'::jsonb))
+      as x(key text, user_id uuid, customer_id text, fields jsonb, start_guarantee boolean, event_at timestamptz)
+  loop
+    if c.user_id is not null then
+      ids := array(select p.id from public.profiles p where p.id = c.user_id);
+    else
+      ids := array(select p.id from public.profiles p where p.stripe_customer_id = c.customer_id);
+    end if;
+
+    if coalesce(array_length(ids, 1), 0) = 0 then
+      key := c.key; outcome := 'unmatched';
+      return next;
+      continue;
+    end if;
+
+    update public.profiles p set
+      subscription_plan      = case when c.fields ? 'subscription_plan'      then c.fields->>'subscription_plan'      else p.subscription_plan end,
+      subscription_status    = case when c.fields ? 'subscription_status'    then c.fields->>'subscription_status'    else p.subscription_status end,
+      billing_cycle          = case when c.fields ? 'billing_cycle'          then c.fields->>'billing_cycle'          else p.billing_cycle end,
+      stripe_customer_id     = case when c.fields ? 'stripe_customer_id'     then c.fields->>'stripe_customer_id'     else p.stripe_customer_id end,
+      stripe_subscription_id = case when c.fields ? 'stripe_subscription_id' then c.fields->>'stripe_subscription_id' else p.stripe_subscription_id end,
+      subscription_end       = case when c.fields ? 'subscription_end'
+                                    then (c.fields->>'subscription_end')::timestamptz else p.subscription_end end,
+      -- Âncora da cota de garantia (lib/quota.ts): só na PRIMEIRA ativação
+      guarantee_started_at   = case when c.start_guarantee then coalesce(p.guarantee_started_at, now())
+                                    else p.guarantee_started_at end,
+      stripe_event_at        = c.event_at
+    where p.id = any (ids)
+      and (p.stripe_event_at is null or p.stripe_event_at <= c.event_at);
+    get diagnostics n = row_count;
+
+    -- Velho demais para os campos, mas a garantia ainda vale se nunca começou
+    if n = 0 and c.start_guarantee then
+      update public.profiles p set guarantee_started_at = now()
+       where p.id = any (ids) and p.guarantee_started_at is null;
+    end if;
+
+    key := c.key; outcome := case when n > 0 then 'applied' else 'stale' end;
+    return next;
+  end loop;
+end;
+$$;
+
+-- ----------------------------------------------------------------------------
+-- stripe_events_settle — fecha um lote pelo claim_token (igual a
+-- requests_settle): [{ id, claim_token, outcome, error, retry_in_secs }]
+-- ----------------------------------------------------------------------------
+create or replace function public.stripe_events_settle(p_results jsonb)
+returns int
+language plpgsql
+security invoker
+set search_path = public
+as $$
+declare
+  n int;
+begin
+  update public.stripe_events e set
+    status = case
+      when c.outcome = 'retry' and e.attempts >= e.max_attempts then 'failed'
+      when c.outcome = 'retry' then 'pending'
+      else c.outcome
+    end,
+    visible_at  = case when c.outcome = 'retry'
+                       then now() + make_interval(secs => greatest(coalesce(c.retry_in_secs, 0), 0))
+                       else null end,
+    applied_at  = case when c.outcome in ('applied', 'ignored') then now() else e.applied_at end,
+    claim_token = null,
+    error       = case when c.outcome = 'applied' then null else coalesce(c.error, e.error) end
+  from jsonb_to_recordset(coalesce(p_results, '[]'::jsonb))
+       as c(id text, claim_token uuid, outcome text, error text, retry_in_secs int)
+  where e.id = c.id
+    and e.claim_token = c.claim_token
+    and e.status = 'processing'
+    and c.outcome in ('applied', 'ignored', 'failed', 'retry');
+  get diagnostics n = row_count;
+  return n;
+end;
+$$;
+
+-- ----------------------------------------------------------------------------
+-- stripe_events_replay — 'failed' → 'pending' (p_customer_key null = todos)
+-- ----------------------------------------------------------------------------
+create or replace function public.stripe_events_replay(p_customer_key text default null)
+returns int
+language plpgsql
+security invoker
+set search_path = public
+as $$
+declare
+  n int;
+begin
+  update public.stripe_events e set
+    status     = 'pending',
+    attempts   = 0,
+    visible_at = null
+  where e.status = 'failed'
+    and (p_customer_key is null or e.customer_key = p_customer_key);
+  get diagnostics n = row_count;
+  return n;
+end;
+$$;
+
+-- ----------------------------------------------------------------------------
+-- Acesso: só o servidor (service_role)
+-- ----------------------------------------------------------------------------
+alter table public.stripe_events enable row level security;
+revoke all on public.stripe_events from public, anon, authenticated;
+grant all on public.stripe_events to service_role;
+
+revoke all on function public.stripe_events_claim(text, int, int) from public, anon, authenticated;
+revoke all on function public.stripe_apply_profiles(jsonb) from public, anon, authenticated;
+revoke all on function public.stripe_events_settle(jsonb) from public, anon, authenticated;
+revoke all on function public.stripe_events_replay(text) from public, anon, authenticated;
+grant execute on function public.stripe_events_claim(text, int, int) to service_role;
+grant execute on function public.stripe_apply_profiles(jsonb) to service_role;
+grant execute on function public.stripe_events_settle(jsonb) to service_role;
+grant execute on function public.stripe_events_replay(text) to service_role;